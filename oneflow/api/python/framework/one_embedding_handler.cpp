@@ -40,12 +40,21 @@ class OneEmbeddingHandler final {
 #endif
   }
 
-  void SaveSnapshot(const std::string& snapshot_name) {
+  Maybe<void> SaveSnapshot(const std::string& snapshot_name) {
 #ifdef WITH_CUDA
-    Global<embedding::EmbeddingManager>::Get()->SaveSnapshot(embedding_name_, local_rank_id_,
-                                                             rank_id_, snapshot_name);
+    return Global<embedding::EmbeddingManager>::Get()->SaveSnapshot(
+        embedding_name_, local_rank_id_, rank_id_, snapshot_name);
 #else
-    UNIMPLEMENTED() << "Only Support with CUDA";
+    UNIMPLEMENTED_THEN_RETURN() << "Only Support with CUDA";
+#endif
+  }
+
+  Maybe<void> SaveDeltaSnapshot(const std::string& snapshot_name) {
+#ifdef WITH_CUDA
+    return Global<embedding::EmbeddingManager>::Get()->SaveDeltaSnapshot(
+        embedding_name_, local_rank_id_, rank_id_, snapshot_name);
+#else
+    UNIMPLEMENTED_THEN_RETURN() << "Only Support with CUDA";
 #endif
   }
 
@@ -73,6 +82,7 @@ ONEFLOW_API_PYBIND11_MODULE("", m) {
                                                      rank_id, world_size);
       }))
       .def("SaveSnapshot", &OneEmbeddingHandler::SaveSnapshot)
+      .def("SaveDeltaSnapshot", &OneEmbeddingHandler::SaveDeltaSnapshot)
       .def("LoadSnapshot", &OneEmbeddingHandler::LoadSnapshot);
 }
 
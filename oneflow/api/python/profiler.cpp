@@ -17,19 +17,45 @@ limitations under the License.
 #include "oneflow/api/python/of_api_registry.h"
 
 #include "oneflow/core/profiler/profiler.h"
+#include "oneflow/core/profiler/host_profiler.h"
 
 namespace py = pybind11;
 
 namespace oneflow {
 
 ONEFLOW_API_PYBIND11_MODULE("profiler", m) {
-  m.def("RangePush", [](const std::string& str) { OF_PROFILER_RANGE_PUSH(str); });
+  m.def("RangePush", [](const std::string& str) { profiler::RangePush(str); });
 
-  m.def("RangePop", []() { OF_PROFILER_RANGE_POP(); });
+  m.def("RangePop", []() { profiler::RangePop(); });
 
   m.def("ProfilerStart", []() { profiler::ProfilerStart(); });
 
   m.def("ProfilerStop", []() { profiler::ProfilerStop(); });
+
+  m.def("EnableHostProfiler", [](bool record_shapes, bool profile_memory) {
+    profiler::HostProfilerConfig config;
+    config.record_shapes = record_shapes;
+    config.profile_memory = profile_memory;
+    profiler::EnableHostProfiler(config).GetOrThrow();
+  });
+
+  m.def("DisableHostProfiler", []() {
+    const auto& events = profiler::DisableHostProfiler().GetOrThrow();
+    py::list list;
+    for (const auto& event : events) {
+      py::dict dict;
+      dict["name"] = event.name;
+      dict["category"] = event.category;
+      dict["input_shapes"] = event.input_shapes;
+      dict["stream"] = event.stream;
+      dict["thread_id"] = event.thread_id;
+      dict["start_ns"] = event.start_ns;
+      dict["end_ns"] = event.end_ns;
+      dict["allocated_bytes_delta"] = event.allocated_bytes_delta;
+      list.append(dict);
+    }
+    return list;
+  });
 }
 
 }  // namespace oneflow
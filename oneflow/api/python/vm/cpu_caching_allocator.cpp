@@ -0,0 +1,49 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include <pybind11/pybind11.h>
+#include "oneflow/api/python/of_api_registry.h"
+#include "oneflow/core/vm/cpu_caching_allocator.h"
+
+namespace py = pybind11;
+
+namespace oneflow {
+namespace vm {
+
+ONEFLOW_API_PYBIND11_MODULE("", m) {
+  m.def("GetCpuAllocatorStats", []() {
+    const CpuCachingAllocatorStats stats = Global<CpuCachingAllocator>::Get()->GetStats();
+    py::dict dict;
+    dict["allocated_bytes"] = stats.allocated_bytes;
+    dict["peak_allocated_bytes"] = stats.peak_allocated_bytes;
+    dict["cached_bytes"] = stats.cached_bytes;
+    dict["reserved_bytes"] = stats.allocated_bytes + stats.cached_bytes;
+    dict["num_allocs"] = stats.num_allocs;
+    dict["num_cache_hits"] = stats.num_cache_hits;
+    dict["num_system_allocs"] = stats.num_system_allocs;
+    dict["num_system_frees"] = stats.num_system_frees;
+    return dict;
+  });
+  m.def("ResetCpuAllocatorPeakStats",
+        []() { Global<CpuCachingAllocator>::Get()->ResetPeakStats(); });
+  m.def("EmptyCpuAllocatorCache", []() { Global<CpuCachingAllocator>::Get()->EmptyCache(); });
+  m.def("SetCpuAllocatorCacheLimit",
+        [](size_t cache_limit) { Global<CpuCachingAllocator>::Get()->SetCacheLimit(cache_limit); });
+  m.def("GetCpuAllocatorCacheLimit",
+        []() { return Global<CpuCachingAllocator>::Get()->cache_limit(); });
+}
+
+}  // namespace vm
+}  // namespace oneflow
@@ -0,0 +1,134 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/op_expr_grad_function.h"
+#include "oneflow/core/framework/op_expr.h"
+#include "oneflow/core/functional/functional.h"
+#include "oneflow/core/common/container_util.h"
+
+namespace oneflow {
+namespace one {
+
+struct FusedRnnSequenceCaptureState : public AutoGradCaptureState {
+  std::string mode;
+  bool reverse = false;
+  bool input_gates_requires_grad = false;
+  bool hx_requires_grad = false;
+  bool weight_hh_requires_grad = false;
+  bool bias_hh_requires_grad = false;
+  bool cx_requires_grad = false;
+  bool weight_hr_requires_grad = false;
+  bool has_bias_hh = false;
+  bool has_cx = false;
+  bool has_weight_hr = false;
+};
+
+class FusedRnnSequence : public OpExprGradFunction<FusedRnnSequenceCaptureState> {
+ public:
+  Maybe<void> Init(const OpExpr& op) override;
+  Maybe<void> Capture(FusedRnnSequenceCaptureState* ctx, const TensorTuple& inputs,
+                      const TensorTuple& outputs, const AttrMap& attrs) const override;
+  Maybe<void> Apply(const FusedRnnSequenceCaptureState* ctx, const TensorTuple& out_grads,
+                    TensorTuple* in_grads) const override;
+
+ private:
+  // Positions of the optional inputs in the forward input tuple, -1 if absent.
+  int32_t bias_hh_index_ = -1;
+  int32_t cx_index_ = -1;
+  int32_t weight_hr_index_ = -1;
+};
+
+Maybe<void> FusedRnnSequence::Init(const OpExpr& op) {
+  const auto* fw_op_expr = dynamic_cast<const UserOpExpr*>(&op);
+  CHECK_NOTNULL_OR_RETURN(fw_op_expr);  // NOLINT(maybe-need-error-msg)
+  const auto& arg_tuple = *fw_op_expr->input_arg_tuple();
+  bias_hh_index_ = arg_tuple.TensorTupleIndex4ArgNameAndIndex("bias_hh", 0);
+  cx_index_ = arg_tuple.TensorTupleIndex4ArgNameAndIndex("cx", 0);
+  weight_hr_index_ = arg_tuple.TensorTupleIndex4ArgNameAndIndex("weight_hr", 0);
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> FusedRnnSequence::Capture(FusedRnnSequenceCaptureState* ctx,
+                                      const TensorTuple& inputs, const TensorTuple& outputs,
+                                      const AttrMap& attrs) const {
+  ctx->mode = JUST(attrs.GetAttr<std::string>("mode"));
+  ctx->reverse = JUST(attrs.GetAttr<bool>("reverse"));
+  ctx->input_gates_requires_grad = JUST(oneflow::VectorAt(inputs, 0))->requires_grad();
+  ctx->hx_requires_grad = JUST(oneflow::VectorAt(inputs, 1))->requires_grad();
+  ctx->weight_hh_requires_grad = JUST(oneflow::VectorAt(inputs, 2))->requires_grad();
+  ctx->has_bias_hh = bias_hh_index_ >= 0;
+  ctx->has_cx = cx_index_ >= 0;
+  ctx->has_weight_hr = weight_hr_index_ >= 0;
+  if (ctx->has_bias_hh) {
+    ctx->bias_hh_requires_grad = JUST(oneflow::VectorAt(inputs, bias_hh_index_))->requires_grad();
+  }
+  if (ctx->has_cx) {
+    ctx->cx_requires_grad = JUST(oneflow::VectorAt(inputs, cx_index_))->requires_grad();
+  }
+  if (ctx->has_weight_hr) {
+    ctx->weight_hr_requires_grad =
+        JUST(oneflow::VectorAt(inputs, weight_hr_index_))->requires_grad();
+  }
+  ctx->SaveTensorForBackward(JUST(oneflow::VectorAt(outputs, 0)));  // y
+  ctx->SaveTensorForBackward(JUST(oneflow::VectorAt(outputs, 2)));  // reserve_space
+  ctx->SaveTensorForBackward(JUST(oneflow::VectorAt(inputs, 1)));   // hx
+  ctx->SaveTensorForBackward(JUST(oneflow::VectorAt(inputs, 2)));   // weight_hh
+  if (ctx->has_cx) { ctx->SaveTensorForBackward(JUST(oneflow::VectorAt(inputs, cx_index_))); }
+  if (ctx->has_weight_hr) {
+    ctx->SaveTensorForBackward(JUST(oneflow::VectorAt(inputs, weight_hr_index_)));
+  }
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> FusedRnnSequence::Apply(const FusedRnnSequenceCaptureState* ctx,
+                                    const TensorTuple& out_grads, TensorTuple* in_grads) const {
+  CHECK_EQ_OR_RETURN(out_grads.size(), 3);  // NOLINT(maybe-need-error-msg)
+  const auto& saved = ctx->SavedTensors();
+  int32_t saved_index = 4;
+  Optional<one::Tensor> cx;
+  Optional<one::Tensor> weight_hr;
+  Optional<one::Tensor> dcy;
+  if (ctx->has_cx) {
+    cx = JUST(oneflow::VectorAt(saved, saved_index++));
+    dcy = JUST(oneflow::VectorAt(out_grads, 1));
+  }
+  if (ctx->has_weight_hr) { weight_hr = JUST(oneflow::VectorAt(saved, saved_index++)); }
+  const auto& grads = JUST(functional::FusedRnnSequenceGrad(
+      JUST(oneflow::VectorAt(out_grads, 0)), JUST(oneflow::VectorAt(saved, 0)),
+      JUST(oneflow::VectorAt(saved, 1)), JUST(oneflow::VectorAt(saved, 2)),
+      JUST(oneflow::VectorAt(saved, 3)), cx, weight_hr, dcy, ctx->has_bias_hh, ctx->mode,
+      ctx->reverse));
+
+  // Grads come back in output order: input_gates, hx, weight_hh, [bias_hh], [cx], [weight_hr].
+  in_grads->resize(3 + ctx->has_bias_hh + ctx->has_cx + ctx->has_weight_hr);
+  int32_t grad_index = 0;
+  const auto AssignGrad = [&](int32_t input_index, bool requires_grad) -> Maybe<void> {
+    const auto& grad = JUST(oneflow::VectorAt(*grads, grad_index++));
+    if (requires_grad) { *JUST(oneflow::VectorAt(in_grads, input_index)) = grad; }
+    return Maybe<void>::Ok();
+  };
+  JUST(AssignGrad(0, ctx->input_gates_requires_grad));
+  JUST(AssignGrad(1, ctx->hx_requires_grad));
+  JUST(AssignGrad(2, ctx->weight_hh_requires_grad));
+  if (ctx->has_bias_hh) { JUST(AssignGrad(bias_hh_index_, ctx->bias_hh_requires_grad)); }
+  if (ctx->has_cx) { JUST(AssignGrad(cx_index_, ctx->cx_requires_grad)); }
+  if (ctx->has_weight_hr) { JUST(AssignGrad(weight_hr_index_, ctx->weight_hr_requires_grad)); }
+  return Maybe<void>::Ok();
+}
+
+REGISTER_OP_EXPR_GRAD_FUNCTION("fused_rnn_sequence", FusedRnnSequence);
+
+}  // namespace one
+}  // namespace oneflow
@@ -36,7 +36,7 @@ class CpuDeviceCtx final : public DeviceCtx {
 
   std::unique_ptr<DeviceCtx> Copy() const { return std::unique_ptr<DeviceCtx>(new CpuDeviceCtx()); }
 
-  vm::Allocator* mut_allocator() override { return Global<vm::CpuAllocator>::Get(); }
+  vm::Allocator* mut_allocator() override { return &allocator_; }
 
   DeviceType device_type() const override { return DeviceType::kCPU; }
 
@@ -45,6 +45,7 @@ class CpuDeviceCtx final : public DeviceCtx {
  private:
   std::shared_ptr<ep::Device> device_;
   ep::Stream* stream_;
+  vm::CpuAllocator allocator_;
 };  // namespace oneflow
 
 }  // namespace oneflow
@@ -16,6 +16,7 @@ limitations under the License.
 #include "oneflow/core/embedding/cached_key_value_store.h"
 #include "oneflow/core/ep/cuda/cuda_stream.h"
 #include "oneflow/core/ep/include/device_manager_registry.h"
+#include <unordered_set>
 
 namespace oneflow {
 
@@ -43,8 +44,13 @@ template<typename Key, typename Elem>
 class CacheKeyValueStoreImpl : public KeyValueStore {
  public:
   OF_DISALLOW_COPY_AND_MOVE(CacheKeyValueStoreImpl);
-  CacheKeyValueStoreImpl(std::unique_ptr<KeyValueStore>&& store, std::unique_ptr<Cache>&& cache)
-      : store_(std::move(store)), cache_(std::move(cache)), synced_(true), max_query_length_(0) {
+  CacheKeyValueStoreImpl(std::unique_ptr<KeyValueStore>&& store, std::unique_ptr<Cache>&& cache,
+                         bool delta_snapshot)
+      : store_(std::move(store)),
+        cache_(std::move(cache)),
+        synced_(true),
+        delta_snapshot_(delta_snapshot),
+        max_query_length_(0) {
     OF_CUDA_CHECK(cudaGetDevice(&device_index_));
     CHECK_EQ(store_->KeySize(), cache_->KeySize());
     CHECK_EQ(store_->ValueSize(), cache_->ValueSize());
@@ -62,6 +68,8 @@ class CacheKeyValueStoreImpl : public KeyValueStore {
       OF_CUDA_CHECK(cudaFree(values_buffer_));
       OF_CUDA_CHECK(cudaFree(indices_buffer0_));
       OF_CUDA_CHECK(cudaFree(indices_buffer1_));
+      OF_CUDA_CHECK(cudaFree(dirty_keys_buffer_));
+      OF_CUDA_CHECK(cudaFreeHost(host_keys_buffer_));
     }
     cache_.reset();
     store_.reset();
@@ -81,11 +89,15 @@ class CacheKeyValueStoreImpl : public KeyValueStore {
       OF_CUDA_CHECK(cudaFree(values_buffer_));
       OF_CUDA_CHECK(cudaFree(indices_buffer0_));
       OF_CUDA_CHECK(cudaFree(indices_buffer1_));
+      OF_CUDA_CHECK(cudaFree(dirty_keys_buffer_));
+      OF_CUDA_CHECK(cudaFreeHost(host_keys_buffer_));
     }
     OF_CUDA_CHECK(cudaMalloc(&keys_buffer_, query_length * store_->KeySize()));
     OF_CUDA_CHECK(cudaMalloc(&values_buffer_, query_length * store_->ValueSize()));
     OF_CUDA_CHECK(cudaMalloc(&indices_buffer0_, query_length * sizeof(uint32_t)));
     OF_CUDA_CHECK(cudaMalloc(&indices_buffer1_, query_length * sizeof(uint32_t)));
+    OF_CUDA_CHECK(cudaMalloc(&dirty_keys_buffer_, query_length * store_->KeySize()));
+    OF_CUDA_CHECK(cudaMallocHost(&host_keys_buffer_, query_length * store_->KeySize()));
     max_query_length_ = query_length;
   }
 
@@ -94,12 +106,14 @@ class CacheKeyValueStoreImpl : public KeyValueStore {
   void Put(ep::Stream* stream, uint32_t num_keys, const void* keys, const void* values) override;
   bool SnapshotExists(const std::string& name) override;
   void LoadSnapshot(const std::string& name) override;
-  void SaveSnapshot(const std::string& name) override;
+  Maybe<void> SaveSnapshot(const std::string& name) override;
+  Maybe<void> SaveDeltaSnapshot(const std::string& name) override;
   void LoadSnapshot(const std::string& name,
                     const std::function<void(KVIterator* iter)>& Hook) override;
 
  private:
   void SyncCacheToStore();
+  void SyncDirtyKeysToStore();
 
   std::unique_ptr<KeyValueStore> store_;
   std::unique_ptr<Cache> cache_;
@@ -110,11 +124,17 @@ class CacheKeyValueStoreImpl : public KeyValueStore {
   Elem* values_buffer_{};
   uint32_t* indices_buffer0_{};
   uint32_t* indices_buffer1_{};
+  Key* dirty_keys_buffer_{};
+  Key* host_keys_buffer_{};
   int device_index_{};
   uint32_t max_query_length_;
   uint32_t num_elems_per_value_{};
   std::recursive_mutex mutex_;
   bool synced_;
+  bool delta_snapshot_;
+  // Keys put since the last snapshot that are still in the cache, only tracked with
+  // delta_snapshot_. Evicted keys are written to store_, which tracks them itself.
+  std::unordered_set<Key> dirty_keys_;
 };
 
 template<typename Key, typename Elem>
@@ -154,12 +174,26 @@ void CacheKeyValueStoreImpl<Key, Elem>::Put(ep::Stream* stream, uint32_t num_key
   std::lock_guard<std::recursive_mutex> lock(mutex_);
   synced_ = false;
   auto cuda_stream = stream->As<ep::CudaStream>();
+  if (delta_snapshot_ && num_keys > 0) {
+    CHECK_LE(num_keys, max_query_length_);
+    OF_CUDA_CHECK(cudaMemcpyAsync(host_keys_buffer_, keys, num_keys * sizeof(Key),
+                                  cudaMemcpyDefault, cuda_stream->cuda_stream()));
+    CHECK_JUST(cuda_stream->Sync());
+    dirty_keys_.insert(host_keys_buffer_, host_keys_buffer_ + num_keys);
+  }
   cache_->Put(stream, num_keys, keys, values, num_buffer_, keys_buffer_, values_buffer_);
   if (cache_->Policy() == CacheOptions::Policy::kFull) { return; }
   OF_CUDA_CHECK(cudaMemcpyAsync(host_num_buffer_, num_buffer_, sizeof(uint32_t), cudaMemcpyDefault,
                                 cuda_stream->cuda_stream()));
   CHECK_JUST(cuda_stream->Sync());
-  store_->Put(stream, *host_num_buffer_, keys_buffer_, values_buffer_);
+  const uint32_t num_evicted = *host_num_buffer_;
+  if (delta_snapshot_ && num_evicted > 0) {
+    OF_CUDA_CHECK(cudaMemcpyAsync(host_keys_buffer_, keys_buffer_, num_evicted * sizeof(Key),
+                                  cudaMemcpyDefault, cuda_stream->cuda_stream()));
+    CHECK_JUST(cuda_stream->Sync());
+    for (uint32_t i = 0; i < num_evicted; ++i) { dirty_keys_.erase(host_keys_buffer_[i]); }
+  }
+  store_->Put(stream, num_evicted, keys_buffer_, values_buffer_);
 }
 
 template<typename Key, typename Elem>
@@ -178,6 +212,7 @@ void CacheKeyValueStoreImpl<Key, Elem>::LoadSnapshot(
   CudaCurrentDeviceGuard guard(device_index_);
   std::lock_guard<std::recursive_mutex> lock(mutex_);
   cache_->Clear();
+  dirty_keys_.clear();
   store_->LoadSnapshot(name, [&](KVIterator* iter) {
     if (cache_->Policy() == CacheOptions::Policy::kFull) {
       auto device =
@@ -210,11 +245,56 @@ void CacheKeyValueStoreImpl<Key, Elem>::LoadSnapshot(
 }
 
 template<typename Key, typename Elem>
-void CacheKeyValueStoreImpl<Key, Elem>::SaveSnapshot(const std::string& name) {
+Maybe<void> CacheKeyValueStoreImpl<Key, Elem>::SaveSnapshot(const std::string& name) {
   CudaCurrentDeviceGuard guard(device_index_);
   std::lock_guard<std::recursive_mutex> lock(mutex_);
   SyncCacheToStore();
-  store_->SaveSnapshot(name);
+  dirty_keys_.clear();
+  return store_->SaveSnapshot(name);
+}
+
+template<typename Key, typename Elem>
+Maybe<void> CacheKeyValueStoreImpl<Key, Elem>::SaveDeltaSnapshot(const std::string& name) {
+  CudaCurrentDeviceGuard guard(device_index_);
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  CHECK_OR_RETURN(delta_snapshot_)
+      << "Delta snapshots need the delta_snapshot option of the persistent table";
+  SyncDirtyKeysToStore();
+  return store_->SaveDeltaSnapshot(name);
+}
+
+template<typename Key, typename Elem>
+void CacheKeyValueStoreImpl<Key, Elem>::SyncDirtyKeysToStore() {
+  if (!dirty_keys_.empty()) {
+    CudaCurrentDeviceGuard guard(device_index_);
+    auto device =
+        Global<ep::DeviceManagerRegistry>::Get()->GetDevice(DeviceType::kCUDA, device_index_);
+    CHECK(device);
+    auto* stream = device->CreateStream();
+    auto* cuda_stream = stream->As<ep::CudaStream>();
+    auto it = dirty_keys_.cbegin();
+    while (it != dirty_keys_.cend()) {
+      uint32_t num_keys = 0;
+      for (; it != dirty_keys_.cend() && num_keys < max_query_length_; ++it) {
+        host_keys_buffer_[num_keys] = *it;
+        num_keys += 1;
+      }
+      OF_CUDA_CHECK(cudaMemcpyAsync(dirty_keys_buffer_, host_keys_buffer_, num_keys * sizeof(Key),
+                                    cudaMemcpyDefault, cuda_stream->cuda_stream()));
+      cache_->Get(stream, num_keys, dirty_keys_buffer_, values_buffer_, num_buffer_, keys_buffer_,
+                  indices_buffer0_);
+      OF_CUDA_CHECK(cudaMemcpyAsync(host_num_buffer_, num_buffer_, sizeof(uint32_t),
+                                    cudaMemcpyDefault, cuda_stream->cuda_stream()));
+      CHECK_JUST(stream->Sync());
+      CHECK_EQ(*host_num_buffer_, 0) << "Dirty keys must stay in the cache until evicted";
+      store_->Put(stream, num_keys, dirty_keys_buffer_, values_buffer_);
+      CHECK_JUST(stream->Sync());
+    }
+    device->DestroyStream(stream);
+    dirty_keys_.clear();
+  }
+  // Every other cached value is unchanged since the last snapshot, which is already in store_.
+  synced_ = true;
 }
 
 template<typename Key, typename Elem>
@@ -245,33 +325,39 @@ void CacheKeyValueStoreImpl<Key, Elem>::SyncCacheToStore() {
 
 template<typename Key>
 std::unique_ptr<KeyValueStore> DispatchElemType(std::unique_ptr<KeyValueStore>&& store,
-                                                std::unique_ptr<Cache>&& cache) {
+                                                std::unique_ptr<Cache>&& cache,
+                                                bool delta_snapshot) {
   const uint32_t value_size = store->ValueSize();
   if (value_size % sizeof(uint4) == 0) {
     return std::unique_ptr<KeyValueStore>(
-        new CacheKeyValueStoreImpl<Key, uint4>(std::move(store), std::move(cache)));
+        new CacheKeyValueStoreImpl<Key, uint4>(std::move(store), std::move(cache), delta_snapshot));
   } else if (value_size % sizeof(uint64_t) == 0) {
     return std::unique_ptr<KeyValueStore>(
-        new CacheKeyValueStoreImpl<Key, uint64_t>(std::move(store), std::move(cache)));
+        new CacheKeyValueStoreImpl<Key, uint64_t>(std::move(store), std::move(cache),
+                                                  delta_snapshot));
   } else if (value_size % sizeof(uint32_t) == 0) {
     return std::unique_ptr<KeyValueStore>(
-        new CacheKeyValueStoreImpl<Key, uint32_t>(std::move(store), std::move(cache)));
+        new CacheKeyValueStoreImpl<Key, uint32_t>(std::move(store), std::move(cache),
+                                                  delta_snapshot));
   } else if (value_size % sizeof(uint16_t) == 0) {
     return std::unique_ptr<KeyValueStore>(
-        new CacheKeyValueStoreImpl<Key, uint16_t>(std::move(store), std::move(cache)));
+        new CacheKeyValueStoreImpl<Key, uint16_t>(std::move(store), std::move(cache),
+                                                  delta_snapshot));
   } else {
     return std::unique_ptr<KeyValueStore>(
-        new CacheKeyValueStoreImpl<Key, uint8_t>(std::move(store), std::move(cache)));
+        new CacheKeyValueStoreImpl<Key, uint8_t>(std::move(store), std::move(cache),
+                                                 delta_snapshot));
   }
 }
 
 std::unique_ptr<KeyValueStore> DispatchKeyType(std::unique_ptr<KeyValueStore>&& store,
-                                               std::unique_ptr<Cache>&& cache) {
+                                               std::unique_ptr<Cache>&& cache,
+                                               bool delta_snapshot) {
   const uint32_t key_size = store->KeySize();
   if (key_size == 4) {
-    return DispatchElemType<uint32_t>(std::move(store), std::move(cache));
+    return DispatchElemType<uint32_t>(std::move(store), std::move(cache), delta_snapshot);
   } else if (key_size == 8) {
-    return DispatchElemType<uint64_t>(std::move(store), std::move(cache));
+    return DispatchElemType<uint64_t>(std::move(store), std::move(cache), delta_snapshot);
   } else {
     UNIMPLEMENTED();
     return nullptr;
@@ -281,8 +367,9 @@ std::unique_ptr<KeyValueStore> DispatchKeyType(std::unique_ptr<KeyValueStore>&&
 }  // namespace
 
 std::unique_ptr<KeyValueStore> NewCachedKeyValueStore(std::unique_ptr<KeyValueStore>&& store,
-                                                      std::unique_ptr<Cache>&& cache) {
-  return DispatchKeyType(std::move(store), std::move(cache));
+                                                      std::unique_ptr<Cache>&& cache,
+                                                      bool delta_snapshot) {
+  return DispatchKeyType(std::move(store), std::move(cache), delta_snapshot);
 }
 
 }  // namespace embedding
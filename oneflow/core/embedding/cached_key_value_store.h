@@ -23,8 +23,11 @@ namespace oneflow {
 
 namespace embedding {
 
+// With delta_snapshot, the keys put since the last snapshot are tracked so that SaveDeltaSnapshot
+// only writes those back to store, instead of the whole cache.
 std::unique_ptr<KeyValueStore> NewCachedKeyValueStore(std::unique_ptr<KeyValueStore>&& store,
-                                                      std::unique_ptr<Cache>&& cache);
+                                                      std::unique_ptr<Cache>&& cache,
+                                                      bool delta_snapshot);
 
 }  // namespace embedding
 
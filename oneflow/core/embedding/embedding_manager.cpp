@@ -55,17 +55,39 @@ void EmbeddingManager::CreateKeyValueStore(const KeyValueStoreOptions& key_value
       key_value_store_options.PersistentTablePhysicalBlockSize();
   options.table_options.target_chunk_size_mb = 4 * 1024;
   options.table_options.capacity_hint = key_value_store_options.PersistentTableCapacityHint();
+  options.table_options.compaction_live_ratio =
+      key_value_store_options.PersistentTableCompactionLiveRatio();
+  options.table_options.compaction_io_rate_limit_mb =
+      key_value_store_options.PersistentTableCompactionIoRateLimitMb();
+  options.table_options.snapshot_prebuilt_index =
+      key_value_store_options.PersistentTableSnapshotPrebuiltIndex();
+  options.table_options.delta_snapshot = key_value_store_options.PersistentTableDeltaSnapshot();
   store = NewPersistentTableKeyValueStore(options);
   const std::vector<CacheOptions>& cache_options = key_value_store_options.GetCachesOptions();
   for (int i = cache_options.size() - 1; i >= 0; --i) {
     std::unique_ptr<Cache> cache = NewCache(cache_options.at(i));
-    store = NewCachedKeyValueStore(std::move(store), std::move(cache));
+    store = NewCachedKeyValueStore(std::move(store), std::move(cache),
+                                   key_value_store_options.PersistentTableDeltaSnapshot());
   }
   key_value_store_map_.emplace(map_key, std::move(store));
 }
 
-void EmbeddingManager::SaveSnapshot(const std::string& embedding_name, int64_t local_rank_id,
-                                    int64_t rank_id, const std::string& snapshot_name) {
+Maybe<void> EmbeddingManager::SaveSnapshot(const std::string& embedding_name,
+                                           int64_t local_rank_id, int64_t rank_id,
+                                           const std::string& snapshot_name) {
+  CudaCurrentDeviceGuard guard(local_rank_id);
+  std::pair<std::string, int64_t> map_key = std::make_pair(embedding_name, rank_id);
+  std::unique_lock<std::mutex> lock(mutex_);
+
+  auto it = key_value_store_map_.find(map_key);
+  CHECK(it != key_value_store_map_.end())
+      << "Can not find embedding: " << embedding_name << "-" << rank_id;
+  return it->second->SaveSnapshot(snapshot_name);
+}
+
+Maybe<void> EmbeddingManager::SaveDeltaSnapshot(const std::string& embedding_name,
+                                                int64_t local_rank_id, int64_t rank_id,
+                                                const std::string& snapshot_name) {
   CudaCurrentDeviceGuard guard(local_rank_id);
   std::pair<std::string, int64_t> map_key = std::make_pair(embedding_name, rank_id);
   std::unique_lock<std::mutex> lock(mutex_);
@@ -73,7 +95,7 @@ void EmbeddingManager::SaveSnapshot(const std::string& embedding_name, int64_t l
   auto it = key_value_store_map_.find(map_key);
   CHECK(it != key_value_store_map_.end())
       << "Can not find embedding: " << embedding_name << "-" << rank_id;
-  it->second->SaveSnapshot(snapshot_name);
+  return it->second->SaveDeltaSnapshot(snapshot_name);
 }
 
 void EmbeddingManager::LoadSnapshot(const std::string& embedding_name, int64_t local_rank_id,
@@ -32,8 +32,10 @@ class EmbeddingManager final {
   EmbeddingManager() = default;
   ~EmbeddingManager() = default;
 
-  void SaveSnapshot(const std::string& embedding_name, int64_t local_rank_id, int64_t rank_id,
-                    const std::string& snapshot_name);
+  Maybe<void> SaveSnapshot(const std::string& embedding_name, int64_t local_rank_id,
+                           int64_t rank_id, const std::string& snapshot_name);
+  Maybe<void> SaveDeltaSnapshot(const std::string& embedding_name, int64_t local_rank_id,
+                                int64_t rank_id, const std::string& snapshot_name);
   void LoadSnapshot(const std::string& embedding_name, int64_t local_rank_id, int64_t rank_id,
                     const std::string& snapshot_name);
 
@@ -18,6 +18,7 @@ limitations under the License.
 
 #include "oneflow/core/embedding/kv_iterator.h"
 #include "oneflow/core/common/util.h"
+#include "oneflow/core/common/maybe.h"
 #include "oneflow/core/ep/include/stream.h"
 
 namespace oneflow {
@@ -42,7 +43,8 @@ class KeyValueStore {
   virtual void LoadSnapshot(const std::string& name) = 0;
   virtual void LoadSnapshot(const std::string& name,
                             const std::function<void(KVIterator* iter)>& Hook) = 0;
-  virtual void SaveSnapshot(const std::string& name) = 0;
+  virtual Maybe<void> SaveSnapshot(const std::string& name) = 0;
+  virtual Maybe<void> SaveDeltaSnapshot(const std::string& name) = 0;
 };
 
 }  // namespace embedding
@@ -140,6 +140,33 @@ class KeyValueStoreOptions final {
     } else {
       persistent_table_capacity_hint_ = 0;
     }
+    if (persistent_table.contains("compaction_live_ratio")) {
+      CHECK(persistent_table["compaction_live_ratio"].is_number());
+      persistent_table_compaction_live_ratio_ =
+          persistent_table["compaction_live_ratio"].get<float>();
+    } else {
+      persistent_table_compaction_live_ratio_ = 0;
+    }
+    if (persistent_table.contains("compaction_io_rate_limit_mb")) {
+      CHECK(persistent_table["compaction_io_rate_limit_mb"].is_number());
+      persistent_table_compaction_io_rate_limit_mb_ =
+          persistent_table["compaction_io_rate_limit_mb"].get<int64_t>();
+    } else {
+      persistent_table_compaction_io_rate_limit_mb_ = 64;
+    }
+    if (persistent_table.contains("snapshot_prebuilt_index")) {
+      CHECK(persistent_table["snapshot_prebuilt_index"].is_boolean());
+      persistent_table_snapshot_prebuilt_index_ =
+          persistent_table["snapshot_prebuilt_index"].get<bool>();
+    } else {
+      persistent_table_snapshot_prebuilt_index_ = false;
+    }
+    if (persistent_table.contains("delta_snapshot")) {
+      CHECK(persistent_table["delta_snapshot"].is_boolean());
+      persistent_table_delta_snapshot_ = persistent_table["delta_snapshot"].get<bool>();
+    } else {
+      persistent_table_delta_snapshot_ = false;
+    }
   }
   ~KeyValueStoreOptions() = default;
   int64_t KeyTypeSize() const { return key_type_size_; }
@@ -150,6 +177,16 @@ class KeyValueStoreOptions final {
   const std::vector<std::string>& PersistentTablePaths() const { return persistent_table_paths_; }
   int64_t PersistentTablePhysicalBlockSize() const { return persistent_table_phisical_block_size_; }
   int64_t PersistentTableCapacityHint() const { return persistent_table_capacity_hint_; }
+  float PersistentTableCompactionLiveRatio() const {
+    return persistent_table_compaction_live_ratio_;
+  }
+  int64_t PersistentTableCompactionIoRateLimitMb() const {
+    return persistent_table_compaction_io_rate_limit_mb_;
+  }
+  bool PersistentTableSnapshotPrebuiltIndex() const {
+    return persistent_table_snapshot_prebuilt_index_;
+  }
+  bool PersistentTableDeltaSnapshot() const { return persistent_table_delta_snapshot_; }
   bool IsFullCache() const {
     if (cache_options_.size() > 0 && cache_options_.at(0).policy == CacheOptions::Policy::kFull) {
       return true;
@@ -165,6 +202,10 @@ class KeyValueStoreOptions final {
   std::vector<std::string> persistent_table_paths_;
   int64_t persistent_table_phisical_block_size_;
   int64_t persistent_table_capacity_hint_;
+  float persistent_table_compaction_live_ratio_;
+  int64_t persistent_table_compaction_io_rate_limit_mb_;
+  bool persistent_table_snapshot_prebuilt_index_;
+  bool persistent_table_delta_snapshot_;
   std::vector<CacheOptions> cache_options_;
 };
 
@@ -14,6 +14,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 */
 #include "oneflow/core/embedding/persistent_table_key_value_store.h"
+#include "oneflow/core/embedding/persistent_table.h"
 #include "oneflow/core/embedding/cached_key_value_store.h"
 #include "oneflow/core/embedding/cache.h"
 #include "oneflow/core/device/cuda_util.h"
@@ -27,8 +28,6 @@ namespace embedding {
 
 namespace {
 
-#ifdef WITH_CUDA
-
 std::string CreateTempDirectory() {
   const char* tmp_env = getenv("TMPDIR");
   const char* tmp_dir = tmp_env == nullptr ? "/tmp" : tmp_env;
@@ -38,6 +37,170 @@ std::string CreateTempDirectory() {
   return std::string(path);
 }
 
+#ifdef __linux__
+
+void PutVersion(PersistentTable* table, uint64_t begin, uint64_t end, uint32_t value_length,
+                float version) {
+  std::vector<uint64_t> keys(end - begin);
+  std::vector<float> values(keys.size() * value_length);
+  for (size_t i = 0; i < keys.size(); ++i) {
+    keys[i] = begin + i;
+    for (size_t j = 0; j < value_length; ++j) {
+      values[i * value_length + j] = static_cast<float>(keys[i] * value_length + j) + version;
+    }
+  }
+  table->Put(keys.size(), keys.data(), values.data());
+}
+
+TEST(PersistentTable, Compaction) {
+  const std::string path = CreateTempDirectory();
+  const uint32_t value_length = 128;
+  PersistentTableOptions options{};
+  options.path = path;
+  options.value_size = value_length * sizeof(float);
+  options.key_size = GetSizeOfDataType(DataType::kUInt64);
+  options.physical_block_size = 512;
+  options.target_chunk_size_mb = 1;
+  options.compaction_live_ratio = 0.5;
+  options.compaction_interval_ms = 10;
+  // 2048 values per chunk, chunk 0 to 2 are fully overwritten and chunk 3 is left 25% live.
+  const uint64_t num_keys = 8192;
+  std::unique_ptr<PersistentTable> table = NewPersistentTable(options);
+  PutVersion(table.get(), 0, num_keys, value_length, 0);
+  CHECK_JUST(table->SaveSnapshot("v0"));
+  PutVersion(table.get(), 0, 6144, value_length, 1);
+  PutVersion(table.get(), 6144, 7680, value_length, 1);
+  const auto ValueFileExists = [&](uint64_t chunk_id) {
+    const std::string chunk_name = std::to_string(chunk_id);
+    return PosixFile::FileExists(path + "/values/value-" + std::string(12 - chunk_name.size(), '0')
+                                 + chunk_name);
+  };
+  // Chunks referenced by snapshot v0 must be kept.
+  std::this_thread::sleep_for(std::chrono::milliseconds(200));
+  for (uint64_t chunk_id = 0; chunk_id < 4; ++chunk_id) { ASSERT_TRUE(ValueFileExists(chunk_id)); }
+  PosixFile::RecursiveDelete(path + "/snapshots/v0");
+  for (int i = 0; i < 500 && ValueFileExists(3); ++i) {
+    std::this_thread::sleep_for(std::chrono::milliseconds(10));
+  }
+  for (uint64_t chunk_id = 0; chunk_id < 4; ++chunk_id) { ASSERT_FALSE(ValueFileExists(chunk_id)); }
+  std::vector<uint64_t> keys(num_keys);
+  std::iota(keys.begin(), keys.end(), 0);
+  std::vector<float> values(num_keys * value_length);
+  std::vector<uint32_t> missing_indices(num_keys);
+  uint32_t n_missing = 0;
+  table->Get(num_keys, keys.data(), values.data(), &n_missing, missing_indices.data());
+  ASSERT_EQ(n_missing, 0);
+  for (size_t i = 0; i < num_keys; ++i) {
+    const float version = i < 7680 ? 1 : 0;
+    for (size_t j = 0; j < value_length; ++j) {
+      ASSERT_EQ(values[i * value_length + j], static_cast<float>(i * value_length + j) + version);
+    }
+  }
+  table.reset();
+  PosixFile::RecursiveDelete(path);
+}
+
+void TestLoadSnapshot(bool prebuilt_index) {
+  const std::string path = CreateTempDirectory();
+  const uint32_t value_length = 128;
+  PersistentTableOptions options{};
+  options.path = path;
+  options.value_size = value_length * sizeof(float);
+  options.key_size = GetSizeOfDataType(DataType::kUInt64);
+  options.physical_block_size = 512;
+  options.target_chunk_size_mb = 1;
+  options.snapshot_prebuilt_index = prebuilt_index;
+  const uint64_t num_keys = 8192;
+  std::unique_ptr<PersistentTable> table = NewPersistentTable(options);
+  PutVersion(table.get(), 0, num_keys, value_length, 0);
+  PutVersion(table.get(), 0, 1000, value_length, 1);
+  CHECK_JUST(table->SaveSnapshot("v1"));
+  PutVersion(table.get(), 0, num_keys, value_length, 2);
+  table.reset();
+  table = NewPersistentTable(options);
+  ASSERT_TRUE(table->SnapshotExists("v1"));
+  table->LoadSnapshot("v1");
+  std::vector<uint64_t> keys(num_keys + 1);
+  std::iota(keys.begin(), keys.end(), 0);
+  std::vector<float> values(keys.size() * value_length);
+  std::vector<uint32_t> missing_indices(keys.size());
+  uint32_t n_missing = 0;
+  table->Get(keys.size(), keys.data(), values.data(), &n_missing, missing_indices.data());
+  ASSERT_EQ(n_missing, 1);
+  ASSERT_EQ(missing_indices[0], num_keys);
+  for (size_t i = 0; i < num_keys; ++i) {
+    const float version = i < 1000 ? 1 : 0;
+    for (size_t j = 0; j < value_length; ++j) {
+      ASSERT_EQ(values[i * value_length + j], static_cast<float>(i * value_length + j) + version);
+    }
+  }
+  table.reset();
+  PosixFile::RecursiveDelete(path);
+}
+
+TEST(PersistentTable, LoadSnapshot) { TestLoadSnapshot(false); }
+
+TEST(PersistentTable, LoadSnapshotPrebuiltIndex) { TestLoadSnapshot(true); }
+
+TEST(PersistentTable, DeltaSnapshot) {
+  const std::string path = CreateTempDirectory();
+  const uint32_t value_length = 128;
+  PersistentTableOptions options{};
+  options.path = path;
+  options.value_size = value_length * sizeof(float);
+  options.key_size = GetSizeOfDataType(DataType::kUInt64);
+  options.physical_block_size = 512;
+  options.target_chunk_size_mb = 1;
+  const uint64_t num_keys = 8192;
+  std::unique_ptr<PersistentTable> table = NewPersistentTable(options);
+  // Keys are only tracked for delta snapshots when asked to.
+  ASSERT_FALSE(table->SaveDeltaSnapshot("untracked").IsOk());
+  table.reset();
+  options.delta_snapshot = true;
+  table = NewPersistentTable(options);
+  PutVersion(table.get(), 0, num_keys, value_length, 0);
+  CHECK_JUST(table->SaveSnapshot("full"));
+  PutVersion(table.get(), 0, 1000, value_length, 1);
+  CHECK_JUST(table->SaveDeltaSnapshot("delta1"));
+  PutVersion(table.get(), 500, 1500, value_length, 2);
+  PutVersion(table.get(), num_keys, num_keys + 100, value_length, 2);
+  CHECK_JUST(table->SaveDeltaSnapshot("delta2"));
+  PutVersion(table.get(), 0, num_keys, value_length, 3);
+  // Snapshots that deltas are built on can not be overwritten.
+  ASSERT_FALSE(table->SaveSnapshot("full").IsOk());
+  ASSERT_FALSE(table->SaveDeltaSnapshot("delta1").IsOk());
+  CHECK_JUST(table->SaveDeltaSnapshot("delta3"));
+  CHECK_JUST(table->SaveSnapshot("delta3"));
+  table.reset();
+  table = NewPersistentTable(options);
+  table->LoadSnapshot("delta2");
+  std::vector<uint64_t> keys(num_keys + 101);
+  std::iota(keys.begin(), keys.end(), 0);
+  std::vector<float> values(keys.size() * value_length);
+  std::vector<uint32_t> missing_indices(keys.size());
+  uint32_t n_missing = 0;
+  table->Get(keys.size(), keys.data(), values.data(), &n_missing, missing_indices.data());
+  ASSERT_EQ(n_missing, 1);
+  ASSERT_EQ(missing_indices[0], num_keys + 100);
+  for (size_t i = 0; i < num_keys + 100; ++i) {
+    float version = 0;
+    if (i < 500) {
+      version = 1;
+    } else if (i < 1500 || i >= num_keys) {
+      version = 2;
+    }
+    for (size_t j = 0; j < value_length; ++j) {
+      ASSERT_EQ(values[i * value_length + j], static_cast<float>(i * value_length + j) + version);
+    }
+  }
+  table.reset();
+  PosixFile::RecursiveDelete(path);
+}
+
+#endif  // __linux__
+
+#ifdef WITH_CUDA
+
 bool HasCudaDevice() {
   int device_count = 0;
   if (cudaGetDeviceCount(&device_count) != cudaSuccess) { return false; }
@@ -50,7 +213,7 @@ void TestKeyValueStore(KeyValueStore* store, size_t num_embeddings, size_t test_
   auto device = Global<ep::DeviceManagerRegistry>::Get()->GetDevice(DeviceType::kCUDA, 0);
   ep::Stream* stream = device->CreateStream();
 
-  store->SaveSnapshot("init");
+  CHECK_JUST(store->SaveSnapshot("init"));
 
   uint64_t* keys = nullptr;
   float* values = nullptr;
@@ -102,7 +265,7 @@ void TestKeyValueStore(KeyValueStore* store, size_t num_embeddings, size_t test_
 
   OF_CUDA_CHECK(cudaDeviceSynchronize());
 
-  store->SaveSnapshot("final");
+  CHECK_JUST(store->SaveSnapshot("final"));
 
   OF_CUDA_CHECK(cudaMemset(values_host, 0, values_size));
   OF_CUDA_CHECK(cudaMemset(values, 0, values_size));
@@ -209,7 +372,7 @@ TEST(CachedKeyValueStore, LRU) {
   cache_options.key_size = 8;
   std::unique_ptr<Cache> cache = NewCache(cache_options);
   std::unique_ptr<KeyValueStore> cached_store =
-      NewCachedKeyValueStore(std::move(store), std::move(cache));
+      NewCachedKeyValueStore(std::move(store), std::move(cache), false);
   cached_store->ReserveQueryLength(128);
   TestKeyValueStore(cached_store.get(), 1024, 1024, value_length);
   cached_store.reset();
@@ -236,7 +399,7 @@ TEST(CachedKeyValueStore, Full) {
   cache_options.key_size = 8;
   std::unique_ptr<Cache> cache = NewCache(cache_options);
   std::unique_ptr<KeyValueStore> cached_store =
-      NewCachedKeyValueStore(std::move(store), std::move(cache));
+      NewCachedKeyValueStore(std::move(store), std::move(cache), false);
   cached_store->ReserveQueryLength(128);
   TestKeyValueStore(cached_store.get(), 1024, 1024, value_length);
   cached_store.reset();
@@ -244,6 +407,77 @@ TEST(CachedKeyValueStore, Full) {
   Global<ep::DeviceManagerRegistry>::Delete();
 }
 
+void TestCachedDeltaSnapshot(CacheOptions::Policy policy) {
+  Global<ep::DeviceManagerRegistry>::New();
+  auto device = Global<ep::DeviceManagerRegistry>::Get()->GetDevice(DeviceType::kCUDA, 0);
+  ep::Stream* stream = device->CreateStream();
+  PersistentTableKeyValueStoreOptions store_options{};
+  std::string path = CreateTempDirectory();
+  store_options.table_options.path = path;
+  uint32_t value_length = 128;
+  store_options.table_options.value_size = value_length * sizeof(float);
+  store_options.table_options.key_size = GetSizeOfDataType(DataType::kUInt64);
+  store_options.table_options.physical_block_size = 512;
+  store_options.table_options.delta_snapshot = true;
+  std::unique_ptr<KeyValueStore> store = NewPersistentTableKeyValueStore(store_options);
+  CacheOptions cache_options{};
+  cache_options.policy = policy;
+  cache_options.value_memory_kind = CacheOptions::MemoryKind::kDevice;
+  cache_options.value_size = 512;
+  cache_options.capacity = 1024 * 2;
+  cache_options.key_size = 8;
+  std::unique_ptr<KeyValueStore> cached_store =
+      NewCachedKeyValueStore(std::move(store), NewCache(cache_options), true);
+  const uint32_t batch_size = 128;
+  cached_store->ReserveQueryLength(batch_size);
+  const size_t num_keys = 1024;
+  uint64_t* keys = nullptr;
+  float* values = nullptr;
+  OF_CUDA_CHECK(cudaMallocManaged(&keys, num_keys * sizeof(uint64_t)));
+  OF_CUDA_CHECK(cudaMallocManaged(&values, num_keys * value_length * sizeof(float)));
+  for (size_t i = 0; i < num_keys; ++i) { keys[i] = i + 1; }
+  for (size_t i = 0; i < num_keys * value_length; ++i) { values[i] = i; }
+  for (size_t offset = 0; offset < num_keys; offset += batch_size) {
+    cached_store->Put(stream, batch_size, keys + offset, values + offset * value_length);
+  }
+  CHECK_JUST(cached_store->SaveSnapshot("full"));
+  // Rewrite 100 keys twice, only those are in the delta snapshot.
+  const size_t num_updated = 100;
+  for (int i = 0; i < 2; ++i) {
+    cached_store->Put(stream, num_updated, keys, values);
+    CHECK_JUST(stream->Sync());
+  }
+  CHECK_JUST(cached_store->SaveDeltaSnapshot("delta"));
+  uint64_t delta_index_size = 0;
+  const std::string delta_dir = path + "/snapshots/delta";
+  DIR* dir = opendir(delta_dir.c_str());
+  PCHECK(dir != nullptr);
+  struct dirent* ent = nullptr;
+  while ((ent = readdir(dir)) != nullptr) {
+    const std::string file_name = ent->d_name;
+    if (file_name.rfind("index-", 0) != 0) { continue; }
+    delta_index_size += PosixFile(PosixFile::JoinPath(delta_dir, file_name), O_RDONLY, 0644).Size();
+  }
+  closedir(dir);
+  ASSERT_EQ(delta_index_size, num_updated * sizeof(uint64_t));
+  OF_CUDA_CHECK(cudaFree(keys));
+  OF_CUDA_CHECK(cudaFree(values));
+  device->DestroyStream(stream);
+  cached_store.reset();
+  PosixFile::RecursiveDelete(path);
+  Global<ep::DeviceManagerRegistry>::Delete();
+}
+
+TEST(CachedKeyValueStore, LRUDeltaSnapshot) {
+  if (!HasCudaDevice()) { return; }
+  TestCachedDeltaSnapshot(CacheOptions::Policy::kLRU);
+}
+
+TEST(CachedKeyValueStore, FullDeltaSnapshot) {
+  if (!HasCudaDevice()) { return; }
+  TestCachedDeltaSnapshot(CacheOptions::Policy::kFull);
+}
+
 #endif  // WITH_CUDA
 
 }  // namespace
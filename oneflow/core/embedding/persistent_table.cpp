@@ -20,6 +20,7 @@ limitations under the License.
 
 #include "oneflow/core/common/channel.h"
 #include "oneflow/core/embedding/posix_file.h"
+#include "oneflow/core/embedding/hash_functions.cuh"
 #include "oneflow/core/common/blocking_counter.h"
 #include <robin_hood.h>
 #include <fcntl.h>
@@ -28,6 +29,9 @@ limitations under the License.
 #include <sys/syscall.h>
 #include <linux/aio_abi.h>
 #include <unistd.h>
+#include <chrono>
+#include <shared_mutex>
+#include <unordered_set>
 #ifdef WITH_LIBURING
 #include <liburing.h>
 #endif  // WITH_LIBURING
@@ -50,6 +54,7 @@ constexpr uint32_t kChunkNameSuffixLength = 12;
 constexpr char const* kKeyFileNamePrefix = "key-";
 constexpr char const* kIndexFileNamePrefix = "index-";
 constexpr char const* kValueFileNamePrefix = "value-";
+constexpr char const* kPrebuiltIndexFileNamePrefix = "prebuilt-index-";
 constexpr char const* kLockFileName = "LOCK";
 constexpr char const* kKeySizeFileName = "KEY_SIZE";
 constexpr char const* kValueSizeFileName = "VALUE_SIZE";
@@ -59,7 +64,16 @@ constexpr char const* kKeysDirName = "keys";
 constexpr char const* kValuesDirName = "values";
 constexpr char const* kSnapshotsDirName = "snapshots";
 constexpr char const* kSnapshotListFileName = "LIST";
+constexpr char const* kSnapshotBaseFileName = "BASE";
+constexpr char const* kPrebuiltIndexNumShardsFileName = "PREBUILT_INDEX_NUM_SHARDS";
 constexpr size_t kParallelForStride = 256;
+constexpr uint64_t kCompactionBatchBlocks = 256;
+constexpr uint32_t kNumIndexShards = 64;
+
+struct PrebuiltIndexEntry {
+  uint64_t key;
+  uint64_t row_id;
+};
 
 template<typename T>
 T* BytesOffset(T* ptr, size_t bytes) {
@@ -145,6 +159,43 @@ class AlignedBuffer final {
   std::unique_ptr<char> ptr_;
 };
 
+struct ReadBuffer {
+  OF_DISALLOW_COPY_AND_MOVE(ReadBuffer);
+  explicit ReadBuffer(size_t alignment) : blocks(alignment) {}
+  ~ReadBuffer() = default;
+
+  std::vector<uint32_t> offsets;
+  AlignedBuffer blocks;
+};
+
+// Sleeps as needed so that the bytes passed to Acquire since construction do not exceed
+// bytes_per_second on average.
+class IoRateLimiter final {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(IoRateLimiter);
+  explicit IoRateLimiter(uint64_t bytes_per_second)
+      : bytes_per_second_(bytes_per_second), bytes_(0), start_(std::chrono::steady_clock::now()) {}
+  ~IoRateLimiter() = default;
+
+  void Acquire(uint64_t bytes) {
+    if (bytes_per_second_ == 0) { return; }
+    bytes_ += bytes;
+    const int64_t expected_us =
+        static_cast<int64_t>(static_cast<double>(bytes_) * 1000000 / bytes_per_second_);
+    const int64_t elapsed_us = std::chrono::duration_cast<std::chrono::microseconds>(
+                                   std::chrono::steady_clock::now() - start_)
+                                   .count();
+    if (expected_us > elapsed_us) {
+      std::this_thread::sleep_for(std::chrono::microseconds(expected_us - elapsed_us));
+    }
+  }
+
+ private:
+  uint64_t bytes_per_second_;
+  uint64_t bytes_;
+  std::chrono::steady_clock::time_point start_;
+};
+
 template<typename Key>
 class ChunkIteratorImpl : public PersistentTable::Iterator {
  public:
@@ -353,17 +404,48 @@ class PersistentTableImpl : public PersistentTable {
   void LoadSnapshot(const std::string& name) override;
   void LoadSnapshot(const std::string& name,
                     const std::function<void(Iterator* iter)>& Hook) override;
-  void SaveSnapshot(const std::string& name) override;
+  Maybe<void> SaveSnapshot(const std::string& name) override;
+  Maybe<void> SaveDeltaSnapshot(const std::string& name) override;
 
  private:
+  using IndexShard = robin_hood::unordered_flat_map<Key, uint64_t>;
+
   std::string KeyFilePath(uint64_t chunk_id) const;
   std::string ValueFilePath(uint64_t chunk_id) const;
   std::string IndexFilePath(const std::string& name, uint64_t chunk_id) const;
   std::string SnapshotDirPath(const std::string& name) const;
   std::string SnapshotListFilePath(const std::string& name) const;
-  void LoadSnapshotImpl(const std::string& name);
-  void SaveSnapshotImpl(const std::string& name);
+  std::string PrebuiltIndexFilePath(const std::string& name, uint32_t shard_id) const;
+  std::string PrebuiltIndexNumShardsFilePath(const std::string& name) const;
+  std::string SnapshotBaseFilePath(const std::string& name) const;
+  std::vector<uint64_t> ListSnapshotChunkIds(const std::string& name) const;
+  std::vector<std::string> SnapshotChain(const std::string& name) const;
+  std::string FindDeltaSnapshotOf(const std::string& name) const;
+  bool PrebuiltIndexExists(const std::string& name) const;
+  size_t LoadSnapshotImpl(const std::string& name);
+  void LoadChunkIndices(const std::string& name, bool overwrite, std::vector<IndexShard>* index);
+  void LoadPrebuiltIndex(const std::string& name, std::vector<IndexShard>* index);
+  void RecountLiveValues(const std::vector<IndexShard>& index);
+  void IterateChunk(uint64_t chunk_id, size_t n, const uint64_t* indices,
+                    const std::function<void(Iterator* iter)>& Hook);
+  template<typename ForEachRowId>
+  void SaveChunkIndices(const std::string& name, const std::string& base_name,
+                        const ForEachRowId& for_each_row_id);
+  Maybe<void> SaveSnapshotImpl(const std::string& name);
+  Maybe<void> SaveDeltaSnapshotImpl(const std::string& name);
+  void SavePrebuiltIndex(const std::string& name);
   void ParallelFor(size_t total, const ForRange<Engine>& for_range);
+  void ParallelFor(size_t total, size_t stride, const ForRange<Engine>& for_range);
+  uint32_t IndexShardId(Key key) const { return PersistentTableIndexHash()(key) % kNumIndexShards; }
+  IndexShard& RowIdMapping(Key key) { return row_id_mapping_[IndexShardId(key)]; }
+  void UpdateRowId(uint32_t shard_id, Key key, uint64_t row_id);
+  std::unique_ptr<ReadBuffer> AcquireReadBuffer();
+  void ReleaseReadBuffer(std::unique_ptr<ReadBuffer>&& buffer);
+  void AddLiveValues(uint64_t chunk_id, uint64_t n);
+  void CompactionLoop();
+  void Compact();
+  void CompactChunk(uint64_t chunk_id, IoRateLimiter* limiter);
+  void ListSnapshotChunks(std::unordered_set<uint64_t>* chunk_ids);
 
   std::string root_dir_;
   std::string keys_dir_;
@@ -375,19 +457,45 @@ class PersistentTableImpl : public PersistentTable {
   uint64_t num_values_per_chunk_;
   uint32_t num_values_per_block_;
   uint32_t logical_block_size_;
+  uint32_t physical_block_size_;
 
   std::vector<std::unique_ptr<Worker<Engine>>> workers_;
 
-  std::vector<uint32_t> offsets_buffer_;
   AlignedBuffer blocks_buffer_;
+  std::vector<std::vector<uint32_t>> shard_key_indices_;
+  std::mutex read_buffers_mutex_;
+  std::vector<std::unique_ptr<ReadBuffer>> read_buffers_;
 
+  // Serializes writers, snapshots and compaction. Lookups do not take it, they only hold
+  // index_mutexes_ and value_files_mutex_ shared, and writers holding mutex_ lock those
+  // exclusively just around the mutation itself.
   std::recursive_mutex mutex_;
   uint64_t physical_table_size_;
-  robin_hood::unordered_flat_map<Key, uint64_t> row_id_mapping_;
+  // Partitioned by PersistentTableIndexHash into kNumIndexShards maps, so that restoring a snapshot
+  // can fill the shards in parallel and lookups only contend with writers on the same shard.
+  std::vector<IndexShard> row_id_mapping_;
+  std::vector<std::shared_timed_mutex> index_mutexes_;
+  // Keys remapped since last_snapshot_name_ was saved or loaded, per index shard. Only tracked when
+  // delta_snapshot_ is set.
+  std::vector<robin_hood::unordered_flat_set<Key>> dirty_keys_;
+  std::string last_snapshot_name_;
+  bool compacting_;
+  std::vector<uint64_t> chunk_num_live_values_;
   std::vector<PosixFile> value_files_;
+  std::shared_timed_mutex value_files_mutex_;
   PosixFile writable_key_file_;
   uint64_t writable_key_file_chunk_id_;
   PosixFileLockGuard lock_;
+
+  bool snapshot_prebuilt_index_;
+  bool delta_snapshot_;
+  float compaction_live_ratio_;
+  uint64_t compaction_io_rate_limit_;
+  uint64_t compaction_interval_ms_;
+  std::mutex compaction_mutex_;
+  std::condition_variable compaction_cv_;
+  std::atomic<bool> compaction_shutdown_;
+  std::thread compaction_thread_;
 };
 
 template<typename Key, typename Engine>
@@ -396,11 +504,33 @@ PersistentTableImpl<Key, Engine>::PersistentTableImpl(const PersistentTableOptio
       key_size_(options.key_size),
       value_size_(options.value_size),
       logical_block_size_(GetLogicalBlockSize(options.physical_block_size, value_size_)),
+      physical_block_size_(options.physical_block_size),
       blocks_buffer_(options.physical_block_size),
-      writable_key_file_chunk_id_(-1) {
+      shard_key_indices_(kNumIndexShards),
+      row_id_mapping_(kNumIndexShards),
+      index_mutexes_(kNumIndexShards),
+      dirty_keys_(kNumIndexShards),
+      compacting_(false),
+      writable_key_file_chunk_id_(-1),
+      snapshot_prebuilt_index_(
+          ParseBooleanFromEnv("ONEFLOW_ONE_EMBEDDING_PERSISTENT_TABLE_SNAPSHOT_PREBUILT_INDEX",
+                              options.snapshot_prebuilt_index)),
+      delta_snapshot_(ParseBooleanFromEnv("ONEFLOW_ONE_EMBEDDING_PERSISTENT_TABLE_DELTA_SNAPSHOT",
+                                          options.delta_snapshot)),
+      compaction_live_ratio_(ParseFloatFromEnv(
+          "ONEFLOW_ONE_EMBEDDING_PERSISTENT_TABLE_COMPACTION_LIVE_RATIO",
+          options.compaction_live_ratio)),
+      compaction_io_rate_limit_(
+          ParseIntegerFromEnv("ONEFLOW_ONE_EMBEDDING_PERSISTENT_TABLE_COMPACTION_IO_RATE_LIMIT_MB",
+                              options.compaction_io_rate_limit_mb)
+          * 1024 * 1024),
+      compaction_interval_ms_(options.compaction_interval_ms),
+      compaction_shutdown_(false) {
   const uint64_t capacity_hint = ParseIntegerFromEnv(
       "ONEFLOW_ONE_EMBEDDING_PERSISTENT_TABLE_CAPACITY_HINT", options.capacity_hint);
-  if (capacity_hint > 0) { row_id_mapping_.reserve(capacity_hint); }
+  if (capacity_hint > 0) {
+    for (auto& shard : row_id_mapping_) { shard.reserve(capacity_hint / kNumIndexShards); }
+  }
   PosixFile::RecursiveCreateDirectory(options.path, 0755);
   const std::string lock_filename = PosixFile::JoinPath(options.path, kLockFileName);
   const bool init = !PosixFile::FileExists(lock_filename);
@@ -444,10 +574,23 @@ PersistentTableImpl<Key, Engine>::PersistentTableImpl(const PersistentTableOptio
   } else {
     physical_table_size_ = 0;
   }
+  chunk_num_live_values_.resize(value_files_.size());
+  if (compaction_live_ratio_ > 0) {
+    CHECK_LE(compaction_live_ratio_, 1);
+    compaction_thread_ = std::thread(&PersistentTableImpl<Key, Engine>::CompactionLoop, this);
+  }
 }
 
 template<typename Key, typename Engine>
 PersistentTableImpl<Key, Engine>::~PersistentTableImpl() {
+  if (compaction_thread_.joinable()) {
+    {
+      std::lock_guard<std::mutex> lock(compaction_mutex_);
+      compaction_shutdown_ = true;
+    }
+    compaction_cv_.notify_all();
+    compaction_thread_.join();
+  }
   for (uint32_t tid = 0; tid < workers_.size(); ++tid) { workers_.at(tid)->Shutdown(); }
 }
 
@@ -459,15 +602,28 @@ uint32_t PersistentTableImpl<Key, Engine>::LogicalBlockSize() const {
 template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::GetBlocks(uint32_t num_keys, const void* keys, void* blocks,
                                                  uint32_t* offsets) {
-  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  // Held until every read is complete, so no value file found through the index can be closed or
+  // moved underneath a pending read. Writers only take it exclusively on the caller thread, never
+  // from a worker, otherwise they could wait on a reader that waits on the same worker.
+  std::shared_lock<std::shared_timed_mutex> files_lock(value_files_mutex_);
   ParallelFor(num_keys, [&](Engine* engine, size_t start, size_t end) {
     for (uint64_t i = start; i < end; ++i) {
       const Key key = static_cast<const Key*>(keys)[i];
-      auto it = row_id_mapping_.find(key);
-      if (it == row_id_mapping_.end()) {
+      const uint32_t shard_id = IndexShardId(key);
+      bool found = false;
+      uint64_t id = 0;
+      {
+        std::shared_lock<std::shared_timed_mutex> shard_lock(index_mutexes_[shard_id]);
+        const auto& shard = row_id_mapping_[shard_id];
+        auto it = shard.find(key);
+        if (it != shard.end()) {
+          found = true;
+          id = it->second;
+        }
+      }
+      if (!found) {
         offsets[i] = logical_block_size_;
       } else {
-        const uint64_t id = it->second;
         const uint64_t block_id = id / num_values_per_block_;
         const uint32_t id_in_block = id - block_id * num_values_per_block_;
         const uint32_t offset_in_block = id_in_block * value_size_;
@@ -486,29 +642,50 @@ void PersistentTableImpl<Key, Engine>::GetBlocks(uint32_t num_keys, const void*
 template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::Get(uint32_t num_keys, const void* keys, void* values,
                                            uint32_t* n_missing, uint32_t* missing_indices) {
-  std::lock_guard<std::recursive_mutex> lock(mutex_);
-  offsets_buffer_.resize(num_keys);
+  std::unique_ptr<ReadBuffer> buffer = AcquireReadBuffer();
+  std::vector<uint32_t>& offsets = buffer->offsets;
+  offsets.resize(num_keys);
   void* blocks_ptr = nullptr;
   if (value_size_ == logical_block_size_) {
     blocks_ptr = values;
   } else {
-    blocks_buffer_.Resize(num_keys * logical_block_size_);
-    blocks_ptr = blocks_buffer_.ptr();
+    buffer->blocks.Resize(num_keys * logical_block_size_);
+    blocks_ptr = buffer->blocks.ptr();
   }
-  GetBlocks(num_keys, keys, blocks_ptr, offsets_buffer_.data());
+  GetBlocks(num_keys, keys, blocks_ptr, offsets.data());
   uint32_t missing_count = 0;
   for (uint32_t i = 0; i < num_keys; ++i) {
-    if (offsets_buffer_.at(i) == logical_block_size_) {
+    if (offsets.at(i) == logical_block_size_) {
       missing_indices[missing_count] = i;
       missing_count += 1;
     } else {
       if (value_size_ != logical_block_size_) {
         MemcpyOffset(values, i * value_size_, blocks_ptr,
-                     (i * logical_block_size_) + offsets_buffer_[i], value_size_);
+                     (i * logical_block_size_) + offsets[i], value_size_);
       }
     }
   }
   *n_missing = missing_count;
+  ReleaseReadBuffer(std::move(buffer));
+}
+
+template<typename Key, typename Engine>
+std::unique_ptr<ReadBuffer> PersistentTableImpl<Key, Engine>::AcquireReadBuffer() {
+  {
+    std::lock_guard<std::mutex> lock(read_buffers_mutex_);
+    if (!read_buffers_.empty()) {
+      std::unique_ptr<ReadBuffer> buffer = std::move(read_buffers_.back());
+      read_buffers_.pop_back();
+      return buffer;
+    }
+  }
+  return std::unique_ptr<ReadBuffer>(new ReadBuffer(physical_block_size_));
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::ReleaseReadBuffer(std::unique_ptr<ReadBuffer>&& buffer) {
+  std::lock_guard<std::mutex> lock(read_buffers_mutex_);
+  read_buffers_.push_back(std::move(buffer));
 }
 
 template<typename Key, typename Engine>
@@ -523,16 +700,22 @@ void PersistentTableImpl<Key, Engine>::PutBlocks(uint32_t num_keys, const void*
   const uint64_t start_block_id = start_index / num_values_per_block_;
   uint64_t written_blocks = 0;
   const uint64_t block_keys_size = num_values_per_block_ * sizeof(Key);
+  if (num_blocks > 0) {
+    const uint64_t end_chunk_id = (start_block_id + num_blocks - 1) / num_logical_blocks_per_chunk_;
+    if (end_chunk_id >= value_files_.size()) {
+      std::unique_lock<std::shared_timed_mutex> files_lock(value_files_mutex_);
+      while (end_chunk_id >= value_files_.size()) {
+        value_files_.emplace_back(ValueFilePath(value_files_.size()), O_CREAT | O_RDWR | O_DIRECT,
+                                  0644);
+      }
+    }
+  }
   BlockingCounter bc(1);
   workers_.at(0)->Schedule([&](Engine*) {
     while (written_blocks < num_blocks) {
       const uint64_t batch_start_block_id = start_block_id + written_blocks;
       const uint64_t batch_chunk_id = batch_start_block_id / num_logical_blocks_per_chunk_;
-      if (batch_chunk_id == value_files_.size()) {
-        value_files_.emplace_back(ValueFilePath(batch_chunk_id), O_CREAT | O_RDWR | O_DIRECT, 0644);
-      } else {
-        CHECK_LE(batch_chunk_id, value_files_.size());
-      }
+      CHECK_LT(batch_chunk_id, value_files_.size());
       if ((!writable_key_file_.IsOpen()) || writable_key_file_chunk_id_ != batch_chunk_id) {
         writable_key_file_ = PosixFile(KeyFilePath(batch_chunk_id), O_CREAT | O_RDWR, 0644);
       }
@@ -561,10 +744,23 @@ void PersistentTableImpl<Key, Engine>::PutBlocks(uint32_t num_keys, const void*
     }
     bc.Decrease();
   });
-  for (uint64_t i = 0; i < num_keys; ++i) {
-    row_id_mapping_[static_cast<const Key*>(keys)[i]] = start_index + i;
+  for (uint32_t i = 0; i < num_keys; ++i) {
+    shard_key_indices_[IndexShardId(static_cast<const Key*>(keys)[i])].push_back(i);
   }
   bc.WaitForeverUntilCntEqualZero();
+  // The new rows are published only once their blocks are on disk, and each shard is locked once
+  // per batch, keeping the keys of a shard in input order so that the last duplicate wins.
+  for (uint32_t shard_id = 0; shard_id < kNumIndexShards; ++shard_id) {
+    std::vector<uint32_t>& key_indices = shard_key_indices_[shard_id];
+    if (key_indices.empty()) { continue; }
+    {
+      std::unique_lock<std::shared_timed_mutex> shard_lock(index_mutexes_[shard_id]);
+      for (const uint32_t i : key_indices) {
+        UpdateRowId(shard_id, static_cast<const Key*>(keys)[i], start_index + i);
+      }
+    }
+    key_indices.clear();
+  }
 }
 
 template<typename Key, typename Engine>
@@ -617,44 +813,238 @@ std::string PersistentTableImpl<Key, Engine>::SnapshotListFilePath(const std::st
 }
 
 template<typename Key, typename Engine>
-void PersistentTableImpl<Key, Engine>::LoadSnapshotImpl(const std::string& name) {
-  std::lock_guard<std::recursive_mutex> lock(mutex_);
-  const std::string snapshot_base = SnapshotDirPath(name);
-  const std::string snapshot_list = SnapshotListFilePath(name);
-  row_id_mapping_.clear();
-  std::ifstream list_if(snapshot_list);
+std::string PersistentTableImpl<Key, Engine>::PrebuiltIndexFilePath(const std::string& name,
+                                                                    uint32_t shard_id) const {
+  return PosixFile::JoinPath(SnapshotDirPath(name),
+                             kPrebuiltIndexFileNamePrefix + GetChunkName(shard_id));
+}
+
+template<typename Key, typename Engine>
+std::string PersistentTableImpl<Key, Engine>::PrebuiltIndexNumShardsFilePath(
+    const std::string& name) const {
+  return PosixFile::JoinPath(SnapshotDirPath(name), kPrebuiltIndexNumShardsFileName);
+}
+
+template<typename Key, typename Engine>
+std::string PersistentTableImpl<Key, Engine>::SnapshotBaseFilePath(const std::string& name) const {
+  return PosixFile::JoinPath(SnapshotDirPath(name), kSnapshotBaseFileName);
+}
+
+template<typename Key, typename Engine>
+std::vector<uint64_t> PersistentTableImpl<Key, Engine>::ListSnapshotChunkIds(
+    const std::string& name) const {
+  std::vector<uint64_t> chunk_ids;
+  std::ifstream list_if(SnapshotListFilePath(name));
   std::string index_filename;
   while (std::getline(list_if, index_filename)) {
-    const uint64_t chunk_id = GetChunkId(index_filename, kIndexFileNamePrefix);
-    PosixFile index_file(PosixFile::JoinPath(snapshot_base, index_filename), O_RDONLY, 0644);
-    const size_t index_file_size = index_file.Size();
-    CHECK_EQ(index_file_size % sizeof(uint64_t), 0);
-    if (index_file_size == 0) { return; }
-    const size_t n_entries = index_file_size / sizeof(uint64_t);
-    PosixMappedFile mapped_index(std::move(index_file), index_file_size, PROT_READ);
-    PosixFile key_file(KeyFilePath(chunk_id), O_RDONLY, 0644);
-    PosixMappedFile mapped_key(std::move(key_file), key_file.Size(), PROT_READ);
-    const uint64_t* indices = static_cast<const uint64_t*>(mapped_index.ptr());
-    const Key* keys = static_cast<const Key*>(mapped_key.ptr());
-    const uint64_t chunk_start_index = chunk_id * num_values_per_chunk_;
-    row_id_mapping_.reserve(row_id_mapping_.size() + n_entries);
-    for (size_t i = 0; i < n_entries; ++i) {
-      CHECK(row_id_mapping_.emplace(keys[indices[i] - chunk_start_index], indices[i]).second);
+    chunk_ids.push_back(GetChunkId(index_filename, kIndexFileNamePrefix));
+  }
+  return chunk_ids;
+}
+
+template<typename Key, typename Engine>
+std::vector<std::string> PersistentTableImpl<Key, Engine>::SnapshotChain(
+    const std::string& name) const {
+  std::vector<std::string> chain{name};
+  while (PosixFile::FileExists(SnapshotBaseFilePath(chain.back()))) {
+    std::ifstream base_if(SnapshotBaseFilePath(chain.back()));
+    std::string base_name;
+    std::getline(base_if, base_name);
+    CHECK(PosixFile::FileExists(SnapshotListFilePath(base_name)))
+        << "Base snapshot " << base_name << " of delta snapshot " << chain.back()
+        << " does not exist";
+    CHECK(std::find(chain.begin(), chain.end(), base_name) == chain.end())
+        << "Snapshot " << base_name << " is its own base";
+    chain.push_back(base_name);
+  }
+  return chain;
+}
+
+template<typename Key, typename Engine>
+std::string PersistentTableImpl<Key, Engine>::FindDeltaSnapshotOf(const std::string& name) const {
+  DIR* dir = opendir(snapshots_dir_.c_str());
+  if (dir == nullptr) {
+    PCHECK(errno == ENOENT);
+    return "";
+  }
+  std::string delta_name;
+  struct dirent* ent = nullptr;
+  while ((ent = readdir(dir)) != nullptr) {
+    if (strcmp(ent->d_name, ".") == 0 || strcmp(ent->d_name, "..") == 0) { continue; }
+    const std::string base_file_path = SnapshotBaseFilePath(ent->d_name);
+    if (!PosixFile::FileExists(base_file_path)) { continue; }
+    std::ifstream base_if(base_file_path);
+    std::string base_name;
+    std::getline(base_if, base_name);
+    if (base_name == name) {
+      delta_name = ent->d_name;
+      break;
     }
   }
+  PCHECK(closedir(dir) == 0);
+  return delta_name;
+}
+
+template<typename Key, typename Engine>
+bool PersistentTableImpl<Key, Engine>::PrebuiltIndexExists(const std::string& name) const {
+  const std::string num_shards_filename = PrebuiltIndexNumShardsFilePath(name);
+  if (!PosixFile::FileExists(num_shards_filename)) { return false; }
+  std::ifstream ifs(num_shards_filename);
+  uint32_t num_shards = 0;
+  ifs >> num_shards;
+  return num_shards == kNumIndexShards;
 }
 
 template<typename Key, typename Engine>
-void PersistentTableImpl<Key, Engine>::SaveSnapshotImpl(const std::string& name) {
+size_t PersistentTableImpl<Key, Engine>::LoadSnapshotImpl(const std::string& name) {
   std::lock_guard<std::recursive_mutex> lock(mutex_);
+  // A delta snapshot only holds the rows remapped since its base, so the chain is applied from the
+  // full snapshot at its root to the requested one.
+  const std::vector<std::string> chain = SnapshotChain(name);
+  // The index is built aside and swapped in shard by shard, the workers building it must not wait
+  // on shard locks that lookups may be holding.
+  std::vector<IndexShard> index(kNumIndexShards);
+  chunk_num_live_values_.assign(value_files_.size(), 0);
+  if (PrebuiltIndexExists(chain.back())) {
+    LoadPrebuiltIndex(chain.back(), &index);
+  } else {
+    LoadChunkIndices(chain.back(), false, &index);
+  }
+  for (auto it = chain.rbegin() + 1; it != chain.rend(); ++it) {
+    LoadChunkIndices(*it, true, &index);
+  }
+  if (chain.size() > 1) { RecountLiveValues(index); }
+  for (uint32_t shard_id = 0; shard_id < kNumIndexShards; ++shard_id) {
+    std::unique_lock<std::shared_timed_mutex> shard_lock(index_mutexes_[shard_id]);
+    std::swap(row_id_mapping_[shard_id], index[shard_id]);
+  }
+  for (auto& keys : dirty_keys_) { keys.clear(); }
+  last_snapshot_name_ = name;
+  return chain.size();
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::LoadChunkIndices(const std::string& name, bool overwrite,
+                                                        std::vector<IndexShard>* index) {
+  // The keys of every chunk are first partitioned by index shard, then every shard is filled by
+  // a single worker, so the hash maps are built in parallel without locking.
+  const std::vector<uint64_t> chunk_ids = ListSnapshotChunkIds(name);
+  std::vector<std::vector<std::vector<std::pair<Key, uint64_t>>>> partitions(chunk_ids.size());
+  std::vector<uint64_t> num_entries(chunk_ids.size());
+  ParallelFor(chunk_ids.size(), 1, [&](Engine* engine, size_t start, size_t end) {
+    for (size_t i = start; i < end; ++i) {
+      const uint64_t chunk_id = chunk_ids.at(i);
+      partitions.at(i).resize(kNumIndexShards);
+      PosixFile index_file(IndexFilePath(name, chunk_id), O_RDONLY, 0644);
+      const size_t index_file_size = index_file.Size();
+      CHECK_EQ(index_file_size % sizeof(uint64_t), 0);
+      if (index_file_size == 0) { continue; }
+      const size_t n_entries = index_file_size / sizeof(uint64_t);
+      PosixMappedFile mapped_index(std::move(index_file), index_file_size, PROT_READ);
+      PosixFile key_file(KeyFilePath(chunk_id), O_RDONLY, 0644);
+      PosixMappedFile mapped_key(std::move(key_file), key_file.Size(), PROT_READ);
+      const uint64_t* indices = static_cast<const uint64_t*>(mapped_index.ptr());
+      const Key* keys = static_cast<const Key*>(mapped_key.ptr());
+      const uint64_t chunk_start_index = chunk_id * num_values_per_chunk_;
+      for (size_t j = 0; j < n_entries; ++j) {
+        const Key key = keys[indices[j] - chunk_start_index];
+        partitions.at(i)
+            .at(PersistentTableIndexHash()(key) % kNumIndexShards)
+            .emplace_back(key, indices[j]);
+      }
+      num_entries.at(i) = n_entries;
+    }
+  });
+  ParallelFor(kNumIndexShards, 1, [&](Engine* engine, size_t start, size_t end) {
+    for (size_t shard_id = start; shard_id < end; ++shard_id) {
+      auto& shard = index->at(shard_id);
+      size_t shard_size = 0;
+      for (const auto& partition : partitions) { shard_size += partition.at(shard_id).size(); }
+      shard.reserve(shard_size);
+      for (auto& partition : partitions) {
+        for (const auto& pair : partition.at(shard_id)) {
+          if (overwrite) {
+            shard[pair.first] = pair.second;
+          } else {
+            CHECK(shard.emplace(pair.first, pair.second).second);
+          }
+        }
+        std::vector<std::pair<Key, uint64_t>>().swap(partition.at(shard_id));
+      }
+    }
+  });
+  if (overwrite) { return; }
+  for (size_t i = 0; i < chunk_ids.size(); ++i) {
+    AddLiveValues(chunk_ids.at(i), num_entries.at(i));
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::LoadPrebuiltIndex(const std::string& name,
+                                                         std::vector<IndexShard>* index) {
+  std::mutex num_live_values_mutex;
+  ParallelFor(kNumIndexShards, 1, [&](Engine* engine, size_t start, size_t end) {
+    std::vector<uint64_t> num_live_values(chunk_num_live_values_.size());
+    for (size_t shard_id = start; shard_id < end; ++shard_id) {
+      PosixFile index_file(PrebuiltIndexFilePath(name, shard_id), O_RDONLY, 0644);
+      const size_t index_file_size = index_file.Size();
+      CHECK_EQ(index_file_size % sizeof(PrebuiltIndexEntry), 0);
+      if (index_file_size == 0) { continue; }
+      const size_t n_entries = index_file_size / sizeof(PrebuiltIndexEntry);
+      PosixMappedFile mapped_index(std::move(index_file), index_file_size, PROT_READ);
+      const PrebuiltIndexEntry* entries =
+          static_cast<const PrebuiltIndexEntry*>(mapped_index.ptr());
+      auto& shard = index->at(shard_id);
+      shard.reserve(n_entries);
+      for (size_t i = 0; i < n_entries; ++i) {
+        CHECK(shard.emplace(static_cast<Key>(entries[i].key), entries[i].row_id).second);
+        num_live_values.at(entries[i].row_id / num_values_per_chunk_) += 1;
+      }
+    }
+    std::lock_guard<std::mutex> lock(num_live_values_mutex);
+    for (size_t i = 0; i < num_live_values.size(); ++i) {
+      chunk_num_live_values_.at(i) += num_live_values.at(i);
+    }
+  });
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::RecountLiveValues(const std::vector<IndexShard>& index) {
+  chunk_num_live_values_.assign(value_files_.size(), 0);
+  std::mutex num_live_values_mutex;
+  ParallelFor(kNumIndexShards, 1, [&](Engine* engine, size_t start, size_t end) {
+    std::vector<uint64_t> num_live_values(chunk_num_live_values_.size());
+    for (size_t shard_id = start; shard_id < end; ++shard_id) {
+      for (const auto& pair : index.at(shard_id)) {
+        num_live_values.at(pair.second / num_values_per_chunk_) += 1;
+      }
+    }
+    std::lock_guard<std::mutex> lock(num_live_values_mutex);
+    for (size_t i = 0; i < num_live_values.size(); ++i) {
+      chunk_num_live_values_.at(i) += num_live_values.at(i);
+    }
+  });
+}
+
+template<typename Key, typename Engine>
+template<typename ForEachRowId>
+void PersistentTableImpl<Key, Engine>::SaveChunkIndices(const std::string& name,
+                                                        const std::string& base_name,
+                                                        const ForEachRowId& for_each_row_id) {
   PosixFile::RecursiveCreateDirectory(SnapshotDirPath(name), 0755);
+  // Never leave the prebuilt index or base of a previous snapshot with the same name behind.
+  PosixFile::RecursiveDelete(PrebuiltIndexNumShardsFilePath(name));
+  PosixFile::RecursiveDelete(SnapshotBaseFilePath(name));
+  if (!base_name.empty()) {
+    std::ofstream base_ofs(SnapshotBaseFilePath(name));
+    base_ofs << base_name << std::endl;
+  }
   std::ofstream list_ofs(SnapshotListFilePath(name));
-  if (row_id_mapping_.empty()) { return; }
   std::vector<PosixMappedFile> index_files(value_files_.size());
   std::vector<uint64_t> counters(value_files_.size());
   const uint64_t max_index_file_size = num_values_per_chunk_ * sizeof(uint64_t);
-  for (const auto& pair : row_id_mapping_) {
-    const uint64_t chunk_id = pair.second / num_values_per_chunk_;
+  for_each_row_id([&](uint64_t row_id) {
+    const uint64_t chunk_id = row_id / num_values_per_chunk_;
     CHECK(chunk_id < value_files_.size());
     if (index_files[chunk_id].ptr() == nullptr) {
       PosixFile snapshot_file(IndexFilePath(name, chunk_id), O_CREAT | O_RDWR, 0644);
@@ -665,9 +1055,9 @@ void PersistentTableImpl<Key, Engine>::SaveSnapshotImpl(const std::string& name)
     uint64_t* indices = static_cast<uint64_t*>(index_files[chunk_id].ptr());
     uint64_t& count = counters[chunk_id];
     CHECK_LT(count, num_values_per_chunk_);
-    indices[count] = pair.second;
+    indices[count] = row_id;
     count += 1;
-  }
+  });
   for (size_t i = 0; i < value_files_.size(); ++i) {
     const uint64_t count = counters[i];
     if (count > 0) {
@@ -679,6 +1069,78 @@ void PersistentTableImpl<Key, Engine>::SaveSnapshotImpl(const std::string& name)
   }
 }
 
+template<typename Key, typename Engine>
+Maybe<void> PersistentTableImpl<Key, Engine>::SaveSnapshotImpl(const std::string& name) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  // Overwriting a snapshot would silently change every delta snapshot built on it.
+  const std::string delta_name = FindDeltaSnapshotOf(name);
+  CHECK_OR_RETURN(delta_name.empty())
+      << "Snapshot " << name << " can not be overwritten, it is the base of delta snapshot "
+      << delta_name;
+  SaveChunkIndices(name, "", [&](const auto& Visit) {
+    for (const auto& shard : row_id_mapping_) {
+      for (const auto& pair : shard) { Visit(pair.second); }
+    }
+  });
+  if (snapshot_prebuilt_index_) { SavePrebuiltIndex(name); }
+  for (auto& keys : dirty_keys_) { keys.clear(); }
+  last_snapshot_name_ = name;
+  return Maybe<void>::Ok();
+}
+
+template<typename Key, typename Engine>
+Maybe<void> PersistentTableImpl<Key, Engine>::SaveDeltaSnapshotImpl(const std::string& name) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  CHECK_OR_RETURN(delta_snapshot_)
+      << "Delta snapshots need the delta_snapshot option of the persistent table";
+  if (last_snapshot_name_.empty() || !SnapshotExists(last_snapshot_name_)) {
+    // Nothing to build on, every key has been remapped since the table was opened.
+    return SaveSnapshotImpl(name);
+  }
+  CHECK_NE_OR_RETURN(name, last_snapshot_name_) << "A delta snapshot can not overwrite its base";
+  const std::string delta_name = FindDeltaSnapshotOf(name);
+  CHECK_OR_RETURN(delta_name.empty())
+      << "Snapshot " << name << " can not be overwritten, it is the base of delta snapshot "
+      << delta_name;
+  SaveChunkIndices(name, last_snapshot_name_, [&](const auto& Visit) {
+    for (uint32_t shard_id = 0; shard_id < kNumIndexShards; ++shard_id) {
+      const auto& shard = row_id_mapping_.at(shard_id);
+      for (const Key key : dirty_keys_.at(shard_id)) {
+        auto it = shard.find(key);
+        CHECK(it != shard.end());
+        Visit(it->second);
+      }
+    }
+  });
+  for (auto& keys : dirty_keys_) { keys.clear(); }
+  last_snapshot_name_ = name;
+  return Maybe<void>::Ok();
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::SavePrebuiltIndex(const std::string& name) {
+  ParallelFor(kNumIndexShards, 1, [&](Engine* engine, size_t start, size_t end) {
+    for (size_t shard_id = start; shard_id < end; ++shard_id) {
+      const auto& shard = row_id_mapping_.at(shard_id);
+      const size_t index_file_size = shard.size() * sizeof(PrebuiltIndexEntry);
+      PosixFile index_file(PrebuiltIndexFilePath(name, shard_id), O_CREAT | O_RDWR, 0644);
+      index_file.Truncate(index_file_size);
+      if (index_file_size == 0) { continue; }
+      PosixMappedFile mapped_index(std::move(index_file), index_file_size, PROT_READ | PROT_WRITE);
+      PrebuiltIndexEntry* entries = static_cast<PrebuiltIndexEntry*>(mapped_index.ptr());
+      size_t count = 0;
+      for (const auto& pair : shard) {
+        entries[count].key = pair.first;
+        entries[count].row_id = pair.second;
+        count += 1;
+      }
+    }
+  });
+  // Written last, a snapshot only uses its prebuilt index once all the shard files are complete.
+  std::ofstream ofs(PrebuiltIndexNumShardsFilePath(name));
+  ofs << kNumIndexShards << std::endl;
+}
+
 template<typename Key, typename Engine>
 bool PersistentTableImpl<Key, Engine>::SnapshotExists(const std::string& name) {
   std::lock_guard<std::recursive_mutex> lock(mutex_);
@@ -694,55 +1156,77 @@ template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::LoadSnapshot(
     const std::string& name, const std::function<void(Iterator* iter)>& Hook) {
   std::lock_guard<std::recursive_mutex> lock(mutex_);
-  const std::string snapshot_base = SnapshotDirPath(name);
-  const std::string snapshot_list = SnapshotListFilePath(name);
-  row_id_mapping_.clear();
-  std::ifstream list_if(snapshot_list);
-  std::string index_filename;
-  while (std::getline(list_if, index_filename)) {
-    const uint64_t chunk_id = GetChunkId(index_filename, kIndexFileNamePrefix);
-    PosixFile index_file(PosixFile::JoinPath(snapshot_base, index_filename), O_RDONLY, 0644);
+  const size_t chain_length = LoadSnapshotImpl(name);
+  if (!Hook) { return; }
+  if (chain_length > 1) {
+    // The live rows of a delta chain are spread over the index files of all its snapshots, so
+    // they are grouped by chunk from the restored index instead.
+    std::vector<std::vector<uint64_t>> chunk_indices(value_files_.size());
+    for (const auto& shard : row_id_mapping_) {
+      for (const auto& pair : shard) {
+        chunk_indices.at(pair.second / num_values_per_chunk_).push_back(pair.second);
+      }
+    }
+    for (uint64_t chunk_id = 0; chunk_id < chunk_indices.size(); ++chunk_id) {
+      if (chunk_indices.at(chunk_id).empty()) { continue; }
+      IterateChunk(chunk_id, chunk_indices.at(chunk_id).size(), chunk_indices.at(chunk_id).data(),
+                   Hook);
+    }
+    return;
+  }
+  for (const uint64_t chunk_id : ListSnapshotChunkIds(name)) {
+    PosixFile index_file(IndexFilePath(name, chunk_id), O_RDONLY, 0644);
     const size_t index_file_size = index_file.Size();
     CHECK_EQ(index_file_size % sizeof(uint64_t), 0);
-    if (index_file_size == 0) { return; }
+    if (index_file_size == 0) { continue; }
     const size_t n_entries = index_file_size / sizeof(uint64_t);
     PosixMappedFile mapped_index(std::move(index_file), index_file_size, PROT_READ);
-    PosixFile key_file(KeyFilePath(chunk_id), O_RDONLY, 0644);
-    PosixMappedFile mapped_key(std::move(key_file), key_file.Size(), PROT_READ);
-    const uint64_t* indices = static_cast<const uint64_t*>(mapped_index.ptr());
-    const Key* keys = static_cast<const Key*>(mapped_key.ptr());
-    const uint64_t chunk_start_index = chunk_id * num_values_per_chunk_;
-    row_id_mapping_.reserve(row_id_mapping_.size() + n_entries);
-    for (size_t i = 0; i < n_entries; ++i) {
-      CHECK(row_id_mapping_.emplace(keys[indices[i] - chunk_start_index], indices[i]).second);
-    }
-    if (Hook) {
-      PosixFile value_file(ValueFilePath(chunk_id), O_RDONLY, 0644);
-      PosixMappedFile mapped_value(std::move(value_file), value_file.Size(), PROT_READ);
-      ChunkIteratorImpl<Key> chunk_iterator(value_size_, logical_block_size_, num_values_per_block_,
-                                            num_values_per_chunk_, chunk_id, n_entries, keys,
-                                            indices, mapped_value.ptr());
-      Hook(&chunk_iterator);
-    }
+    IterateChunk(chunk_id, n_entries, static_cast<const uint64_t*>(mapped_index.ptr()), Hook);
   }
 }
 
 template<typename Key, typename Engine>
-void PersistentTableImpl<Key, Engine>::SaveSnapshot(const std::string& name) {
-  SaveSnapshotImpl(name);
+void PersistentTableImpl<Key, Engine>::IterateChunk(
+    uint64_t chunk_id, size_t n, const uint64_t* indices,
+    const std::function<void(Iterator* iter)>& Hook) {
+  PosixFile key_file(KeyFilePath(chunk_id), O_RDONLY, 0644);
+  PosixMappedFile mapped_key(std::move(key_file), key_file.Size(), PROT_READ);
+  PosixFile value_file(ValueFilePath(chunk_id), O_RDONLY, 0644);
+  PosixMappedFile mapped_value(std::move(value_file), value_file.Size(), PROT_READ);
+  ChunkIteratorImpl<Key> chunk_iterator(value_size_, logical_block_size_, num_values_per_block_,
+                                        num_values_per_chunk_, chunk_id, n,
+                                        static_cast<const Key*>(mapped_key.ptr()), indices,
+                                        mapped_value.ptr());
+  Hook(&chunk_iterator);
+}
+
+template<typename Key, typename Engine>
+Maybe<void> PersistentTableImpl<Key, Engine>::SaveSnapshot(const std::string& name) {
+  return SaveSnapshotImpl(name);
+}
+
+template<typename Key, typename Engine>
+Maybe<void> PersistentTableImpl<Key, Engine>::SaveDeltaSnapshot(const std::string& name) {
+  return SaveDeltaSnapshotImpl(name);
 }
 
 template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::ParallelFor(size_t total,
                                                    const ForRange<Engine>& for_range) {
+  ParallelFor(total, kParallelForStride, for_range);
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::ParallelFor(size_t total, size_t stride,
+                                                   const ForRange<Engine>& for_range) {
   BlockingCounter bc(workers_.size());
   std::atomic<size_t> counter(0);
   for (size_t i = 0; i < workers_.size(); ++i) {
     workers_.at(i)->Schedule([&](Engine* engine) {
       while (true) {
-        const size_t start = counter.fetch_add(kParallelForStride, std::memory_order_relaxed);
+        const size_t start = counter.fetch_add(stride, std::memory_order_relaxed);
         if (start >= total) { break; }
-        const size_t next_start = start + kParallelForStride;
+        const size_t next_start = start + stride;
         const size_t end = std::min(next_start, total);
         for_range(engine, start, end);
       }
@@ -753,6 +1237,149 @@ void PersistentTableImpl<Key, Engine>::ParallelFor(size_t total,
   bc.WaitForeverUntilCntEqualZero();
 }
 
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::UpdateRowId(uint32_t shard_id, Key key, uint64_t row_id) {
+  // Rows moved by compaction keep their old copy while a snapshot references it, so they do not
+  // need to be part of the next delta snapshot.
+  if (delta_snapshot_ && !compacting_) { dirty_keys_[shard_id].insert(key); }
+  auto it = row_id_mapping_[shard_id].emplace(key, row_id);
+  if (!it.second) {
+    const uint64_t old_chunk_id = it.first->second / num_values_per_chunk_;
+    CHECK_GT(chunk_num_live_values_.at(old_chunk_id), 0);
+    chunk_num_live_values_.at(old_chunk_id) -= 1;
+    it.first->second = row_id;
+  }
+  AddLiveValues(row_id / num_values_per_chunk_, 1);
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::AddLiveValues(uint64_t chunk_id, uint64_t n) {
+  if (chunk_num_live_values_.size() <= chunk_id) { chunk_num_live_values_.resize(chunk_id + 1); }
+  chunk_num_live_values_.at(chunk_id) += n;
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::CompactionLoop() {
+  std::unique_lock<std::mutex> lock(compaction_mutex_);
+  while (true) {
+    compaction_cv_.wait_for(lock, std::chrono::milliseconds(compaction_interval_ms_),
+                            [&]() { return compaction_shutdown_.load(); });
+    if (compaction_shutdown_) { break; }
+    lock.unlock();
+    Compact();
+    lock.lock();
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::Compact() {
+  // The last chunk file is never compacted or removed, it is either still being appended to or is
+  // needed to recover physical_table_size_ when the table is reopened.
+  std::vector<std::pair<double, uint64_t>> sparse_chunks;
+  {
+    std::lock_guard<std::recursive_mutex> lock(mutex_);
+    for (uint64_t chunk_id = 0; chunk_id + 1 < value_files_.size(); ++chunk_id) {
+      if (!value_files_.at(chunk_id).IsOpen()) { continue; }
+      const uint64_t num_live_values = chunk_num_live_values_.at(chunk_id);
+      const double live_ratio = static_cast<double>(num_live_values) / num_values_per_chunk_;
+      if (num_live_values > 0 && live_ratio < compaction_live_ratio_) {
+        sparse_chunks.emplace_back(live_ratio, chunk_id);
+      }
+    }
+  }
+  std::sort(sparse_chunks.begin(), sparse_chunks.end());
+  IoRateLimiter limiter(compaction_io_rate_limit_);
+  for (const auto& pair : sparse_chunks) {
+    if (compaction_shutdown_) { return; }
+    CompactChunk(pair.second, &limiter);
+  }
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::unordered_set<uint64_t> snapshot_chunk_ids;
+  ListSnapshotChunks(&snapshot_chunk_ids);
+  std::unique_lock<std::shared_timed_mutex> files_lock(value_files_mutex_);
+  for (uint64_t chunk_id = 0; chunk_id + 1 < value_files_.size(); ++chunk_id) {
+    if (!value_files_.at(chunk_id).IsOpen()) { continue; }
+    if (chunk_num_live_values_.at(chunk_id) != 0) { continue; }
+    if (snapshot_chunk_ids.count(chunk_id) != 0) { continue; }
+    value_files_.at(chunk_id).Close();
+    PosixFile::RecursiveDelete(ValueFilePath(chunk_id));
+    PosixFile::RecursiveDelete(KeyFilePath(chunk_id));
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::CompactChunk(uint64_t chunk_id, IoRateLimiter* limiter) {
+  // Only the compaction thread closes value files and a sealed chunk is never written again, so
+  // the blocks can be read without holding mutex_. Whether a row is still live is decided under
+  // mutex_ right before it is rewritten.
+  int value_fd = -1;
+  {
+    std::lock_guard<std::recursive_mutex> lock(mutex_);
+    value_fd = value_files_.at(chunk_id).fd();
+  }
+  PosixFile key_file(KeyFilePath(chunk_id), O_RDONLY, 0644);
+  const uint64_t block_keys_size = num_values_per_block_ * sizeof(Key);
+  AlignedBuffer blocks(physical_block_size_);
+  blocks.Resize(kCompactionBatchBlocks * logical_block_size_);
+  std::vector<Key> block_keys(kCompactionBatchBlocks * num_values_per_block_);
+  std::vector<Key> live_keys;
+  std::vector<char> live_values;
+  for (uint64_t start_block = 0; start_block < num_logical_blocks_per_chunk_;
+       start_block += kCompactionBatchBlocks) {
+    const uint64_t num_blocks =
+        std::min(kCompactionBatchBlocks, num_logical_blocks_per_chunk_ - start_block);
+    const uint64_t values_bytes = num_blocks * logical_block_size_;
+    PCHECK(pread(value_fd, blocks.ptr(), values_bytes, start_block * logical_block_size_)
+           == values_bytes);
+    const uint64_t keys_bytes = num_blocks * block_keys_size;
+    PCHECK(pread(key_file.fd(), block_keys.data(), keys_bytes, start_block * block_keys_size)
+           == keys_bytes);
+    live_keys.clear();
+    live_values.clear();
+    {
+      std::lock_guard<std::recursive_mutex> lock(mutex_);
+      if (chunk_num_live_values_.at(chunk_id) == 0) { break; }
+      const uint64_t start_index =
+          chunk_id * num_values_per_chunk_ + start_block * num_values_per_block_;
+      for (uint64_t i = 0; i < num_blocks * num_values_per_block_; ++i) {
+        const auto& shard = RowIdMapping(block_keys[i]);
+        auto it = shard.find(block_keys[i]);
+        if (it == shard.end() || it->second != start_index + i) { continue; }
+        const uint64_t block_id = i / num_values_per_block_;
+        const uint64_t value_offset =
+            block_id * logical_block_size_ + (i - block_id * num_values_per_block_) * value_size_;
+        live_keys.push_back(block_keys[i]);
+        live_values.insert(live_values.end(), BytesOffset(blocks.ptr(), value_offset),
+                           BytesOffset(blocks.ptr(), value_offset + value_size_));
+      }
+      if (!live_keys.empty()) {
+        compacting_ = true;
+        Put(live_keys.size(), live_keys.data(), live_values.data());
+        compacting_ = false;
+      }
+    }
+    limiter->Acquire(values_bytes + keys_bytes + live_values.size());
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::ListSnapshotChunks(
+    std::unordered_set<uint64_t>* chunk_ids) {
+  DIR* dir = opendir(snapshots_dir_.c_str());
+  if (dir == nullptr) {
+    PCHECK(errno == ENOENT);
+    return;
+  }
+  struct dirent* ent = nullptr;
+  while ((ent = readdir(dir)) != nullptr) {
+    if (strcmp(ent->d_name, ".") == 0 || strcmp(ent->d_name, "..") == 0) { continue; }
+    for (const uint64_t chunk_id : ListSnapshotChunkIds(ent->d_name)) {
+      chunk_ids->insert(chunk_id);
+    }
+  }
+  PCHECK(closedir(dir) == 0);
+}
+
 template<typename Engine>
 std::unique_ptr<PersistentTable> DispatchKeyType(const PersistentTableOptions& options) {
   if (options.key_size == 4) {
@@ -17,6 +17,7 @@ limitations under the License.
 #define ONEFLOW_CORE_EMBEDDING_PERSISTENT_TABLE_H_
 
 #include "oneflow/core/common/util.h"
+#include "oneflow/core/common/maybe.h"
 
 namespace oneflow {
 
@@ -29,6 +30,19 @@ struct PersistentTableOptions {
   uint64_t target_chunk_size_mb = 4 * 1024;
   uint16_t physical_block_size = 4096;
   uint64_t capacity_hint = 0;
+  // Sealed chunks whose ratio of live values drops below compaction_live_ratio are rewritten by a
+  // background thread, and their files are removed once no snapshot references them. 0 disables
+  // compaction.
+  float compaction_live_ratio = 0;
+  // Upper bound of the bytes read and written by compaction per second, 0 means unlimited.
+  uint64_t compaction_io_rate_limit_mb = 64;
+  uint64_t compaction_interval_ms = 60 * 1000;
+  // Also save the index of a snapshot partitioned by hash shard, so that restoring it only needs
+  // to map one file per shard instead of gathering keys from every chunk.
+  bool snapshot_prebuilt_index = false;
+  // Track the keys written since the last snapshot, which SaveDeltaSnapshot needs. The tracked
+  // keys take memory until the next snapshot, so this is off unless delta snapshots are used.
+  bool delta_snapshot = false;
 };
 
 class PersistentTable {
@@ -59,7 +73,11 @@ class PersistentTable {
   virtual void LoadSnapshot(const std::string& name) = 0;
   virtual void LoadSnapshot(const std::string& name,
                             const std::function<void(Iterator* iter)>& Hook) = 0;
-  virtual void SaveSnapshot(const std::string& name) = 0;
+  virtual Maybe<void> SaveSnapshot(const std::string& name) = 0;
+  // Saves only the rows remapped since the last snapshot saved or loaded by this table, with that
+  // snapshot as its base. Loading a delta snapshot restores its whole chain of bases. Requires
+  // PersistentTableOptions::delta_snapshot.
+  virtual Maybe<void> SaveDeltaSnapshot(const std::string& name) = 0;
 };
 
 std::unique_ptr<PersistentTable> NewPersistentTable(const PersistentTableOptions& options);
@@ -0,0 +1,154 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/embedding/persistent_table.h"
+#include "oneflow/core/embedding/posix_file.h"
+#include "oneflow/core/common/util.h"
+#include <gtest/gtest.h>
+#include <chrono>
+#include <numeric>
+#include <random>
+
+namespace oneflow {
+
+namespace embedding {
+
+namespace {
+
+#ifdef __linux__
+
+std::string CreateTempDirectory() {
+  const char* tmp_env = getenv("TMPDIR");
+  const char* tmp_dir = tmp_env == nullptr ? "/tmp" : tmp_env;
+  std::string tpl = std::string(tmp_dir) + "/test_persistent_table_XXXXXX";
+  char* path = mkdtemp(const_cast<char*>(tpl.c_str()));
+  PCHECK(path != nullptr);
+  return std::string(path);
+}
+
+// Values of key k at version v are k * value_length + j + v, so a reader can tell a consistent
+// row from one mixing two versions or belonging to another key.
+void FillValues(const std::vector<uint64_t>& keys, uint32_t value_length, float version,
+                std::vector<float>* values) {
+  values->resize(keys.size() * value_length);
+  for (size_t i = 0; i < keys.size(); ++i) {
+    for (size_t j = 0; j < value_length; ++j) {
+      values->at(i * value_length + j) = static_cast<float>(keys[i] * value_length + j) + version;
+    }
+  }
+}
+
+void BenchmarkConcurrentGetPut(uint32_t num_readers) {
+  const std::string path = CreateTempDirectory();
+  const uint32_t value_length = 32;
+  const uint64_t num_keys = 1 << 18;
+  const uint32_t batch_size = 4096;
+  // A short smoke run by default, set the duration to get meaningful throughput numbers.
+  const int64_t duration_ms =
+      ParseIntegerFromEnv("ONEFLOW_PERSISTENT_TABLE_BENCHMARK_DURATION_MS", 50);
+  PersistentTableOptions options{};
+  options.path = path;
+  options.value_size = value_length * sizeof(float);
+  options.key_size = sizeof(uint64_t);
+  options.physical_block_size = 512;
+  options.target_chunk_size_mb = 16;
+  std::unique_ptr<PersistentTable> table = NewPersistentTable(options);
+  std::vector<uint64_t> all_keys(num_keys);
+  std::iota(all_keys.begin(), all_keys.end(), 0);
+  std::vector<float> all_values;
+  FillValues(all_keys, value_length, 0, &all_values);
+  table->Put(num_keys, all_keys.data(), all_values.data());
+
+  std::atomic<bool> stop(false);
+  std::atomic<int64_t> num_read_keys(0);
+  std::atomic<int64_t> num_written_keys(0);
+  std::atomic<int64_t> num_errors(0);
+  std::atomic<int64_t> max_version(0);
+  std::vector<std::thread> readers;
+  for (uint32_t tid = 0; tid < num_readers; ++tid) {
+    readers.emplace_back([&, tid]() {
+      std::mt19937_64 engine(tid);
+      std::uniform_int_distribution<uint64_t> dist(0, num_keys - 1);
+      std::vector<uint64_t> keys(batch_size);
+      std::vector<float> values(batch_size * value_length);
+      std::vector<uint32_t> missing_indices(batch_size);
+      // Every thread runs at least one batch, even if the run ends before it starts.
+      do {
+        for (auto& key : keys) { key = dist(engine); }
+        // Any version written before the lookup finished is acceptable.
+        uint32_t n_missing = 0;
+        table->Get(batch_size, keys.data(), values.data(), &n_missing, missing_indices.data());
+        const int64_t version_bound = max_version.load();
+        if (n_missing != 0) { num_errors += 1; }
+        for (uint32_t i = 0; i < batch_size; ++i) {
+          const float* row = values.data() + i * value_length;
+          const float version = row[0] - static_cast<float>(keys[i] * value_length);
+          if (version < 0 || version > version_bound) { num_errors += 1; }
+          for (uint32_t j = 1; j < value_length; ++j) {
+            if (row[j] != static_cast<float>(keys[i] * value_length + j) + version) {
+              num_errors += 1;
+              break;
+            }
+          }
+        }
+        num_read_keys += batch_size;
+      } while (!stop);
+    });
+  }
+  std::thread writer([&]() {
+    std::mt19937_64 engine(num_readers);
+    std::uniform_int_distribution<uint64_t> dist(0, num_keys - 1);
+    std::vector<uint64_t> keys(batch_size);
+    std::vector<float> values;
+    int64_t version = 0;
+    do {
+      version += 1;
+      for (auto& key : keys) { key = dist(engine); }
+      FillValues(keys, value_length, version, &values);
+      max_version = version;
+      table->Put(batch_size, keys.data(), values.data());
+      num_written_keys += batch_size;
+    } while (!stop);
+  });
+  const auto start = std::chrono::steady_clock::now();
+  std::this_thread::sleep_for(std::chrono::milliseconds(duration_ms));
+  stop = true;
+  writer.join();
+  for (auto& reader : readers) { reader.join(); }
+  const double seconds =
+      std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+  LOG(INFO) << "PersistentTable readers: " << num_readers
+            << ", get keys/s: " << static_cast<double>(num_read_keys) / seconds
+            << ", put keys/s: " << static_cast<double>(num_written_keys) / seconds;
+  ASSERT_EQ(num_errors, 0);
+  ASSERT_GT(num_read_keys, 0);
+  ASSERT_GT(num_written_keys, 0);
+  table.reset();
+  PosixFile::RecursiveDelete(path);
+}
+
+TEST(PersistentTable, ConcurrentGetPut1Reader) { BenchmarkConcurrentGetPut(1); }
+
+TEST(PersistentTable, ConcurrentGetPut4Readers) { BenchmarkConcurrentGetPut(4); }
+
+TEST(PersistentTable, ConcurrentGetPut16Readers) { BenchmarkConcurrentGetPut(16); }
+
+#endif  // __linux__
+
+}  // namespace
+
+}  // namespace embedding
+
+}  // namespace oneflow
@@ -134,7 +134,8 @@ class KeyValueStoreImpl : public KeyValueStore {
   void LoadSnapshot(const std::string& name) override;
   void LoadSnapshot(const std::string& name,
                     const std::function<void(KVIterator* iter)>& Hook) override;
-  void SaveSnapshot(const std::string& name) override;
+  Maybe<void> SaveSnapshot(const std::string& name) override;
+  Maybe<void> SaveDeltaSnapshot(const std::string& name) override;
 
  private:
   int device_index_;
@@ -219,9 +220,15 @@ void KeyValueStoreImpl<Key>::LoadSnapshot(const std::string& name,
 }
 
 template<typename Key>
-void KeyValueStoreImpl<Key>::SaveSnapshot(const std::string& name) {
+Maybe<void> KeyValueStoreImpl<Key>::SaveSnapshot(const std::string& name) {
   CudaCurrentDeviceGuard guard(device_index_);
-  table_->SaveSnapshot(name);
+  return table_->SaveSnapshot(name);
+}
+
+template<typename Key>
+Maybe<void> KeyValueStoreImpl<Key>::SaveDeltaSnapshot(const std::string& name) {
+  CudaCurrentDeviceGuard guard(device_index_);
+  return table_->SaveDeltaSnapshot(name);
 }
 
 }  // namespace
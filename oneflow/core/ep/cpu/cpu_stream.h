@@ -94,6 +94,12 @@ class CpuStream : public Stream {
   Maybe<void> Sync() override;
   void RecordEvent(Event* event) override;
 
+  // Grain size of a ParallelFor whose iterations each process row_size elements.
+  static size_t RowGrainSize(size_t row_size) {
+    if (row_size == 0 || row_size >= kParallelForDefaultGrain) { return 1; }
+    return kParallelForDefaultGrain / row_size;
+  }
+
   template<typename F>
   void ParallelFor(int64_t begin, int64_t end, const F& func) {
     ParallelFor(begin, end, func, kParallelForDefaultGrain);
@@ -25,8 +25,8 @@ namespace primitive {
 namespace {
 
 template<typename T, size_t arity>
-void AddCpu(const T* const* srcs, T* dst, size_t count) {
-  for (size_t i = 0; i < count; ++i) {
+void AddCpu(const T* const* srcs, T* dst, size_t begin, size_t end) {
+  for (size_t i = begin; i < end; ++i) {
     T sum = T(0);
     for (size_t a = 0; a < arity; ++a) { sum += srcs[a][i]; }
     dst[i] = sum;
@@ -34,8 +34,8 @@ void AddCpu(const T* const* srcs, T* dst, size_t count) {
 }
 
 template<typename T>
-void AddCpu(const T* const* srcs, size_t arity, T* dst, size_t count) {
-  for (size_t i = 0; i < count; ++i) {
+void AddCpu(const T* const* srcs, size_t arity, T* dst, size_t begin, size_t end) {
+  for (size_t i = begin; i < end; ++i) {
     T sum = T(0);
     for (size_t a = 0; a < arity; ++a) { sum += srcs[a][i]; }
     dst[i] = sum;
@@ -52,25 +52,30 @@ class AddDefaultImpl : public Add {
   using Add::Launch;
   void Launch(Stream* stream, const void* const* srcs, size_t arity, void* dst,
               size_t count) override {
-#define ONE_IF(a)                                                                            \
-  if (arity == a) {                                                                          \
-    AddCpu<T, a>(reinterpret_cast<const T* const*>(srcs), reinterpret_cast<T*>(dst), count); \
-  }
+    const T* const* src_ptrs = reinterpret_cast<const T* const*>(srcs);
+    T* dst_ptr = reinterpret_cast<T*>(dst);
+    stream->As<CpuStream>()->ParallelFor(0, count, [&](int64_t begin, int64_t end) {
+#define ONE_IF(a) \
+  if (arity == a) { AddCpu<T, a>(src_ptrs, dst_ptr, begin, end); }
 #define ONE_ELIF(a) else ONE_IF(a)
-#define ONE_ELSE                                                                                 \
-  else {                                                                                         \
-    AddCpu<T>(reinterpret_cast<const T* const*>(srcs), arity, reinterpret_cast<T*>(dst), count); \
+#define ONE_ELSE                                     \
+  else {                                             \
+    AddCpu<T>(src_ptrs, arity, dst_ptr, begin, end); \
   }
-    ONE_IF(0)
-    ONE_ELIF(1)
-    ONE_ELIF(2)
-    ONE_ELIF(3)
-    ONE_ELIF(4)
-    ONE_ELIF(5)
-    ONE_ELIF(6)
-    ONE_ELIF(7)
-    ONE_ELIF(8)
-    ONE_ELSE
+      ONE_IF(0)
+      ONE_ELIF(1)
+      ONE_ELIF(2)
+      ONE_ELIF(3)
+      ONE_ELIF(4)
+      ONE_ELIF(5)
+      ONE_ELIF(6)
+      ONE_ELIF(7)
+      ONE_ELIF(8)
+      ONE_ELSE
+#undef ONE_ELSE
+#undef ONE_ELIF
+#undef ONE_IF
+    });
   }
 };
 
@@ -16,6 +16,7 @@ limitations under the License.
 #include "oneflow/core/ep/include/primitive/primitive.h"
 #include "oneflow/core/ep/include/primitive/broadcast_matmul.h"
 #include "oneflow/core/ep/common/primitive/broadcast_matmul.h"
+#include "oneflow/core/ep/cpu/cpu_stream.h"
 #include "oneflow/core/common/blas.h"
 
 namespace oneflow {
@@ -43,13 +44,25 @@ CBLAS_TRANSPOSE GetCblasTranspose(BlasTransposeType transpose_type) {
 }
 
 template<typename T>
-void CblasMatmul(CBLAS_TRANSPOSE trans_a, CBLAS_TRANSPOSE trans_b, int m, int n, int k, T alpha,
-                 const T* a, const T* b, T beta, T* c) {
+struct MatmulBatch {
+  const T* a;
+  const T* b;
+  T* c;
+  T beta;
+};
+
+// Computes rows [row_begin, row_end) of c = alpha * op(a) * op(b) + beta * c, where op(a) has m
+// rows in total.
+template<typename T>
+void CblasMatmulRows(CBLAS_TRANSPOSE trans_a, CBLAS_TRANSPOSE trans_b, int m, int n, int k,
+                     int row_begin, int row_end, T alpha, const T* a, const T* b, T beta, T* c) {
   int lda = 0;
   if (trans_a == CblasNoTrans) {
     lda = k;
+    a += static_cast<int64_t>(row_begin) * k;
   } else if (trans_a == CblasTrans) {
     lda = m;
+    a += row_begin;
   } else {
     UNIMPLEMENTED();
   }
@@ -62,27 +75,70 @@ void CblasMatmul(CBLAS_TRANSPOSE trans_a, CBLAS_TRANSPOSE trans_b, int m, int n,
     UNIMPLEMENTED();
   }
   const int ldc = n;
-  cblas_gemm<T>(CblasRowMajor, trans_a, trans_b, m, n, k, alpha, a, lda, b, ldb, beta, c, ldc);
+  c += static_cast<int64_t>(row_begin) * n;
+  cblas_gemm<T>(CblasRowMajor, trans_a, trans_b, row_end - row_begin, n, k, alpha, a, lda, b, ldb,
+                beta, c, ldc);
 }
 
 template<typename T>
-void LaunchCblasBroadcastMatmul(Stream* /*stream*/, DataType data_type,
-                                BlasTransposeType transpose_a, BlasTransposeType transpose_b,
-                                int64_t num_batch_dims, const int64_t* broadcast_batch_dims,
-                                const int64_t* a_batch_dims, const int64_t* b_batch_dims,
-                                const int64_t* c_batch_dims, int64_t m, int64_t n, int64_t k,
-                                Scalar alpha, const void* a, const void* b, Scalar beta, void* c) {
+void LaunchCblasBroadcastMatmul(Stream* stream, DataType data_type, BlasTransposeType transpose_a,
+                                BlasTransposeType transpose_b, int64_t num_batch_dims,
+                                const int64_t* broadcast_batch_dims, const int64_t* a_batch_dims,
+                                const int64_t* b_batch_dims, const int64_t* c_batch_dims,
+                                int64_t m, int64_t n, int64_t k, Scalar alpha, const void* a,
+                                const void* b, Scalar beta, void* c) {
+  // c is empty, and the row blocks below can not be sized for m == 0.
+  if (m == 0 || n == 0) { return; }
+  auto* cpu_stream = stream->As<CpuStream>();
   const CBLAS_TRANSPOSE cblas_trans_a = GetCblasTranspose(transpose_a);
   const CBLAS_TRANSPOSE cblas_trans_b = GetCblasTranspose(transpose_b);
   const T alpha_value = alpha.Value<T>();
-  auto func = [&](const void* batch_a, const void* batch_b, void* batch_c, Scalar batch_beta) {
-    const T beta_value = batch_beta.Value<T>();
-    CblasMatmul<T>(cblas_trans_a, cblas_trans_b, m, n, k, alpha_value,
-                   static_cast<const T*>(batch_a), static_cast<const T*>(batch_b), beta_value,
-                   static_cast<T*>(batch_c));
+  std::vector<MatmulBatch<T>> batches;
+  ForEachMatmul<kMaxNumDims>(
+      data_type, m, n, k, beta, num_batch_dims, broadcast_batch_dims, a_batch_dims, b_batch_dims,
+      c_batch_dims, a, b, c,
+      [&](const void* batch_a, const void* batch_b, void* batch_c, Scalar batch_beta) {
+        batches.push_back({static_cast<const T*>(batch_a), static_cast<const T*>(batch_b),
+                           static_cast<T*>(batch_c), batch_beta.Value<T>()});
+      });
+  if (batches.empty()) { return; }
+  // Batch items that accumulate into the same c must run one after another.
+  bool independent_batches = true;
+  for (int64_t i = 0; i < num_batch_dims; ++i) {
+    if (c_batch_dims[i] != broadcast_batch_dims[i]) { independent_batches = false; }
+  }
+  const int64_t num_batches = batches.size();
+  const int64_t num_parallel_batches = independent_batches ? num_batches : 1;
+  // Split every matmul into blocks of rows when there are fewer batch items than threads, so that
+  // a single large matmul, such as a broadcast b folded into m by Simplify, also runs in parallel.
+  const int64_t num_threads = dynamic_cast<CpuDevice*>(stream->device())->GetNumThreads();
+  auto DivUp = [](int64_t x, int64_t y) { return (x + y - 1) / y; };
+  int64_t num_row_blocks = 1;
+  if (num_parallel_batches < num_threads) {
+    num_row_blocks = std::min(m, DivUp(num_threads, num_parallel_batches));
+  }
+  const int64_t rows_per_block = DivUp(m, num_row_blocks);
+  num_row_blocks = DivUp(m, rows_per_block);
+  const size_t grain_size = CpuStream::RowGrainSize(rows_per_block * n * k);
+  auto RunBatches = [&](int64_t batch_begin, int64_t batch_end) {
+    cpu_stream->ParallelFor(
+        batch_begin * num_row_blocks, batch_end * num_row_blocks,
+        [&](int64_t begin, int64_t end) {
+          for (int64_t i = begin; i < end; ++i) {
+            const MatmulBatch<T>& batch = batches[i / num_row_blocks];
+            const int64_t row_begin = i % num_row_blocks * rows_per_block;
+            const int64_t row_end = std::min(row_begin + rows_per_block, m);
+            CblasMatmulRows<T>(cblas_trans_a, cblas_trans_b, m, n, k, row_begin, row_end,
+                               alpha_value, batch.a, batch.b, batch.beta, batch.c);
+          }
+        },
+        grain_size);
   };
-  ForEachMatmul<kMaxNumDims>(data_type, m, n, k, beta, num_batch_dims, broadcast_batch_dims,
-                             a_batch_dims, b_batch_dims, c_batch_dims, a, b, c, func);
+  if (independent_batches) {
+    RunBatches(0, num_batches);
+  } else {
+    for (int64_t i = 0; i < num_batches; ++i) { RunBatches(i, i + 1); }
+  }
 }
 
 void LaunchBroadcastMatmul(Stream* stream, DataType data_type, BlasTransposeType transpose_a,
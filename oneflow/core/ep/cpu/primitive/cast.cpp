@@ -15,6 +15,7 @@ limitations under the License.
 */
 #include "oneflow/core/ep/include/primitive/cast.h"
 #include "oneflow/core/ep/cpu/primitive/type_seq.h"
+#include "oneflow/core/ep/cpu/cpu_stream.h"
 
 namespace oneflow {
 
@@ -36,7 +37,11 @@ class CastImpl : public Cast {
   ~CastImpl() override = default;
 
   void Launch(Stream* stream, const void* from, void* to, size_t count) override {
-    CastCpu(reinterpret_cast<const From*>(from), reinterpret_cast<To*>(to), count);
+    const From* from_ptr = reinterpret_cast<const From*>(from);
+    To* to_ptr = reinterpret_cast<To*>(to);
+    stream->As<CpuStream>()->ParallelFor(0, count, [from_ptr, to_ptr](int64_t begin, int64_t end) {
+      CastCpu(from_ptr + begin, to_ptr + begin, end - begin);
+    });
   }
 };
 
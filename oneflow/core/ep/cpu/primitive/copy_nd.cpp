@@ -15,6 +15,8 @@ limitations under the License.
 */
 #include "oneflow/core/ep/include/primitive/copy_nd.h"
 #include "oneflow/core/ep/common/primitive/copy_nd.h"
+#include "oneflow/core/ep/cpu/cpu_stream.h"
+#include <cstring>
 
 namespace oneflow {
 
@@ -24,28 +26,44 @@ namespace primitive {
 namespace {
 
 template<size_t num_dims, size_t movement_size, typename IndexType>
-void CopyNdKernel(CopyNdKernelParams<num_dims, IndexType> params) {
+void CopyNdKernel(const CopyNdKernelParams<num_dims, IndexType>& params, IndexType row_size,
+                  IndexType begin_row, IndexType end_row) {
   using T = typename std::aligned_storage<movement_size, movement_size>::type;
   const T* src = reinterpret_cast<const T*>(params.src);
   T* dst = reinterpret_cast<T*>(params.dst);
-  for (IndexType i = 0; i < params.count; ++i) {
+  for (IndexType row = begin_row; row < end_row; ++row) {
     IndexType copy_index[num_dims];
     IndexType src_index[num_dims];
     IndexType dst_index[num_dims];
-    params.copy_index_helper.OffsetToNdIndex(i, copy_index);
+    params.copy_index_helper.OffsetToNdIndex(row * row_size, copy_index);
     for (size_t j = 0; j < num_dims; ++j) {
       src_index[j] = params.src_pos[j] + copy_index[j];
       dst_index[j] = params.dst_pos[j] + copy_index[j];
     }
     const IndexType src_offset = params.src_index_helper.NdIndexToOffset(src_index);
     const IndexType dst_offset = params.dst_index_helper.NdIndexToOffset(dst_index);
-    dst[dst_offset] = src[src_offset];
+    std::memcpy(dst + dst_offset, src + src_offset, row_size * movement_size);
   }
 }
 
 template<size_t num_dims, size_t movement_size, typename IndexType>
 void LaunchKernel(Stream* stream, CopyNdKernelParams<num_dims, IndexType> params) {
-  CopyNdKernel<num_dims, movement_size, IndexType>(params);
+  if (params.count == 0) { return; }
+  // The last dim of the copy is contiguous in both src and dst, so every row of the extent is
+  // copied at once. The row size is the stride of the second last dim of the extent.
+  IndexType row_size = params.count;
+  if (num_dims > 1) {
+    IndexType index[num_dims]{};
+    // num_dims - 2 written so that it stays in bounds when instantiated with num_dims == 1.
+    index[std::max<size_t>(num_dims, 2) - 2] = 1;
+    row_size = params.copy_index_helper.NdIndexToOffset(index);
+  }
+  stream->As<CpuStream>()->ParallelFor(
+      0, params.count / row_size,
+      [&](int64_t begin, int64_t end) {
+        CopyNdKernel<num_dims, movement_size, IndexType>(params, row_size, begin, end);
+      },
+      CpuStream::RowGrainSize(row_size));
 }
 
 class CopyNdImpl : public CopyNd {
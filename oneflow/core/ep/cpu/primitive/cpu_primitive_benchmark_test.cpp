@@ -0,0 +1,283 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include <gtest/gtest.h>
+#include <chrono>
+#include <random>
+#include "oneflow/core/ep/include/device_manager_registry.h"
+#include "oneflow/core/ep/cpu/cpu_device.h"
+#include "oneflow/core/ep/include/primitive/add.h"
+#include "oneflow/core/ep/include/primitive/broadcast_matmul.h"
+#include "oneflow/core/ep/include/primitive/cast.h"
+#include "oneflow/core/ep/include/primitive/copy_nd.h"
+#include "oneflow/core/ep/include/primitive/elementwise_unary.h"
+#include "oneflow/core/ep/include/primitive/fill.h"
+#include "oneflow/core/ep/include/primitive/permute.h"
+#include "oneflow/core/ep/include/primitive/softmax.h"
+#include "oneflow/core/common/scalar.h"
+
+namespace oneflow {
+
+namespace ep {
+
+namespace primitive {
+
+namespace {
+
+constexpr int kNumIterations = 10;
+
+class CpuPrimitiveBenchmark : public ::testing::Test {
+ protected:
+  void SetUp() override {
+    registry_.reset(new DeviceManagerRegistry());
+    device_ = registry_->GetDevice(DeviceType::kCPU, 0);
+    stream_ = device_->CreateStream();
+    num_threads_ = std::max<size_t>(std::thread::hardware_concurrency(), 1);
+  }
+
+  void TearDown() override {
+    device_->DestroyStream(stream_);
+    device_.reset();
+    registry_.reset();
+  }
+
+  // Runs launch with one thread and with all hardware threads, logs the throughput of both and
+  // returns after checking that both runs produced the same bytes in output.
+  void Benchmark(const std::string& name, size_t bytes, const std::function<void()>& launch,
+                 const std::vector<char>* output) {
+    std::vector<char> single_thread_output;
+    double seconds[2];
+    const size_t num_threads[2] = {1, num_threads_};
+    for (int i = 0; i < 2; ++i) {
+      static_cast<CpuDevice*>(device_.get())->SetNumThreads(num_threads[i]);
+      launch();
+      const auto start = std::chrono::steady_clock::now();
+      for (int iter = 0; iter < kNumIterations; ++iter) { launch(); }
+      seconds[i] = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count()
+                   / kNumIterations;
+      if (i == 0) { single_thread_output = *output; }
+    }
+    LOG(INFO) << name << ": " << bytes / seconds[0] / 1e9 << " GB/s with 1 thread, "
+              << bytes / seconds[1] / 1e9 << " GB/s with " << num_threads_ << " threads";
+    ASSERT_TRUE(single_thread_output == *output);
+  }
+
+  std::unique_ptr<DeviceManagerRegistry> registry_;
+  std::shared_ptr<Device> device_;
+  Stream* stream_;
+  size_t num_threads_;
+};
+
+template<typename T>
+void RandomFill(std::vector<char>* buffer) {
+  std::mt19937 engine(0);
+  std::uniform_real_distribution<float> dist(-8, 8);
+  T* ptr = reinterpret_cast<T*>(buffer->data());
+  for (size_t i = 0; i < buffer->size() / sizeof(T); ++i) { ptr[i] = static_cast<T>(dist(engine)); }
+}
+
+constexpr size_t kNumElements = 1 << 24;
+
+TEST_F(CpuPrimitiveBenchmark, ElementwiseUnary) {
+  std::vector<char> src(kNumElements * sizeof(float));
+  std::vector<char> dst(src.size());
+  RandomFill<float>(&src);
+  auto relu = NewPrimitive<ElementwiseUnaryFactory>(DeviceType::kCPU, UnaryOp::kRelu,
+                                                    DataType::kFloat, DataType::kFloat);
+  ASSERT_TRUE(relu);
+  Benchmark(
+      "ElementwiseUnary(relu)", src.size() + dst.size(),
+      [&]() { relu->Launch(stream_, src.data(), dst.data(), kNumElements); }, &dst);
+}
+
+TEST_F(CpuPrimitiveBenchmark, Cast) {
+  std::vector<char> src(kNumElements * sizeof(float));
+  std::vector<char> dst(kNumElements * sizeof(double));
+  RandomFill<float>(&src);
+  auto cast = NewPrimitive<CastFactory>(DeviceType::kCPU, DataType::kFloat, DataType::kDouble);
+  ASSERT_TRUE(cast);
+  Benchmark(
+      "Cast(float->double)", src.size() + dst.size(),
+      [&]() { cast->Launch(stream_, src.data(), dst.data(), kNumElements); }, &dst);
+}
+
+TEST_F(CpuPrimitiveBenchmark, Fill) {
+  std::vector<char> dst(kNumElements * sizeof(float));
+  auto fill = NewPrimitive<FillFactory>(DeviceType::kCPU, DataType::kFloat);
+  ASSERT_TRUE(fill);
+  Benchmark(
+      "Fill", dst.size(), [&]() { fill->Launch(stream_, dst.data(), Scalar(1.5), kNumElements); },
+      &dst);
+}
+
+TEST_F(CpuPrimitiveBenchmark, Add) {
+  std::vector<char> src0(kNumElements * sizeof(double));
+  std::vector<char> src1(src0.size());
+  std::vector<char> dst(src0.size());
+  RandomFill<double>(&src0);
+  RandomFill<double>(&src1);
+  auto add = NewPrimitive<AddFactory>(DeviceType::kCPU, DataType::kDouble);
+  ASSERT_TRUE(add);
+  Benchmark(
+      "Add(double)", src0.size() * 3,
+      [&]() { add->Launch(stream_, src0.data(), src1.data(), dst.data(), kNumElements); }, &dst);
+}
+
+TEST_F(CpuPrimitiveBenchmark, Transpose) {
+  const int64_t src_dims[3] = {16, 1000, 1000};
+  const int permutation[3] = {0, 2, 1};
+  std::vector<char> src(16 * 1000 * 1000 * sizeof(float));
+  std::vector<char> dst(src.size());
+  RandomFill<float>(&src);
+  auto permute = NewPrimitive<PermuteFactory>(DeviceType::kCPU, 3);
+  ASSERT_TRUE(permute);
+  Benchmark(
+      "Permute(0, 2, 1)", src.size() * 2,
+      [&]() {
+        permute->Launch(stream_, DataType::kFloat, 3, src_dims, src.data(), permutation,
+                        dst.data());
+      },
+      &dst);
+  const float* src_ptr = reinterpret_cast<const float*>(src.data());
+  const float* dst_ptr = reinterpret_cast<const float*>(dst.data());
+  ASSERT_EQ(dst_ptr[(5 * 1000 + 7) * 1000 + 3], src_ptr[(5 * 1000 + 3) * 1000 + 7]);
+}
+
+TEST_F(CpuPrimitiveBenchmark, Permute) {
+  const int64_t src_dims[4] = {8, 64, 128, 64};
+  const int permutation[4] = {2, 0, 3, 1};
+  std::vector<char> src(8 * 64 * 128 * 64 * sizeof(float));
+  std::vector<char> dst(src.size());
+  RandomFill<float>(&src);
+  auto permute = NewPrimitive<PermuteFactory>(DeviceType::kCPU, 4);
+  ASSERT_TRUE(permute);
+  Benchmark(
+      "Permute(2, 0, 3, 1)", src.size() * 2,
+      [&]() {
+        permute->Launch(stream_, DataType::kFloat, 4, src_dims, src.data(), permutation,
+                        dst.data());
+      },
+      &dst);
+  // dst dims are (128, 8, 64, 64).
+  const float* src_ptr = reinterpret_cast<const float*>(src.data());
+  const float* dst_ptr = reinterpret_cast<const float*>(dst.data());
+  ASSERT_EQ(dst_ptr[((100 * 8 + 3) * 64 + 50) * 64 + 9],
+            src_ptr[((3 * 64 + 9) * 128 + 100) * 64 + 50]);
+}
+
+TEST_F(CpuPrimitiveBenchmark, CopyNd) {
+  const int64_t src_dims[2] = {4096, 4096};
+  const int64_t src_pos[2] = {100, 100};
+  const int64_t dst_dims[2] = {2048, 2048};
+  const int64_t dst_pos[2] = {0, 0};
+  const int64_t extent[2] = {2048, 2048};
+  std::vector<char> src(4096 * 4096 * sizeof(float));
+  std::vector<char> dst(2048 * 2048 * sizeof(float));
+  RandomFill<float>(&src);
+  auto copy_nd = NewPrimitive<CopyNdFactory>(DeviceType::kCPU, 2);
+  ASSERT_TRUE(copy_nd);
+  Benchmark(
+      "CopyNd", dst.size() * 2,
+      [&]() {
+        copy_nd->Launch(stream_, DataType::kFloat, 2, dst.data(), dst_dims, dst_pos, src.data(),
+                        src_dims, src_pos, extent);
+      },
+      &dst);
+  const float* src_ptr = reinterpret_cast<const float*>(src.data());
+  const float* dst_ptr = reinterpret_cast<const float*>(dst.data());
+  ASSERT_EQ(dst_ptr[7 * 2048 + 11], src_ptr[107 * 4096 + 111]);
+}
+
+TEST_F(CpuPrimitiveBenchmark, Softmax) {
+  const size_t rows = 16384;
+  const size_t cols = 1024;
+  std::vector<char> x(rows * cols * sizeof(float));
+  std::vector<char> y(x.size());
+  RandomFill<float>(&x);
+  auto softmax = NewPrimitive<SoftmaxFactory>(DeviceType::kCPU, DataType::kFloat);
+  ASSERT_TRUE(softmax);
+  Benchmark(
+      "Softmax", x.size() + y.size(),
+      [&]() { softmax->Launch(stream_, rows, cols, x.data(), y.data()); }, &y);
+}
+
+TEST_F(CpuPrimitiveBenchmark, BatchMatmul) {
+  const int64_t batch = 256;
+  const int64_t m = 64;
+  const int64_t n = 64;
+  const int64_t k = 64;
+  const int64_t a_dims[3] = {batch, m, k};
+  const int64_t b_dims[3] = {batch, k, n};
+  const int64_t c_dims[3] = {batch, m, n};
+  std::vector<char> a(batch * m * k * sizeof(float));
+  std::vector<char> b(batch * k * n * sizeof(float));
+  std::vector<char> c(batch * m * n * sizeof(float));
+  RandomFill<float>(&a);
+  RandomFill<float>(&b);
+  auto matmul = NewPrimitive<BroadcastMatmulFactory>(DeviceType::kCPU, DataType::kFloat,
+                                                     BlasTransposeType::N, BlasTransposeType::N, 3);
+  ASSERT_TRUE(matmul);
+  Benchmark(
+      "BatchMatmul(256x64x64x64)", a.size() + b.size() + c.size(),
+      [&]() {
+        matmul->Launch(stream_, Scalar(1), 3, a_dims, a.data(), 3, b_dims, b.data(), Scalar(0), 3,
+                       c_dims, c.data());
+      },
+      &c);
+  const float* a_ptr = reinterpret_cast<const float*>(a.data());
+  const float* b_ptr = reinterpret_cast<const float*>(b.data());
+  const float* c_ptr = reinterpret_cast<const float*>(c.data());
+  const int64_t i = 100;
+  const int64_t row = 5;
+  const int64_t col = 7;
+  float expected = 0;
+  for (int64_t p = 0; p < k; ++p) {
+    expected += a_ptr[(i * m + row) * k + p] * b_ptr[(i * k + p) * n + col];
+  }
+  ASSERT_NEAR(c_ptr[(i * m + row) * n + col], expected, 1e-1);
+}
+
+TEST_F(CpuPrimitiveBenchmark, EmptyBatchMatmul) {
+  auto matmul = NewPrimitive<BroadcastMatmulFactory>(DeviceType::kCPU, DataType::kFloat,
+                                                     BlasTransposeType::N, BlasTransposeType::N, 3);
+  ASSERT_TRUE(matmul);
+  std::vector<float> a(64);
+  std::vector<float> b(64);
+  std::vector<float> c(64);
+  // Empty m, n and batch, c has no elements and every launch must be a no-op.
+  const int64_t shapes[3][4] = {{2, 0, 4, 3}, {2, 3, 4, 0}, {0, 3, 4, 2}};
+  for (const auto& shape : shapes) {
+    const int64_t batch = shape[0];
+    const int64_t m = shape[1];
+    const int64_t k = shape[2];
+    const int64_t n = shape[3];
+    const int64_t a_dims[3] = {batch, m, k};
+    const int64_t b_dims[3] = {batch, k, n};
+    const int64_t c_dims[3] = {batch, m, n};
+    for (const size_t num_threads : {size_t(1), num_threads_}) {
+      static_cast<CpuDevice*>(device_.get())->SetNumThreads(num_threads);
+      matmul->Launch(stream_, Scalar(1), 3, a_dims, a.data(), 3, b_dims, b.data(), Scalar(0), 3,
+                     c_dims, c.data());
+    }
+  }
+}
+
+}  // namespace
+
+}  // namespace primitive
+
+}  // namespace ep
+
+}  // namespace oneflow
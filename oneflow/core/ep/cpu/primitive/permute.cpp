@@ -15,6 +15,7 @@ limitations under the License.
 */
 #include "oneflow/core/ep/include/primitive/permute.h"
 #include "oneflow/core/ep/common/primitive/permute_impl.h"
+#include "oneflow/core/ep/cpu/cpu_stream.h"
 
 namespace oneflow {
 
@@ -27,30 +28,99 @@ namespace internal {
 
 namespace {
 
+constexpr int64_t kTransposeTileSize = 32;
+
 template<size_t num_dims, size_t movement_size, typename IndexType>
-void PermuteKernel(PermuteKernelParams<num_dims, IndexType> params) {
+void PermuteKernel(const PermuteKernelParams<num_dims, IndexType>& params,
+                   const IndexType* dst_dims, const IndexType* src_strides, IndexType begin,
+                   IndexType end) {
   using T = typename std::aligned_storage<movement_size, movement_size>::type;
   const T* src = reinterpret_cast<const T*>(params.src);
   T* dst = reinterpret_cast<T*>(params.dst);
-  for (IndexType i = 0; i < params.count; ++i) {
-    IndexType src_index[num_dims];
-    IndexType dst_index[num_dims];
-    params.dst_index_helper.OffsetToNdIndex(i, dst_index);
-    for (size_t dim = 0; dim < num_dims; ++dim) {
-      src_index[params.permutation[dim]] = dst_index[dim];
-    }
-    IndexType src_offset = params.src_index_helper.NdIndexToOffset(src_index);
+  // Only the first index of the range is decomposed, the following ones are reached by stepping
+  // the dst index like an odometer and moving the src offset by the matching strides.
+  IndexType dst_index[num_dims];
+  params.dst_index_helper.OffsetToNdIndex(begin, dst_index);
+  IndexType src_offset = 0;
+  for (size_t dim = 0; dim < num_dims; ++dim) { src_offset += dst_index[dim] * src_strides[dim]; }
+  for (IndexType i = begin; i < end; ++i) {
     dst[i] = src[src_offset];
+    for (int dim = num_dims - 1; dim >= 0; --dim) {
+      dst_index[dim] += 1;
+      src_offset += src_strides[dim];
+      if (dst_index[dim] < dst_dims[dim]) { break; }
+      src_offset -= dst_dims[dim] * src_strides[dim];
+      dst_index[dim] = 0;
+    }
   }
 }
 
+// Transposes the last two dims tile by tile, so that both the rows read from src and the rows
+// written to dst stay in cache while a tile is processed.
+template<size_t movement_size, typename IndexType>
+void BatchTranspose(CpuStream* stream, const void* src_ptr, void* dst_ptr, IndexType num_batches,
+                    IndexType rows, IndexType cols) {
+  using T = typename std::aligned_storage<movement_size, movement_size>::type;
+  const T* src = reinterpret_cast<const T*>(src_ptr);
+  T* dst = reinterpret_cast<T*>(dst_ptr);
+  const IndexType row_tiles = (rows + kTransposeTileSize - 1) / kTransposeTileSize;
+  const IndexType col_tiles = (cols + kTransposeTileSize - 1) / kTransposeTileSize;
+  const IndexType tiles_per_batch = row_tiles * col_tiles;
+  stream->ParallelFor(
+      0, num_batches * tiles_per_batch,
+      [&](int64_t begin, int64_t end) {
+        for (int64_t tile = begin; tile < end; ++tile) {
+          const IndexType batch = tile / tiles_per_batch;
+          const IndexType tile_in_batch = tile - batch * tiles_per_batch;
+          const IndexType row_begin = tile_in_batch / col_tiles * kTransposeTileSize;
+          const IndexType col_begin = tile_in_batch % col_tiles * kTransposeTileSize;
+          const IndexType row_end = std::min<IndexType>(rows, row_begin + kTransposeTileSize);
+          const IndexType col_end = std::min<IndexType>(cols, col_begin + kTransposeTileSize);
+          const T* batch_src = src + batch * rows * cols;
+          T* batch_dst = dst + batch * rows * cols;
+          for (IndexType col = col_begin; col < col_end; ++col) {
+            for (IndexType row = row_begin; row < row_end; ++row) {
+              batch_dst[col * rows + row] = batch_src[row * cols + col];
+            }
+          }
+        }
+      },
+      CpuStream::RowGrainSize(kTransposeTileSize * kTransposeTileSize));
+}
+
 template<size_t num_dims, size_t movement_size, typename IndexType>
 void LaunchKernel(Stream* stream, const int64_t* src_dims, const void* src, const int* permutation,
                   void* dst, size_t count) {
+  CpuStream* cpu_stream = stream->As<CpuStream>();
+  if (num_dims == 2 && permutation[0] == 1 && permutation[1] == 0) {
+    BatchTranspose<movement_size, IndexType>(cpu_stream, src, dst, 1, src_dims[0], src_dims[1]);
+    return;
+  }
+  if (num_dims == 3 && permutation[0] == 0 && permutation[1] == 2 && permutation[2] == 1) {
+    BatchTranspose<movement_size, IndexType>(cpu_stream, src, dst, src_dims[0], src_dims[1],
+                                             src_dims[2]);
+    return;
+  }
   PermuteKernelParams<num_dims, IndexType> params =
       MakePermuteParams<num_dims, IndexType>(src_dims, src, permutation, dst, count);
-  PermuteKernel<num_dims, movement_size, IndexType>(params);
+  IndexType dst_dims[num_dims];
+  IndexType src_strides[num_dims];
+  IndexType src_stride = 1;
+  for (int dim = num_dims - 1; dim >= 0; --dim) {
+    src_strides[dim] = src_stride;
+    src_stride *= src_dims[dim];
+  }
+  IndexType permuted_src_strides[num_dims];
+  for (size_t dim = 0; dim < num_dims; ++dim) {
+    dst_dims[dim] = src_dims[permutation[dim]];
+    permuted_src_strides[dim] = src_strides[permutation[dim]];
+  }
+  cpu_stream->ParallelFor(0, count, [&](int64_t begin, int64_t end) {
+    PermuteKernel<num_dims, movement_size, IndexType>(params, dst_dims, permuted_src_strides, begin,
+                                                      end);
+  });
 }
+
 class PermuteImpl : public Permute {
  public:
   OF_DISALLOW_COPY_AND_MOVE(PermuteImpl);
@@ -28,11 +28,13 @@ limitations under the License.
 #include "oneflow/core/functional/functional.h"
 #include "oneflow/core/graph/op_graph.h"
 #include "oneflow/core/job/compiler.h"
+#include "oneflow/core/job/id_manager.h"
 #include "oneflow/core/job/job_build_and_infer_ctx_mgr.h"
 #include "oneflow/core/job/job_desc.h"
 #include "oneflow/core/job/job_instance.h"
 #include "oneflow/core/job/critical_section_instance.h"
 #include "oneflow/core/job/lazy_mode.h"
+#include "oneflow/core/job/plan_cache.h"
 #include "oneflow/core/job/plan_util.h"
 #include "oneflow/core/persistence/tee_persistent_log_stream.h"
 #include "oneflow/core/vm/vm_util.h"
@@ -66,6 +68,30 @@ Maybe<std::string> GetTensorMetaString(const std::shared_ptr<one::Tensor>& tenso
   return ret;
 }
 
+Maybe<NNGraphTensorMeta> GetTensorMeta(const std::shared_ptr<one::Tensor>& tensor) {
+  NNGraphTensorMeta meta;
+  meta.shape = *tensor->shape();
+  meta.dtype = tensor->dtype();
+  if (tensor->is_consistent()) {
+    meta.parallel_desc = JUST(tensor->parallel_desc());
+    meta.nd_sbp = JUST(tensor->nd_sbp());
+  } else {
+    meta.device = JUST(tensor->device());
+  }
+  return meta;
+}
+
+Maybe<bool> TensorMetaEquals(const NNGraphTensorMeta& meta,
+                             const std::shared_ptr<one::Tensor>& tensor) {
+  if (tensor->dtype() != meta.dtype || *tensor->shape() != meta.shape) { return false; }
+  if (tensor->is_consistent()) {
+    return static_cast<bool>(meta.parallel_desc)
+           && JUST(tensor->parallel_desc()) == meta.parallel_desc
+           && JUST(tensor->nd_sbp()) == meta.nd_sbp;
+  }
+  return !meta.parallel_desc && JUST(tensor->device()) == meta.device;
+}
+
 }  // namespace
 
 NNGraph::~NNGraph() {
@@ -135,6 +161,7 @@ Maybe<void> NNGraph::RegisterInputOpNamesAndTensors(
   for (const auto& input_tensor : input_tensors) {
     input_tensors_valid_.emplace_back(JUST(GetTensorValidInCurRank(input_tensor)));
     inputs_tensor_meta_str_.emplace_back(*JUST(GetTensorMetaString(input_tensor)));
+    inputs_tensor_meta_.emplace_back(*JUST(GetTensorMeta(input_tensor)));
   }
   CHECK_EQ_OR_RETURN(input_tensors_valid_.size(), input_tensors.size());
   return Maybe<void>::Ok();
@@ -154,6 +181,7 @@ Maybe<void> NNGraph::RegisterOutputOpNamesAndTensors(
   for (const auto& output_tensor : output_tensors) {
     output_tensors_valid_.emplace_back(JUST(GetTensorValidInCurRank(output_tensor)));
     outputs_tensor_meta_str_.emplace_back(*JUST(GetTensorMetaString(output_tensor)));
+    outputs_tensor_meta_.emplace_back(*JUST(GetTensorMeta(output_tensor)));
   }
   CHECK_EQ_OR_RETURN(output_tensors_valid_.size(), output_tensors.size());
   return Maybe<void>::Ok();
@@ -258,9 +286,31 @@ Maybe<void> NNGraph::CompileAndInitRuntime() {
   auto scope = std::make_unique<GlobalJobDescScope>(job_.job_conf(), job_ctx->job_id());
   if (GlobalProcessCtx::IsThisProcessMaster()) {
     double start = GetCurTime();
-    // TODO(chengcheng): new memory reused by chunk
-    Compiler().Compile(&job_, &plan_, /* need_job_complete */ true);
-    PlanUtil::GenMemBlockAndChunkWithVariableOpNames4Plan(&plan_, variable_op_names_);
+    std::unique_ptr<PlanCache> plan_cache;
+    PlanCacheEntry cache_entry;
+    if (PlanCache::Enabled()) {
+      IdStateProto id_state;
+      Global<IDMgr>::Get()->SaveIdState(&id_state);
+      plan_cache.reset(new PlanCache(job_, job_ctx->job_id(), variable_op_names_, id_state));
+    }
+    if (plan_cache && plan_cache->TryLoad(&cache_entry)) {
+      // NOTE: the ids allocated by the skipped compilation are taken into account, so graphs
+      // compiled later get the same ids as without the cache.
+      job_.Swap(cache_entry.mutable_job());
+      plan_.Swap(cache_entry.mutable_plan());
+      Global<IDMgr>::Get()->RestoreIdState(cache_entry.id_state());
+      VLOG(1) << "Graph name: " << name_ << " loaded the compiled plan from cache.";
+    } else {
+      // TODO(chengcheng): new memory reused by chunk
+      Compiler().Compile(&job_, &plan_, /* need_job_complete */ true);
+      PlanUtil::GenMemBlockAndChunkWithVariableOpNames4Plan(&plan_, variable_op_names_);
+      if (plan_cache) {
+        *cache_entry.mutable_job() = job_;
+        *cache_entry.mutable_plan() = plan_;
+        Global<IDMgr>::Get()->SaveIdState(cache_entry.mutable_id_state());
+        JUST(plan_cache->Save(&cache_entry));
+      }
+    }
 
     VLOG(1) << "Graph name: " << name_ << " compile time: " << (GetCurTime() - start) / 1000000000.0
             << " seconds.";
@@ -478,20 +528,22 @@ Maybe<void> RunLazyNNGraph(const one::TensorTuple& inputs, const one::TensorTupl
   //   the args: parameters is all variable tensor hold by nn.Graph
   //   but the NNGraph::variable_op_size may has FreeEagerTensor as sepcial variable op.
   CHECK_LE_OR_RETURN(parameters.size(), nn_graph->variable_op_size());
+  // The meta strings are only formatted for the error message.
   for (int i = 0; i < inputs.size(); ++i) {
-    // TODO(chengcheng, liufengwei):
-    //   use TensorMeta.to_string and equal.
+    if (JUST(TensorMetaEquals(nn_graph->inputs_tensor_meta().at(i), inputs.at(i)))) { continue; }
     std::string tensor_meta_str = *JUST(GetTensorMetaString(inputs.at(i)));
     const std::string& static_meta_str = nn_graph->inputs_tensor_meta_str().at(i);
-    CHECK_OR_RETURN(static_meta_str == tensor_meta_str)
-        << "\n  nn.Graph ONLY accepts static inputs tensor meta, please check whether your input "
-        << "tensor meta each step is the same as the input of first call graph. \n  The excepted "
-        << "tensor meta is : ( \n  " << static_meta_str
-        << " \n) , but the actual tensor meta is : ( \n  " << tensor_meta_str << " \n)";
+    return Error::CheckFailedError()
+           << "\n  nn.Graph ONLY accepts static inputs tensor meta, please check whether your "
+           << "input tensor meta each step is the same as the input of first call graph. \n  The "
+           << "excepted tensor meta is : ( \n  " << static_meta_str
+           << " \n) , but the actual tensor meta is : ( \n  " << tensor_meta_str << " \n)";
   }
   for (int i = 0; i < outputs.size(); ++i) {
-    CHECK_OR_RETURN(nn_graph->outputs_tensor_meta_str().at(i)
-                    == *JUST(GetTensorMetaString(outputs.at(i))));
+    CHECK_OR_RETURN(JUST(TensorMetaEquals(nn_graph->outputs_tensor_meta().at(i), outputs.at(i))))
+        << "\n  The excepted tensor meta of output " << i << " is : ( \n  "
+        << nn_graph->outputs_tensor_meta_str().at(i) << " \n) , but the actual tensor meta is : ( "
+        << "\n  " << *JUST(GetTensorMetaString(outputs.at(i))) << " \n)";
   }
   std::vector<std::shared_ptr<vm::EagerBlobObject>> input_blobs;
   std::vector<std::shared_ptr<vm::EagerBlobObject>> output_blobs;
@@ -30,6 +30,16 @@ namespace oneflow {
 
 class Blob;
 
+// The meta of a graph input/output recorded when it is registered. Symbols are interned, so
+// checking the tensors of every run takes a few pointer comparisons instead of formatting strings.
+struct NNGraphTensorMeta {
+  Shape shape;
+  Symbol<DType> dtype;
+  Symbol<Device> device;
+  Symbol<ParallelDesc> parallel_desc;
+  Symbol<NdSbp> nd_sbp;
+};
+
 class NNGraph final : public NNGraphIf {
  public:
   explicit NNGraph(const std::string& name,
@@ -45,6 +55,12 @@ class NNGraph final : public NNGraphIf {
   const std::vector<bool>& outputs_valid() const override;
   const std::vector<std::string>& inputs_tensor_meta_str() const;
   const std::vector<std::string>& outputs_tensor_meta_str() const;
+  const std::vector<NNGraphTensorMeta>& inputs_tensor_meta() const {
+    return inputs_tensor_meta_;
+  }
+  const std::vector<NNGraphTensorMeta>& outputs_tensor_meta() const {
+    return outputs_tensor_meta_;
+  }
   int64_t variable_op_size() const;
 
   Maybe<void> RegisterAdditionalVarOpNamesAndTensorsToBeLoaded(
@@ -80,6 +96,8 @@ class NNGraph final : public NNGraphIf {
   std::vector<bool> output_tensors_valid_;
   std::vector<std::string> inputs_tensor_meta_str_;
   std::vector<std::string> outputs_tensor_meta_str_;
+  std::vector<NNGraphTensorMeta> inputs_tensor_meta_;
+  std::vector<NNGraphTensorMeta> outputs_tensor_meta_;
   HashMap<std::string, std::shared_ptr<one::Tensor>> variable_op_name2tensor_;
   // Additional variables are variable other than model states, such as states in
   // optimizers/lr schedulers or free eager tensors.
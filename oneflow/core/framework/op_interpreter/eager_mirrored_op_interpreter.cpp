@@ -40,6 +40,7 @@ limitations under the License.
 #include "oneflow/core/framework/op_builder.h"
 #include "oneflow/core/framework/id_util.h"
 #include "oneflow/core/functional/functional.h"
+#include "oneflow/core/profiler/host_profiler.h"
 #include "oneflow/core/rpc/include/global_process_ctx.h"
 
 namespace oneflow {
@@ -81,11 +82,24 @@ std::vector<TensorMeta*>* ThreadLocalDefaultOutputMutTensorMetas(int64_t size) {
   return &ptr_vec;
 }
 
+std::string InputShapesString(const TensorTuple& inputs) {
+  std::string str = "[";
+  for (int i = 0; i < inputs.size(); ++i) {
+    if (i > 0) { str += ", "; }
+    str += inputs.at(i)->shape()->ToString();
+  }
+  return str + "]";
+}
+
 }  // namespace
 
 Maybe<void> NaiveInterpret(const UserOpExpr& user_op_expr, const TensorTuple& inputs,
                            const Symbol<Device>& default_device, TensorTuple* outputs,
                            const OpExprInterpContext& ctx) {
+  profiler::HostEventGuard profiler_guard("op", [&]() { return user_op_expr.op_type_name(); });
+  if (profiler_guard.record_shapes()) {
+    profiler_guard.set_input_shapes(InputShapesString(inputs));
+  }
   const auto& attrs = ctx.attrs;
   std::shared_ptr<EagerBlobObjectList> input_eager_blob_objects =
       std::make_shared<EagerBlobObjectList>(inputs.size());
@@ -1053,6 +1053,97 @@ class SqrtSquareSumFunctor {
   std::shared_ptr<OpExpr> op_;
 };
 
+class MultiReduceBaseFunctor {
+ public:
+  explicit MultiReduceBaseFunctor(const std::string& op_type_name) {
+    ops_.resize(kMaxInputCount);
+    for (int n = 0; n < ops_.size(); ++n) {
+      ops_[n] = CHECK_JUST(one::OpBuilder(op_type_name).Input("x", n + 1).Output("y").Build());
+    }
+  }
+  virtual ~MultiReduceBaseFunctor() = default;
+
+ protected:
+  // Reduces every kMaxInputCount inputs with one op and returns the partial results.
+  Maybe<TensorTuple> PartialReduce(const TensorTuple& x, const AttrMap& attrs) const {
+    CHECK_GE_OR_RETURN(x.size(), 1) << "Expected at least one input tensor";
+    auto partials = std::make_shared<TensorTuple>();
+    for (int i = 0; i < x.size(); i += kMaxInputCount) {
+      size_t size = (i + kMaxInputCount) < x.size() ? kMaxInputCount : x.size() - i;
+      TensorTuple partial_inputs(size);
+      std::copy(x.begin() + i, x.begin() + i + size, partial_inputs.begin());
+      partials->emplace_back(
+          JUST(OpInterpUtil::Dispatch<Tensor>(*ops_.at(size - 1), partial_inputs, attrs)));
+    }
+    return partials;
+  }
+
+ private:
+  std::vector<std::shared_ptr<OpExpr>> ops_;
+};
+
+class MultiReduceSumPowAbsFunctor : public MultiReduceBaseFunctor {
+ public:
+  MultiReduceSumPowAbsFunctor() : MultiReduceBaseFunctor("multi_reduce_sum_pow_abs") {}
+  Maybe<Tensor> operator()(const TensorTuple& x, const float& p) const {
+    MutableAttrMap attrs;
+    JUST(attrs.SetAttr<float>("p", p));
+    const auto& partials = JUST(PartialReduce(x, attrs));
+    if (partials->size() == 1) { return partials->at(0); }
+    return ReduceSum(JUST(Stack(*partials, 0)), {0}, false);
+  }
+};
+
+class MultiReduceMaxAbsFunctor : public MultiReduceBaseFunctor {
+ public:
+  MultiReduceMaxAbsFunctor() : MultiReduceBaseFunctor("multi_reduce_max_abs") {}
+  Maybe<Tensor> operator()(const TensorTuple& x) const {
+    const auto& partials = JUST(PartialReduce(x, {}));
+    if (partials->size() == 1) { return partials->at(0); }
+    return ReduceMax(JUST(Stack(*partials, 0)), {0}, false);
+  }
+};
+
+class MultiReduceMinAbsFunctor : public MultiReduceBaseFunctor {
+ public:
+  MultiReduceMinAbsFunctor() : MultiReduceBaseFunctor("multi_reduce_min_abs") {}
+  Maybe<Tensor> operator()(const TensorTuple& x) const {
+    const auto& partials = JUST(PartialReduce(x, {}));
+    if (partials->size() == 1) { return partials->at(0); }
+    return ReduceMin(JUST(Stack(*partials, 0)), {0}, false);
+  }
+};
+
+class MultiTensorClipByNormFunctor {
+ public:
+  MultiTensorClipByNormFunctor() {
+    ops_.resize(kMaxInputCount);
+    for (int n = 0; n < ops_.size(); ++n) {
+      ops_[n] = CHECK_JUST(one::OpBuilder("multi_tensor_clip_by_norm")
+                               .Input("x", n + 1)
+                               .Input("total_norm")
+                               .Build());
+    }
+  }
+  Maybe<void> operator()(const TensorTuple& x, const std::shared_ptr<one::Tensor>& total_norm,
+                         const float& max_norm, const float& epsilon) const {
+    MutableAttrMap attrs;
+    JUST(attrs.SetAttr<float>("max_norm", max_norm));
+    JUST(attrs.SetAttr<float>("epsilon", epsilon));
+    for (int i = 0; i < x.size(); i += kMaxInputCount) {
+      size_t size = (i + kMaxInputCount) < x.size() ? kMaxInputCount : x.size() - i;
+      TensorTuple inputs(size + 1);
+      std::copy(x.begin() + i, x.begin() + i + size, inputs.begin());
+      inputs.at(size) = total_norm;
+      JUST(OpInterpUtil::Dispatch<TensorTuple>(*ops_.at(size - 1), inputs, attrs));
+    }
+    return Maybe<void>::Ok();
+  }
+
+ private:
+  std::vector<std::shared_ptr<OpExpr>> ops_;
+};
+
 class VectorNormFunctor {
  public:
   VectorNormFunctor() {}
@@ -2813,6 +2904,10 @@ ONEFLOW_FUNCTION_LIBRARY(m) {
   m.add_functor<ClampFunctor>("Clip");
   m.add_functor<ClampInplaceFunctor>("ClipInplace");
   m.add_functor<SqrtSquareSumFunctor>("SqrtSquareSum");
+  m.add_functor<MultiReduceSumPowAbsFunctor>("MultiReduceSumPowAbs");
+  m.add_functor<MultiReduceMaxAbsFunctor>("MultiReduceMaxAbs");
+  m.add_functor<MultiReduceMinAbsFunctor>("MultiReduceMinAbs");
+  m.add_functor<MultiTensorClipByNormFunctor>("MultiTensorClipByNorm");
   m.add_functor<VectorNormFunctor, ScalarVectorNormFunctor>("VectorNorm");
   m.add_functor<ScalarMatrixNormFunctor, MatrixNormFunctor>("MatrixNorm");
   m.add_functor<NormFunctor, Norm2Functor>("Norm");
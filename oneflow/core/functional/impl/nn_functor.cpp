@@ -2363,6 +2363,110 @@ class FusedDotFeatureInteractionFunctor {
   std::vector<std::shared_ptr<OpExpr>> ops_no_output_concat_;
 };
 
+class FusedRnnSequenceFunctor {
+ public:
+  // One op per combination of the optional inputs, indexed by the bits of OpIndex.
+  FusedRnnSequenceFunctor() {
+    ops_.resize(8);
+    for (int i = 0; i < ops_.size(); ++i) {
+      one::OpBuilder builder("fused_rnn_sequence");
+      builder.Input("input_gates").Input("hx").Input("weight_hh");
+      if (i & kHasBias) { builder.Input("bias_hh"); }
+      if (i & kHasCx) { builder.Input("cx"); }
+      if (i & kHasWeightHr) { builder.Input("weight_hr"); }
+      ops_[i] = CHECK_JUST(builder.Output("y").Output("cy").Output("reserve_space").Build());
+    }
+  }
+
+  Maybe<TensorTuple> operator()(const std::shared_ptr<one::Tensor>& input_gates,
+                                const std::shared_ptr<one::Tensor>& hx,
+                                const std::shared_ptr<one::Tensor>& weight_hh,
+                                const Optional<one::Tensor>& bias_hh,
+                                const Optional<one::Tensor>& cx,
+                                const Optional<one::Tensor>& weight_hr, const std::string& mode,
+                                const bool& reverse) const {
+    MutableAttrMap attrs;
+    JUST(attrs.SetAttr<std::string>("mode", mode));
+    JUST(attrs.SetAttr<bool>("reverse", reverse));
+    TensorTuple inputs{input_gates, hx, weight_hh};
+    int op_index = 0;
+    if (bias_hh) {
+      op_index |= kHasBias;
+      inputs.emplace_back(JUST(bias_hh));
+    }
+    if (cx) {
+      op_index |= kHasCx;
+      inputs.emplace_back(JUST(cx));
+    }
+    if (weight_hr) {
+      op_index |= kHasWeightHr;
+      inputs.emplace_back(JUST(weight_hr));
+    }
+    return OpInterpUtil::Dispatch<TensorTuple>(*JUST(oneflow::VectorAt(ops_, op_index)), inputs,
+                                               attrs);
+  }
+
+ private:
+  static constexpr int kHasBias = 1;
+  static constexpr int kHasCx = 2;
+  static constexpr int kHasWeightHr = 4;
+  std::vector<std::shared_ptr<OpExpr>> ops_;
+};
+
+class FusedRnnSequenceGradFunctor {
+ public:
+  FusedRnnSequenceGradFunctor() {
+    ops_.resize(16);
+    for (int i = 0; i < ops_.size(); ++i) {
+      one::OpBuilder builder("fused_rnn_sequence_grad");
+      builder.Input("dy").Input("y").Input("reserve_space").Input("hx").Input("weight_hh");
+      if (i & kHasCx) { builder.Input("cx"); }
+      if (i & kHasWeightHr) { builder.Input("weight_hr"); }
+      if (i & kHasDcy) { builder.Input("dcy"); }
+      builder.Output("input_gates_grad").Output("hx_grad").Output("weight_hh_grad");
+      if (i & kHasBiasGrad) { builder.Output("bias_hh_grad"); }
+      if (i & kHasCx) { builder.Output("cx_grad"); }
+      if (i & kHasWeightHr) { builder.Output("weight_hr_grad"); }
+      ops_[i] = CHECK_JUST(builder.Build());
+    }
+  }
+
+  Maybe<TensorTuple> operator()(
+      const std::shared_ptr<one::Tensor>& dy, const std::shared_ptr<one::Tensor>& y,
+      const std::shared_ptr<one::Tensor>& reserve_space, const std::shared_ptr<one::Tensor>& hx,
+      const std::shared_ptr<one::Tensor>& weight_hh, const Optional<one::Tensor>& cx,
+      const Optional<one::Tensor>& weight_hr, const Optional<one::Tensor>& dcy,
+      const bool& has_bias_hh_grad, const std::string& mode, const bool& reverse) const {
+    MutableAttrMap attrs;
+    JUST(attrs.SetAttr<std::string>("mode", mode));
+    JUST(attrs.SetAttr<bool>("reverse", reverse));
+    TensorTuple inputs{dy, y, reserve_space, hx, weight_hh};
+    int op_index = has_bias_hh_grad ? kHasBiasGrad : 0;
+    if (cx) {
+      op_index |= kHasCx;
+      inputs.emplace_back(JUST(cx));
+    }
+    if (weight_hr) {
+      op_index |= kHasWeightHr;
+      inputs.emplace_back(JUST(weight_hr));
+    }
+    if (dcy) {
+      CHECK_OR_RETURN(cx) << "dcy is only meaningful together with cx";
+      op_index |= kHasDcy;
+      inputs.emplace_back(JUST(dcy));
+    }
+    return OpInterpUtil::Dispatch<TensorTuple>(*JUST(oneflow::VectorAt(ops_, op_index)), inputs,
+                                               attrs);
+  }
+
+ private:
+  static constexpr int kHasBiasGrad = 1;
+  static constexpr int kHasCx = 2;
+  static constexpr int kHasWeightHr = 4;
+  static constexpr int kHasDcy = 8;
+  std::vector<std::shared_ptr<OpExpr>> ops_;
+};
+
 class OneEmbeddingIdShuffleFunctor {
  public:
   OneEmbeddingIdShuffleFunctor() {
@@ -2606,6 +2710,8 @@ ONEFLOW_FUNCTION_LIBRARY(m) {
   m.add_functor<impl::RoiAlignFunctor>("RoiAlign");
   m.add_functor<impl::RoiAlignGradFunctor>("RoiAlignGrad");
   m.add_functor<impl::FusedDotFeatureInteractionFunctor>("FusedDotFeatureInteraction");
+  m.add_functor<impl::FusedRnnSequenceFunctor>("FusedRnnSequence");
+  m.add_functor<impl::FusedRnnSequenceGradFunctor>("FusedRnnSequenceGrad");
   m.add_functor<impl::OneEmbeddingIdShuffleFunctor>("OneEmbeddingIdShuffle");
   m.add_functor<impl::OneEmbeddingEmbeddingShuffleFunctor>("OneEmbeddingEmbeddingShuffle");
   m.add_functor<impl::OneEmbeddingEmbeddingGradientShuffleFunctor>(
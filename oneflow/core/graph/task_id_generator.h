@@ -30,6 +30,10 @@ class TaskIdGenerator final {
 
   TaskId Generate(const StreamId& stream_id);
 
+  // Counters keyed by the stream id encoded with EncodeStreamIdToInt64.
+  HashMap<int64_t, task_index_t> GetTaskIndexCounters() const;
+  void SetTaskIndexCounters(const HashMap<int64_t, task_index_t>& stream_id2task_index_counter);
+
  private:
   HashMap<StreamId, task_index_t> stream_id2task_index_counter_;
 };
@@ -39,6 +43,23 @@ inline TaskId TaskIdGenerator::Generate(const StreamId& stream_id) {
   return TaskId{stream_id, task_index};
 }
 
+inline HashMap<int64_t, TaskIdGenerator::task_index_t> TaskIdGenerator::GetTaskIndexCounters()
+    const {
+  HashMap<int64_t, task_index_t> counters;
+  for (const auto& pair : stream_id2task_index_counter_) {
+    counters.emplace(EncodeStreamIdToInt64(pair.first), pair.second);
+  }
+  return counters;
+}
+
+inline void TaskIdGenerator::SetTaskIndexCounters(
+    const HashMap<int64_t, task_index_t>& stream_id2task_index_counter) {
+  stream_id2task_index_counter_.clear();
+  for (const auto& pair : stream_id2task_index_counter) {
+    stream_id2task_index_counter_.emplace(DecodeStreamIdFromInt64(pair.first), pair.second);
+  }
+}
+
 }  // namespace oneflow
 
 #endif  // ONEFLOW_CORE_GRAPH_TASK_ID_GENERATOR_H_
@@ -28,4 +28,26 @@ IDMgr::IDMgr() {
   chunk_id_count_ = 0;
 }
 
+void IDMgr::SaveIdState(IdStateProto* id_state) const {
+  id_state->set_regst_desc_id_count(regst_desc_id_count_);
+  id_state->set_mem_block_id_count(mem_block_id_count_);
+  id_state->set_chunk_id_count(chunk_id_count_);
+  auto* counters = id_state->mutable_stream_id2task_index_count();
+  counters->clear();
+  for (const auto& pair : task_id_gen_.GetTaskIndexCounters()) {
+    (*counters)[pair.first] = pair.second;
+  }
+}
+
+void IDMgr::RestoreIdState(const IdStateProto& id_state) {
+  regst_desc_id_count_ = id_state.regst_desc_id_count();
+  mem_block_id_count_ = id_state.mem_block_id_count();
+  chunk_id_count_ = id_state.chunk_id_count();
+  HashMap<int64_t, TaskIdGenerator::task_index_t> counters;
+  for (const auto& pair : id_state.stream_id2task_index_count()) {
+    counters.emplace(pair.first, pair.second);
+  }
+  task_id_gen_.SetTaskIndexCounters(counters);
+}
+
 }  // namespace oneflow
@@ -21,6 +21,7 @@ limitations under the License.
 #include "oneflow/core/job/resource_desc.h"
 #include "oneflow/core/job/global_for.h"
 #include "oneflow/core/graph/task_id_generator.h"
+#include "oneflow/core/job/id_state.pb.h"
 
 namespace oneflow {
 
@@ -35,6 +36,11 @@ class IDMgr final {
 
   TaskIdGenerator* GetTaskIdGenerator() { return &task_id_gen_; }
 
+  // Saves and restores all id counters, so that a cached plan can be used in place of
+  // compiling it.
+  void SaveIdState(IdStateProto* id_state) const;
+  void RestoreIdState(const IdStateProto& id_state);
+
  private:
   friend class Global<IDMgr>;
   IDMgr();
@@ -0,0 +1,117 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/job/plan_cache.h"
+#include <unistd.h>
+#include <algorithm>
+#include <climits>
+#include <fstream>
+#include <sstream>
+#include <google/protobuf/io/coded_stream.h>
+#include <google/protobuf/io/zero_copy_stream_impl.h>
+#include <google/protobuf/io/zero_copy_stream_impl_lite.h>
+#include "oneflow/core/common/protobuf.h"
+#include "oneflow/core/common/str_util.h"
+#include "oneflow/core/control/global_process_ctx.h"
+#include "oneflow/core/job/global_for.h"
+#include "oneflow/core/job/resource_desc.h"
+#include "oneflow/core/job/version.h"
+#include "oneflow/core/persistence/file_system.h"
+
+namespace oneflow {
+
+namespace {
+
+// Map fields make the default serialization order unstable between processes.
+void AppendDeterministicSerialization(const PbMessage& msg, std::string* out) {
+  google::protobuf::io::StringOutputStream string_stream(out);
+  google::protobuf::io::CodedOutputStream coded_stream(&string_stream);
+  coded_stream.SetSerializationDeterministic(true);
+  CHECK(msg.SerializeToCodedStream(&coded_stream));
+}
+
+// 64-bit FNV-1a, stable across builds and platforms unlike std::hash.
+uint64_t Fnv1aHash(const std::string& str) {
+  uint64_t hash = 14695981039346656037ULL;
+  for (const char c : str) {
+    hash ^= static_cast<uint8_t>(c);
+    hash *= 1099511628211ULL;
+  }
+  return hash;
+}
+
+}  // namespace
+
+PlanCache::PlanCache(const Job& job, int64_t job_id,
+                     const HashSet<std::string>& variable_op_names,
+                     const IdStateProto& id_state)
+    : cache_dir_(GetStringFromEnv("ONEFLOW_NN_GRAPH_PLAN_CACHE_DIR", "")) {
+  key_ = GetOneFlowGitVersion();
+  key_ += "\n" + std::to_string(GlobalProcessCtx::WorldSize()) + "\n"
+          + std::to_string(GlobalProcessCtx::NumOfProcessPerNode()) + "\n"
+          + std::to_string(job_id) + "\n";
+  AppendDeterministicSerialization(Global<ResourceDesc, ForSession>::Get()->resource(), &key_);
+  AppendDeterministicSerialization(job, &key_);
+  AppendDeterministicSerialization(id_state, &key_);
+  std::vector<std::string> sorted_variable_op_names(variable_op_names.begin(),
+                                                    variable_op_names.end());
+  std::sort(sorted_variable_op_names.begin(), sorted_variable_op_names.end());
+  for (const auto& name : sorted_variable_op_names) { key_ += "\n" + name; }
+  key_hash_ = Fnv1aHash(key_);
+}
+
+/*static*/ bool PlanCache::Enabled() {
+  return !GetStringFromEnv("ONEFLOW_NN_GRAPH_PLAN_CACHE_DIR", "").empty();
+}
+
+std::string PlanCache::FilePath() const {
+  std::stringstream ss;
+  ss << std::hex << key_hash_;
+  return JoinPath(cache_dir_, "plan_" + ss.str() + ".pb");
+}
+
+bool PlanCache::TryLoad(PlanCacheEntry* entry) const {
+  std::ifstream in_stream(FilePath(), std::ifstream::in | std::ifstream::binary);
+  if (!in_stream.is_open()) { return false; }
+  google::protobuf::io::IstreamInputStream input_stream(&in_stream);
+  google::protobuf::io::CodedInputStream coded_stream(&input_stream);
+  // Plans of large graphs exceed the default limit of 64MB.
+  coded_stream.SetTotalBytesLimit(INT_MAX);
+  if (!entry->ParseFromCodedStream(&coded_stream)) {
+    LOG(WARNING) << "Ignore broken plan cache file " << FilePath();
+    return false;
+  }
+  // Entries of different keys can share a file name, only an equal key is a hit.
+  return entry->key() == key_;
+}
+
+Maybe<void> PlanCache::Save(PlanCacheEntry* entry) const {
+  entry->set_key(key_);
+  LocalFS()->RecursivelyCreateDirIfNotExist(cache_dir_);
+  const std::string file_path = FilePath();
+  // Written to a temporary file first so that concurrent readers never see a partial entry.
+  const std::string tmp_file_path = file_path + ".tmp" + std::to_string(getpid());
+  {
+    std::ofstream out_stream(tmp_file_path,
+                             std::ofstream::out | std::ofstream::trunc | std::ofstream::binary);
+    CHECK_OR_RETURN(out_stream.is_open()) << "can not open " << tmp_file_path;
+    CHECK_OR_RETURN(entry->SerializeToOstream(&out_stream))
+        << "failed to write plan cache file " << tmp_file_path;
+  }
+  LocalFS()->RenameFile(tmp_file_path, file_path);
+  return Maybe<void>::Ok();
+}
+
+}  // namespace oneflow
@@ -0,0 +1,53 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_CORE_JOB_PLAN_CACHE_H_
+#define ONEFLOW_CORE_JOB_PLAN_CACHE_H_
+
+#include "oneflow/core/common/maybe.h"
+#include "oneflow/core/common/util.h"
+#include "oneflow/core/job/plan_cache.pb.h"
+
+namespace oneflow {
+
+// On-disk cache of plans compiled by nn.Graph. It is enabled by setting the environment
+// variable ONEFLOW_NN_GRAPH_PLAN_CACHE_DIR to a directory, and skips job passes and plan
+// compilation of a graph that has been compiled before with the same job, variables, resource
+// and world topology.
+class PlanCache final {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(PlanCache);
+  PlanCache(const Job& job, int64_t job_id, const HashSet<std::string>& variable_op_names,
+            const IdStateProto& id_state);
+  ~PlanCache() = default;
+
+  static bool Enabled();
+
+  // Returns false if no plan has been cached for this key.
+  bool TryLoad(PlanCacheEntry* entry) const;
+  // The key of `entry` is set here.
+  Maybe<void> Save(PlanCacheEntry* entry) const;
+
+ private:
+  std::string FilePath() const;
+
+  std::string cache_dir_;
+  std::string key_;
+  uint64_t key_hash_;
+};
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_CORE_JOB_PLAN_CACHE_H_
@@ -16,16 +16,34 @@ limitations under the License.
 #include "oneflow/core/kernel/profiler_kernel_observer.h"
 #include "oneflow/core/profiler/profiler.h"
 #include "oneflow/core/profiler/kernel.h"
+#include "oneflow/core/profiler/host_profiler.h"
+#include "oneflow/core/kernel/kernel.h"
 
 namespace oneflow {
 
+namespace {
+
+// Kernels do not nest on a thread, so one flag per thread pairs the push with its pop. Without
+// the host profiler a kernel launch only costs the atomic load of IsHostProfilerEnabled.
+thread_local bool host_range_pushed = false;
+
+}  // namespace
+
 void ProfilerKernelObserver::WillForwardDataContent(KernelContext* kernel_ctx,
                                                     const Kernel* kernel) {
   OF_PROFILER_ONLY_CODE(profiler::TraceKernelForwardDataContentStart(kernel_ctx, kernel));
+  if (profiler::IsHostProfilerEnabled()) {
+    profiler::PushHostRange("kernel", kernel->op_conf().name());
+    host_range_pushed = true;
+  }
 }
 
 void ProfilerKernelObserver::DidForwardDataContent(KernelContext* kernel_ctx,
                                                    const Kernel* kernel) {
+  if (host_range_pushed) {
+    profiler::PopHostRange();
+    host_range_pushed = false;
+  }
   OF_PROFILER_ONLY_CODE(profiler::TraceKernelForwardDataContentEnd(kernel_ctx, kernel));
 }
 
@@ -0,0 +1,202 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/profiler/host_profiler.h"
+#include <chrono>
+#include "oneflow/core/vm/cpu_caching_allocator.h"
+
+namespace oneflow {
+
+namespace profiler {
+
+namespace internal {
+
+std::atomic<bool> host_profiler_enabled(false);
+
+}  // namespace internal
+
+namespace {
+
+struct ThreadEventBuffer {
+  std::mutex mutex;
+  std::vector<HostEvent> events;
+};
+
+int64_t SteadyClockNs() {
+  return std::chrono::duration_cast<std::chrono::nanoseconds>(
+             std::chrono::steady_clock::now().time_since_epoch())
+      .count();
+}
+
+// Every thread appends to its own buffer, so recording threads only contend with the thread
+// collecting the events.
+class HostEventCollector final {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(HostEventCollector);
+  HostEventCollector()
+      : record_shapes_(false),
+        profile_memory_(false),
+        start_ns_(SteadyClockNs()),
+        next_thread_id_(0) {}
+  ~HostEventCollector() = default;
+
+  static HostEventCollector* Singleton() {
+    static HostEventCollector* collector = new HostEventCollector();
+    return collector;
+  }
+
+  // The config and the start time are read without holding mutex_ by recording threads, which
+  // may still be finishing an event of the previous session while Enable writes them.
+  HostProfilerConfig config() const {
+    HostProfilerConfig config;
+    config.record_shapes = record_shapes_.load(std::memory_order_relaxed);
+    config.profile_memory = profile_memory_.load(std::memory_order_relaxed);
+    return config;
+  }
+
+  int64_t NowNs() const { return SteadyClockNs() - start_ns_.load(std::memory_order_relaxed); }
+
+  ThreadEventBuffer* ThisThreadBuffer(int64_t* thread_id) {
+    static thread_local std::shared_ptr<ThreadEventBuffer> buffer;
+    static thread_local int64_t this_thread_id = 0;
+    if (!buffer) {
+      buffer = std::make_shared<ThreadEventBuffer>();
+      std::lock_guard<std::mutex> lock(mutex_);
+      this_thread_id = next_thread_id_++;
+      buffers_.push_back(buffer);
+    }
+    *thread_id = this_thread_id;
+    return buffer.get();
+  }
+
+  Maybe<void> Enable(const HostProfilerConfig& config) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    CHECK_OR_RETURN(!IsHostProfilerEnabled()) << "the host profiler is already enabled";
+    for (const auto& buffer : buffers_) {
+      std::lock_guard<std::mutex> buffer_lock(buffer->mutex);
+      buffer->events.clear();
+    }
+    record_shapes_.store(config.record_shapes, std::memory_order_relaxed);
+    profile_memory_.store(config.profile_memory, std::memory_order_relaxed);
+    start_ns_.store(SteadyClockNs(), std::memory_order_relaxed);
+    // Publishes the config and the start time to the threads that see the profiler enabled.
+    internal::host_profiler_enabled.store(true, std::memory_order_release);
+    return Maybe<void>::Ok();
+  }
+
+  Maybe<std::vector<HostEvent>> Disable() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    CHECK_OR_RETURN(IsHostProfilerEnabled()) << "the host profiler is not enabled";
+    internal::host_profiler_enabled.store(false);
+    std::vector<HostEvent> events;
+    for (const auto& buffer : buffers_) {
+      std::lock_guard<std::mutex> buffer_lock(buffer->mutex);
+      for (auto& event : buffer->events) { events.push_back(std::move(event)); }
+      buffer->events.clear();
+    }
+    std::stable_sort(events.begin(), events.end(), [](const HostEvent& lhs, const HostEvent& rhs) {
+      return lhs.start_ns < rhs.start_ns;
+    });
+    return events;
+  }
+
+ private:
+  std::mutex mutex_;
+  std::atomic<bool> record_shapes_;
+  std::atomic<bool> profile_memory_;
+  std::atomic<int64_t> start_ns_;
+  int64_t next_thread_id_;
+  std::vector<std::shared_ptr<ThreadEventBuffer>> buffers_;
+};
+
+int64_t AllocatedBytes() {
+  auto* allocator = Global<vm::CpuCachingAllocator>::Get();
+  if (allocator == nullptr) { return 0; }
+  return allocator->GetStats().allocated_bytes;
+}
+
+void StartEvent(const char* category, std::string name, HostEvent* event,
+                int64_t* start_allocated_bytes) {
+  auto* collector = HostEventCollector::Singleton();
+  event->category = category;
+  event->name = std::move(name);
+  if (collector->config().profile_memory) { *start_allocated_bytes = AllocatedBytes(); }
+  event->start_ns = collector->NowNs();
+}
+
+void EndEvent(int64_t start_allocated_bytes, HostEvent* event) {
+  auto* collector = HostEventCollector::Singleton();
+  event->end_ns = collector->NowNs();
+  if (collector->config().profile_memory) {
+    event->allocated_bytes_delta = AllocatedBytes() - start_allocated_bytes;
+  }
+  // Events ending after DisableHostProfiler belong to no session.
+  if (!IsHostProfilerEnabled()) { return; }
+  ThreadEventBuffer* buffer = collector->ThisThreadBuffer(&event->thread_id);
+  std::lock_guard<std::mutex> lock(buffer->mutex);
+  buffer->events.push_back(std::move(*event));
+}
+
+struct HostRange {
+  bool enabled;
+  int64_t start_allocated_bytes;
+  HostEvent event;
+};
+
+std::vector<HostRange>* ThisThreadHostRanges() {
+  static thread_local std::vector<HostRange> ranges;
+  return &ranges;
+}
+
+}  // namespace
+
+HostProfilerConfig GetHostProfilerConfig() {
+  return HostEventCollector::Singleton()->config();
+}
+
+Maybe<void> EnableHostProfiler(const HostProfilerConfig& config) {
+  return HostEventCollector::Singleton()->Enable(config);
+}
+
+Maybe<std::vector<HostEvent>> DisableHostProfiler() {
+  return HostEventCollector::Singleton()->Disable();
+}
+
+void HostEventGuard::Start(const char* category, std::string name) {
+  StartEvent(category, std::move(name), &event_, &start_allocated_bytes_);
+}
+
+void HostEventGuard::End() { EndEvent(start_allocated_bytes_, &event_); }
+
+void PushHostRange(const char* category, const std::string& name) {
+  auto* ranges = ThisThreadHostRanges();
+  ranges->emplace_back();
+  HostRange* range = &ranges->back();
+  range->enabled = IsHostProfilerEnabled();
+  if (range->enabled) { StartEvent(category, name, &range->event, &range->start_allocated_bytes); }
+}
+
+void PopHostRange() {
+  auto* ranges = ThisThreadHostRanges();
+  // Like the nvtx range it pairs with, an unmatched pop is ignored.
+  if (ranges->empty()) { return; }
+  HostRange* range = &ranges->back();
+  if (range->enabled) { EndEvent(range->start_allocated_bytes, &range->event); }
+  ranges->pop_back();
+}
+
+}  // namespace profiler
+
+}  // namespace oneflow
@@ -0,0 +1,109 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_CORE_PROFILER_HOST_PROFILER_H_
+#define ONEFLOW_CORE_PROFILER_HOST_PROFILER_H_
+
+#include <atomic>
+#include "oneflow/core/common/util.h"
+#include "oneflow/core/common/maybe.h"
+
+namespace oneflow {
+
+namespace profiler {
+
+// A host time range recorded by the host profiler.
+struct HostEvent {
+  std::string name;
+  // "op" for eager op dispatch, "instruction" for vm instructions, "kernel" for lazy kernels and
+  // "range" for RangePush/RangePop.
+  std::string category;
+  // The shapes of the inputs, e.g. "[(2,3), (3,)]". Empty unless shapes are recorded.
+  std::string input_shapes;
+  // The vm stream an instruction runs on, e.g. "cpu:0".
+  std::string stream;
+  int64_t thread_id = 0;
+  // Nanoseconds since the profiler was enabled.
+  int64_t start_ns = 0;
+  int64_t end_ns = 0;
+  // Change of the bytes allocated by the CPU caching allocator during the event. Zero unless
+  // memory is profiled.
+  int64_t allocated_bytes_delta = 0;
+};
+
+struct HostProfilerConfig {
+  bool record_shapes = false;
+  bool profile_memory = false;
+};
+
+namespace internal {
+
+extern std::atomic<bool> host_profiler_enabled;
+
+}  // namespace internal
+
+// Recording is off by default and costs an atomic load per event when off. The acquire load pairs
+// with the release store of EnableHostProfiler, so a thread seeing the profiler enabled also sees
+// its config and start time.
+inline bool IsHostProfilerEnabled() {
+  return internal::host_profiler_enabled.load(std::memory_order_acquire);
+}
+
+HostProfilerConfig GetHostProfilerConfig();
+
+// Drops all recorded events and starts recording. Fails if the profiler is already enabled.
+Maybe<void> EnableHostProfiler(const HostProfilerConfig& config);
+
+// Stops recording and returns the events recorded since EnableHostProfiler, ordered by start time.
+Maybe<std::vector<HostEvent>> DisableHostProfiler();
+
+// Records a range from the construction to the destruction of the guard when the profiler is
+// enabled at construction. GetName is only called in that case.
+class HostEventGuard final {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(HostEventGuard);
+  template<typename GetNameT>
+  HostEventGuard(const char* category, const GetNameT& GetName)
+      : enabled_(IsHostProfilerEnabled()) {
+    if (enabled_) { Start(category, GetName()); }
+  }
+  ~HostEventGuard() {
+    if (enabled_) { End(); }
+  }
+
+  bool enabled() const { return enabled_; }
+  bool record_shapes() const { return enabled_ && GetHostProfilerConfig().record_shapes; }
+  void set_input_shapes(std::string input_shapes) { event_.input_shapes = std::move(input_shapes); }
+  void set_stream(std::string stream) { event_.stream = std::move(stream); }
+
+ private:
+  void Start(const char* category, std::string name);
+  void End();
+
+  bool enabled_;
+  int64_t start_allocated_bytes_ = 0;
+  HostEvent event_;
+};
+
+// Ranges opened by RangePush on this thread, closed by the matching RangePop. A pop without a
+// matching push is ignored.
+void PushHostRange(const char* category, const std::string& name);
+void PopHostRange();
+
+}  // namespace profiler
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_CORE_PROFILER_HOST_PROFILER_H_
@@ -15,6 +15,7 @@ limitations under the License.
 */
 
 #include "oneflow/core/profiler/profiler.h"
+#include "oneflow/core/profiler/host_profiler.h"
 #ifdef OF_ENABLE_PROFILER
 #include <nvtx3/nvToolsExt.h>
 #include <sys/syscall.h>
@@ -43,12 +44,14 @@ void RangePush(const std::string& name) {
 #ifdef OF_ENABLE_PROFILER
   nvtxRangePushA(name.c_str());
 #endif  // OF_ENABLE_PROFILER
+  PushHostRange("range", name);
 }
 
 void RangePop() {
 #ifdef OF_ENABLE_PROFILER
   nvtxRangePop();
 #endif  // OF_ENABLE_PROFILER
+  PopHostRange();
 }
 
 #ifdef OF_ENABLE_PROFILER
@@ -13,20 +13,22 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 */
-#include <cstdlib>
 #include "oneflow/core/vm/cpu_allocator.h"
+#include "oneflow/core/vm/cpu_caching_allocator.h"
 #include "oneflow/core/common/util.h"
 
 namespace oneflow {
 namespace vm {
 
+CpuAllocator::CpuAllocator() : stream_id_(Global<CpuCachingAllocator>::Get()->NewStreamId()) {}
+
 void CpuAllocator::Allocate(char** mem_ptr, std::size_t size) {
-  *mem_ptr = reinterpret_cast<char*>(aligned_alloc(kHostAlignSize, size));
+  *mem_ptr = Global<CpuCachingAllocator>::Get()->Allocate(stream_id_, size);
 }
 
-void CpuAllocator::Deallocate(char* mem_ptr, std::size_t size) { std::free(mem_ptr); }
-
-COMMAND(Global<CpuAllocator>::SetAllocated(new CpuAllocator()));
+void CpuAllocator::Deallocate(char* mem_ptr, std::size_t size) {
+  Global<CpuCachingAllocator>::Get()->Deallocate(stream_id_, mem_ptr);
+}
 
 }  // namespace vm
 }  // namespace oneflow
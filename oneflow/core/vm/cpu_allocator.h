@@ -22,13 +22,17 @@ limitations under the License.
 namespace oneflow {
 namespace vm {
 
+// Allocator of one CPU stream, backed by the process wide CpuCachingAllocator.
 class CpuAllocator final : public Allocator {
  public:
-  explicit CpuAllocator() = default;
+  explicit CpuAllocator();
   ~CpuAllocator() override = default;
 
   void Allocate(char** mem_ptr, std::size_t size) override;
   void Deallocate(char* mem_ptr, std::size_t size) override;
+
+ private:
+  int64_t stream_id_;
 };
 
 }  // namespace vm
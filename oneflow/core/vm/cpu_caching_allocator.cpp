@@ -0,0 +1,147 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include <cstdlib>
+#include "oneflow/core/vm/cpu_caching_allocator.h"
+
+namespace oneflow {
+namespace vm {
+
+CpuCachingAllocator::CpuCachingAllocator(size_t cache_limit)
+    : cache_limit_(cache_limit), next_stream_id_(0) {}
+
+CpuCachingAllocator::~CpuCachingAllocator() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  EmptyCacheLocked();
+}
+
+size_t CpuCachingAllocator::BlockSize4Size(size_t size) {
+  if (size <= kMinBlockSize) { return kMinBlockSize; }
+  // size is in (2^msb, 2^(msb+1)], which is split into four block sizes.
+  const int32_t msb = 63 ^ __builtin_clzll(size - 1);
+  const size_t step = std::max(kMinBlockSize, static_cast<size_t>(1) << (msb - 2));
+  return RoundUp(size, step);
+}
+
+char* CpuCachingAllocator::AllocateFromCache(int64_t stream_id, size_t block_size) {
+  const auto TryPop = [&](FreeBlocks* free_blocks) -> char* {
+    auto it = free_blocks->find(block_size);
+    if (it == free_blocks->end() || it->second.empty()) { return nullptr; }
+    char* mem_ptr = it->second.back();
+    it->second.pop_back();
+    return mem_ptr;
+  };
+  auto stream_it = stream_id2free_blocks_.find(stream_id);
+  if (stream_it != stream_id2free_blocks_.end()) {
+    char* mem_ptr = TryPop(&stream_it->second);
+    if (mem_ptr != nullptr) { return mem_ptr; }
+  }
+  for (auto& pair : stream_id2free_blocks_) {
+    if (pair.first == stream_id) { continue; }
+    char* mem_ptr = TryPop(&pair.second);
+    if (mem_ptr != nullptr) { return mem_ptr; }
+  }
+  return nullptr;
+}
+
+char* CpuCachingAllocator::Allocate(int64_t stream_id, size_t size) {
+  if (size == 0) { return nullptr; }
+  const size_t block_size = BlockSize4Size(size);
+  std::lock_guard<std::mutex> lock(mutex_);
+  stats_.num_allocs += 1;
+  char* mem_ptr = AllocateFromCache(stream_id, block_size);
+  if (mem_ptr != nullptr) {
+    stats_.num_cache_hits += 1;
+    stats_.cached_bytes -= block_size;
+  } else {
+    mem_ptr = static_cast<char*>(aligned_alloc(kHostAlignSize, block_size));
+    if (mem_ptr == nullptr && stats_.cached_bytes > 0) {
+      EmptyCacheLocked();
+      mem_ptr = static_cast<char*>(aligned_alloc(kHostAlignSize, block_size));
+    }
+    CHECK(mem_ptr != nullptr) << "Error! : Out of memory when allocate size : " << size
+                              << ".\n The allocated bytes of CpuCachingAllocator is : "
+                              << stats_.allocated_bytes;
+    stats_.num_system_allocs += 1;
+  }
+  CHECK(ptr2block_size_.emplace(mem_ptr, block_size).second);
+  stats_.allocated_bytes += block_size;
+  stats_.peak_allocated_bytes = std::max(stats_.peak_allocated_bytes, stats_.allocated_bytes);
+  return mem_ptr;
+}
+
+void CpuCachingAllocator::Deallocate(int64_t stream_id, char* mem_ptr) {
+  if (mem_ptr == nullptr) { return; }
+  std::lock_guard<std::mutex> lock(mutex_);
+  auto it = ptr2block_size_.find(mem_ptr);
+  CHECK(it != ptr2block_size_.end())
+      << "Error! : Try deallocate mem_ptr non-existent. mem ptr = " << mem_ptr;
+  const size_t block_size = it->second;
+  ptr2block_size_.erase(it);
+  stats_.allocated_bytes -= block_size;
+  if (stats_.cached_bytes + block_size > cache_limit_) {
+    SystemFree(mem_ptr);
+  } else {
+    stream_id2free_blocks_[stream_id][block_size].push_back(mem_ptr);
+    stats_.cached_bytes += block_size;
+  }
+}
+
+void CpuCachingAllocator::SystemFree(char* mem_ptr) {
+  std::free(mem_ptr);
+  stats_.num_system_frees += 1;
+}
+
+void CpuCachingAllocator::EmptyCacheLocked() {
+  for (auto& stream_pair : stream_id2free_blocks_) {
+    for (auto& pair : stream_pair.second) {
+      for (char* mem_ptr : pair.second) { SystemFree(mem_ptr); }
+    }
+  }
+  stream_id2free_blocks_.clear();
+  stats_.cached_bytes = 0;
+}
+
+void CpuCachingAllocator::EmptyCache() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  EmptyCacheLocked();
+}
+
+void CpuCachingAllocator::SetCacheLimit(size_t cache_limit) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  cache_limit_ = cache_limit;
+  if (stats_.cached_bytes > cache_limit_) { EmptyCacheLocked(); }
+}
+
+size_t CpuCachingAllocator::cache_limit() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return cache_limit_;
+}
+
+CpuCachingAllocatorStats CpuCachingAllocator::GetStats() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return stats_;
+}
+
+void CpuCachingAllocator::ResetPeakStats() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  stats_.peak_allocated_bytes = stats_.allocated_bytes;
+}
+
+COMMAND(Global<CpuCachingAllocator>::SetAllocated(new CpuCachingAllocator(
+    ParseIntegerFromEnv("ONEFLOW_CPU_ALLOCATOR_CACHE_LIMIT_MB", 1024) * 1024 * 1024)));
+
+}  // namespace vm
+}  // namespace oneflow
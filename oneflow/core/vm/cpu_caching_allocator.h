@@ -0,0 +1,85 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_CORE_VM_CPU_CACHING_ALLOCATOR_H_
+#define ONEFLOW_CORE_VM_CPU_CACHING_ALLOCATOR_H_
+
+#include <cstdint>
+#include "oneflow/core/common/util.h"
+
+namespace oneflow {
+namespace vm {
+
+struct CpuCachingAllocatorStats {
+  // Bytes of the blocks handed out and not deallocated yet.
+  size_t allocated_bytes = 0;
+  size_t peak_allocated_bytes = 0;
+  // Bytes of the free blocks kept for reuse.
+  size_t cached_bytes = 0;
+  int64_t num_allocs = 0;
+  int64_t num_cache_hits = 0;
+  int64_t num_system_allocs = 0;
+  int64_t num_system_frees = 0;
+};
+
+// CpuCachingAllocator keeps freed host memory for reuse instead of returning it to the system.
+//
+// Requested sizes are rounded up to a block size, four block sizes per power of two with a minimum
+// of kMinBlockSize, so a free block is reused by any request rounding to the same block size.
+// Free blocks are kept per stream: a stream first reuses the blocks it freed itself, which are
+// still warm in the caches of its thread, then blocks freed by other streams, and only then calls
+// aligned_alloc. Blocks freed while the cached bytes would exceed the cache limit are returned to
+// the system.
+class CpuCachingAllocator final {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(CpuCachingAllocator);
+  explicit CpuCachingAllocator(size_t cache_limit);
+  ~CpuCachingAllocator();
+
+  int64_t NewStreamId() { return next_stream_id_++; }
+
+  char* Allocate(int64_t stream_id, size_t size);
+  void Deallocate(int64_t stream_id, char* mem_ptr);
+
+  // Returns all free blocks to the system.
+  void EmptyCache();
+  void SetCacheLimit(size_t cache_limit);
+  size_t cache_limit();
+  CpuCachingAllocatorStats GetStats();
+  void ResetPeakStats();
+
+  static size_t BlockSize4Size(size_t size);
+
+ private:
+  static constexpr size_t kMinBlockSize = 512;
+
+  using FreeBlocks = HashMap<size_t, std::vector<char*>>;
+
+  char* AllocateFromCache(int64_t stream_id, size_t block_size);
+  void SystemFree(char* mem_ptr);
+  void EmptyCacheLocked();
+
+  std::mutex mutex_;
+  size_t cache_limit_;
+  HashMap<int64_t, FreeBlocks> stream_id2free_blocks_;
+  HashMap<char*, size_t> ptr2block_size_;
+  CpuCachingAllocatorStats stats_;
+  std::atomic<int64_t> next_stream_id_;
+};
+
+}  // namespace vm
+}  // namespace oneflow
+
+#endif  // ONEFLOW_CORE_VM_CPU_CACHING_ALLOCATOR_H_
@@ -0,0 +1,94 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "gtest/gtest.h"
+#include "oneflow/core/vm/cpu_caching_allocator.h"
+
+namespace oneflow {
+namespace vm {
+
+TEST(CpuCachingAllocator, block_size) {
+  ASSERT_EQ(CpuCachingAllocator::BlockSize4Size(1), 512);
+  ASSERT_EQ(CpuCachingAllocator::BlockSize4Size(512), 512);
+  ASSERT_EQ(CpuCachingAllocator::BlockSize4Size(513), 1024);
+  ASSERT_EQ(CpuCachingAllocator::BlockSize4Size(4096), 4096);
+  ASSERT_EQ(CpuCachingAllocator::BlockSize4Size(4097), 5120);
+  ASSERT_EQ(CpuCachingAllocator::BlockSize4Size(7000), 7168);
+  ASSERT_EQ(CpuCachingAllocator::BlockSize4Size(1 << 20), 1 << 20);
+  ASSERT_EQ(CpuCachingAllocator::BlockSize4Size((1 << 20) + 1), (1 << 20) + (1 << 18));
+}
+
+TEST(CpuCachingAllocator, reuse) {
+  CpuCachingAllocator allocator(1 << 20);
+  const int64_t stream0 = allocator.NewStreamId();
+  const int64_t stream1 = allocator.NewStreamId();
+  ASSERT_EQ(allocator.Allocate(stream0, 0), nullptr);
+
+  char* ptr0 = allocator.Allocate(stream0, 1000);
+  char* ptr1 = allocator.Allocate(stream1, 1000);
+  ASSERT_NE(ptr0, ptr1);
+  ASSERT_EQ(reinterpret_cast<uintptr_t>(ptr0) % kHostAlignSize, 0);
+  allocator.Deallocate(stream0, ptr0);
+  allocator.Deallocate(stream1, ptr1);
+  // Each stream gets back the block it freed.
+  ASSERT_EQ(allocator.Allocate(stream1, 1024), ptr1);
+  ASSERT_EQ(allocator.Allocate(stream0, 900), ptr0);
+  allocator.Deallocate(stream0, ptr0);
+  // A stream without free blocks of the size takes one from another stream.
+  ASSERT_EQ(allocator.Allocate(stream1, 1000), ptr0);
+  allocator.Deallocate(stream1, ptr0);
+  allocator.Deallocate(stream1, ptr1);
+
+  CpuCachingAllocatorStats stats = allocator.GetStats();
+  ASSERT_EQ(stats.allocated_bytes, 0);
+  ASSERT_EQ(stats.peak_allocated_bytes, 2048);
+  ASSERT_EQ(stats.cached_bytes, 2048);
+  ASSERT_EQ(stats.num_allocs, 5);
+  ASSERT_EQ(stats.num_cache_hits, 3);
+  ASSERT_EQ(stats.num_system_allocs, 2);
+  ASSERT_EQ(stats.num_system_frees, 0);
+
+  allocator.EmptyCache();
+  stats = allocator.GetStats();
+  ASSERT_EQ(stats.cached_bytes, 0);
+  ASSERT_EQ(stats.num_system_frees, 2);
+}
+
+TEST(CpuCachingAllocator, cache_limit) {
+  CpuCachingAllocator allocator(4096);
+  const int64_t stream = allocator.NewStreamId();
+  std::vector<char*> ptrs;
+  for (int i = 0; i < 8; ++i) { ptrs.push_back(allocator.Allocate(stream, 1024)); }
+  for (char* ptr : ptrs) { allocator.Deallocate(stream, ptr); }
+  CpuCachingAllocatorStats stats = allocator.GetStats();
+  ASSERT_EQ(stats.cached_bytes, 4096);
+  ASSERT_EQ(stats.num_system_frees, 4);
+
+  char* large = allocator.Allocate(stream, 8192);
+  allocator.Deallocate(stream, large);
+  stats = allocator.GetStats();
+  ASSERT_EQ(stats.cached_bytes, 4096);
+  ASSERT_EQ(stats.num_system_frees, 5);
+
+  allocator.SetCacheLimit(0);
+  stats = allocator.GetStats();
+  ASSERT_EQ(stats.cached_bytes, 0);
+  char* ptr = allocator.Allocate(stream, 1024);
+  allocator.Deallocate(stream, ptr);
+  ASSERT_EQ(allocator.GetStats().cached_bytes, 0);
+}
+
+}  // namespace vm
+}  // namespace oneflow
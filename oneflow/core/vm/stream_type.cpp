@@ -0,0 +1,35 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/vm/stream_type.h"
+#include "oneflow/core/vm/instruction.h"
+#include "oneflow/core/vm/stream.h"
+#include "oneflow/core/profiler/host_profiler.h"
+
+namespace oneflow {
+namespace vm {
+
+void StreamType::Run(Instruction* instruction) const {
+  profiler::HostEventGuard profiler_guard(
+      "instruction", [&]() { return instruction->instr_msg().DebugName(); });
+  if (profiler_guard.enabled()) {
+    const Stream& stream = instruction->stream();
+    profiler_guard.set_stream(std::string(stream_tag()) + ":" + std::to_string(stream.device_id()));
+  }
+  Compute(instruction);
+}
+
+}  // namespace vm
+}  // namespace oneflow
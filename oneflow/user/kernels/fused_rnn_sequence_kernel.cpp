@@ -0,0 +1,418 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/ep/include/primitive/matmul.h"
+
+namespace oneflow {
+
+namespace {
+
+enum class RnnMode { kRnnTanh, kRnnRelu, kGru, kLstm };
+
+RnnMode RnnMode4Name(const std::string& mode) {
+  if (mode == "rnn_tanh") { return RnnMode::kRnnTanh; }
+  if (mode == "rnn_relu") { return RnnMode::kRnnRelu; }
+  if (mode == "gru") { return RnnMode::kGru; }
+  if (mode == "lstm") { return RnnMode::kLstm; }
+  UNIMPLEMENTED();
+  return RnnMode::kRnnTanh;
+}
+
+int64_t NumGates4Mode(RnnMode mode) {
+  if (mode == RnnMode::kGru) { return 3; }
+  if (mode == RnnMode::kLstm) { return 4; }
+  return 1;
+}
+
+template<typename T>
+T Sigmoid(T x) {
+  return static_cast<T>(1) / (static_cast<T>(1) + std::exp(-x));
+}
+
+std::unique_ptr<ep::primitive::Matmul> NewMatmulPrimitive(DataType data_type, bool transpose_a,
+                                                          bool transpose_b) {
+  const auto trans_a =
+      transpose_a ? ep::primitive::BlasTransposeType::T : ep::primitive::BlasTransposeType::N;
+  const auto trans_b =
+      transpose_b ? ep::primitive::BlasTransposeType::T : ep::primitive::BlasTransposeType::N;
+  return ep::primitive::NewPrimitive<ep::primitive::MatmulFactory>(DeviceType::kCPU, data_type,
+                                                                   trans_a, trans_b);
+}
+
+struct RnnSizes {
+  int64_t seq_len;
+  int64_t batch_size;
+  int64_t hidden_size;
+  int64_t gate_size;
+  int64_t output_size;
+  int64_t reserve_size;
+};
+
+RnnSizes GetRnnSizes(RnnMode mode, const ShapeView& y_shape, const ShapeView& weight_hh_shape,
+                     const ShapeView& reserve_shape) {
+  RnnSizes sizes{};
+  sizes.seq_len = y_shape.At(0);
+  sizes.batch_size = y_shape.At(1);
+  sizes.output_size = y_shape.At(2);
+  sizes.gate_size = weight_hh_shape.At(1);
+  sizes.hidden_size = sizes.gate_size / NumGates4Mode(mode);
+  sizes.reserve_size = reserve_shape.At(2);
+  return sizes;
+}
+
+// Timestep processed at position `step` of the recurrence.
+int64_t TimeIndex(int64_t step, int64_t seq_len, bool reverse) {
+  return reverse ? seq_len - 1 - step : step;
+}
+
+}  // namespace
+
+// The input projection of every timestep is computed by the caller in a single GEMM, so each step
+// of the recurrence only multiplies the previous hidden state by weight_hh before applying the
+// gate nonlinearities in place.
+template<typename T>
+class FusedRnnSequenceKernel final : public user_op::OpKernel {
+ public:
+  FusedRnnSequenceKernel() = default;
+  ~FusedRnnSequenceKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const RnnMode mode = RnnMode4Name(ctx->Attr<std::string>("mode"));
+    const bool reverse = ctx->Attr<bool>("reverse");
+    const user_op::Tensor* input_gates = ctx->Tensor4ArgNameAndIndex("input_gates", 0);
+    const user_op::Tensor* hx = ctx->Tensor4ArgNameAndIndex("hx", 0);
+    const user_op::Tensor* weight_hh = ctx->Tensor4ArgNameAndIndex("weight_hh", 0);
+    user_op::Tensor* y = ctx->Tensor4ArgNameAndIndex("y", 0);
+    user_op::Tensor* cy = ctx->Tensor4ArgNameAndIndex("cy", 0);
+    user_op::Tensor* reserve_space = ctx->Tensor4ArgNameAndIndex("reserve_space", 0);
+    user_op::Tensor* tmp_buffer = ctx->Tensor4ArgNameAndIndex("tmp_buffer", 0);
+    const T* bias_hh = nullptr;
+    if (ctx->has_input("bias_hh", 0)) {
+      bias_hh = ctx->Tensor4ArgNameAndIndex("bias_hh", 0)->dptr<T>();
+    }
+    const T* cx = nullptr;
+    if (ctx->has_input("cx", 0)) { cx = ctx->Tensor4ArgNameAndIndex("cx", 0)->dptr<T>(); }
+    const T* weight_hr = nullptr;
+    if (ctx->has_input("weight_hr", 0)) {
+      weight_hr = ctx->Tensor4ArgNameAndIndex("weight_hr", 0)->dptr<T>();
+    }
+
+    const RnnSizes sizes =
+        GetRnnSizes(mode, y->shape_view(), weight_hh->shape_view(), reserve_space->shape_view());
+    const int64_t N = sizes.batch_size;
+    const int64_t H = sizes.hidden_size;
+    const int64_t G = sizes.gate_size;
+    const int64_t P = sizes.output_size;
+    const int64_t R = sizes.reserve_size;
+    const int64_t L = sizes.seq_len;
+    if (L == 0 || N == 0) { return; }
+
+    // tmp_buffer: hidden gates (N, G) followed by the unprojected lstm output (N, H).
+    T* hidden_gates = tmp_buffer->mut_dptr<T>();
+    T* lstm_m = hidden_gates + N * G;
+    auto matmul_nn = NewMatmulPrimitive(y->data_type(), false, false);
+    CHECK(matmul_nn);
+
+    const T* gi_base = input_gates->dptr<T>();
+    T* y_base = y->mut_dptr<T>();
+    T* reserve_base = reserve_space->mut_dptr<T>();
+    for (int64_t step = 0; step < L; ++step) {
+      const int64_t t = TimeIndex(step, L, reverse);
+      const int64_t prev_t = TimeIndex(step - 1, L, reverse);
+      const T* h_prev = step == 0 ? hx->dptr<T>() : y_base + prev_t * N * P;
+      const T* gi = gi_base + t * N * G;
+      T* h = y_base + t * N * P;
+      T* reserve = reserve_base + t * N * R;
+      matmul_nn->Launch(ctx->stream(), N, G, P, 1.0, h_prev, weight_hh->dptr<T>(), 0.0,
+                        hidden_gates);
+      for (int64_t b = 0; b < N; ++b) {
+        const T* gi_b = gi + b * G;
+        T* gh_b = hidden_gates + b * G;
+        if (bias_hh != nullptr) {
+          for (int64_t j = 0; j < G; ++j) { gh_b[j] += bias_hh[j]; }
+        }
+        if (mode == RnnMode::kRnnTanh || mode == RnnMode::kRnnRelu) {
+          for (int64_t j = 0; j < H; ++j) {
+            const T pre = gi_b[j] + gh_b[j];
+            h[b * P + j] = mode == RnnMode::kRnnTanh ? std::tanh(pre)
+                                                     : (pre > static_cast<T>(0) ? pre : 0);
+          }
+        } else if (mode == RnnMode::kGru) {
+          T* res_b = reserve + b * R;
+          const T* h_prev_b = h_prev + b * P;
+          for (int64_t j = 0; j < H; ++j) {
+            const T r = Sigmoid(gi_b[j] + gh_b[j]);
+            const T z = Sigmoid(gi_b[H + j] + gh_b[H + j]);
+            const T ghn = gh_b[2 * H + j];
+            const T n = std::tanh(gi_b[2 * H + j] + r * ghn);
+            h[b * P + j] = n + z * (h_prev_b[j] - n);
+            res_b[j] = r;
+            res_b[H + j] = z;
+            res_b[2 * H + j] = n;
+            res_b[3 * H + j] = ghn;
+          }
+        } else {
+          T* res_b = reserve + b * R;
+          const T* c_prev_b =
+              step == 0 ? cx + b * H : reserve_base + prev_t * N * R + b * R + 4 * H;
+          T* m_b = weight_hr == nullptr ? h + b * P : lstm_m + b * H;
+          for (int64_t j = 0; j < H; ++j) {
+            const T i = Sigmoid(gi_b[j] + gh_b[j]);
+            const T f = Sigmoid(gi_b[H + j] + gh_b[H + j]);
+            const T g = std::tanh(gi_b[2 * H + j] + gh_b[2 * H + j]);
+            const T o = Sigmoid(gi_b[3 * H + j] + gh_b[3 * H + j]);
+            const T c = f * c_prev_b[j] + i * g;
+            m_b[j] = o * std::tanh(c);
+            res_b[j] = i;
+            res_b[H + j] = f;
+            res_b[2 * H + j] = g;
+            res_b[3 * H + j] = o;
+            res_b[4 * H + j] = c;
+          }
+        }
+      }
+      if (weight_hr != nullptr) {
+        matmul_nn->Launch(ctx->stream(), N, P, H, 1.0, lstm_m, weight_hr, 0.0, h);
+      }
+    }
+    if (mode == RnnMode::kLstm) {
+      const T* last_reserve = reserve_base + TimeIndex(L - 1, L, reverse) * N * R;
+      T* cy_ptr = cy->mut_dptr<T>();
+      for (int64_t b = 0; b < N; ++b) {
+        std::copy(last_reserve + b * R + 4 * H, last_reserve + b * R + 5 * H, cy_ptr + b * H);
+      }
+    }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_FUSED_RNN_SEQUENCE_KERNEL(dtype)                                      \
+  REGISTER_USER_KERNEL("fused_rnn_sequence")                                           \
+      .SetCreateFn<FusedRnnSequenceKernel<dtype>>()                                    \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCPU)                  \
+                       && (user_op::HobDataType("y", 0) == GetDataType<dtype>::value)) \
+      .SetInferTmpSizeFn([](user_op::InferContext* ctx) {                              \
+        const Shape& gates_shape = ctx->InputShape("input_gates", 0);                  \
+        const int64_t batch_size = gates_shape.At(1);                                  \
+        const int64_t gate_size = gates_shape.At(2);                                   \
+        const int64_t hidden_size =                                                    \
+            gate_size / NumGates4Mode(RnnMode4Name(ctx->Attr<std::string>("mode")));   \
+        return (batch_size * gate_size + batch_size * hidden_size) * sizeof(dtype);    \
+      });
+
+REGISTER_FUSED_RNN_SEQUENCE_KERNEL(float)
+REGISTER_FUSED_RNN_SEQUENCE_KERNEL(double)
+
+// Backpropagation through time over the activations saved in reserve_space. Gradients of the
+// recurrent weights are accumulated across steps with beta = 1 GEMMs.
+template<typename T>
+class FusedRnnSequenceGradKernel final : public user_op::OpKernel {
+ public:
+  FusedRnnSequenceGradKernel() = default;
+  ~FusedRnnSequenceGradKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const RnnMode mode = RnnMode4Name(ctx->Attr<std::string>("mode"));
+    const bool reverse = ctx->Attr<bool>("reverse");
+    const user_op::Tensor* dy = ctx->Tensor4ArgNameAndIndex("dy", 0);
+    const user_op::Tensor* y = ctx->Tensor4ArgNameAndIndex("y", 0);
+    const user_op::Tensor* reserve_space = ctx->Tensor4ArgNameAndIndex("reserve_space", 0);
+    const user_op::Tensor* hx = ctx->Tensor4ArgNameAndIndex("hx", 0);
+    const user_op::Tensor* weight_hh = ctx->Tensor4ArgNameAndIndex("weight_hh", 0);
+    user_op::Tensor* input_gates_grad = ctx->Tensor4ArgNameAndIndex("input_gates_grad", 0);
+    user_op::Tensor* hx_grad = ctx->Tensor4ArgNameAndIndex("hx_grad", 0);
+    user_op::Tensor* weight_hh_grad = ctx->Tensor4ArgNameAndIndex("weight_hh_grad", 0);
+    user_op::Tensor* tmp_buffer = ctx->Tensor4ArgNameAndIndex("tmp_buffer", 0);
+    const T* cx = nullptr;
+    if (ctx->has_input("cx", 0)) { cx = ctx->Tensor4ArgNameAndIndex("cx", 0)->dptr<T>(); }
+    const T* weight_hr = nullptr;
+    if (ctx->has_input("weight_hr", 0)) {
+      weight_hr = ctx->Tensor4ArgNameAndIndex("weight_hr", 0)->dptr<T>();
+    }
+    const T* dcy = nullptr;
+    if (ctx->has_input("dcy", 0)) { dcy = ctx->Tensor4ArgNameAndIndex("dcy", 0)->dptr<T>(); }
+    T* bias_hh_grad = nullptr;
+    if (ctx->has_output("bias_hh_grad", 0)) {
+      bias_hh_grad = ctx->Tensor4ArgNameAndIndex("bias_hh_grad", 0)->mut_dptr<T>();
+    }
+    T* cx_grad = nullptr;
+    if (ctx->has_output("cx_grad", 0)) {
+      cx_grad = ctx->Tensor4ArgNameAndIndex("cx_grad", 0)->mut_dptr<T>();
+    }
+    T* weight_hr_grad = nullptr;
+    if (ctx->has_output("weight_hr_grad", 0)) {
+      weight_hr_grad = ctx->Tensor4ArgNameAndIndex("weight_hr_grad", 0)->mut_dptr<T>();
+    }
+
+    const RnnSizes sizes =
+        GetRnnSizes(mode, y->shape_view(), weight_hh->shape_view(), reserve_space->shape_view());
+    const int64_t N = sizes.batch_size;
+    const int64_t H = sizes.hidden_size;
+    const int64_t G = sizes.gate_size;
+    const int64_t P = sizes.output_size;
+    const int64_t R = sizes.reserve_size;
+    const int64_t L = sizes.seq_len;
+
+    // tmp_buffer: running dh (N, P), hidden gates grad (N, G), dm (N, H), dc (N, H) and the
+    // recomputed unprojected lstm output m (N, H).
+    T* dh = tmp_buffer->mut_dptr<T>();
+    T* dgh = dh + N * P;
+    T* dm = dgh + N * G;
+    T* dc = dm + N * H;
+    T* lstm_m = dc + N * H;
+    std::fill(dh, dh + N * P, static_cast<T>(0));
+    if (mode == RnnMode::kLstm) {
+      if (dcy != nullptr) {
+        std::copy(dcy, dcy + N * H, dc);
+      } else {
+        std::fill(dc, dc + N * H, static_cast<T>(0));
+      }
+    }
+    T* dw_hh = weight_hh_grad->mut_dptr<T>();
+    std::fill(dw_hh, dw_hh + P * G, static_cast<T>(0));
+    if (bias_hh_grad != nullptr) { std::fill(bias_hh_grad, bias_hh_grad + G, static_cast<T>(0)); }
+    if (weight_hr_grad != nullptr) {
+      std::fill(weight_hr_grad, weight_hr_grad + H * P, static_cast<T>(0));
+    }
+
+    auto matmul_nt = NewMatmulPrimitive(y->data_type(), false, true);
+    auto matmul_tn = NewMatmulPrimitive(y->data_type(), true, false);
+    CHECK(matmul_nt);
+    CHECK(matmul_tn);
+
+    const T* dy_base = dy->dptr<T>();
+    const T* y_base = y->dptr<T>();
+    const T* reserve_base = reserve_space->dptr<T>();
+    T* dgi_base = input_gates_grad->mut_dptr<T>();
+    for (int64_t step = L - 1; step >= 0; --step) {
+      const int64_t t = TimeIndex(step, L, reverse);
+      const int64_t prev_t = TimeIndex(step - 1, L, reverse);
+      const T* h_prev = step == 0 ? hx->dptr<T>() : y_base + prev_t * N * P;
+      const T* h = y_base + t * N * P;
+      const T* reserve = reserve_base + t * N * R;
+      const T* dy_t = dy_base + t * N * P;
+      T* dgi = dgi_base + t * N * G;
+      for (int64_t i = 0; i < N * P; ++i) { dh[i] += dy_t[i]; }
+      if (mode == RnnMode::kLstm) {
+        if (weight_hr != nullptr) {
+          for (int64_t b = 0; b < N; ++b) {
+            const T* res_b = reserve + b * R;
+            for (int64_t j = 0; j < H; ++j) {
+              lstm_m[b * H + j] = res_b[3 * H + j] * std::tanh(res_b[4 * H + j]);
+            }
+          }
+          matmul_tn->Launch(ctx->stream(), H, P, N, 1.0, lstm_m, dh, 1.0, weight_hr_grad);
+          matmul_nt->Launch(ctx->stream(), N, H, P, 1.0, dh, weight_hr, 0.0, dm);
+        } else {
+          std::copy(dh, dh + N * H, dm);
+        }
+      }
+      for (int64_t b = 0; b < N; ++b) {
+        T* dgi_b = dgi + b * G;
+        T* dgh_b = dgh + b * G;
+        T* dh_b = dh + b * P;
+        if (mode == RnnMode::kRnnTanh || mode == RnnMode::kRnnRelu) {
+          const T* h_b = h + b * P;
+          for (int64_t j = 0; j < H; ++j) {
+            const T dact = mode == RnnMode::kRnnTanh
+                               ? static_cast<T>(1) - h_b[j] * h_b[j]
+                               : static_cast<T>(h_b[j] > static_cast<T>(0) ? 1 : 0);
+            const T dpre = dh_b[j] * dact;
+            dgi_b[j] = dpre;
+            dgh_b[j] = dpre;
+          }
+        } else if (mode == RnnMode::kGru) {
+          const T* res_b = reserve + b * R;
+          const T* h_prev_b = h_prev + b * P;
+          for (int64_t j = 0; j < H; ++j) {
+            const T r = res_b[j];
+            const T z = res_b[H + j];
+            const T n = res_b[2 * H + j];
+            const T ghn = res_b[3 * H + j];
+            const T dn_pre = dh_b[j] * (static_cast<T>(1) - z) * (static_cast<T>(1) - n * n);
+            const T dz_pre = dh_b[j] * (h_prev_b[j] - n) * z * (static_cast<T>(1) - z);
+            const T dr_pre = dn_pre * ghn * r * (static_cast<T>(1) - r);
+            dgi_b[j] = dr_pre;
+            dgi_b[H + j] = dz_pre;
+            dgi_b[2 * H + j] = dn_pre;
+            dgh_b[j] = dr_pre;
+            dgh_b[H + j] = dz_pre;
+            dgh_b[2 * H + j] = dn_pre * r;
+            // The direct path h = n + z * (h_prev - n) contributes dh * z to dh_prev.
+            dh_b[j] *= z;
+          }
+        } else {
+          const T* res_b = reserve + b * R;
+          const T* c_prev_b =
+              step == 0 ? cx + b * H : reserve_base + prev_t * N * R + b * R + 4 * H;
+          const T* dm_b = dm + b * H;
+          T* dc_b = dc + b * H;
+          for (int64_t j = 0; j < H; ++j) {
+            const T i = res_b[j];
+            const T f = res_b[H + j];
+            const T g = res_b[2 * H + j];
+            const T o = res_b[3 * H + j];
+            const T tanh_c = std::tanh(res_b[4 * H + j]);
+            const T dc_total = dc_b[j] + dm_b[j] * o * (static_cast<T>(1) - tanh_c * tanh_c);
+            const T di_pre = dc_total * g * i * (static_cast<T>(1) - i);
+            const T df_pre = dc_total * c_prev_b[j] * f * (static_cast<T>(1) - f);
+            const T dg_pre = dc_total * i * (static_cast<T>(1) - g * g);
+            const T do_pre = dm_b[j] * tanh_c * o * (static_cast<T>(1) - o);
+            dgi_b[j] = di_pre;
+            dgi_b[H + j] = df_pre;
+            dgi_b[2 * H + j] = dg_pre;
+            dgi_b[3 * H + j] = do_pre;
+            dc_b[j] = dc_total * f;
+          }
+          std::copy(dgi_b, dgi_b + G, dgh_b);
+        }
+        if (bias_hh_grad != nullptr) {
+          for (int64_t j = 0; j < G; ++j) { bias_hh_grad[j] += dgh_b[j]; }
+        }
+      }
+      matmul_tn->Launch(ctx->stream(), P, G, N, 1.0, h_prev, dgh, 1.0, dw_hh);
+      matmul_nt->Launch(ctx->stream(), N, P, G, 1.0, dgh, weight_hh->dptr<T>(),
+                        mode == RnnMode::kGru ? 1.0 : 0.0, dh);
+    }
+    std::copy(dh, dh + N * P, hx_grad->mut_dptr<T>());
+    if (cx_grad != nullptr) { std::copy(dc, dc + N * H, cx_grad); }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_FUSED_RNN_SEQUENCE_GRAD_KERNEL(dtype)                                   \
+  REGISTER_USER_KERNEL("fused_rnn_sequence_grad")                                        \
+      .SetCreateFn<FusedRnnSequenceGradKernel<dtype>>()                                  \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCPU)                    \
+                       && (user_op::HobDataType("dy", 0) == GetDataType<dtype>::value))  \
+      .SetInferTmpSizeFn([](user_op::InferContext* ctx) {                                \
+        const Shape& dy_shape = ctx->InputShape("dy", 0);                                \
+        const int64_t batch_size = dy_shape.At(1);                                       \
+        const int64_t output_size = dy_shape.At(2);                                      \
+        const int64_t gate_size = ctx->InputShape("weight_hh", 0).At(1);                 \
+        const int64_t hidden_size =                                                      \
+            gate_size / NumGates4Mode(RnnMode4Name(ctx->Attr<std::string>("mode")));     \
+        return batch_size * (output_size + gate_size + 3 * hidden_size) * sizeof(dtype); \
+      });
+
+REGISTER_FUSED_RNN_SEQUENCE_GRAD_KERNEL(float)
+REGISTER_FUSED_RNN_SEQUENCE_GRAD_KERNEL(double)
+
+}  // namespace oneflow
@@ -0,0 +1,95 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/user/kernels/multi_reduce_kernel_util.h"
+#include "oneflow/core/ep/cuda/cuda_stream.h"
+#include <cub/cub.cuh>
+
+namespace oneflow {
+
+namespace {
+
+template<typename T>
+struct MultiReduceParamsPack {
+  MultiReduceParam<T> params[kMultiReduceMaxPackSize];
+  int32_t size;
+};
+
+// Every block writes its partial result to `out[blockIdx.x]`.
+template<typename T, typename TransformFn, typename ReduceFn>
+__global__ void MultiBlockReduceGpu(TransformFn transform, const MultiReduceParamsPack<T> pack,
+                                    const T init, T* out) {
+  ReduceFn reduce_fn{};
+  T t_out = init;
+  for (int32_t i = 0; i < pack.size; ++i) {
+    const MultiReduceParam<T> param = pack.params[i];
+    CUDA_1D_KERNEL_LOOP_T(int64_t, j, param.size) {
+      t_out = reduce_fn(t_out, transform(param.data[j]));
+    }
+  }
+  typedef cub::BlockReduce<T, kCudaThreadsNumPerBlock> BlockReduce;
+  __shared__ typename BlockReduce::TempStorage temp_storage;
+  T b_out = BlockReduce(temp_storage).Reduce(t_out, reduce_fn);
+  if (threadIdx.x == 0) { out[blockIdx.x] = b_out; }
+}
+
+template<typename T, typename ReduceFn>
+__global__ void BlockReduceGpu(const int64_t n, const T* in, const T init, T* out) {
+  ReduceFn reduce_fn{};
+  T t_out = init;
+  for (int64_t i = threadIdx.x; i < n; i += kCudaThreadsNumPerBlock) {
+    t_out = reduce_fn(t_out, in[i]);
+  }
+  typedef cub::BlockReduce<T, kCudaThreadsNumPerBlock> BlockReduce;
+  __shared__ typename BlockReduce::TempStorage temp_storage;
+  T b_out = BlockReduce(temp_storage).Reduce(t_out, reduce_fn);
+  if (threadIdx.x == 0) { *out = b_out; }
+}
+
+}  // namespace
+
+template<typename T, typename TransformFn, typename ReduceFn>
+void MultiReduce<DeviceType::kCUDA, T, TransformFn, ReduceFn>::operator()(
+    ep::Stream* stream, TransformFn transform, const std::vector<MultiReduceParam<T>>& params,
+    T init, T* y, T* temp) {
+  cudaStream_t cuda_stream = stream->As<ep::CudaStream>()->cuda_stream();
+  int64_t num_partials = 0;
+  for (size_t start = 0; start < params.size(); start += kMultiReduceMaxPackSize) {
+    MultiReduceParamsPack<T> pack{};
+    int64_t max_size = 0;
+    pack.size = std::min<size_t>(kMultiReduceMaxPackSize, params.size() - start);
+    for (int32_t i = 0; i < pack.size; ++i) {
+      pack.params[i] = params[start + i];
+      max_size = std::max(max_size, pack.params[i].size);
+    }
+    const int32_t num_blocks = BlocksNum4ThreadsNum(max_size);
+    MultiBlockReduceGpu<T, TransformFn, ReduceFn>
+        <<<num_blocks, kCudaThreadsNumPerBlock, 0, cuda_stream>>>(transform, pack, init,
+                                                                    temp + num_partials);
+    num_partials += num_blocks;
+  }
+  // The partials are reduced in a fixed order, so the result is deterministic.
+  BlockReduceGpu<T, ReduceFn>
+      <<<1, kCudaThreadsNumPerBlock, 0, cuda_stream>>>(num_partials, temp, init, y);
+}
+
+#define INSTANTIATE_MULTI_REDUCE_CUDA(T, type_proto)                           \
+  template struct MultiReduce<DeviceType::kCUDA, T, AbsPow<T>, BinaryAdd<T>>; \
+  template struct MultiReduce<DeviceType::kCUDA, T, Abs<T>, BinaryMax<T>>;    \
+  template struct MultiReduce<DeviceType::kCUDA, T, Abs<T>, BinaryMin<T>>;
+OF_PP_FOR_EACH_TUPLE(INSTANTIATE_MULTI_REDUCE_CUDA, FLOATING_DATA_TYPE_SEQ);
+#undef INSTANTIATE_MULTI_REDUCE_CUDA
+
+}  // namespace oneflow
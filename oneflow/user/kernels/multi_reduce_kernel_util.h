@@ -0,0 +1,97 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_USER_KERNELS_MULTI_REDUCE_KERNEL_UTIL_H_
+#define ONEFLOW_USER_KERNELS_MULTI_REDUCE_KERNEL_UTIL_H_
+
+#include "oneflow/core/kernel/kernel_util.h"
+
+namespace oneflow {
+
+template<typename T>
+struct MultiReduceParam {
+  const T* data;
+  int64_t size;
+};
+
+// Number of tensors reduced by one launch of the CUDA implementation.
+constexpr int64_t kMultiReduceMaxPackSize = 64;
+
+template<typename T>
+struct Abs {
+  OF_DEVICE_FUNC T operator()(T x) const { return x < 0 ? -x : x; }
+};
+
+template<typename T>
+struct AbsPow {
+  explicit AbsPow(float p) : p(p) {}
+  OF_DEVICE_FUNC T operator()(T x) const {
+    const T abs_x = x < 0 ? -x : x;
+    if (p == 0) { return x != 0 ? static_cast<T>(1) : static_cast<T>(0); }
+    if (p == 1) { return abs_x; }
+    if (p == 2) { return x * x; }
+    return pow(abs_x, static_cast<T>(p));
+  }
+
+ private:
+  float p;
+};
+
+template<typename T>
+struct BinaryAdd {
+  OF_DEVICE_FUNC T operator()(T x, T y) const { return x + y; }
+};
+
+// Both BinaryMax and BinaryMin propagate nan like oneflow.max/oneflow.min.
+template<typename T>
+struct BinaryMax {
+  OF_DEVICE_FUNC T operator()(T x, T y) const { return (x != x || x > y) ? x : y; }
+};
+
+template<typename T>
+struct BinaryMin {
+  OF_DEVICE_FUNC T operator()(T x, T y) const { return (x != x || x < y) ? x : y; }
+};
+
+// Reduces ReduceFn(TransformFn(x)) over all elements of all params into the scalar `y`.
+// `temp` holds the per-block partial results of the CUDA implementation and is unused on CPU.
+template<DeviceType device_type, typename T, typename TransformFn, typename ReduceFn>
+struct MultiReduce {
+  void operator()(ep::Stream* stream, TransformFn transform,
+                  const std::vector<MultiReduceParam<T>>& params, T init, T* y, T* temp);
+};
+
+template<typename T, typename TransformFn, typename ReduceFn>
+struct MultiReduce<DeviceType::kCPU, T, TransformFn, ReduceFn> {
+  void operator()(ep::Stream* stream, TransformFn transform,
+                  const std::vector<MultiReduceParam<T>>& params, T init, T* y, T* temp) {
+    ReduceFn reduce{};
+    T result = init;
+    for (const auto& param : params) {
+      FOR_RANGE(int64_t, i, 0, param.size) { result = reduce(result, transform(param.data[i])); }
+    }
+    *y = result;
+  }
+};
+
+template<typename T, typename TransformFn, typename ReduceFn>
+struct MultiReduce<DeviceType::kCUDA, T, TransformFn, ReduceFn> {
+  void operator()(ep::Stream* stream, TransformFn transform,
+                  const std::vector<MultiReduceParam<T>>& params, T init, T* y, T* temp);
+};
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_USER_KERNELS_MULTI_REDUCE_KERNEL_UTIL_H_
@@ -0,0 +1,146 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/user/kernels/multi_reduce_kernel_util.h"
+#include "oneflow/core/kernel/cuda_graph_support.h"
+
+namespace oneflow {
+
+namespace {
+
+// Empty tensors are dropped, so every param covers at least one element.
+template<typename T>
+std::vector<MultiReduceParam<T>> MultiReduceParams4X(user_op::KernelComputeContext* ctx) {
+  std::vector<MultiReduceParam<T>> params;
+  params.reserve(ctx->input_size("x"));
+  for (int32_t i = 0; i < ctx->input_size("x"); ++i) {
+    const user_op::Tensor* x = ctx->Tensor4ArgNameAndIndex("x", i);
+    const int64_t elem_cnt = x->shape().elem_cnt();
+    if (elem_cnt == 0) { continue; }
+    params.push_back(MultiReduceParam<T>{x->dptr<T>(), elem_cnt});
+  }
+  return params;
+}
+
+template<typename T>
+T* TmpBufferPtr(user_op::KernelComputeContext* ctx) {
+  user_op::Tensor* tmp_buffer = ctx->Tensor4ArgNameAndIndex("tmp_buffer", 0);
+  return tmp_buffer == nullptr ? nullptr : tmp_buffer->mut_dptr<T>();
+}
+
+#ifdef WITH_CUDA
+// One partial result per block, packed the same way as MultiReduce<DeviceType::kCUDA>.
+template<typename T>
+size_t InferMultiReduceCudaTmpSize(user_op::InferContext* ctx) {
+  std::vector<int64_t> sizes;
+  for (int32_t i = 0; i < ctx->input_size("x"); ++i) {
+    const int64_t elem_cnt = ctx->InputShape("x", i).elem_cnt();
+    if (elem_cnt > 0) { sizes.push_back(elem_cnt); }
+  }
+  int64_t num_partials = 0;
+  for (size_t start = 0; start < sizes.size(); start += kMultiReduceMaxPackSize) {
+    const size_t end = std::min<size_t>(start + kMultiReduceMaxPackSize, sizes.size());
+    const int64_t max_size = *std::max_element(sizes.begin() + start, sizes.begin() + end);
+    num_partials += BlocksNum4ThreadsNum(max_size);
+  }
+  return GetCudaAlignedSize(std::max<int64_t>(num_partials, 1) * sizeof(T));
+}
+#endif  // WITH_CUDA
+
+}  // namespace
+
+template<DeviceType device_type, typename T>
+class MultiReduceSumPowAbsKernel final : public user_op::OpKernel,
+                                         public user_op::CudaGraphSupport {
+ public:
+  MultiReduceSumPowAbsKernel() = default;
+  ~MultiReduceSumPowAbsKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const std::vector<MultiReduceParam<T>> params = MultiReduceParams4X<T>(ctx);
+    user_op::Tensor* y = ctx->Tensor4ArgNameAndIndex("y", 0);
+    const float p = ctx->Attr<float>("p");
+    MultiReduce<device_type, T, AbsPow<T>, BinaryAdd<T>> reduce_sum{};
+    reduce_sum(ctx->stream(), AbsPow<T>(p), params, static_cast<T>(0), y->mut_dptr<T>(),
+               TmpBufferPtr<T>(ctx));
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+// The abs of every element is at least 0, so 0 is the identity of max and inf the one of min.
+template<DeviceType device_type, typename T, template<typename> class ReduceFn>
+class MultiReduceXAbsKernel final : public user_op::OpKernel, public user_op::CudaGraphSupport {
+ public:
+  MultiReduceXAbsKernel() = default;
+  ~MultiReduceXAbsKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const std::vector<MultiReduceParam<T>> params = MultiReduceParams4X<T>(ctx);
+    user_op::Tensor* y = ctx->Tensor4ArgNameAndIndex("y", 0);
+    const T init = std::is_same<ReduceFn<T>, BinaryMax<T>>::value
+                       ? static_cast<T>(0)
+                       : std::numeric_limits<T>::infinity();
+    MultiReduce<device_type, T, Abs<T>, ReduceFn<T>> reduce{};
+    reduce(ctx->stream(), Abs<T>(), params, init, y->mut_dptr<T>(), TmpBufferPtr<T>(ctx));
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_MULTI_REDUCE_SUM_POW_ABS_CPU_KERNEL(dtype)               \
+  REGISTER_USER_KERNEL("multi_reduce_sum_pow_abs")                        \
+      .SetCreateFn<MultiReduceSumPowAbsKernel<DeviceType::kCPU, dtype>>() \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCPU)     \
+                       && (user_op::HobDataType("y", 0) == GetDataType<dtype>::value));
+
+#define REGISTER_MULTI_REDUCE_X_ABS_CPU_KERNEL(op_type_name, dtype, reduce_fn)  \
+  REGISTER_USER_KERNEL(op_type_name)                                            \
+      .SetCreateFn<MultiReduceXAbsKernel<DeviceType::kCPU, dtype, reduce_fn>>() \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCPU)           \
+                       && (user_op::HobDataType("y", 0) == GetDataType<dtype>::value));
+
+REGISTER_MULTI_REDUCE_SUM_POW_ABS_CPU_KERNEL(float)
+REGISTER_MULTI_REDUCE_SUM_POW_ABS_CPU_KERNEL(double)
+REGISTER_MULTI_REDUCE_X_ABS_CPU_KERNEL("multi_reduce_max_abs", float, BinaryMax)
+REGISTER_MULTI_REDUCE_X_ABS_CPU_KERNEL("multi_reduce_max_abs", double, BinaryMax)
+REGISTER_MULTI_REDUCE_X_ABS_CPU_KERNEL("multi_reduce_min_abs", float, BinaryMin)
+REGISTER_MULTI_REDUCE_X_ABS_CPU_KERNEL("multi_reduce_min_abs", double, BinaryMin)
+
+#ifdef WITH_CUDA
+#define REGISTER_MULTI_REDUCE_SUM_POW_ABS_CUDA_KERNEL(dtype)                           \
+  REGISTER_USER_KERNEL("multi_reduce_sum_pow_abs")                                     \
+      .SetCreateFn<MultiReduceSumPowAbsKernel<DeviceType::kCUDA, dtype>>()             \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCUDA)                 \
+                       && (user_op::HobDataType("y", 0) == GetDataType<dtype>::value)) \
+      .SetInferTmpSizeFn(InferMultiReduceCudaTmpSize<dtype>);
+
+#define REGISTER_MULTI_REDUCE_X_ABS_CUDA_KERNEL(op_type_name, dtype, reduce_fn)        \
+  REGISTER_USER_KERNEL(op_type_name)                                                   \
+      .SetCreateFn<MultiReduceXAbsKernel<DeviceType::kCUDA, dtype, reduce_fn>>()       \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCUDA)                 \
+                       && (user_op::HobDataType("y", 0) == GetDataType<dtype>::value)) \
+      .SetInferTmpSizeFn(InferMultiReduceCudaTmpSize<dtype>);
+
+REGISTER_MULTI_REDUCE_SUM_POW_ABS_CUDA_KERNEL(float)
+REGISTER_MULTI_REDUCE_SUM_POW_ABS_CUDA_KERNEL(double)
+REGISTER_MULTI_REDUCE_X_ABS_CUDA_KERNEL("multi_reduce_max_abs", float, BinaryMax)
+REGISTER_MULTI_REDUCE_X_ABS_CUDA_KERNEL("multi_reduce_max_abs", double, BinaryMax)
+REGISTER_MULTI_REDUCE_X_ABS_CUDA_KERNEL("multi_reduce_min_abs", float, BinaryMin)
+REGISTER_MULTI_REDUCE_X_ABS_CUDA_KERNEL("multi_reduce_min_abs", double, BinaryMin)
+#endif  // WITH_CUDA
+
+}  // namespace oneflow
@@ -0,0 +1,56 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/user/kernels/multi_tensor_clip_by_norm_kernel_util.h"
+#include "oneflow/core/kernel/cuda_graph_support.h"
+
+namespace oneflow {
+
+template<DeviceType device_type, typename T>
+class MultiTensorClipByNormKernel final : public user_op::OpKernel,
+                                          public user_op::CudaGraphSupport {
+ public:
+  MultiTensorClipByNormKernel() = default;
+  ~MultiTensorClipByNormKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    std::vector<MultiTensorClipParam<T>> params;
+    params.reserve(ctx->input_size("x"));
+    for (int32_t i = 0; i < ctx->input_size("x"); ++i) {
+      user_op::Tensor* x = ctx->Tensor4ArgNameAndIndex("x", i);
+      const int64_t elem_cnt = x->shape().elem_cnt();
+      if (elem_cnt == 0) { continue; }
+      params.push_back(MultiTensorClipParam<T>{x->mut_dptr<T>(), elem_cnt});
+    }
+    const user_op::Tensor* total_norm = ctx->Tensor4ArgNameAndIndex("total_norm", 0);
+    MultiTensorClipByNormKernelUtil<device_type, T>::Clip(
+        ctx->stream(), params, total_norm->dptr<T>(), ctx->Attr<float>("max_norm"),
+        ctx->Attr<float>("epsilon"));
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_CLIP_BY_NORM_KERNEL(device, dtype)                   \
+  REGISTER_USER_KERNEL("multi_tensor_clip_by_norm")                                \
+      .SetCreateFn<MultiTensorClipByNormKernel<device, OF_PP_PAIR_FIRST(dtype)>>() \
+      .SetIsMatchedHob((user_op::HobDeviceType() == device)                        \
+                       && (user_op::HobDataType("x", 0) == OF_PP_PAIR_SECOND(dtype)));
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_MULTI_TENSOR_CLIP_BY_NORM_KERNEL, DEVICE_TYPE_SEQ,
+                                 FLOATING_DATA_TYPE_SEQ)
+
+}  // namespace oneflow
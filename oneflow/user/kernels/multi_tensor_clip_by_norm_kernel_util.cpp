@@ -0,0 +1,39 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/user/kernels/multi_tensor_clip_by_norm_kernel_util.h"
+
+namespace oneflow {
+
+template<typename T>
+struct MultiTensorClipByNormKernelUtil<DeviceType::kCPU, T> {
+  static void Clip(ep::Stream* stream, const std::vector<MultiTensorClipParam<T>>& params,
+                   const T* total_norm, float max_norm, float epsilon) {
+    const T clip_coef = static_cast<T>(max_norm) / (*total_norm + static_cast<T>(epsilon));
+    // a nan norm fails the comparison, so like the unfused version it propagates into x
+    if (clip_coef >= static_cast<T>(1)) { return; }
+    for (const auto& param : params) {
+      FOR_RANGE(int64_t, i, 0, param.size) { param.data[i] *= clip_coef; }
+    }
+  }
+};
+
+#define INSTANTIATE_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_CPU(type_cpp, type_proto) \
+  template struct MultiTensorClipByNormKernelUtil<DeviceType::kCPU, type_cpp>;
+OF_PP_FOR_EACH_TUPLE(INSTANTIATE_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_CPU,
+                     FLOATING_DATA_TYPE_SEQ);
+#undef INSTANTIATE_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_CPU
+
+}  // namespace oneflow
@@ -0,0 +1,68 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/user/kernels/multi_tensor_clip_by_norm_kernel_util.h"
+#include "oneflow/core/ep/cuda/cuda_stream.h"
+
+namespace oneflow {
+
+namespace {
+
+template<typename T>
+struct MultiTensorClipParamsPack {
+  MultiTensorClipParam<T> params[kMultiTensorClipMaxPackSize];
+  int32_t size;
+};
+
+template<typename T>
+__global__ void MultiTensorClipByNormGpu(const MultiTensorClipParamsPack<T> pack,
+                                         const T* total_norm, float max_norm, float epsilon) {
+  const T clip_coef = static_cast<T>(max_norm) / (*total_norm + static_cast<T>(epsilon));
+  // a nan norm fails the comparison, so like the unfused version it propagates into x
+  if (clip_coef >= static_cast<T>(1)) { return; }
+  for (int32_t i = 0; i < pack.size; ++i) {
+    const MultiTensorClipParam<T> param = pack.params[i];
+    CUDA_1D_KERNEL_LOOP_T(int64_t, j, param.size) { param.data[j] *= clip_coef; }
+  }
+}
+
+}  // namespace
+
+template<typename T>
+struct MultiTensorClipByNormKernelUtil<DeviceType::kCUDA, T> {
+  static void Clip(ep::Stream* stream, const std::vector<MultiTensorClipParam<T>>& params,
+                   const T* total_norm, float max_norm, float epsilon) {
+    for (size_t start = 0; start < params.size(); start += kMultiTensorClipMaxPackSize) {
+      MultiTensorClipParamsPack<T> pack{};
+      int64_t max_size = 0;
+      pack.size = std::min<size_t>(kMultiTensorClipMaxPackSize, params.size() - start);
+      for (int32_t i = 0; i < pack.size; ++i) {
+        pack.params[i] = params[start + i];
+        max_size = std::max(max_size, pack.params[i].size);
+      }
+      MultiTensorClipByNormGpu<T><<<BlocksNum4ThreadsNum(max_size), kCudaThreadsNumPerBlock, 0,
+                                    stream->As<ep::CudaStream>()->cuda_stream()>>>(
+          pack, total_norm, max_norm, epsilon);
+    }
+  }
+};
+
+#define INSTANTIATE_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_CUDA(type_cpp, type_proto) \
+  template struct MultiTensorClipByNormKernelUtil<DeviceType::kCUDA, type_cpp>;
+OF_PP_FOR_EACH_TUPLE(INSTANTIATE_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_CUDA,
+                     FLOATING_DATA_TYPE_SEQ);
+#undef INSTANTIATE_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_CUDA
+
+}  // namespace oneflow
@@ -0,0 +1,42 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_USER_KERNELS_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_H_
+#define ONEFLOW_USER_KERNELS_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_H_
+
+#include "oneflow/core/kernel/kernel_util.h"
+
+namespace oneflow {
+
+template<typename T>
+struct MultiTensorClipParam {
+  T* data;
+  int64_t size;
+};
+
+// Number of tensors scaled by one launch of the CUDA implementation.
+constexpr int64_t kMultiTensorClipMaxPackSize = 64;
+
+// Scales every tensor by max_norm / (*total_norm + epsilon) in place if that is below 1. The
+// norm is read on device, so clipping does not synchronize with the host.
+template<DeviceType device_type, typename T>
+struct MultiTensorClipByNormKernelUtil {
+  static void Clip(ep::Stream* stream, const std::vector<MultiTensorClipParam<T>>& params,
+                   const T* total_norm, float max_norm, float epsilon);
+};
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_USER_KERNELS_MULTI_TENSOR_CLIP_BY_NORM_KERNEL_UTIL_H_
@@ -0,0 +1,175 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/user/kernels/multi_tensor_model_update_kernel_util.h"
+#include "oneflow/core/ep/cuda/cuda_stream.h"
+
+namespace oneflow {
+
+namespace {
+
+template<typename T, typename G, int N>
+int64_t MaxElemCnt(int64_t n_tensor, const TensorTupleParams<T, G, N>& tensor_tuple_params) {
+  int64_t max_elem_cnt = 0;
+  for (int64_t tensor_idx = 0; tensor_idx < n_tensor; ++tensor_idx) {
+    max_elem_cnt = std::max(max_elem_cnt, tensor_tuple_params.sizes[tensor_idx]);
+  }
+  return max_elem_cnt;
+}
+
+template<typename T, typename G>
+__global__ void MultiTensorSGDUpdateGpu(int64_t n_tensor, T scale, float l1, float l2,
+                                        float weight_decay, float learning_rate_val,
+                                        const float* learning_rate, const T* scale_by_ptr,
+                                        const int64_t* skip_if,
+                                        TensorTupleParams<T, G, 1> tensor_tuple_params) {
+  if (skip_if != nullptr && *skip_if != 0) { return; }
+  if (learning_rate != nullptr) { learning_rate_val = *learning_rate; }
+  if (scale_by_ptr != nullptr) { scale *= *scale_by_ptr; }
+  for (int64_t tensor_idx = 0; tensor_idx < n_tensor; ++tensor_idx) {
+    const G* model_diff = tensor_tuple_params.model_diff_addresses[tensor_idx];
+    T* model = tensor_tuple_params.state_addresses[0][tensor_idx];
+    CUDA_1D_KERNEL_LOOP(i, tensor_tuple_params.sizes[tensor_idx]) {
+      SGDUpdateFunctor<T, G>()(model_diff + i, model + i, scale, l1, l2, weight_decay,
+                               learning_rate_val);
+    }
+  }
+}
+
+template<typename T, typename G>
+__global__ void MultiTensorMomentumUpdateGpu(int64_t n_tensor, T scale, float l1, float l2,
+                                             float beta, float weight_decay,
+                                             float learning_rate_val, const float* learning_rate,
+                                             const T* scale_by_ptr, const int64_t* skip_if,
+                                             TensorTupleParams<T, G, 2> tensor_tuple_params) {
+  if (skip_if != nullptr && *skip_if != 0) { return; }
+  if (learning_rate != nullptr) { learning_rate_val = *learning_rate; }
+  if (scale_by_ptr != nullptr) { scale *= *scale_by_ptr; }
+  for (int64_t tensor_idx = 0; tensor_idx < n_tensor; ++tensor_idx) {
+    const G* model_diff = tensor_tuple_params.model_diff_addresses[tensor_idx];
+    T* model = tensor_tuple_params.state_addresses[0][tensor_idx];
+    T* momentum = tensor_tuple_params.state_addresses[1][tensor_idx];
+    CUDA_1D_KERNEL_LOOP(i, tensor_tuple_params.sizes[tensor_idx]) {
+      MomentumUpdateFunctor<T, G>()(model_diff + i, model + i, momentum + i, scale, l1, l2, beta,
+                                    weight_decay, learning_rate_val);
+    }
+  }
+}
+
+template<typename T, typename G>
+__global__ void MultiTensorAdamUpdateGpu(
+    int64_t n_tensor, T scale, float l1, float l2, float beta1, float beta2, float epsilon,
+    float weight_decay, bool do_bias_correction, float learning_rate_val,
+    float bias_correction1_val, float bias_correction2_val, const float* learning_rate,
+    const T* scale_by_ptr, const int64_t* skip_if, const float* bias_correction1_ptr,
+    const float* bias_correction2_ptr, TensorTupleParams<T, G, 3> tensor_tuple_params) {
+  if (skip_if != nullptr && *skip_if != 0) { return; }
+  if (learning_rate != nullptr) { learning_rate_val = *learning_rate; }
+  if (scale_by_ptr != nullptr) { scale *= *scale_by_ptr; }
+  if (bias_correction1_ptr != nullptr) { bias_correction1_val = *bias_correction1_ptr; }
+  if (bias_correction2_ptr != nullptr) { bias_correction2_val = *bias_correction2_ptr; }
+  for (int64_t tensor_idx = 0; tensor_idx < n_tensor; ++tensor_idx) {
+    const G* model_diff = tensor_tuple_params.model_diff_addresses[tensor_idx];
+    T* model = tensor_tuple_params.state_addresses[0][tensor_idx];
+    T* m = tensor_tuple_params.state_addresses[1][tensor_idx];
+    T* v = tensor_tuple_params.state_addresses[2][tensor_idx];
+    CUDA_1D_KERNEL_LOOP(i, tensor_tuple_params.sizes[tensor_idx]) {
+      AdamUpdateFunctor<T, G>()(model_diff + i, model + i, m + i, v + i, /*max_v=*/nullptr, scale,
+                                l1, l2, beta1, beta2, epsilon, weight_decay, /*amsgrad=*/false,
+                                bias_correction1_val, bias_correction2_val, learning_rate_val);
+    }
+  }
+}
+
+}  // namespace
+
+template<typename T, typename G>
+struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCUDA, T, G> {
+  static void Update(ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2,
+                     float weight_decay, float learning_rate_val, const float* learning_rate,
+                     const T* scale_by_ptr, const int64_t* skip_if,
+                     const TensorTupleParams<T, G, 1>& tensor_tuple_params);
+};
+
+template<typename T, typename G>
+void MultiTensorSGDUpdateKernelUtil<DeviceType::kCUDA, T, G>::Update(
+    ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2, float weight_decay,
+    float learning_rate_val, const float* learning_rate, const T* scale_by_ptr,
+    const int64_t* skip_if, const TensorTupleParams<T, G, 1>& tensor_tuple_params) {
+  const int64_t max_elem_cnt = MaxElemCnt(n_tensor, tensor_tuple_params);
+  MultiTensorSGDUpdateGpu<T, G><<<BlocksNum4ThreadsNum(max_elem_cnt), kCudaThreadsNumPerBlock, 0,
+                                  stream->As<ep::CudaStream>()->cuda_stream()>>>(
+      n_tensor, scale, l1, l2, weight_decay, learning_rate_val, learning_rate, scale_by_ptr,
+      skip_if, tensor_tuple_params);
+}
+
+template struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCUDA, float, float>;
+template struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCUDA, double, double>;
+
+template<typename T, typename G>
+struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCUDA, T, G> {
+  static void Update(ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2, float beta,
+                     float weight_decay, float learning_rate_val, const float* learning_rate,
+                     const T* scale_by_ptr, const int64_t* skip_if,
+                     const TensorTupleParams<T, G, 2>& tensor_tuple_params);
+};
+
+template<typename T, typename G>
+void MultiTensorMomentumUpdateKernelUtil<DeviceType::kCUDA, T, G>::Update(
+    ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2, float beta,
+    float weight_decay, float learning_rate_val, const float* learning_rate, const T* scale_by_ptr,
+    const int64_t* skip_if, const TensorTupleParams<T, G, 2>& tensor_tuple_params) {
+  const int64_t max_elem_cnt = MaxElemCnt(n_tensor, tensor_tuple_params);
+  MultiTensorMomentumUpdateGpu<T, G>
+      <<<BlocksNum4ThreadsNum(max_elem_cnt), kCudaThreadsNumPerBlock, 0,
+         stream->As<ep::CudaStream>()->cuda_stream()>>>(
+          n_tensor, scale, l1, l2, beta, weight_decay, learning_rate_val, learning_rate,
+          scale_by_ptr, skip_if, tensor_tuple_params);
+}
+
+template struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCUDA, float, float>;
+template struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCUDA, double, double>;
+
+template<typename T, typename G>
+struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCUDA, T, G> {
+  static void Update(ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2,
+                     float beta1, float beta2, float epsilon, float weight_decay,
+                     bool do_bias_correction, float learning_rate_val, float bias_correction1_val,
+                     float bias_correction2_val, const float* learning_rate, const T* scale_by_ptr,
+                     const int64_t* skip_if, const float* bias_correction1,
+                     const float* bias_correction2,
+                     const TensorTupleParams<T, G, 3>& tensor_tuple_params);
+};
+
+template<typename T, typename G>
+void MultiTensorAdamUpdateKernelUtil<DeviceType::kCUDA, T, G>::Update(
+    ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2, float beta1, float beta2,
+    float epsilon, float weight_decay, bool do_bias_correction, float learning_rate_val,
+    float bias_correction1_val, float bias_correction2_val, const float* learning_rate,
+    const T* scale_by_ptr, const int64_t* skip_if, const float* bias_correction1_ptr,
+    const float* bias_correction2_ptr, const TensorTupleParams<T, G, 3>& tensor_tuple_params) {
+  const int64_t max_elem_cnt = MaxElemCnt(n_tensor, tensor_tuple_params);
+  MultiTensorAdamUpdateGpu<T, G><<<BlocksNum4ThreadsNum(max_elem_cnt), kCudaThreadsNumPerBlock, 0,
+                                   stream->As<ep::CudaStream>()->cuda_stream()>>>(
+      n_tensor, scale, l1, l2, beta1, beta2, epsilon, weight_decay, do_bias_correction,
+      learning_rate_val, bias_correction1_val, bias_correction2_val, learning_rate, scale_by_ptr,
+      skip_if, bias_correction1_ptr, bias_correction2_ptr, tensor_tuple_params);
+}
+
+template struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCUDA, float, float>;
+template struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCUDA, double, double>;
+
+}  // namespace oneflow
@@ -0,0 +1,65 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_USER_KERNELS_MULTI_TENSOR_MODEL_UPDATE_KERNEL_UTIL_H_
+#define ONEFLOW_USER_KERNELS_MULTI_TENSOR_MODEL_UPDATE_KERNEL_UTIL_H_
+
+#include "oneflow/user/kernels/model_update_kernel_util.h"
+
+namespace oneflow {
+
+// Kernel arguments are passed by value, so the number of tensors handled by one launch is bounded
+// to keep the params struct well below the 4KB CUDA kernel parameter limit.
+constexpr int kMaxTensorsPerLaunch = 48;
+
+// N is the number of mutable tensors per model: 1 for sgd (model), 2 for momentum (model,
+// momentum) and 3 for adam (model, m, v). Slot 0 is always the model.
+template<typename T, typename G, int N>
+struct TensorTupleParams {
+  const G* model_diff_addresses[kMaxTensorsPerLaunch];
+  T* state_addresses[N][kMaxTensorsPerLaunch];
+  int64_t sizes[kMaxTensorsPerLaunch];
+};
+
+template<DeviceType device_type, typename T, typename G>
+struct MultiTensorSGDUpdateKernelUtil {
+  static void Update(ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2,
+                     float weight_decay, float learning_rate_val, const float* learning_rate,
+                     const T* scale_by_ptr, const int64_t* skip_if,
+                     const TensorTupleParams<T, G, 1>& tensor_tuple_params);
+};
+
+template<DeviceType device_type, typename T, typename G>
+struct MultiTensorMomentumUpdateKernelUtil {
+  static void Update(ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2, float beta,
+                     float weight_decay, float learning_rate_val, const float* learning_rate,
+                     const T* scale_by_ptr, const int64_t* skip_if,
+                     const TensorTupleParams<T, G, 2>& tensor_tuple_params);
+};
+
+template<DeviceType device_type, typename T, typename G>
+struct MultiTensorAdamUpdateKernelUtil {
+  static void Update(ep::Stream* stream, int64_t n_tensor, T scale, float l1, float l2,
+                     float beta1, float beta2, float epsilon, float weight_decay,
+                     bool do_bias_correction, float learning_rate_val, float bias_correction1_val,
+                     float bias_correction2_val, const float* learning_rate, const T* scale_by_ptr,
+                     const int64_t* skip_if, const float* bias_correction1,
+                     const float* bias_correction2,
+                     const TensorTupleParams<T, G, 3>& tensor_tuple_params);
+};
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_USER_KERNELS_MULTI_TENSOR_MODEL_UPDATE_KERNEL_UTIL_H_
@@ -0,0 +1,221 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/user/kernels/multi_tensor_model_update_kernel_util.h"
+#include "oneflow/core/kernel/cuda_graph_support.h"
+
+namespace oneflow {
+
+namespace {
+
+const float* LearningRatePtr(user_op::KernelComputeContext* ctx) {
+  if (ctx->has_input("learning_rate", 0)) {
+    return ctx->Tensor4ArgNameAndIndex("learning_rate", 0)->dptr<float>();
+  }
+  return nullptr;
+}
+
+template<typename T>
+const T* ScaleByPtr(user_op::KernelComputeContext* ctx) {
+  if (ctx->has_input("scale_by_tensor", 0)) {
+    const user_op::Tensor* scale_by_tensor = ctx->Tensor4ArgNameAndIndex("scale_by_tensor", 0);
+    CHECK_EQ(scale_by_tensor->shape().elem_cnt(), 1);
+    return scale_by_tensor->dptr<T>();
+  }
+  return nullptr;
+}
+
+const int64_t* SkipIfPtr(user_op::KernelComputeContext* ctx) {
+  if (ctx->has_input("skip_if", 0)) {
+    const user_op::Tensor* skip_if = ctx->Tensor4ArgNameAndIndex("skip_if", 0);
+    CHECK_EQ(skip_if->shape().elem_cnt(), 1);
+    return skip_if->dptr<int64_t>();
+  }
+  return nullptr;
+}
+
+// Walks all models in chunks of kMaxTensorsPerLaunch and calls `launch(n_tensor, params)` once per
+// chunk, so the number of launches is ceil(num_model / kMaxTensorsPerLaunch).
+template<typename T, typename G, int N, typename LaunchFn>
+void ForEachTensorTupleChunk(user_op::KernelComputeContext* ctx,
+                             const std::array<std::string, N>& state_arg_names,
+                             const LaunchFn& launch) {
+  const int64_t num_model = ctx->input_size("model");
+  TensorTupleParams<T, G, N> params{};
+  int64_t count = 0;
+  for (int64_t tensor_idx = 0; tensor_idx < num_model; ++tensor_idx) {
+    const user_op::Tensor* model_diff = ctx->Tensor4ArgNameAndIndex("model_diff", tensor_idx);
+    const int64_t elem_cnt = model_diff->shape().elem_cnt();
+    if (elem_cnt == 0) { continue; }
+    params.model_diff_addresses[count] = model_diff->dptr<G>();
+    for (int i = 0; i < N; ++i) {
+      params.state_addresses[i][count] =
+          ctx->Tensor4ArgNameAndIndex(state_arg_names.at(i), tensor_idx)->mut_dptr<T>();
+    }
+    params.sizes[count] = elem_cnt;
+    count += 1;
+    if (count == kMaxTensorsPerLaunch) {
+      launch(count, params);
+      count = 0;
+    }
+  }
+  if (count > 0) { launch(count, params); }
+}
+
+}  // namespace
+
+template<DeviceType device_type, typename T, typename G>
+class MultiTensorSGDUpdateKernel final : public user_op::OpKernel,
+                                         public user_op::CudaGraphSupport {
+ public:
+  MultiTensorSGDUpdateKernel() = default;
+  ~MultiTensorSGDUpdateKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const auto scale = static_cast<T>(ctx->Attr<double>("scale"));
+    const auto l1 = ctx->Attr<float>("l1");
+    const auto l2 = ctx->Attr<float>("l2");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const float learning_rate_val = ctx->Attr<float>("learning_rate_val");
+    const float* learning_rate_ptr = LearningRatePtr(ctx);
+    const T* scale_by_ptr = ScaleByPtr<T>(ctx);
+    const int64_t* skip_if_ptr = SkipIfPtr(ctx);
+    ForEachTensorTupleChunk<T, G, 1>(
+        ctx, {"model"}, [&](int64_t n_tensor, const TensorTupleParams<T, G, 1>& params) {
+          MultiTensorSGDUpdateKernelUtil<device_type, T, G>::Update(
+              ctx->stream(), n_tensor, scale, l1, l2, weight_decay, learning_rate_val,
+              learning_rate_ptr, scale_by_ptr, skip_if_ptr, params);
+        });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(device, dtype, gtype)                     \
+  REGISTER_USER_KERNEL("multi_tensor_sgd_update")                                         \
+      .SetCreateFn<MultiTensorSGDUpdateKernel<device, dtype, gtype>>()                    \
+      .SetIsMatchedHob((user_op::HobDeviceType() == device)                               \
+                       && (user_op::HobDataType("model", 0) == GetDataType<dtype>::value) \
+                       && (user_op::HobDataType("model_diff", 0) == GetDataType<gtype>::value));
+
+REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(DeviceType::kCPU, float, float);
+REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(DeviceType::kCPU, double, double);
+#ifdef WITH_CUDA
+REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(DeviceType::kCUDA, float, float);
+REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(DeviceType::kCUDA, double, double);
+#endif  // WITH_CUDA
+
+template<DeviceType device_type, typename T, typename G>
+class MultiTensorMomentumUpdateKernel final : public user_op::OpKernel,
+                                              public user_op::CudaGraphSupport {
+ public:
+  MultiTensorMomentumUpdateKernel() = default;
+  ~MultiTensorMomentumUpdateKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const auto scale = static_cast<T>(ctx->Attr<double>("scale"));
+    const auto l1 = ctx->Attr<float>("l1");
+    const auto l2 = ctx->Attr<float>("l2");
+    const auto beta = ctx->Attr<float>("beta");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const float learning_rate_val = ctx->Attr<float>("learning_rate_val");
+    const float* learning_rate_ptr = LearningRatePtr(ctx);
+    const T* scale_by_ptr = ScaleByPtr<T>(ctx);
+    const int64_t* skip_if_ptr = SkipIfPtr(ctx);
+    ForEachTensorTupleChunk<T, G, 2>(
+        ctx, {"model", "momentum"},
+        [&](int64_t n_tensor, const TensorTupleParams<T, G, 2>& params) {
+          MultiTensorMomentumUpdateKernelUtil<device_type, T, G>::Update(
+              ctx->stream(), n_tensor, scale, l1, l2, beta, weight_decay, learning_rate_val,
+              learning_rate_ptr, scale_by_ptr, skip_if_ptr, params);
+        });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(device, dtype, gtype)                \
+  REGISTER_USER_KERNEL("multi_tensor_momentum_update")                                    \
+      .SetCreateFn<MultiTensorMomentumUpdateKernel<device, dtype, gtype>>()               \
+      .SetIsMatchedHob((user_op::HobDeviceType() == device)                               \
+                       && (user_op::HobDataType("model", 0) == GetDataType<dtype>::value) \
+                       && (user_op::HobDataType("model_diff", 0) == GetDataType<gtype>::value));
+
+REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(DeviceType::kCPU, float, float);
+REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(DeviceType::kCPU, double, double);
+#ifdef WITH_CUDA
+REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(DeviceType::kCUDA, float, float);
+REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(DeviceType::kCUDA, double, double);
+#endif  // WITH_CUDA
+
+template<DeviceType device_type, typename T, typename G>
+class MultiTensorAdamUpdateKernel final : public user_op::OpKernel,
+                                          public user_op::CudaGraphSupport {
+ public:
+  MultiTensorAdamUpdateKernel() = default;
+  ~MultiTensorAdamUpdateKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const auto scale = static_cast<T>(ctx->Attr<double>("scale"));
+    const auto l1 = ctx->Attr<float>("l1");
+    const auto l2 = ctx->Attr<float>("l2");
+    const auto beta1 = ctx->Attr<float>("beta1");
+    const auto beta2 = ctx->Attr<float>("beta2");
+    const auto epsilon = ctx->Attr<float>("epsilon");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const bool do_bias_correction = ctx->Attr<bool>("do_bias_correction");
+    const float learning_rate_val = ctx->Attr<float>("learning_rate_val");
+    const float bias_correction1_val = ctx->Attr<float>("bias_correction1_val");
+    const float bias_correction2_val = ctx->Attr<float>("bias_correction2_val");
+    const float* learning_rate_ptr = LearningRatePtr(ctx);
+    const T* scale_by_ptr = ScaleByPtr<T>(ctx);
+    const int64_t* skip_if_ptr = SkipIfPtr(ctx);
+    const float* bias_correction1_ptr = nullptr;
+    if (ctx->has_input("bias_correction1", 0)) {
+      bias_correction1_ptr = ctx->Tensor4ArgNameAndIndex("bias_correction1", 0)->dptr<float>();
+    }
+    const float* bias_correction2_ptr = nullptr;
+    if (ctx->has_input("bias_correction2", 0)) {
+      bias_correction2_ptr = ctx->Tensor4ArgNameAndIndex("bias_correction2", 0)->dptr<float>();
+    }
+    ForEachTensorTupleChunk<T, G, 3>(
+        ctx, {"model", "m", "v"}, [&](int64_t n_tensor, const TensorTupleParams<T, G, 3>& params) {
+          MultiTensorAdamUpdateKernelUtil<device_type, T, G>::Update(
+              ctx->stream(), n_tensor, scale, l1, l2, beta1, beta2, epsilon, weight_decay,
+              do_bias_correction, learning_rate_val, bias_correction1_val, bias_correction2_val,
+              learning_rate_ptr, scale_by_ptr, skip_if_ptr, bias_correction1_ptr,
+              bias_correction2_ptr, params);
+        });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(device, dtype, gtype)                    \
+  REGISTER_USER_KERNEL("multi_tensor_adam_update")                                        \
+      .SetCreateFn<MultiTensorAdamUpdateKernel<device, dtype, gtype>>()                   \
+      .SetIsMatchedHob((user_op::HobDeviceType() == device)                               \
+                       && (user_op::HobDataType("model", 0) == GetDataType<dtype>::value) \
+                       && (user_op::HobDataType("model_diff", 0) == GetDataType<gtype>::value));
+
+REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(DeviceType::kCPU, float, float);
+REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(DeviceType::kCPU, double, double);
+#ifdef WITH_CUDA
+REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(DeviceType::kCUDA, float, float);
+REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(DeviceType::kCUDA, double, double);
+#endif  // WITH_CUDA
+
+}  // namespace oneflow
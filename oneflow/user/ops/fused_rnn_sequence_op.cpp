@@ -0,0 +1,227 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/framework/op_generated.h"
+
+namespace oneflow {
+
+namespace {
+
+Maybe<int64_t> NumGates4Mode(const std::string& mode) {
+  if (mode == "rnn_tanh" || mode == "rnn_relu") { return 1; }
+  if (mode == "gru") { return 3; }
+  if (mode == "lstm") { return 4; }
+  UNIMPLEMENTED_THEN_RETURN() << "Unknown rnn mode " << mode;
+}
+
+// Activations the backward pass needs per step besides y: r, z, n and the hidden part of the new
+// gate for gru; i, f, g, o and the cell state for lstm.
+Maybe<int64_t> ReserveSpaceSize4Mode(const std::string& mode, int64_t hidden_size) {
+  if (mode == "gru") { return 4 * hidden_size; }
+  if (mode == "lstm") { return 5 * hidden_size; }
+  JUST(NumGates4Mode(mode));
+  return 0;
+}
+
+}  // namespace
+
+/* static */ Maybe<void> FusedRnnSequenceOp::InferLogicalTensorDesc(user_op::InferContext* ctx) {
+  const std::string& mode = ctx->Attr<std::string>("mode");
+  const Shape& input_gates_shape = ctx->InputShape("input_gates", 0);
+  CHECK_EQ_OR_RETURN(input_gates_shape.NumAxes(), 3)
+      << "input_gates should be of shape (seq_len, batch_size, num_gates * hidden_size)";
+  const int64_t seq_len = input_gates_shape.At(0);
+  const int64_t batch_size = input_gates_shape.At(1);
+  const int64_t gate_size = input_gates_shape.At(2);
+  const int64_t num_gates = JUST(NumGates4Mode(mode));
+  CHECK_EQ_OR_RETURN(gate_size % num_gates, 0);
+  const int64_t hidden_size = gate_size / num_gates;
+  int64_t output_size = hidden_size;
+  if (ctx->has_input("weight_hr", 0)) {
+    CHECK_EQ_OR_RETURN(mode, "lstm") << "Only lstm supports projections";
+    const Shape& weight_hr_shape = ctx->InputShape("weight_hr", 0);
+    CHECK_EQ_OR_RETURN(weight_hr_shape.NumAxes(), 2);
+    CHECK_EQ_OR_RETURN(weight_hr_shape.At(0), hidden_size);
+    output_size = weight_hr_shape.At(1);
+  }
+  CHECK_EQ_OR_RETURN(ctx->InputShape("weight_hh", 0), Shape({output_size, gate_size}));
+  CHECK_EQ_OR_RETURN(ctx->InputShape("hx", 0), Shape({batch_size, output_size}));
+  if (ctx->has_input("bias_hh", 0)) {
+    CHECK_EQ_OR_RETURN(ctx->InputShape("bias_hh", 0), Shape({gate_size}));
+  }
+  CHECK_EQ_OR_RETURN(ctx->has_input("cx", 0), mode == "lstm") << "cx is required by lstm only";
+  if (ctx->has_input("cx", 0)) {
+    CHECK_EQ_OR_RETURN(ctx->InputShape("cx", 0), Shape({batch_size, hidden_size}));
+  }
+  *ctx->OutputShape("y", 0) = Shape({seq_len, batch_size, output_size});
+  *ctx->OutputShape("cy", 0) = Shape({batch_size, mode == "lstm" ? hidden_size : 0});
+  *ctx->OutputShape("reserve_space", 0) =
+      Shape({seq_len, batch_size, JUST(ReserveSpaceSize4Mode(mode, hidden_size))});
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> FusedRnnSequenceOp::InferPhysicalTensorDesc(user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+
+/* static */ Maybe<void> FusedRnnSequenceOp::GetSbp(user_op::SbpContext* ctx) {
+  auto builder = ctx->NewBuilder()
+                     .Split(user_op::OpArg("input_gates", 0), 1)
+                     .Split(user_op::OpArg("hx", 0), 0)
+                     .Broadcast(user_op::OpArg("weight_hh", 0))
+                     .Split(user_op::OpArg("y", 0), 1)
+                     .Split(user_op::OpArg("cy", 0), 0)
+                     .Split(user_op::OpArg("reserve_space", 0), 1);
+  if (ctx->user_op_conf().has_input("bias_hh", 0)) {
+    builder.Broadcast(user_op::OpArg("bias_hh", 0));
+  }
+  if (ctx->user_op_conf().has_input("cx", 0)) { builder.Split(user_op::OpArg("cx", 0), 0); }
+  if (ctx->user_op_conf().has_input("weight_hr", 0)) {
+    builder.Broadcast(user_op::OpArg("weight_hr", 0));
+  }
+  builder.Build();
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> FusedRnnSequenceOp::InferDataType(user_op::InferContext* ctx) {
+  const DataType data_type = ctx->InputDType("input_gates", 0);
+  for (const auto& arg : ctx->inputs()) {
+    CHECK_EQ_OR_RETURN(ctx->InputDType(arg.first, arg.second), data_type);
+  }
+  *ctx->OutputDType("y", 0) = data_type;
+  *ctx->OutputDType("cy", 0) = data_type;
+  *ctx->OutputDType("reserve_space", 0) = data_type;
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> FusedRnnSequenceOp::CheckAttr(const user_op::UserOpDefWrapper&,
+                                                      const user_op::UserOpConfWrapper& op_conf) {
+  JUST(NumGates4Mode(op_conf.attr<std::string>("mode")));
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> FusedRnnSequenceGradOp::InferLogicalTensorDesc(
+    user_op::InferContext* ctx) {
+  const Shape& y_shape = ctx->InputShape("y", 0);
+  CHECK_EQ_OR_RETURN(ctx->InputShape("dy", 0), y_shape);
+  const Shape& weight_hh_shape = ctx->InputShape("weight_hh", 0);
+  *ctx->OutputShape("input_gates_grad", 0) =
+      Shape({y_shape.At(0), y_shape.At(1), weight_hh_shape.At(1)});
+  *ctx->OutputShape("hx_grad", 0) = ctx->InputShape("hx", 0);
+  *ctx->OutputShape("weight_hh_grad", 0) = weight_hh_shape;
+  if (ctx->has_output("bias_hh_grad", 0)) {
+    *ctx->OutputShape("bias_hh_grad", 0) = Shape({weight_hh_shape.At(1)});
+  }
+  if (ctx->has_output("cx_grad", 0)) {
+    CHECK_OR_RETURN(ctx->has_input("cx", 0));
+    *ctx->OutputShape("cx_grad", 0) = ctx->InputShape("cx", 0);
+  }
+  if (ctx->has_output("weight_hr_grad", 0)) {
+    CHECK_OR_RETURN(ctx->has_input("weight_hr", 0));
+    *ctx->OutputShape("weight_hr_grad", 0) = ctx->InputShape("weight_hr", 0);
+  }
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> FusedRnnSequenceGradOp::InferPhysicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+
+/* static */ Maybe<void> FusedRnnSequenceGradOp::GetSbp(user_op::SbpContext* ctx) {
+  auto builder = ctx->NewBuilder()
+                     .Split(user_op::OpArg("dy", 0), 1)
+                     .Split(user_op::OpArg("y", 0), 1)
+                     .Split(user_op::OpArg("reserve_space", 0), 1)
+                     .Split(user_op::OpArg("hx", 0), 0)
+                     .Broadcast(user_op::OpArg("weight_hh", 0))
+                     .Split(user_op::OpArg("input_gates_grad", 0), 1)
+                     .Split(user_op::OpArg("hx_grad", 0), 0)
+                     .PartialSum(user_op::OpArg("weight_hh_grad", 0));
+  const auto& op_conf = ctx->user_op_conf();
+  if (op_conf.has_input("cx", 0)) { builder.Split(user_op::OpArg("cx", 0), 0); }
+  if (op_conf.has_input("weight_hr", 0)) { builder.Broadcast(user_op::OpArg("weight_hr", 0)); }
+  if (op_conf.has_input("dcy", 0)) { builder.Split(user_op::OpArg("dcy", 0), 0); }
+  if (op_conf.has_output("bias_hh_grad", 0)) {
+    builder.PartialSum(user_op::OpArg("bias_hh_grad", 0));
+  }
+  if (op_conf.has_output("cx_grad", 0)) { builder.Split(user_op::OpArg("cx_grad", 0), 0); }
+  if (op_conf.has_output("weight_hr_grad", 0)) {
+    builder.PartialSum(user_op::OpArg("weight_hr_grad", 0));
+  }
+  builder.Build();
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> FusedRnnSequenceGradOp::InferDataType(user_op::InferContext* ctx) {
+  const DataType data_type = ctx->InputDType("dy", 0);
+  for (const auto& arg : ctx->inputs()) {
+    CHECK_EQ_OR_RETURN(ctx->InputDType(arg.first, arg.second), data_type);
+  }
+  for (const auto& arg : ctx->outputs()) { *ctx->OutputDType(arg.first, arg.second) = data_type; }
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> FusedRnnSequenceGradOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& op_conf) {
+  JUST(NumGates4Mode(op_conf.attr<std::string>("mode")));
+  return Maybe<void>::Ok();
+}
+
+REGISTER_USER_OP_GRAD("fused_rnn_sequence")
+    .SetGenBackwardOpConfFn([](const user_op::UserOpWrapper& op,
+                               const user_op::AddOpFn& AddOp) -> Maybe<void> {
+      const auto& op_conf = op.user_op_conf();
+      user_op::UserOpConfWrapperBuilder builder(op.op_name() + "_grad");
+      builder.Op("fused_rnn_sequence_grad")
+          .Input("dy", op.GetGradTensorWithOpOutput("y", 0))
+          .Input("y", op.output("y", 0))
+          .Input("reserve_space", op.output("reserve_space", 0))
+          .Input("hx", op.input("hx", 0))
+          .Input("weight_hh", op.input("weight_hh", 0))
+          .Output("input_gates_grad")
+          .Output("hx_grad")
+          .Output("weight_hh_grad")
+          .Attr<std::string>("mode", op.attr<std::string>("mode"))
+          .Attr<bool>("reverse", op.attr<bool>("reverse"));
+      if (op_conf.has_input("bias_hh", 0)) { builder.Output("bias_hh_grad"); }
+      if (op_conf.has_input("cx", 0)) {
+        builder.Input("cx", op.input("cx", 0)).Output("cx_grad");
+        if (op.HasGradTensor4OpOutput("cy", 0)) {
+          builder.Input("dcy", op.GetGradTensorWithOpOutput("cy", 0));
+        }
+      }
+      if (op_conf.has_input("weight_hr", 0)) {
+        builder.Input("weight_hr", op.input("weight_hr", 0)).Output("weight_hr_grad");
+      }
+      auto grad_op = builder.Build();
+      AddOp(grad_op);
+
+      const auto BindGrad = [&](const std::string& input_name, const std::string& grad_name) {
+        if (op_conf.has_input(input_name, 0) && op.NeedGenGradTensor4OpInput(input_name, 0)) {
+          op.BindGradTensorWithOpInput(grad_op.output(grad_name, 0), input_name, 0);
+        }
+      };
+      BindGrad("input_gates", "input_gates_grad");
+      BindGrad("hx", "hx_grad");
+      BindGrad("weight_hh", "weight_hh_grad");
+      BindGrad("bias_hh", "bias_hh_grad");
+      BindGrad("cx", "cx_grad");
+      BindGrad("weight_hr", "weight_hr_grad");
+      return Maybe<void>::Ok();
+    });
+
+}  // namespace oneflow
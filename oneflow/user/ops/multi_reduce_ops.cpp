@@ -0,0 +1,170 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/framework/op_generated.h"
+
+namespace oneflow {
+
+namespace {
+
+int64_t MinNumAxes4Inputs(user_op::SbpContext* ctx, const std::string& arg_name) {
+  int64_t min_num_axes = ctx->LogicalTensorDesc4InputArgNameAndIndex(arg_name, 0).shape().NumAxes();
+  for (int64_t i = 1; i < ctx->user_op_conf().input_size(arg_name); ++i) {
+    min_num_axes = std::min(
+        min_num_axes, ctx->LogicalTensorDesc4InputArgNameAndIndex(arg_name, i).shape().NumAxes());
+  }
+  return min_num_axes;
+}
+
+std::vector<std::pair<std::string, int32_t>> OpArgs4Input(user_op::SbpContext* ctx,
+                                                          const std::string& arg_name) {
+  std::vector<std::pair<std::string, int32_t>> op_args;
+  for (int32_t i = 0; i < ctx->user_op_conf().input_size(arg_name); ++i) {
+    op_args.emplace_back(arg_name, i);
+  }
+  return op_args;
+}
+
+Maybe<void> InferMultiReduceTensorDesc(user_op::InferContext* ctx) {
+  *ctx->OutputShape("y", 0) = Shape({});
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> InferMultiReduceDataType(user_op::InferContext* ctx) {
+  const DataType data_type = ctx->InputDType("x", 0);
+  for (int64_t i = 1; i < ctx->input_size("x"); ++i) {
+    CHECK_EQ_OR_RETURN(ctx->InputDType("x", i), data_type);
+  }
+  *ctx->OutputDType("y", 0) = data_type;
+  return Maybe<void>::Ok();
+}
+
+// Partial maxima/minima of split inputs cannot be expressed as an sbp, so inputs are broadcast.
+Maybe<void> GetMultiReduceMaxMinSbp(user_op::SbpContext* ctx) {
+  ctx->NewBuilder().Broadcast(ctx->inputs()).Broadcast(user_op::OpArg("y", 0)).Build();
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> CheckMultiReduceAttr(const user_op::UserOpConfWrapper& op_conf) {
+  CHECK_OR_RETURN(op_conf.input_size("x") >= 1);
+  return Maybe<void>::Ok();
+}
+
+}  // namespace
+
+/*static*/ Maybe<void> MultiReduceSumPowAbsOp::GetSbp(user_op::SbpContext* ctx) {
+  // sum(|x|^p) over the shards of split inputs adds up to the sum over the whole inputs.
+  for (int64_t i = 0; i < MinNumAxes4Inputs(ctx, "x"); ++i) {
+    ctx->NewBuilder().Split(ctx->inputs(), i).PartialSum(user_op::OpArg("y", 0)).Build();
+  }
+  ctx->NewBuilder().Broadcast(ctx->inputs()).Broadcast(user_op::OpArg("y", 0)).Build();
+  return Maybe<void>::Ok();
+}
+/*static*/ Maybe<void> MultiReduceSumPowAbsOp::InferLogicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferMultiReduceTensorDesc(ctx);
+}
+/*static*/ Maybe<void> MultiReduceSumPowAbsOp::InferPhysicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+/*static*/ Maybe<void> MultiReduceSumPowAbsOp::InferDataType(user_op::InferContext* ctx) {
+  return InferMultiReduceDataType(ctx);
+}
+/*static*/ Maybe<void> MultiReduceSumPowAbsOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& op_conf) {
+  return CheckMultiReduceAttr(op_conf);
+}
+
+/*static*/ Maybe<void> MultiReduceMaxAbsOp::GetSbp(user_op::SbpContext* ctx) {
+  return GetMultiReduceMaxMinSbp(ctx);
+}
+/*static*/ Maybe<void> MultiReduceMaxAbsOp::InferLogicalTensorDesc(user_op::InferContext* ctx) {
+  return InferMultiReduceTensorDesc(ctx);
+}
+/*static*/ Maybe<void> MultiReduceMaxAbsOp::InferPhysicalTensorDesc(user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+/*static*/ Maybe<void> MultiReduceMaxAbsOp::InferDataType(user_op::InferContext* ctx) {
+  return InferMultiReduceDataType(ctx);
+}
+/*static*/ Maybe<void> MultiReduceMaxAbsOp::CheckAttr(const user_op::UserOpDefWrapper&,
+                                                      const user_op::UserOpConfWrapper& op_conf) {
+  return CheckMultiReduceAttr(op_conf);
+}
+
+/*static*/ Maybe<void> MultiReduceMinAbsOp::GetSbp(user_op::SbpContext* ctx) {
+  return GetMultiReduceMaxMinSbp(ctx);
+}
+/*static*/ Maybe<void> MultiReduceMinAbsOp::InferLogicalTensorDesc(user_op::InferContext* ctx) {
+  return InferMultiReduceTensorDesc(ctx);
+}
+/*static*/ Maybe<void> MultiReduceMinAbsOp::InferPhysicalTensorDesc(user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+/*static*/ Maybe<void> MultiReduceMinAbsOp::InferDataType(user_op::InferContext* ctx) {
+  return InferMultiReduceDataType(ctx);
+}
+/*static*/ Maybe<void> MultiReduceMinAbsOp::CheckAttr(const user_op::UserOpDefWrapper&,
+                                                      const user_op::UserOpConfWrapper& op_conf) {
+  return CheckMultiReduceAttr(op_conf);
+}
+
+/*static*/ Maybe<void> MultiTensorClipByNormOp::GetSbp(user_op::SbpContext* ctx) {
+  // Scaling is elementwise, so x keeps any uniform sbp as long as the norm is broadcast.
+  const std::vector<std::pair<std::string, int32_t>> x_args = OpArgs4Input(ctx, "x");
+  const user_op::OpArg total_norm_arg("total_norm", 0);
+  for (int64_t i = 0; i < MinNumAxes4Inputs(ctx, "x"); ++i) {
+    ctx->NewBuilder().Split(x_args, i).Broadcast(total_norm_arg).Build();
+  }
+  ctx->NewBuilder().PartialSum(x_args).Broadcast(total_norm_arg).Build();
+  ctx->NewBuilder().Broadcast(ctx->inputs()).Build();
+  return Maybe<void>::Ok();
+}
+/*static*/ Maybe<void> MultiTensorClipByNormOp::InferLogicalTensorDesc(
+    user_op::InferContext* ctx) {
+  CHECK_EQ_OR_RETURN(ctx->InputShape("total_norm", 0).elem_cnt(), 1);
+  return Maybe<void>::Ok();
+}
+/*static*/ Maybe<void> MultiTensorClipByNormOp::InferPhysicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+/*static*/ Maybe<void> MultiTensorClipByNormOp::InferDataType(user_op::InferContext* ctx) {
+  const DataType data_type = ctx->InputDType("x", 0);
+  for (int64_t i = 1; i < ctx->input_size("x"); ++i) {
+    CHECK_EQ_OR_RETURN(ctx->InputDType("x", i), data_type);
+  }
+  CHECK_EQ_OR_RETURN(ctx->InputDType("total_norm", 0), data_type);
+  return Maybe<void>::Ok();
+}
+/*static*/ Maybe<void> MultiTensorClipByNormOp::ModifyInputArg(
+    const GetInputArgModifier& GetInputArgModifierFn, const user_op::UserOpConfWrapper& conf) {
+  for (int32_t i = 0; i < conf.input_size("x"); ++i) {
+    user_op::InputArgModifier* x_modifier = GetInputArgModifierFn("x", i);
+    CHECK_NOTNULL_OR_RETURN(x_modifier);
+    x_modifier->set_is_mutable(true);
+  }
+  return Maybe<void>::Ok();
+}
+/*static*/ Maybe<void> MultiTensorClipByNormOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& op_conf) {
+  CHECK_OR_RETURN(op_conf.input_size("x") >= 1);
+  CHECK_GE_OR_RETURN(op_conf.attr<float>("max_norm"), 0);
+  return Maybe<void>::Ok();
+}
+
+}  // namespace oneflow
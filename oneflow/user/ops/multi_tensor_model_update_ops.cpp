@@ -0,0 +1,212 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/framework/infer_util.h"
+#include "oneflow/core/framework/user_op_conf.h"
+#include "oneflow/core/framework/user_op_registry.h"
+#include "oneflow/core/framework/op_generated.h"
+
+namespace oneflow {
+
+namespace {
+
+Maybe<void> CheckScalarShape(const user_op::TensorDesc* tensor_desc) {
+  CHECK_EQ_OR_RETURN(tensor_desc->shape(), Shape({1}));
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> CheckScalarDataType(const user_op::TensorDesc* tensor_desc, const DataType data_type) {
+  CHECK_EQ_OR_RETURN(tensor_desc->data_type(), data_type);
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> CheckOptionalScalarInputs(user_op::InferContext* ctx) {
+  for (const std::string& arg_name :
+       {"learning_rate", "scale_by_tensor", "skip_if", "bias_correction1", "bias_correction2"}) {
+    if (ctx->has_input(arg_name, 0)) {
+      const user_op::TensorDesc& scalar = ctx->InputTensorDesc(arg_name, 0);
+      JUST(CheckScalarShape(&scalar));
+    }
+  }
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> CheckOptionalScalarDataTypes(user_op::InferContext* ctx) {
+  const user_op::TensorDesc& model = ctx->InputTensorDesc("model", 0);
+  for (const std::string& arg_name : {"learning_rate", "bias_correction1", "bias_correction2"}) {
+    if (ctx->has_input(arg_name, 0)) {
+      const user_op::TensorDesc& scalar = ctx->InputTensorDesc(arg_name, 0);
+      JUST(CheckScalarDataType(&scalar, DataType::kFloat));
+    }
+  }
+  if (ctx->has_input("scale_by_tensor", 0)) {
+    const user_op::TensorDesc& scale_by_tensor = ctx->InputTensorDesc("scale_by_tensor", 0);
+    JUST(CheckScalarDataType(&scale_by_tensor, model.data_type()));
+  }
+  return Maybe<void>::Ok();
+}
+
+// Every state arg (e.g. "m", "v", "momentum") holds one tensor per model and must match it.
+Maybe<void> InferMultiTensorUpdateTensorDesc(user_op::InferContext* ctx,
+                                             const std::vector<std::string>& state_arg_names) {
+  const int64_t num_model = ctx->input_size("model");
+  CHECK_EQ_OR_RETURN(ctx->input_size("model_diff"), num_model);
+  for (const std::string& arg_name : state_arg_names) {
+    CHECK_EQ_OR_RETURN(ctx->input_size(arg_name), num_model);
+  }
+  for (int64_t i = 0; i < num_model; ++i) {
+    const user_op::TensorDesc& model = ctx->InputTensorDesc("model", i);
+    const user_op::TensorDesc& model_diff = ctx->InputTensorDesc("model_diff", i);
+    CHECK_EQ_OR_RETURN(model_diff.shape(), model.shape());
+    for (const std::string& arg_name : state_arg_names) {
+      CHECK_EQ_OR_RETURN(ctx->InputTensorDesc(arg_name, i).shape(), model.shape());
+    }
+  }
+  return CheckOptionalScalarInputs(ctx);
+}
+
+Maybe<void> InferMultiTensorUpdateDataType(user_op::InferContext* ctx,
+                                           const std::vector<std::string>& state_arg_names) {
+  const DataType model_data_type = ctx->InputTensorDesc("model", 0).data_type();
+  const DataType model_diff_data_type = ctx->InputTensorDesc("model_diff", 0).data_type();
+  for (int64_t i = 0; i < ctx->input_size("model"); ++i) {
+    CHECK_EQ_OR_RETURN(ctx->InputTensorDesc("model", i).data_type(), model_data_type);
+    CHECK_EQ_OR_RETURN(ctx->InputTensorDesc("model_diff", i).data_type(), model_diff_data_type);
+    for (const std::string& arg_name : state_arg_names) {
+      CHECK_EQ_OR_RETURN(ctx->InputTensorDesc(arg_name, i).data_type(), model_data_type);
+    }
+  }
+  return CheckOptionalScalarDataTypes(ctx);
+}
+
+// Models in one launch generally have different shapes, so only broadcast is a safe signature.
+Maybe<void> GetMultiTensorUpdateSbp(user_op::SbpContext* ctx) {
+  ctx->NewBuilder().Broadcast(ctx->inputs()).Build();
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> SetInputArgModifierMutable(const user_op::GetInputArgModifier& GetInputArgModifierFn,
+                                       const std::string& arg_name, int32_t arg_index) {
+  user_op::InputArgModifier* arg_modifier = GetInputArgModifierFn(arg_name, arg_index);
+  CHECK_NOTNULL_OR_RETURN(arg_modifier);
+  arg_modifier->set_is_mutable(true);
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> MultiTensorInputArgModifyFn(const user_op::GetInputArgModifier& GetInputArgModifierFn,
+                                        const user_op::UserOpConfWrapper& conf,
+                                        const std::vector<std::string>& state_arg_names) {
+  for (int32_t i = 0; i < conf.input_size("model"); ++i) {
+    JUST(SetInputArgModifierMutable(GetInputArgModifierFn, "model", i));
+    for (const std::string& arg_name : state_arg_names) {
+      JUST(SetInputArgModifierMutable(GetInputArgModifierFn, arg_name, i));
+    }
+  }
+  return Maybe<void>::Ok();
+}
+
+}  // namespace
+
+/* static */ Maybe<void> MultiTensorSgdUpdateOp::InferLogicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferMultiTensorUpdateTensorDesc(ctx, {});
+}
+
+/*static*/ Maybe<void> MultiTensorSgdUpdateOp::InferPhysicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorSgdUpdateOp::GetSbp(user_op::SbpContext* ctx) {
+  return GetMultiTensorUpdateSbp(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorSgdUpdateOp::ModifyInputArg(
+    const GetInputArgModifier& GetInputArgModifierFn, const user_op::UserOpConfWrapper& conf) {
+  return MultiTensorInputArgModifyFn(GetInputArgModifierFn, conf, {});
+}
+
+/* static */ Maybe<void> MultiTensorSgdUpdateOp::InferDataType(user_op::InferContext* ctx) {
+  return InferMultiTensorUpdateDataType(ctx, {});
+}
+
+/*static*/ Maybe<void> MultiTensorSgdUpdateOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& op_conf) {
+  CHECK_OR_RETURN(op_conf.input_size("model") >= 1);
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> MultiTensorMomentumUpdateOp::InferLogicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferMultiTensorUpdateTensorDesc(ctx, {"momentum"});
+}
+
+/*static*/ Maybe<void> MultiTensorMomentumUpdateOp::InferPhysicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorMomentumUpdateOp::GetSbp(user_op::SbpContext* ctx) {
+  return GetMultiTensorUpdateSbp(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorMomentumUpdateOp::ModifyInputArg(
+    const GetInputArgModifier& GetInputArgModifierFn, const user_op::UserOpConfWrapper& conf) {
+  return MultiTensorInputArgModifyFn(GetInputArgModifierFn, conf, {"momentum"});
+}
+
+/* static */ Maybe<void> MultiTensorMomentumUpdateOp::InferDataType(user_op::InferContext* ctx) {
+  return InferMultiTensorUpdateDataType(ctx, {"momentum"});
+}
+
+/*static*/ Maybe<void> MultiTensorMomentumUpdateOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& op_conf) {
+  CHECK_OR_RETURN(op_conf.input_size("model") >= 1);
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> MultiTensorAdamUpdateOp::InferLogicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferMultiTensorUpdateTensorDesc(ctx, {"m", "v"});
+}
+
+/*static*/ Maybe<void> MultiTensorAdamUpdateOp::InferPhysicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorAdamUpdateOp::GetSbp(user_op::SbpContext* ctx) {
+  return GetMultiTensorUpdateSbp(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorAdamUpdateOp::ModifyInputArg(
+    const GetInputArgModifier& GetInputArgModifierFn, const user_op::UserOpConfWrapper& conf) {
+  return MultiTensorInputArgModifyFn(GetInputArgModifierFn, conf, {"m", "v"});
+}
+
+/* static */ Maybe<void> MultiTensorAdamUpdateOp::InferDataType(user_op::InferContext* ctx) {
+  return InferMultiTensorUpdateDataType(ctx, {"m", "v"});
+}
+
+/*static*/ Maybe<void> MultiTensorAdamUpdateOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& op_conf) {
+  CHECK_OR_RETURN(op_conf.input_size("model") >= 1);
+  CHECK_OR_RETURN(!op_conf.attr<bool>("amsgrad"))
+      << "multi_tensor_adam_update does not support amsgrad";
+  return Maybe<void>::Ok();
+}
+
+}  // namespace oneflow
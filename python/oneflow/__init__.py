@@ -395,6 +395,8 @@ import oneflow.utils.data
 import oneflow.comm
 import oneflow.framework.docstr as docstr
 import oneflow.cuda
+import oneflow.cpu
+import oneflow.profiler
 import oneflow.multiprocessing
 import oneflow.one_embedding
 
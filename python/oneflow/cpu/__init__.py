@@ -0,0 +1,82 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import oneflow as flow
+
+
+def memory_stats() -> dict:
+    r"""Returns statistics of the caching allocator used by eager CPU tensors.
+
+    The dict has the following keys:
+
+    - ``allocated_bytes``: bytes held by live tensors.
+    - ``peak_allocated_bytes``: maximum of ``allocated_bytes`` since startup or the last
+      :func:`reset_peak_memory_stats`.
+    - ``cached_bytes``: bytes of freed blocks kept for reuse.
+    - ``reserved_bytes``: ``allocated_bytes`` + ``cached_bytes``.
+    - ``num_allocs``, ``num_cache_hits``: allocation requests and how many of them
+      were served from the cache.
+    - ``num_system_allocs``, ``num_system_frees``: calls to the system allocator.
+
+    Block sizes are rounded up, so the bytes are larger than the sum of tensor sizes.
+    """
+    return flow._oneflow_internal.GetCpuAllocatorStats()
+
+
+def memory_allocated() -> int:
+    r"""Returns the bytes of host memory held by eager CPU tensors."""
+    return memory_stats()["allocated_bytes"]
+
+
+def memory_reserved() -> int:
+    r"""Returns the bytes of host memory held by the CPU caching allocator."""
+    return memory_stats()["reserved_bytes"]
+
+
+def max_memory_allocated() -> int:
+    r"""Returns the peak bytes of host memory held by eager CPU tensors."""
+    return memory_stats()["peak_allocated_bytes"]
+
+
+def reset_peak_memory_stats() -> None:
+    r"""Resets the peak of :func:`max_memory_allocated` to the allocated bytes."""
+    flow._oneflow_internal.ResetCpuAllocatorPeakStats()
+
+
+def empty_cache() -> None:
+    r"""Returns all host memory cached by the CPU caching allocator to the system.
+
+    Memory held by live tensors is not affected.
+    """
+    flow._oneflow_internal.EmptyCpuAllocatorCache()
+
+
+def set_cache_limit(limit_bytes: int) -> None:
+    r"""Sets the maximum bytes of freed host memory kept for reuse.
+
+    Freed blocks beyond the limit are returned to the system, 0 disables the cache.
+    The default is taken from the ``ONEFLOW_CPU_ALLOCATOR_CACHE_LIMIT_MB`` environment
+    variable, 1024 MiB when it is not set.
+
+    Args:
+        limit_bytes (int): the cache limit in bytes.
+    """
+    assert limit_bytes >= 0
+    flow._oneflow_internal.SetCpuAllocatorCacheLimit(int(limit_bytes))
+
+
+def get_cache_limit() -> int:
+    r"""Returns the maximum bytes of freed host memory kept for reuse."""
+    return flow._oneflow_internal.GetCpuAllocatorCacheLimit()
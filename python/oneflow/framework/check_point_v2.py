@@ -13,12 +13,15 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
 import os
+import threading
 import warnings
 from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
 import pickle
+import pickletools
 
 import numpy as np
 from google.protobuf import text_format
@@ -38,6 +41,7 @@ META_INFO_FILENAME = "meta"
 PICKLE_FILENAME = "pickled_data"
 DATA_FILENAME = "out"
 PROTOCOL_VERSION = 1
+DEFAULT_NUM_IO_THREADS = min(8, os.cpu_count() or 1)
 
 
 class FileBackendVariableBlob:
@@ -95,44 +99,111 @@ class FileBackendVariableBlob:
     def dtype(self) -> oneflow.dtype:
         return self.dtype_
 
-    def numpy(self) -> np.ndarray:
+    def numpy(self, mmap: bool = False) -> np.ndarray:
         if not self.has_meta_info_:
             raise RuntimeError("This variable does not have meta info")
-        return np.fromfile(
-            self.file_path,
-            dtype=dtype_util.convert_oneflow_dtype_to_numpy_dtype(self.dtype),
-        ).reshape(self.shape)
+        dtype = dtype_util.convert_oneflow_dtype_to_numpy_dtype(self.dtype)
+        if mmap and os.path.getsize(self.file_path) > 0:
+            # Copy-on-write mapping: pages are read from the file on first access and
+            # writes never reach the checkpoint.
+            return np.memmap(self.file_path, dtype=dtype, mode="c", shape=self.shape)
+        return np.fromfile(self.file_path, dtype=dtype).reshape(self.shape)
 
 
-def _save_tensor_to_disk(tensor: "oneflow.Tensor", dir_name: Union[str, Path]) -> None:
+def _write_tensor_data(
+    data: np.ndarray, meta_info_str: str, dir_name: Union[str, Path]
+) -> None:
     os.makedirs(dir_name, exist_ok=True)
+    data_path = os.path.join(dir_name, DATA_FILENAME)
+    # The file may back tensors loaded with mmap=True, truncating it in place would
+    # make their next access fault. The new data is written to another file that
+    # replaces it, the old inode lives on as long as it is mapped.
+    tmp_path = f"{data_path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, "wb") as f:
+        # tofile writes straight from the array memory, unlike tobytes() which makes
+        # another full host copy first.
+        np.ascontiguousarray(data).tofile(f)
+    os.replace(tmp_path, data_path)
+
+    with open(os.path.join(dir_name, META_INFO_FILENAME), "w") as f:
+        f.write(meta_info_str)
+
+
+def _save_tensor_task(
+    tensor: "oneflow.Tensor", dir_name: Union[str, Path], snapshot: bool = False
+) -> Callable[[], None]:
+    """Fetches the data of ``tensor`` on the calling thread and returns a callable
+    that writes it to ``dir_name`` and can run on an I/O thread. With ``snapshot``
+    the data is copied so that later in-place updates of ``tensor`` are not saved.
+    """
     meta_info = variable_meta_info_pb.VariableMetaInfo()
     meta_info.shape.dim[:] = tensor.shape
     meta_info.data_type = oneflow._oneflow_internal.deprecated.GetProtoDtype4OfDtype(
         tensor.dtype
     )
-    data_path = os.path.join(dir_name, DATA_FILENAME)
-    with open(data_path, "wb") as f:
-        f.write(tensor.numpy().tobytes())
+    data = tensor.numpy()
+    if snapshot and tensor.is_local and not tensor.is_cuda:
+        # numpy() of a local cpu tensor shares its memory.
+        data = np.array(data)
+    meta_info_str = text_format.MessageToString(meta_info)
+    return lambda: _write_tensor_data(data, meta_info_str, dir_name)
 
-    with open(os.path.join(dir_name, META_INFO_FILENAME), "w") as f:
-        f.write(text_format.MessageToString(meta_info))
+
+def _save_tensor_to_disk(tensor: "oneflow.Tensor", dir_name: Union[str, Path]) -> None:
+    _save_tensor_task(tensor, dir_name)()
+
+
+def _run_io_tasks(
+    tasks: Sequence[Callable[[], Any]],
+    num_io_threads: int,
+    finalize: Optional[Callable[[], None]] = None,
+) -> List[Any]:
+    if num_io_threads <= 1 or len(tasks) <= 1:
+        results = [task() for task in tasks]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=num_io_threads, thread_name_prefix="oneflow_checkpoint_io"
+        ) as executor:
+            futures = [executor.submit(task) for task in tasks]
+            results = [future.result() for future in futures]
+    if finalize is not None:
+        finalize()
+    return results
+
+
+_async_save_executor = None
+_async_save_executor_lock = threading.Lock()
+
+
+def _submit_async_save(*args) -> Future:
+    # A single background thread runs the asynchronous saves one after another, so
+    # that at most one save at a time holds its I/O threads.
+    global _async_save_executor
+    with _async_save_executor_lock:
+        if _async_save_executor is None:
+            _async_save_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="oneflow_async_save"
+            )
+    return _async_save_executor.submit(_run_io_tasks, *args)
 
 
 ValueContainer = Union[FileBackendVariableBlob, np.ndarray, "oneflow.Tensor"]
 
 
 def _LoadSingleVariable(
-    path: Optional[str], global_src_rank: Optional[int] = None
+    path: Optional[str], global_src_rank: Optional[int] = None, mmap: bool = False
 ) -> "flow.Tensor":
     if global_src_rank is not None:
         rank = flow.env.get_rank()
         if rank == global_src_rank:
             assert isinstance(path, str)
             file_backed_blob = FileBackendVariableBlob(path)
-            loaded = flow.tensor(
-                file_backed_blob.numpy(), dtype=file_backed_blob.dtype
-            ).to("cuda")
+            if mmap:
+                loaded = flow.from_numpy(file_backed_blob.numpy(mmap=True)).to("cuda")
+            else:
+                loaded = flow.tensor(
+                    file_backed_blob.numpy(), dtype=file_backed_blob.dtype
+                ).to("cuda")
         else:
             loaded = flow.tensor([]).to("cuda")
         loaded = loaded.to_global(
@@ -141,9 +212,164 @@ def _LoadSingleVariable(
         return loaded
 
     assert isinstance(path, str)
+    if mmap:
+        # The tensor shares memory with the mapping, so only the pages that are
+        # actually read get loaded.
+        return flow.from_numpy(FileBackendVariableBlob(path).numpy(mmap=True))
     return flow.tensor(FileBackendVariableBlob(path).numpy())
 
 
+def _balanced_range(total: int, num_parts: int, index: int) -> Tuple[int, int]:
+    # Same partition as BalancedSplitter: the first `total % num_parts` parts are
+    # one element larger.
+    base, remainder = divmod(total, num_parts)
+    begin = base * index + min(index, remainder)
+    return begin, begin + base + (1 if index < remainder else 0)
+
+
+def _split_axis(sbp: "flow.sbp.sbp", ndim: int) -> Optional[int]:
+    for axis in range(ndim):
+        if sbp == flow.sbp.split(axis):
+            return axis
+    return None
+
+
+def _shard_regions(
+    shape: Sequence[int],
+    placement: "flow.placement",
+    sbp: Sequence["flow.sbp.sbp"],
+    unique: bool = False,
+) -> Dict[int, List[Tuple[int, int]]]:
+    """Returns the region of the global tensor held by each rank of ``placement``
+    as a ``[begin, end)`` pair per tensor axis. With ``unique`` only one of the
+    ranks holding the same region (the first one along broadcast axes of the
+    placement) is returned.
+    """
+    ranks = np.asarray(placement.ranks)
+    split_axes = [_split_axis(s, len(shape)) for s in sbp]
+    regions = {}
+    for coord in np.ndindex(*ranks.shape):
+        if unique and any(
+            split_axis is None and index != 0
+            for split_axis, index in zip(split_axes, coord)
+        ):
+            continue
+        region = [(0, dim) for dim in shape]
+        for hierarchy_axis, split_axis in enumerate(split_axes):
+            if split_axis is None:
+                continue
+            begin, end = region[split_axis]
+            part_begin, part_end = _balanced_range(
+                end - begin, ranks.shape[hierarchy_axis], coord[hierarchy_axis]
+            )
+            region[split_axis] = (begin + part_begin, begin + part_end)
+        regions[int(ranks[coord])] = region
+    return regions
+
+
+def _shard_dir_name(rank: int) -> str:
+    return f"rank_{rank}"
+
+
+def _save_global_tensor_shard(tensor: "flow.Tensor") -> Dict[str, Any]:
+    # Partial values are reduced first, after that every shard is a plain slice of
+    # the global tensor.
+    sbp = tuple(
+        flow.sbp.broadcast if s == flow.sbp.partial_sum else s for s in tensor.sbp
+    )
+    if sbp != tuple(tensor.sbp):
+        tensor = tensor.to_global(sbp=sbp)
+    rel_dir_name = f"global_tensor_{tensor.global_id()}"
+    shards = _shard_regions(tensor.shape, tensor.placement, sbp, unique=True)
+    rank = flow.env.get_rank()
+    if rank in shards:
+        pending_save_tasks.append(
+            _save_tensor_task(
+                tensor.to_local(),
+                save_load_path / rel_dir_name / _shard_dir_name(rank),
+                snapshot=save_snapshot,
+            )
+        )
+    return {
+        "path": rel_dir_name,
+        "shape": tuple(tensor.shape),
+        "dtype": tensor.dtype,
+        "placement": tensor.placement,
+        "sbp": sbp,
+        "shards": shards,
+        "world_size": flow.env.get_world_size(),
+    }
+
+
+def _read_region(
+    var_dir: Union[str, Path],
+    shards: Dict[int, List[Tuple[int, int]]],
+    region: List[Tuple[int, int]],
+    dtype: "flow.dtype",
+) -> np.ndarray:
+    """Assembles ``region`` of a sharded global tensor from the shard files that
+    overlap it. The shards are memory mapped, so only the needed slices are read.
+    """
+    out = np.empty(
+        [end - begin for begin, end in region],
+        dtype=dtype_util.convert_oneflow_dtype_to_numpy_dtype(dtype),
+    )
+    for rank, shard_region in shards.items():
+        overlap = [
+            (max(begin, shard_begin), min(end, shard_end))
+            for (begin, end), (shard_begin, shard_end) in zip(region, shard_region)
+        ]
+        if any(begin >= end for begin, end in overlap):
+            continue
+        shard = FileBackendVariableBlob(
+            os.path.join(var_dir, _shard_dir_name(rank))
+        ).numpy(mmap=True)
+        out[
+            tuple(slice(b - rb, e - rb) for (b, e), (rb, _) in zip(overlap, region))
+        ] = shard[
+            tuple(
+                slice(b - sb, e - sb) for (b, e), (sb, _) in zip(overlap, shard_region)
+            )
+        ]
+    return out
+
+
+def _load_global_tensor_shards(
+    var_dir: Union[str, Path], state: Dict[str, Any]
+) -> "flow.Tensor":
+    placement, sbp = state["placement"], state["sbp"]
+    world_size = flow.env.get_world_size()
+    # The first split axis of the saved layout, or broadcast if there is none.
+    split = next(
+        (s for s in sbp if _split_axis(s, len(state["shape"])) is not None),
+        flow.sbp.broadcast,
+    )
+    if state["world_size"] != world_size:
+        # Resharding: the tensor is spread over all current ranks.
+        placement = flow.placement(placement.type, list(range(world_size)))
+        sbp = (split,)
+    target_placement, target_sbp = placement, sbp
+    if len(sbp) > 1:
+        # The logical shape of an n-D sbp is inferred by multiplying the local shape,
+        # which is wrong for uneven shards. Under a 1-D sbp the local shapes are
+        # gathered instead, so the tensor is built on the flattened placement first.
+        placement = flow.placement(
+            placement.type, np.asarray(placement.ranks).flatten().tolist()
+        )
+        sbp = (split,)
+    region = _shard_regions(state["shape"], placement, sbp).get(flow.env.get_rank())
+    if region is None:
+        local = flow.tensor([], dtype=state["dtype"])
+    else:
+        local = flow.from_numpy(
+            _read_region(var_dir, state["shards"], region, state["dtype"])
+        )
+    tensor = local.to_global(placement=placement, sbp=sbp)
+    if placement != target_placement:
+        tensor = tensor.to_global(placement=target_placement, sbp=target_sbp)
+    return tensor
+
+
 def _broadcast_py_object(obj, src: int = 0):
     rank = flow.env.get_rank()
     if src == rank:
@@ -161,6 +387,8 @@ def tensor_getstate(self):
         # save_load_path is not None means setstate/getstate is called inside
         # flow.save or flow.load
         assert isinstance(save_load_path, Path)
+        if save_sharded and not self.is_local:
+            return _save_global_tensor_shard(self)
         if global_src_dsk_rank is None:
             assert self.is_local
             rel_dir_name = id_util.UniqueStr("tensor_")
@@ -176,8 +404,15 @@ def tensor_getstate(self):
                 sbp=flow.sbp.broadcast,
                 placement=flow.placement("cpu", [global_src_dsk_rank]),
             ).to_local()
-        if global_src_dsk_rank is None or global_src_dsk_rank == flow.env.get_rank():
-            _save_tensor_to_disk(tensor, abs_dir_name)
+        if save_sharded:
+            # Only the pickled data of rank 0 is written, so are its local tensors.
+            write_rank = 0
+        else:
+            write_rank = global_src_dsk_rank
+        if write_rank is None or write_rank == flow.env.get_rank():
+            pending_save_tasks.append(
+                _save_tensor_task(tensor, abs_dir_name, snapshot=save_snapshot)
+            )
 
         return {"path": rel_dir_name}
     else:
@@ -203,7 +438,15 @@ def tensor_setstate(self, pickle_dict):
         assert isinstance(save_load_path, Path)
         rel_dir_name = pickle_dict["path"]
         abs_dir_name = save_load_path / rel_dir_name
-        self.__init__(_LoadSingleVariable(str(abs_dir_name), global_src_dsk_rank))
+        if "shards" in pickle_dict:
+            self.__init__(_load_global_tensor_shards(abs_dir_name, pickle_dict))
+            return
+        if rel_dir_name in prefetched_arrays:
+            self.__init__(flow.from_numpy(prefetched_arrays.pop(rel_dir_name)))
+            return
+        self.__init__(
+            _LoadSingleVariable(str(abs_dir_name), global_src_dsk_rank, load_mmap)
+        )
     else:
         if "placement" in pickle_dict:
             return self.__init__(
@@ -242,8 +485,41 @@ def RegisterMethods():
     flow._oneflow_internal.placement.__setstate__ = placement_setstate
 
 
+def _read_variable(var_dir: str) -> Optional[np.ndarray]:
+    try:
+        return FileBackendVariableBlob(var_dir).numpy()
+    except FileNotFoundError:
+        return None
+
+
+def _prefetch_variables(
+    var_dirs: Sequence[str], num_io_threads: int
+) -> List[Optional[np.ndarray]]:
+    """Reads the data of ``var_dirs`` on ``num_io_threads`` threads. Tensors are then
+    created from the arrays without another copy."""
+    return _run_io_tasks(
+        [lambda var_dir=var_dir: _read_variable(var_dir) for var_dir in var_dirs],
+        num_io_threads,
+    )
+
+
+def _referenced_var_names(pickle_bytes: bytes, path: Path) -> List[str]:
+    """Returns the variable directories of ``path`` that the pickled data refers
+    to. Tensors are pickled with the name of their directory, so every string in
+    the pickle naming a directory that holds tensor data is a candidate."""
+    names = {
+        arg
+        for _, arg, _ in pickletools.genops(pickle_bytes)
+        if isinstance(arg, str) and arg and os.sep not in arg
+    }
+    return sorted(name for name in names if (path / name / DATA_FILENAME).is_file())
+
+
 def legacy_load(
-    path: Union[str, Path], global_src_rank: Optional[int] = None,
+    path: Union[str, Path],
+    global_src_rank: Optional[int] = None,
+    mmap: bool = False,
+    num_io_threads: Optional[int] = None,
 ) -> Dict[str, "flow.Tensor"]:
     assert os.path.isdir(path), "Directory {} doesn't exist!".format(path)
     rank = flow.env.get_rank()
@@ -256,10 +532,24 @@ def legacy_load(
             _broadcast_py_object(all_files, global_src_rank)
     else:
         all_files = _broadcast_py_object(None, global_src_rank)
+    if global_src_rank is None and not mmap:
+        var_dirs = [os.path.join(path, f) for f in all_files]
+        arrays = _prefetch_variables(
+            var_dirs, num_io_threads or DEFAULT_NUM_IO_THREADS
+        )
+        for f, var_dir, array in zip(all_files, var_dirs, arrays):
+            if array is None:
+                warnings.warn(
+                    f"'{var_dir}' does not have valid tensor data. Please check it if it is unexpected.",
+                    stacklevel=2,
+                )
+            else:
+                var_dict[f] = flow.from_numpy(array)
+        return var_dict
     for f in all_files:
         var_dir = os.path.join(path, f)
         try:
-            var_dict[f] = _LoadSingleVariable(var_dir, global_src_rank)
+            var_dict[f] = _LoadSingleVariable(var_dir, global_src_rank, mmap)
         except FileNotFoundError:
             warnings.warn(
                 f"'{var_dir}' does not have valid tensor data. Please check it if it is unexpected.",
@@ -269,19 +559,46 @@ def legacy_load(
 
 
 @contextmanager
-def tensor_pickling_context(path: Path, global_src_dst_rank: int):
+def tensor_pickling_context(
+    path: Path,
+    global_src_dst_rank: int,
+    mmap: bool = False,
+    snapshot: bool = False,
+    prefetched: Optional[Dict[str, np.ndarray]] = None,
+    sharded: bool = False,
+):
     global save_load_path
     global global_src_dsk_rank
+    global load_mmap
+    global save_snapshot
+    global pending_save_tasks
+    global prefetched_arrays
+    global save_sharded
     global_src_dsk_rank = global_src_dst_rank
     save_load_path = path
+    load_mmap = mmap
+    save_snapshot = snapshot
+    pending_save_tasks = []
+    prefetched_arrays = prefetched if prefetched is not None else {}
+    save_sharded = sharded
     try:
         yield
     finally:
         global_src_dsk_rank = None
         save_load_path = None
-
-
-def load(path: str, global_src_rank: Optional[int] = None,) -> Any:
+        load_mmap = False
+        save_snapshot = False
+        pending_save_tasks = []
+        prefetched_arrays = {}
+        save_sharded = False
+
+
+def load(
+    path: str,
+    global_src_rank: Optional[int] = None,
+    mmap: bool = False,
+    num_io_threads: Optional[int] = None,
+) -> Any:
     r"""Loads an object saved with oneflow.save() from a directory.
 
     Args:
@@ -292,6 +609,16 @@ def load(path: str, global_src_rank: Optional[int] = None,) -> Any:
             read the files in `path`, and tensors in the loaded
             object will be consistent with placement = 
             `flow.placement('cuda', [global_src_rank])`
+        mmap (bool, optional): If True, local tensors are backed by copy-on-write
+            memory maps of the checkpoint files instead of being read into memory,
+            so only the data that is actually accessed gets loaded. Modifying such
+            a tensor never changes the files. Default: False
+        num_io_threads (int, optional): The number of threads reading tensor files
+            concurrently when neither `global_src_rank` nor `mmap` is set.
+            Default: min(8, cpu count)
+
+    Checkpoints saved with ``sharded=True`` are detected automatically. Every rank
+    then reads only the part of each global tensor it holds.
 
     Returns:
         The loaded object
@@ -307,7 +634,7 @@ def load(path: str, global_src_rank: Optional[int] = None,) -> Any:
     else:
         is_legacy = _broadcast_py_object(None, global_src_rank)
     if is_legacy:
-        return legacy_load(path, global_src_rank)
+        return legacy_load(path, global_src_rank, mmap, num_io_threads)
 
     if global_src_rank is not None:
         if rank == global_src_rank:
@@ -318,15 +645,32 @@ def load(path: str, global_src_rank: Optional[int] = None,) -> Any:
     else:
         pickle_bytes = pickle_path.read_bytes()
 
-    with tensor_pickling_context(path, global_src_rank):
+    prefetched = None
+    if global_src_rank is None and not mmap:
+        var_names = _referenced_var_names(pickle_bytes, path)
+        arrays = _prefetch_variables(
+            [str(path / name) for name in var_names],
+            num_io_threads or DEFAULT_NUM_IO_THREADS,
+        )
+        prefetched = {
+            name: array
+            for name, array in zip(var_names, arrays)
+            if array is not None
+        }
+    with tensor_pickling_context(path, global_src_rank, mmap, prefetched=prefetched):
         res = pickle.loads(pickle_bytes)
     assert res["protocol_version"] == PROTOCOL_VERSION
     return res["data"]
 
 
 def save(
-    obj: Any, path: Union[str, Path], global_dst_rank: Optional[int] = None,
-) -> None:
+    obj: Any,
+    path: Union[str, Path],
+    global_dst_rank: Optional[int] = None,
+    num_io_threads: Optional[int] = None,
+    async_save: bool = False,
+    sharded: bool = False,
+) -> Optional[Future]:
     r"""Save an object to a directory.
 
     Args:
@@ -337,8 +681,37 @@ def save(
             will be saved by the process whose rank == 
             global_src_rank, while other processes will not do any
             disk I/O.
+        num_io_threads (int, optional): The number of threads writing tensor files
+            concurrently. Default: min(8, cpu count)
+        async_save (bool, optional): If True, tensor data is snapshotted and the
+            files are written in the background. A
+            :class:`concurrent.futures.Future` is returned, its ``result()``
+            blocks until the checkpoint is complete and re-raises I/O errors.
+            Default: False
+        sharded (bool, optional): If True, every rank writes only its own shard of
+            each global tensor, next to a manifest of its shape, placement and sbp.
+            `path` must be on a file system shared by all ranks. Loading such a
+            checkpoint with a different world size reshards the tensors over all
+            ranks. Local tensors are saved from rank 0. Can not be combined with
+            `async_save`. Default: False
+
+    Returns:
+        None, or a Future when `async_save` is True
     """
+    if sharded and global_dst_rank is not None:
+        raise ValueError("global_dst_rank can not be used with sharded=True")
+    if sharded and async_save:
+        # Rank 0 may only write the pickled data once every rank has written its
+        # shards, which takes a collective that can not run on the I/O thread.
+        raise ValueError("async_save can not be used with sharded=True")
     path: Path = Path(path)
+    num_io_threads = num_io_threads or DEFAULT_NUM_IO_THREADS
+
+    def run(tasks, finalize=None):
+        if async_save:
+            return _submit_async_save(tasks, num_io_threads, finalize)
+        _run_io_tasks(tasks, num_io_threads, finalize)
+        return None
 
     if isinstance(obj, graph_util.Graph):
         graph: graph_util.Graph = obj
@@ -350,20 +723,44 @@ def save(
         serialized_job = str(text_format.MessageToString(graph._forward_job_proto))
         oneflow._oneflow_internal.nn.graph.SaveJobToIR(serialized_job, str(path))
 
-        for x in graph._state():
-            _save_tensor_to_disk(x.origin, path / f"{x.name_prefix}{x.name}")
-
-        return
+        return run(
+            [
+                _save_tensor_task(
+                    x.origin, path / f"{x.name_prefix}{x.name}", snapshot=async_save
+                )
+                for x in graph._state()
+            ]
+        )
 
     obj = {"protocol_version": PROTOCOL_VERSION, "data": obj}
-    with tensor_pickling_context(path, global_dst_rank):
+    with tensor_pickling_context(
+        path, global_dst_rank, snapshot=async_save, sharded=sharded
+    ):
         pickled_bytes = pickle.dumps(obj)
+        tasks = pending_save_tasks
     rank = flow.env.get_rank()
+    if sharded:
+        # All shards are on disk before rank 0 writes the pickled data.
+        _run_io_tasks(tasks, num_io_threads)
+        tasks = []
+        flow.comm.barrier()
+        if rank != 0:
+            return None
     if global_dst_rank is None or global_dst_rank == rank:
         path.mkdir(exist_ok=True)
-        pickle_path = path / PICKLE_FILENAME
-        pickle_path.write_bytes(pickled_bytes)
+
+        # The pickled data is written last, a checkpoint without it is incomplete.
+        def write_pickled_data():
+            (path / PICKLE_FILENAME).write_bytes(pickled_bytes)
+
+        return run(tasks, write_pickled_data)
+    return run(tasks)
 
 
 save_load_path = None
 global_src_dsk_rank = None
+load_mmap = False
+save_snapshot = False
+pending_save_tasks = []
+prefetched_arrays = {}
+save_sharded = False
@@ -13,6 +13,9 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import json
+import os
+
 import oneflow._oneflow_internal
 
 
@@ -30,3 +33,200 @@ def ProfilerStart():
 
 def ProfilerStop():
     oneflow._oneflow_internal.profiler.ProfilerStop()
+
+
+class EventAverage(object):
+    r"""Host events with the same key aggregated by :meth:`profile.key_averages`."""
+
+    def __init__(self, name, category, input_shapes=""):
+        self.name = name
+        self.category = category
+        self.input_shapes = input_shapes
+        self.count = 0
+        self.total_time_us = 0.0
+        self.min_time_us = float("inf")
+        self.max_time_us = 0.0
+        self.allocated_bytes_delta = 0
+
+    @property
+    def avg_time_us(self):
+        return self.total_time_us / self.count if self.count > 0 else 0.0
+
+    def add(self, event):
+        time_us = (event["end_ns"] - event["start_ns"]) / 1000.0
+        self.count += 1
+        self.total_time_us += time_us
+        self.min_time_us = min(self.min_time_us, time_us)
+        self.max_time_us = max(self.max_time_us, time_us)
+        self.allocated_bytes_delta += event["allocated_bytes_delta"]
+
+
+class EventAverages(list):
+    r"""A list of :class:`EventAverage` that can be printed as a table."""
+
+    _SORT_KEYS = {
+        "total_time": lambda avg: avg.total_time_us,
+        "avg_time": lambda avg: avg.avg_time_us,
+        "max_time": lambda avg: avg.max_time_us,
+        "count": lambda avg: avg.count,
+        "memory": lambda avg: avg.allocated_bytes_delta,
+    }
+
+    def table(self, sort_by="total_time", row_limit=100):
+        r"""Returns the aggregated events as a text table.
+
+        Args:
+            sort_by (str): one of ``"total_time"``, ``"avg_time"``, ``"max_time"``,
+                ``"count"`` and ``"memory"``; rows are sorted in descending order.
+            row_limit (int): the maximum number of rows, -1 for all rows.
+        """
+        if sort_by not in self._SORT_KEYS:
+            raise ValueError(
+                "sort_by must be one of {}, but got {}".format(
+                    sorted(self._SORT_KEYS.keys()), sort_by
+                )
+            )
+        rows = sorted(self, key=self._SORT_KEYS[sort_by], reverse=True)
+        if row_limit >= 0:
+            rows = rows[:row_limit]
+        with_shapes = any(avg.input_shapes for avg in rows)
+        header = ["Name", "Category", "Calls", "Total us", "Avg us", "Min us", "Max us"]
+        header.append("Mem delta")
+        if with_shapes:
+            header.append("Input shapes")
+        lines = [header]
+        for avg in rows:
+            line = [
+                avg.name,
+                avg.category,
+                str(avg.count),
+                "{:.3f}".format(avg.total_time_us),
+                "{:.3f}".format(avg.avg_time_us),
+                "{:.3f}".format(avg.min_time_us),
+                "{:.3f}".format(avg.max_time_us),
+                str(avg.allocated_bytes_delta),
+            ]
+            if with_shapes:
+                line.append(avg.input_shapes)
+            lines.append(line)
+        widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+        separator = "  ".join("-" * width for width in widths)
+        text = [separator]
+        for i, line in enumerate(lines):
+            text.append(
+                "  ".join(cell.ljust(width) for cell, width in zip(line, widths))
+            )
+            if i == 0:
+                text.append(separator)
+        text.append(separator)
+        return "\n".join(text)
+
+    def __str__(self):
+        return self.table()
+
+
+class profile(object):
+    r"""Context manager recording host timings of eager ops, vm instructions, graph
+    kernels and :class:`record_function` ranges. It works without CUDA or Nsight.
+
+    Args:
+        record_shapes (bool): record the input shapes of eager ops.
+        profile_memory (bool): record the change of the host memory allocated by eager
+            CPU tensors during every event.
+
+    For example:
+
+    .. code-block:: python
+
+        >>> import os
+        >>> import tempfile
+        >>> import oneflow as flow
+        >>> x = flow.randn(16, 16)
+        >>> with flow.profiler.profile(record_shapes=True) as prof:
+        ...     y = flow.matmul(x, x)
+        >>> table = prof.key_averages().table(sort_by="total_time", row_limit=10)
+        >>> with tempfile.TemporaryDirectory() as trace_dir:
+        ...     prof.export_chrome_trace(os.path.join(trace_dir, "trace.json"))
+
+    """
+
+    def __init__(self, record_shapes=False, profile_memory=False):
+        self.record_shapes = record_shapes
+        self.profile_memory = profile_memory
+        self._events = None
+
+    def __enter__(self):
+        oneflow._oneflow_internal.eager.Sync()
+        oneflow._oneflow_internal.profiler.EnableHostProfiler(
+            self.record_shapes, self.profile_memory
+        )
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            oneflow._oneflow_internal.eager.Sync()
+        finally:
+            self._events = oneflow._oneflow_internal.profiler.DisableHostProfiler()
+
+    def events(self):
+        r"""Returns the recorded events as dicts ordered by start time."""
+        if self._events is None:
+            raise RuntimeError("the profiler has not finished")
+        return self._events
+
+    def key_averages(self, group_by_input_shape=False):
+        r"""Aggregates the events by name and category, and also by input shapes if
+        ``group_by_input_shape`` is True.
+        """
+        averages = {}
+        for event in self.events():
+            input_shapes = event["input_shapes"] if group_by_input_shape else ""
+            key = (event["name"], event["category"], input_shapes)
+            if key not in averages:
+                averages[key] = EventAverage(*key)
+            averages[key].add(event)
+        return EventAverages(averages.values())
+
+    def table(self, sort_by="total_time", row_limit=100):
+        return self.key_averages().table(sort_by=sort_by, row_limit=row_limit)
+
+    def export_chrome_trace(self, path):
+        r"""Writes the events to ``path`` in the Chrome trace event format, which can be
+        opened by chrome://tracing or Perfetto.
+        """
+        trace_events = []
+        for event in self.events():
+            args = {}
+            for key in ["input_shapes", "stream"]:
+                if event[key]:
+                    args[key] = event[key]
+            if self.profile_memory:
+                args["allocated_bytes_delta"] = event["allocated_bytes_delta"]
+            trace_events.append(
+                {
+                    "name": event["name"],
+                    "cat": event["category"],
+                    "ph": "X",
+                    "ts": event["start_ns"] / 1000.0,
+                    "dur": (event["end_ns"] - event["start_ns"]) / 1000.0,
+                    "pid": os.getpid(),
+                    "tid": event["thread_id"],
+                    "args": args,
+                }
+            )
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+
+class record_function(object):
+    r"""Context manager recording a user defined range in :class:`profile`."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        RangePush(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        RangePop()
@@ -38,6 +38,7 @@ __all__ = [
     "get_sharing_strategy",
     "get_all_sharing_strategies",
     "unlink_all_shared_memory",
+    "shared_memory_pool_stats",
 ]
 
 
@@ -98,4 +99,24 @@ def unlink_all_shared_memory():
     flow._oneflow_internal.multiprocessing.unlink_all_shared_memory()
 
 
+def shared_memory_pool_stats():
+    """Returns the counters of the shared memory pool that backs the tensors this
+    process sends to other processes: ``hits`` and ``misses`` of segment requests,
+    segments ``reclaimed`` after a receiver released them, ``evictions`` beyond the
+    ``ONEFLOW_SHM_POOL_MAX_CACHED_BYTES`` cap (128MB by default), and the current
+    ``cached_segments``, ``cached_bytes`` and ``leased_segments``.
+
+    The counters of the mappings of segments received from other processes are
+    prefixed with ``attached_``: ``hits`` when a segment mapped before is reused,
+    ``misses``, ``evictions`` beyond ``ONEFLOW_SHM_ATTACHED_MAX_CACHED_BYTES``
+    (128MB by default), ``cached_segments`` and ``cached_bytes``.
+    """
+    from .shared_memory_pool import get_attached_segment_cache, get_shared_memory_pool
+
+    stats = get_shared_memory_pool().stats()
+    for key, value in get_attached_segment_cache().stats().items():
+        stats["attached_" + key] = value
+    return stats
+
+
 init_reductions()
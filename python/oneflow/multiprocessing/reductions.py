@@ -20,7 +20,11 @@ import numpy as np
 import oneflow as flow
 from oneflow.nn.parameter import Parameter
 from oneflow.framework.tensor import Tensor
-from oneflow.multiprocessing import shared_memory
+from oneflow.multiprocessing.shared_memory_pool import (
+    HEADER_SIZE,
+    get_attached_segment_cache,
+    get_shared_memory_pool,
+)
 
 
 try:
@@ -34,25 +38,70 @@ except ImportError:
     pass
 
 
+def new_shared_tensor(shape, dtype):
+    """Returns an uninitialized local cpu tensor of ``shape`` and numpy ``dtype`` that
+    lives in a pooled shared memory segment, so that putting it on a
+    :mod:`oneflow.multiprocessing` queue only transfers the name of its segment.
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if nbytes == 0:
+        return flow.from_numpy(np.empty(shape, dtype=dtype))
+    pool = get_shared_memory_pool()
+    segment = pool.acquire(nbytes)
+    arr = segment.array(shape, dtype)
+    address = arr.ctypes.data
+    pool.track_payload(address, nbytes, segment)
+
+    def release_segment():
+        pool.untrack_payload(address)
+        pool.release(segment)
+
+    t = flow.from_numpy(arr)
+    t._register_storage_delete_hook(release_segment)
+    return t
+
+
+def _share_tensor_data(tensor_data):
+    """Returns a pooled segment holding ``tensor_data`` and marks it as sent. Tensors
+    from new_shared_tensor are shared as they are, others are copied once."""
+    pool = get_shared_memory_pool()
+    if tensor_data.flags["C_CONTIGUOUS"]:
+        segment = pool.find_payload(tensor_data.ctypes.data, tensor_data.nbytes)
+        if segment is not None:
+            pool.mark_sent(segment)
+            return segment
+    segment = pool.acquire(tensor_data.nbytes)
+    segment.array(tensor_data.shape, tensor_data.dtype)[...] = tensor_data
+    pool.mark_sent(segment)
+    # Nothing in this process references the copy, it returns to the pool as soon
+    # as the receiver is done with it.
+    pool.release(segment)
+    return segment
+
+
+def _open_shared_array(name, size, shape, dtype):
+    cache = get_attached_segment_cache()
+    shm = cache.attach(name, size)
+    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=HEADER_SIZE)
+
+    def release_lease():
+        cache.detach(shm)
+
+    return arr, release_lease
+
+
 def rebuild_empty_tensor(shape, dtype, requires_grad):
     t = flow.tensor([], dtype=dtype)
     t.requires_grad = requires_grad
     return t.reshape(*shape)
 
 
-def rebuild_shm_tensor(shm, shape, dtype, requires_grad):
-    def delete_shm():
-        shm.close()
-        try:
-            shm.unlink()
-        except:
-            pass
-
-    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+def rebuild_shm_tensor(name, size, shape, dtype, requires_grad):
+    arr, release_lease = _open_shared_array(name, size, shape, dtype)
     t = flow.from_numpy(arr)
-    t._register_storage_delete_hook(delete_shm)
+    t._register_storage_delete_hook(release_lease)
     t.requires_grad = requires_grad
-
     return t
 
 
@@ -62,14 +111,10 @@ def rebuild_empty_parameter(shape, dtype, requires_grad):
     return Parameter(t, requires_grad=requires_grad)
 
 
-def rebuild_shm_parameter(shm, shape, dtype, requires_grad):
-    def delete_shm():
-        shm.close()
-        shm.unlink()
-
-    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+def rebuild_shm_parameter(name, size, shape, dtype, requires_grad):
+    arr, release_lease = _open_shared_array(name, size, shape, dtype)
     t = flow.from_numpy(arr)
-    t._register_storage_delete_hook(delete_shm)
+    t._register_storage_delete_hook(release_lease)
     return Parameter(t, requires_grad=requires_grad)
 
 
@@ -80,14 +125,16 @@ def reduce_tensor(tensor):
     if tensor_data.nbytes == 0:
         return (rebuild_empty_tensor, (tensor.shape, tensor.dtype, requires_grad))
     else:
-        shm = shared_memory.SharedMemory(create=True, size=tensor_data.nbytes)
-        shm_numpy = np.ndarray(
-            tensor_data.shape, dtype=tensor_data.dtype, buffer=shm.buf
-        )
-        shm_numpy[:] = tensor_data[:]
+        segment = _share_tensor_data(tensor_data)
         return (
             rebuild_shm_tensor,
-            (shm, tensor_data.shape, tensor_data.dtype, requires_grad),
+            (
+                segment.name,
+                segment.size,
+                tensor_data.shape,
+                tensor_data.dtype,
+                requires_grad,
+            ),
         )
 
 
@@ -96,16 +143,18 @@ def reduce_parameter(tensor):
     requires_grad = tensor.requires_grad
 
     if tensor_data.nbytes == 0:
-        return (rebuild_empty_parameter, (tensor, shape, tensor.dtype, requires_grad))
+        return (rebuild_empty_parameter, (tensor.shape, tensor.dtype, requires_grad))
     else:
-        shm = shared_memory.SharedMemory(create=True, size=tensor_data.nbytes)
-        shm_numpy = np.ndarray(
-            tensor_data.shape, dtype=tensor_data.dtype, buffer=shm.buf
-        )
-        shm_numpy[:] = tensor_data[:]
+        segment = _share_tensor_data(tensor_data)
         return (
             rebuild_shm_parameter,
-            (shm, tensor_data.shape, tensor_data.dtype, requires_grad),
+            (
+                segment.name,
+                segment.size,
+                tensor_data.shape,
+                tensor_data.dtype,
+                requires_grad,
+            ),
         )
 
 
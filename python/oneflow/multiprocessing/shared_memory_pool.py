@@ -0,0 +1,276 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import collections
+import os
+import threading
+
+import numpy as np
+
+from oneflow.multiprocessing.shared_memory import SharedMemory
+
+__all__ = [
+    "SharedMemoryPool",
+    "get_shared_memory_pool",
+    "AttachedSegmentCache",
+    "get_attached_segment_cache",
+]
+
+# Every pooled segment starts with a header. Its first byte is set while a receiving
+# process still maps the payload, the rest keeps the payload aligned.
+HEADER_SIZE = 64
+_MIN_SEGMENT_SIZE = 4096
+
+
+def _bucket_size(nbytes):
+    size = _MIN_SEGMENT_SIZE
+    while size < nbytes + HEADER_SIZE:
+        size *= 2
+    return size
+
+
+def _destroy(shm):
+    shm.close()
+    try:
+        shm.unlink()
+    except:
+        pass
+
+
+class PooledSegment:
+    """A shared memory segment owned by the pool of the process that created it."""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.size = shm.size
+        self.local_refs = 0
+        self.sent = False
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def leased(self):
+        "Whether a receiving process still uses the payload."
+        return self.shm.buf[0] != 0
+
+    def array(self, shape, dtype):
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=HEADER_SIZE)
+
+
+class SharedMemoryPool:
+    """A per-process pool of shared memory segments bucketed by power-of-two size.
+
+    A segment is in use while tensors of this process reference it (``local_refs``)
+    or, once it has been sent, until the receiving process frees its tensor and
+    clears the lease byte in the header. It is then cached for reuse; the least
+    recently freed segments are unlinked when the cache exceeds ``max_cached_bytes``.
+    """
+
+    def __init__(self, max_cached_bytes):
+        self.max_cached_bytes = max_cached_bytes
+        self._lock = threading.Lock()
+        # Free segments ordered from least to most recently freed.
+        self._free = collections.OrderedDict()
+        self._free_names_by_size = collections.defaultdict(list)
+        self._cached_bytes = 0
+        # Segments freed locally whose payload is still used by a receiving process.
+        self._leased = {}
+        # Payload address -> (segment, nbytes) of tensors allocated in this pool.
+        self._payloads = {}
+        self._stats = collections.Counter()
+
+    def acquire(self, nbytes):
+        size = _bucket_size(nbytes)
+        with self._lock:
+            self._reclaim_leased()
+            names = self._free_names_by_size[size]
+            if len(names) > 0:
+                segment = self._free.pop(names.pop())
+                self._cached_bytes -= segment.size
+                self._stats["hits"] += 1
+            else:
+                segment = PooledSegment(SharedMemory(create=True, size=size))
+                self._stats["misses"] += 1
+            segment.local_refs = 1
+            segment.sent = False
+            return segment
+
+    def track_payload(self, address, nbytes, segment):
+        with self._lock:
+            self._payloads[address] = (segment, nbytes)
+
+    def untrack_payload(self, address):
+        with self._lock:
+            self._payloads.pop(address, None)
+
+    def find_payload(self, address, nbytes):
+        """Returns the unsent segment whose whole payload starts at ``address``."""
+        with self._lock:
+            segment, payload_nbytes = self._payloads.get(address, (None, None))
+            if segment is None or segment.sent or payload_nbytes != nbytes:
+                return None
+            return segment
+
+    def mark_sent(self, segment):
+        with self._lock:
+            segment.sent = True
+            segment.shm.buf[0] = 1
+
+    def release(self, segment):
+        with self._lock:
+            segment.local_refs -= 1
+            if segment.local_refs > 0:
+                return
+            if segment.leased:
+                self._leased[segment.name] = segment
+            else:
+                self._add_free(segment)
+
+    def stats(self):
+        with self._lock:
+            self._reclaim_leased()
+            return {
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "reclaimed": self._stats["reclaimed"],
+                "evictions": self._stats["evictions"],
+                "cached_segments": len(self._free),
+                "cached_bytes": self._cached_bytes,
+                "leased_segments": len(self._leased),
+            }
+
+    def clear(self):
+        """Unlinks every cached segment and every segment still leased to a receiver."""
+        with self._lock:
+            for segment in list(self._free.values()) + list(self._leased.values()):
+                _destroy(segment.shm)
+            self._free.clear()
+            self._free_names_by_size.clear()
+            self._leased.clear()
+            self._cached_bytes = 0
+
+    def _reclaim_leased(self):
+        for name in [name for name, s in self._leased.items() if not s.leased]:
+            self._add_free(self._leased.pop(name))
+            self._stats["reclaimed"] += 1
+
+    def _add_free(self, segment):
+        self._free[segment.name] = segment
+        self._free_names_by_size[segment.size].append(segment.name)
+        self._cached_bytes += segment.size
+        while self._cached_bytes > self.max_cached_bytes and len(self._free) > 0:
+            name, evicted = self._free.popitem(last=False)
+            self._free_names_by_size[evicted.size].remove(name)
+            self._cached_bytes -= evicted.size
+            _destroy(evicted.shm)
+            self._stats["evictions"] += 1
+
+
+class AttachedSegmentCache:
+    """Keeps the mappings of segments received from other processes open after their
+    tensors are freed, so that receiving a tensor in a segment seen before skips
+    shm_open and mmap.
+
+    A sender reuses the same few segments of its pool, so a receiver mostly sees
+    names it already mapped. Idle mappings are closed least recently used first when
+    they exceed ``max_cached_bytes``.
+    """
+
+    def __init__(self, max_cached_bytes):
+        self.max_cached_bytes = max_cached_bytes
+        self._lock = threading.Lock()
+        # Mappings no tensor of this process uses, from least to most recently used.
+        self._idle = collections.OrderedDict()
+        self._cached_bytes = 0
+        self._stats = collections.Counter()
+
+    def attach(self, name, size):
+        with self._lock:
+            shm = self._idle.pop(name, None)
+            if shm is not None:
+                self._cached_bytes -= shm.size
+                if shm.size >= size:
+                    self._stats["hits"] += 1
+                    return shm
+                shm.close()
+            self._stats["misses"] += 1
+        return SharedMemory(name=name, size=size)
+
+    def detach(self, shm):
+        # The sender owns the segment, clearing the lease lets it reuse it. The
+        # mapping stays valid even if the sender unlinks the segment.
+        shm.buf[0] = 0
+        with self._lock:
+            stale = self._idle.pop(shm.name, None)
+            if stale is not None:
+                self._cached_bytes -= stale.size
+                stale.close()
+            self._idle[shm.name] = shm
+            self._cached_bytes += shm.size
+            while self._cached_bytes > self.max_cached_bytes and len(self._idle) > 0:
+                _, evicted = self._idle.popitem(last=False)
+                self._cached_bytes -= evicted.size
+                evicted.close()
+                self._stats["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "evictions": self._stats["evictions"],
+                "cached_segments": len(self._idle),
+                "cached_bytes": self._cached_bytes,
+            }
+
+    def clear(self):
+        """Closes every idle mapping."""
+        with self._lock:
+            for shm in self._idle.values():
+                shm.close()
+            self._idle.clear()
+            self._cached_bytes = 0
+
+
+_pool = None
+_pool_pid = None
+_attached_cache = None
+_attached_cache_pid = None
+
+
+def get_shared_memory_pool():
+    """Returns the pool of the current process. A forked child gets a new pool and
+    never touches the segments of its parent."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = SharedMemoryPool(
+            int(os.getenv("ONEFLOW_SHM_POOL_MAX_CACHED_BYTES", 128 * 1024 * 1024))
+        )
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def get_attached_segment_cache():
+    """Returns the cache of the mappings of received segments of the current
+    process. A forked child gets a new cache."""
+    global _attached_cache, _attached_cache_pid
+    if _attached_cache is None or _attached_cache_pid != os.getpid():
+        _attached_cache = AttachedSegmentCache(
+            int(os.getenv("ONEFLOW_SHM_ATTACHED_MAX_CACHED_BYTES", 128 * 1024 * 1024))
+        )
+        _attached_cache_pid = os.getpid()
+    return _attached_cache
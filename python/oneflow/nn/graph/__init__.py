@@ -15,3 +15,4 @@ limitations under the License.
 """
 from .graph import Graph
 from .block import Block
+from .dynamic_shape_graph import DynamicShapeGraph
@@ -0,0 +1,182 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import bisect
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence
+
+import oneflow
+from oneflow.framework.tensor import Tensor
+from oneflow.nn.graph.graph import Graph
+from oneflow.nn.graph.util import flatten_io_tensors, map_io_tensors
+
+
+class DynamicShapeGraph(object):
+    r"""Runs inputs of variable shapes with a bounded LRU cache of nn.Graph plans,
+    one per input shape bucket.
+
+    nn.Graph compiles a plan for the input shapes of its first call. Instead, the
+    size of every input tensor along each dimension in ``bucket_boundaries`` is
+    padded with ``pad_value`` up to the nearest boundary not smaller than it, and
+    the inputs are run by the plan compiled for their padded shapes. Dimensions
+    not in ``bucket_boundaries`` are not padded, every size of them gets a plan of
+    its own.
+
+    ``make_graph`` is called to create the graph of every new bucket. The graphs
+    should hold the same modules, so that all plans share the same parameter and
+    buffer tensors.
+
+    Args:
+        make_graph (Callable[[], nn.Graph]): returns a new, not compiled graph.
+        bucket_boundaries (Dict[int, Sequence[int]]): maps a dimension to the sizes
+            the inputs are padded to along it. (default: ``None``)
+        pad_value (float): the value of the padding. (default: ``0``)
+        max_plans (int): the maximum number of compiled plans kept, the least
+            recently used one is released when a new one is compiled.
+            (default: ``8``)
+
+    For example:
+
+    .. code-block:: python
+
+        import oneflow as flow
+
+        model = flow.nn.Embedding(1000, 16)
+
+        class EmbeddingGraph(flow.nn.Graph):
+            def __init__(self):
+                super().__init__()
+                self.model = model
+
+            def build(self, ids):
+                return self.model(ids)
+
+        g = flow.nn.graph.DynamicShapeGraph(
+            EmbeddingGraph, bucket_boundaries={1: [32, 64, 128]}
+        )
+        out = g(flow.ones(4, 50, dtype=flow.int64))  # runs the plan for (4, 64)
+        print(out.shape)  # oneflow.Size([4, 64, 16])
+
+    The outputs are those of the padded inputs, slice them or mask the padded
+    positions as with any padded batch. Graphs with optimizers are not supported,
+    since the states created for an optimizer would not be shared between plans.
+    """
+
+    def __init__(
+        self,
+        make_graph: Callable[[], Graph],
+        bucket_boundaries: Optional[Dict[int, Sequence[int]]] = None,
+        *,
+        pad_value: float = 0,
+        max_plans: int = 8
+    ):
+        if not callable(make_graph):
+            raise TypeError("make_graph should be callable")
+        if max_plans < 1:
+            raise ValueError("max_plans should be at least 1")
+        self._make_graph = make_graph
+        self._bucket_boundaries = OrderedDict()
+        for dim, boundaries in (bucket_boundaries or {}).items():
+            boundaries = sorted(set(boundaries))
+            if len(boundaries) == 0 or boundaries[0] <= 0:
+                raise ValueError(
+                    "bucket boundaries of dim {} should be positive and not "
+                    "empty, got {}".format(dim, boundaries)
+                )
+            self._bucket_boundaries[dim] = boundaries
+        self._pad_value = pad_value
+        self._max_plans = max_plans
+        # input shapes and dtypes of a bucket -> the graph compiled for them
+        self._graphs = OrderedDict()
+
+    @property
+    def compiled_buckets(self):
+        r"""The keys of the cached plans, from the least to the most recently
+        used. A key holds the padded shape, the dtype and the device, or the
+        placement and sbp for global tensors, of every input tensor."""
+        return list(self._graphs.keys())
+
+    def bucket_size(self, dim: int, size: int) -> int:
+        r"""Returns the size inputs of ``size`` along ``dim`` are padded to."""
+        boundaries = self._bucket_boundaries.get(dim)
+        if boundaries is None:
+            return size
+        index = bisect.bisect_left(boundaries, size)
+        if index == len(boundaries):
+            raise ValueError(
+                "input size {} along dim {} is larger than the largest bucket "
+                "boundary {}".format(size, dim, boundaries[-1])
+            )
+        return boundaries[index]
+
+    def _pad(self, tensor: Tensor) -> Tensor:
+        for dim in self._bucket_boundaries.keys():
+            if dim >= tensor.dim() or dim < -tensor.dim():
+                continue
+            size = tensor.shape[dim]
+            pad_size = self.bucket_size(dim, size) - size
+            if pad_size == 0:
+                continue
+            pad_shape = list(tensor.shape)
+            pad_shape[dim] = pad_size
+            if tensor.is_global:
+                padding = oneflow.full(
+                    pad_shape,
+                    self._pad_value,
+                    dtype=tensor.dtype,
+                    placement=tensor.placement,
+                    sbp=tensor.sbp,
+                )
+            else:
+                padding = oneflow.full(
+                    pad_shape, self._pad_value, dtype=tensor.dtype, device=tensor.device
+                )
+            tensor = oneflow.cat([tensor, padding], dim=dim)
+        return tensor
+
+    def _get_graph(self, key):
+        graph = self._graphs.get(key)
+        if graph is not None:
+            self._graphs.move_to_end(key)
+            return graph
+        graph = self._make_graph()
+        if not isinstance(graph, Graph):
+            raise TypeError(
+                "make_graph should return a nn.Graph, got {}".format(type(graph))
+            )
+        if len(graph._opts) > 0:
+            raise NotImplementedError(
+                "DynamicShapeGraph does not support nn.Graph with optimizers."
+            )
+        if len(self._graphs) >= self._max_plans:
+            # The plan is released with the graph.
+            self._graphs.popitem(last=False)
+        self._graphs[key] = graph
+        return graph
+
+    @staticmethod
+    def _tensor_key(tensor: Tensor):
+        # A plan is compiled for the devices, or the placements and sbps, of its
+        # inputs as well as for their shapes and dtypes.
+        if tensor.is_global:
+            return (tuple(tensor.shape), tensor.dtype, tensor.placement, tensor.sbp)
+        return (tuple(tensor.shape), tensor.dtype, tensor.device)
+
+    def __call__(self, *args, **kwargs):
+        args, kwargs = map_io_tensors((args, kwargs), self._pad)
+        key = tuple(
+            self._tensor_key(tensor) for tensor in flatten_io_tensors((args, kwargs))
+        )
+        return self._get_graph(key)(*args, **kwargs)
@@ -35,6 +35,8 @@ from oneflow.nn.graph.graph_config import GraphConfig
 from oneflow.nn.graph.optimizer import OptDict, VariableConfig
 from oneflow.nn.graph.util import (
     add_indent,
+    flatten_io_tensors,
+    map_io_tensors,
     seq_to_func_return,
     sys_exc_error_msg,
     IONodeType,
@@ -129,6 +131,7 @@ class Graph(object):
         self._debug_max_v_level = 0
         self._outputs_buffer_size = 2
         self._cur_index_of_ouputs_buffer = 0
+        self._zero_copy_outputs = False
 
         self._session = session_ctx.GetDefaultSession()
         assert type(self._session) is MultiClientSession
@@ -600,6 +603,7 @@ class Graph(object):
     def _generate_config_proto(self):
         self.config.proto.set_job_name(self._name)
         self._outputs_buffer_size = self.config._outputs_buffer_size
+        self._zero_copy_outputs = self.config._zero_copy_outputs
 
         if self._grad_scaler is not None:
             self._grad_scaler._generate_conf_for_graph(
@@ -888,7 +892,9 @@ class Graph(object):
 
     def __run(self, *args, **kwargs):
         try:
-            flattened_eager_args = self.__flatten_io("input", *args, **kwargs)
+            # The IO structure was checked when compiling, so the inputs are only
+            # flattened here and their meta is checked by RunLazyNNGraph.
+            flattened_eager_args = flatten_io_tensors((args, kwargs))
             outputs_tensor_tuple = self._outputs_tensor_tuple_buffer[
                 self._cur_index_of_ouputs_buffer
             ]
@@ -916,8 +922,16 @@ class Graph(object):
             )
             raise
 
-        # Copy outputs from buffer
-        eager_outputs, _ = self.__copy_io("output", *eager_outputs)
+        if not self._zero_copy_outputs:
+            # Copy outputs from buffer
+            with oneflow._oneflow_internal.lazy_mode.guard(False):
+                eager_outputs = map_io_tensors(
+                    eager_outputs, lambda tensor: tensor.to(copy=True)
+                )
+        else:
+            # The tensors are shared with the buffer, but the containers are copied so
+            # that changing the returned list or dict does not change the buffer.
+            eager_outputs = map_io_tensors(eager_outputs, lambda tensor: tensor)
 
         # Make sure that last used devices of tensors in `outputs_tensor_tuple` are
         # "critical_section".
@@ -1084,14 +1098,6 @@ class Graph(object):
 
         return self.__map_io(io_type, func, *args, **kwargs)
 
-    def __copy_io(self, io_type, *args, **kwargs):
-        def func(tensor):
-            with oneflow._oneflow_internal.lazy_mode.guard(False):
-                build_arg = tensor.to(copy=True)
-                return build_arg
-
-        return self.__map_io(io_type, func, *args, **kwargs)
-
     def _add_block(self, name: str, module: Module = None) -> None:
         r"""Adds module to the graph as a block so that the module will
         be called in nn.Graph.build.
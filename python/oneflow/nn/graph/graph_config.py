@@ -28,6 +28,7 @@ class GraphConfig(object):
     def __init__(self):
         super().__init__()
         self._outputs_buffer_size = 2
+        self._zero_copy_outputs = False
         self.proto = job_conf_cfg.JobConfigProto()
         self._train(False)
 
@@ -61,6 +62,37 @@ class GraphConfig(object):
         """
         self._outputs_buffer_size = value
 
+    def enable_zero_copy_outputs(self, mode: bool = True):
+        r"""If set to true, calling the graph returns the tensors of its outputs buffer
+        instead of copies of them, which saves a copy of every output per call.
+
+        The outputs buffer is a ring of ``outputs_buffer_size`` items (see
+        ``set_outputs_buffer_size``), so the outputs returned by a call are
+        overwritten by the call ``outputs_buffer_size`` calls later. Read or copy
+        them before that, and do not modify them in place.
+
+        For example:
+
+        .. code-block:: python
+
+            import oneflow as flow
+
+            class Graph(flow.nn.Graph):
+                def __init__(self):
+                    super().__init__()
+                    self.linear = flow.nn.Linear(3, 8, False)
+                    self.config.enable_zero_copy_outputs(True)
+                def build(self, x):
+                    return self.linear(x)
+
+            graph = Graph()
+
+        Args:
+            mode (bool, optional): The default vaule is True.
+        """
+        assert type(mode) is bool
+        self._zero_copy_outputs = mode
+
     def enable_amp(self, mode: bool = True):
         r"""If set to true, then graph will use mixed precision mode, it means use both float16 and float32 during model training.
 
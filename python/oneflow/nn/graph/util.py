@@ -46,6 +46,36 @@ def seq_to_func_return(seq, need_unpack=False):
     return seq
 
 
+def flatten_io_tensors(value, tensors=None):
+    r"""Appends the tensors in the nested tuple/list/dict ``value`` to ``tensors`` in
+    the order of ``IONode.named_nodes()``, without building an IONode tree."""
+    if tensors is None:
+        tensors = []
+    if isinstance(value, Tensor):
+        tensors.append(value)
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            flatten_io_tensors(item, tensors)
+    elif isinstance(value, dict):
+        for item in value.values():
+            flatten_io_tensors(item, tensors)
+    return tensors
+
+
+def map_io_tensors(value, func):
+    r"""Returns ``value`` with every tensor in it replaced by ``func(tensor)``, the
+    cheap counterpart of ``IONode.map_leaf`` for values already checked by it."""
+    if isinstance(value, Tensor):
+        return func(value)
+    elif isinstance(value, tuple):
+        return tuple(map_io_tensors(item, func) for item in value)
+    elif isinstance(value, list):
+        return [map_io_tensors(item, func) for item in value]
+    elif isinstance(value, dict):
+        return {key: map_io_tensors(item, func) for key, item in value.items()}
+    return value
+
+
 class IONodeType:
     TENSOR = "TENSOR"
     NONE = "NONE"
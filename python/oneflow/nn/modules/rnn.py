@@ -20,6 +20,68 @@ from oneflow.nn import Module
 from math import sqrt
 
 
+def _use_fused_rnn(input):
+    # fused_rnn_sequence only has a CPU kernel, other placements keep the per-step loop.
+    return (
+        not input.is_global
+        and input.device.type == "cpu"
+        and input.dtype in (flow.float32, flow.float64)
+    )
+
+
+def _fused_rnn_forward(module, mode, input, h_t_f, h_t_b, c_t_f=None, c_t_b=None):
+    """Runs every layer as one GEMM projecting the inputs of all timesteps followed by
+    one fused_rnn_sequence op for the recurrence. ``input`` is batch major and the
+    initial states are already split by direction, as in the per-step loop.
+    """
+    proj_size = getattr(module, "proj_size", 0)
+    num_directions = 2 if module.bidirectional else 1
+    layer_input = input.permute(1, 0, 2)
+    seq_len = layer_input.size(0)
+    layer_hidden = []
+    layer_cell = []
+    for layer in range(module.num_layers):
+        outputs = []
+        for direction in range(num_directions):
+            suffix = "_reverse" if direction == 1 else ""
+            input_gates = flow.matmul(
+                layer_input, getattr(module, "weight_ih_l{}{}".format(layer, suffix))
+            )
+            bias_hh = None
+            if module.bias:
+                input_gates = input_gates + getattr(
+                    module, "bias_ih_l{}{}".format(layer, suffix)
+                )
+                bias_hh = getattr(module, "bias_hh_l{}{}".format(layer, suffix))
+            weight_hr = None
+            if proj_size > 0:
+                weight_hr = getattr(module, "weight_hr_l{}{}".format(layer, suffix))
+            h_init, c_init = (h_t_f, c_t_f) if direction == 0 else (h_t_b, c_t_b)
+            y, cy, _ = flow._C.fused_rnn_sequence(
+                input_gates,
+                h_init[layer, :, :],
+                getattr(module, "weight_hh_l{}{}".format(layer, suffix)),
+                bias_hh=bias_hh,
+                cx=None if c_init is None else c_init[layer, :, :],
+                weight_hr=weight_hr,
+                mode=mode,
+                reverse=direction == 1,
+            )
+            # The reverse direction finishes at the first timestep.
+            last_step = 0 if direction == 1 else seq_len - 1
+            layer_hidden.append(y[last_step, :, :].unsqueeze(0))
+            layer_cell.append(cy.unsqueeze(0))
+            if module.dropout != 0 and layer != module.num_layers - 1:
+                y = module.drop(y)
+            outputs.append(y)
+        layer_input = flow.cat(outputs, dim=2) if num_directions == 2 else outputs[0]
+
+    hidden_seq = layer_input
+    if module.batch_first:
+        hidden_seq = hidden_seq.permute(1, 0, 2)
+    return hidden_seq, flow.cat(layer_hidden, dim=0), flow.cat(layer_cell, dim=0)
+
+
 class RNN(Module):
     """The interface is consistent with PyTorch.
     The documentation is referenced from: https://pytorch.org/docs/stable/generated/torch.nn.RNN.html#torch.nn.RNN
@@ -235,6 +297,16 @@ class RNN(Module):
         else:
             h_t_f = h_t
 
+        if _use_fused_rnn(input):
+            hidden_seq, h_t, _ = _fused_rnn_forward(
+                self,
+                "rnn_" + self.nonlinearity,
+                input,
+                h_t_f,
+                h_t_b if self.bidirectional else None,
+            )
+            return hidden_seq, h_t
+
         layer_hidden = []
 
         for layer in range(self.num_layers):
@@ -559,6 +631,12 @@ class GRU(Module):
         else:
             h_t_f = h_t
 
+        if _use_fused_rnn(input):
+            hidden_seq, h_t, _ = _fused_rnn_forward(
+                self, "gru", input, h_t_f, h_t_b if self.bidirectional else None,
+            )
+            return hidden_seq, h_t
+
         layer_hidden = []
 
         for layer in range(self.num_layers):
@@ -969,6 +1047,18 @@ class LSTM(nn.Module):
             h_t_f = h_t
             c_t_f = c_t
 
+        if _use_fused_rnn(input):
+            hidden_seq, h_t, c_t = _fused_rnn_forward(
+                self,
+                "lstm",
+                input,
+                h_t_f,
+                h_t_b if self.bidirectional else None,
+                c_t_f,
+                c_t_b if self.bidirectional else None,
+            )
+            return hidden_seq, (h_t, c_t)
+
         layer_hidden = []
         layer_cell = []
 
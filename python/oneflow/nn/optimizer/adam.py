@@ -53,6 +53,9 @@ class Adam(Optimizer):
         weight_decay (float, optional): weight decay (L2 penalty) (default: 0)
         amsgrad (bool, optional): whether to use the AMSGrad variant of this algorithm. (default: False) 
         do_bias_correction (bool, optional): Whether do bias correction (default: True)
+        foreach (bool, optional): whether to update all local parameters of the same device
+            and dtype in one multi-tensor kernel launch instead of one launch per parameter.
+            It is ignored when amsgrad is True. (default: False)
 
     .. _Adam\\: A Method for Stochastic Optimization:
         https://arxiv.org/abs/1412.6980
@@ -116,6 +119,7 @@ class Adam(Optimizer):
         weight_decay: float = 0,
         amsgrad: bool = False,
         do_bias_correction: bool = True,
+        foreach: bool = False,
     ):
         assert lr >= 0.0, f"Invalid learning rate: {lr}"
         assert eps >= 0.0, f"Invalid epsilon value: {eps}"
@@ -135,6 +139,7 @@ class Adam(Optimizer):
         options["bias_correction1"] = 1.0
         options["bias_correction2"] = 1.0
         options["do_bias_correction"] = do_bias_correction
+        options["foreach"] = foreach
         super().__init__(params, options)
 
         for param_group in self.param_groups:
@@ -193,19 +198,35 @@ class Adam(Optimizer):
                     "do_bias_correction": param_group["do_bias_correction"],
                     "amsgrad": param_group["amsgrad"],
                 }
+                params = []
                 for param in param_group.parameters:
                     if param.grad is None:
                         continue
                     if "exp_avg" not in self._state[param]:
-                        self._state[param]["exp_avg"] = flow.zeros_like(param)
+                        self._state[param]["exp_avg"] = self._zeros_like(
+                            param, "exp_avg"
+                        )
                     if "exp_avg_sq" not in self._state[param]:
-                        self._state[param]["exp_avg_sq"] = flow.zeros_like(param)
+                        self._state[param]["exp_avg_sq"] = self._zeros_like(
+                            param, "exp_avg_sq"
+                        )
                     if param_group["amsgrad"]:
                         if "max_exp_avg_sq" not in self._state[param]:
-                            self._state[param]["max_exp_avg_sq"] = flow.zeros_like(
-                                param
+                            self._state[param]["max_exp_avg_sq"] = self._zeros_like(
+                                param, "max_exp_avg_sq"
                             )
+                    params.append(param)
+
+                if param_group["foreach"] and not param_group["amsgrad"]:
+                    params = self._multi_tensor_update(
+                        "multi_tensor_adam_update",
+                        flow._C.dispatch_adam_update,
+                        params,
+                        [("m", "exp_avg"), ("v", "exp_avg_sq")],
+                        **kwargs,
+                    )
 
+                for param in params:
                     m_tensor = self._state[param]["exp_avg"]
                     v_tensor = self._state[param]["exp_avg_sq"]
 
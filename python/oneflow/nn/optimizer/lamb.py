@@ -194,9 +194,13 @@ class LAMB(Optimizer):
                     if param.grad is None:
                         continue
                     if "exp_avg" not in self._state[param]:
-                        self._state[param]["exp_avg"] = flow.zeros_like(param)
+                        self._state[param]["exp_avg"] = self._zeros_like(
+                            param, "exp_avg"
+                        )
                     if "exp_avg_sq" not in self._state[param]:
-                        self._state[param]["exp_avg_sq"] = flow.zeros_like(param)
+                        self._state[param]["exp_avg_sq"] = self._zeros_like(
+                            param, "exp_avg_sq"
+                        )
                     m_tensor = self._state[param]["exp_avg"]
                     v_tensor = self._state[param]["exp_avg_sq"]
 
@@ -22,7 +22,7 @@ from typing import Any, Callable, Dict, Union
 from oneflow.framework.tensor import Tensor
 from oneflow.nn.graph.block import TensorBlock
 from oneflow.nn.parameter import Parameter
-from oneflow.nn.utils.clip_grad import clip_grad_norm_
+from oneflow.nn.utils.clip_grad import clip_grad_norm_, _clip_grads_norm_
 import oneflow as flow
 
 
@@ -99,6 +99,43 @@ class _SourceOpOnlyResourceDependenceMode:
         del self.guard
 
 
+class _FlatBufferLayout(object):
+    """Offsets of same-device, same-dtype local parameters inside one contiguous 1-D buffer.
+
+    Parameters, gradients and every optimizer state key get their own buffer with
+    this layout, and each tensor is a view into it.
+    """
+
+    def __init__(self, params):
+        self.params = params
+        self.device = params[0].device
+        self.dtype = params[0].dtype
+        self.offsets = dict()
+        numel = 0
+        for param in params:
+            self.offsets[param] = numel
+            numel += self._aligned_numel(param)
+        self.numel = numel
+        self.param_buffer = None
+        self.grad_buffer = None
+        self.state_buffers = dict()
+
+    def _aligned_numel(self, param):
+        # Keep every view aligned to 512 bytes like the DDP gradient buckets, so that
+        # vectorized cuda kernels can run on them.
+        unit_size = max(512 // self.dtype.bytes, 1)
+        return (param.numel() + unit_size - 1) // unit_size * unit_size
+
+    def new_buffer(self):
+        return flow.zeros(self.numel, dtype=self.dtype, device=self.device)
+
+    def view(self, buffer, param):
+        start = self.offsets[param]
+        return flow._C.slice_view_1d_contiguous(
+            buffer, start, start + param.numel()
+        ).view(param.shape)
+
+
 def _decorate_step(step):
     def decorated_step(*args, **kwargs):
         with _SourceOpOnlyResourceDependenceMode():
@@ -115,6 +152,9 @@ class Optimizer(object):
         self._state["step"] = 0
 
         self._parse_input_parameters(parameters)
+        self._multi_tensor_ops = dict()
+        # param -> _FlatBufferLayout, filled by flatten_parameters()
+        self._flat_layouts = dict()
 
         self.step = _decorate_step(self.step)
 
@@ -179,10 +219,14 @@ class Optimizer(object):
             else:
                 state[k] = v
         self._state = state
+        self._move_state_to_flat_buffers()
 
         # Update parameter groups, setting their 'params' value
         def update_group(group, new_group):
             group._options = deepcopy(new_group["_options"])
+            # Options added after the state dict was saved fall back to their defaults.
+            for key, value in self._default_options.items():
+                group.setdefault(key, value)
             group._enable_clip_grad = new_group["_enable_clip_grad"]
             return group
 
@@ -255,6 +299,18 @@ class Optimizer(object):
         """
         for param_group in self.param_groups:
             if param_group._enable_clip_grad:
+                grad_buffers = self._flat_grad_buffers(param_group)
+                norm_type = float(param_group["clip_grad_norm_type"])
+                # Padding between views is zero and changes the -inf norm, and the
+                # 0 norm has to be counted per parameter, not per flat buffer.
+                if grad_buffers is not None and norm_type not in (float("-inf"), 0.0):
+                    _clip_grads_norm_(
+                        grad_buffers,
+                        float(param_group["clip_grad_max_norm"]),
+                        norm_type,
+                        True,
+                    )
+                    continue
                 clip_grad_norm_(
                     param_group.parameters,
                     param_group["clip_grad_max_norm"],
@@ -284,15 +340,146 @@ class Optimizer(object):
             3. Optimizers have a different behavior if the gradient is 0 or None
             (in one case it does the step with a gradient of 0 and in the other
             it skips the step altogether).
+
+            Gradients living in flat buffers (see :meth:`flatten_parameters`) are
+            always zeroed, because setting them to None would detach them from
+            the buffer.
         """
+        for layout in set(self._flat_layouts.values()):
+            layout.grad_buffer.zero_()
         for param_group in self.param_groups:
             for param in param_group.parameters:
+                if param in self._flat_layouts:
+                    continue
                 if param.grad is not None:
                     if set_to_none:
                         param.grad = None
                     else:
                         param.grad.zeros_()
 
+    def flatten_parameters(self):
+        r"""Moves the parameters, their gradients and the optimizer state into flat buffers.
+
+        Local parameters of each parameter group are grouped by device and dtype. Each
+        group gets one contiguous buffer for the parameters, one for the gradients and
+        one per optimizer state (e.g. ``exp_avg``), and every tensor becomes a view into
+        its buffer. :meth:`zero_grad` and :meth:`clip_grad` then run as one operation
+        per buffer, and the optimizer state is no longer thousands of small allocations.
+
+        Gradients are allocated up front and never become None, so parameters that do
+        not receive a gradient are stepped with a zero gradient. Global parameters are
+        left untouched.
+
+        Call it after the model is moved to its device and before the first
+        ``backward``.
+
+        For example:
+
+        .. code-block:: python
+
+            adam = flow.optim.Adam(net.parameters(), lr=1e-3)
+            adam.flatten_parameters()
+
+        """
+        with flow.no_grad():
+            for param_group in self.param_groups:
+                groups = collections.OrderedDict()
+                for param in param_group.parameters:
+                    if param.is_global or param in self._flat_layouts:
+                        continue
+                    groups.setdefault((param.device, param.dtype), []).append(param)
+
+                for params in groups.values():
+                    layout = _FlatBufferLayout(params)
+                    layout.param_buffer = layout.new_buffer()
+                    layout.grad_buffer = layout.new_buffer()
+                    for param in params:
+                        param_view = layout.view(layout.param_buffer, param)
+                        param_view.copy_(param.detach())
+                        grad_view = layout.view(layout.grad_buffer, param)
+                        if param.grad is not None:
+                            grad_view.copy_(param.grad.detach())
+                        param.data = param_view
+                        param.grad = grad_view
+                        # accumulate the next gradients into the view
+                        param._is_grad_acc_inplace = True
+                        self._flat_layouts[param] = layout
+        self._move_state_to_flat_buffers()
+
+    def _zeros_like(self, param, state_key):
+        """Creates the zero-initialized optimizer state `state_key` of `param`."""
+        layout = self._flat_layouts.get(param, None)
+        if layout is None:
+            return flow.zeros_like(param)
+        if state_key not in layout.state_buffers:
+            layout.state_buffers[state_key] = layout.new_buffer()
+        return layout.view(layout.state_buffers[state_key], param)
+
+    def _move_state_to_flat_buffers(self):
+        with flow.no_grad():
+            for param, layout in self._flat_layouts.items():
+                param_state = self._state.get(param, None)
+                if param_state is None:
+                    continue
+                for key, value in param_state.items():
+                    if isinstance(value, Tensor) and value.shape == param.shape:
+                        state_view = self._zeros_like(param, key)
+                        state_view.copy_(value)
+                        param_state[key] = state_view
+
+    def _flat_grad_buffers(self, param_group):
+        """Returns the gradient buffers of `param_group` if all its parameters are flattened."""
+        layouts = []
+        for param in param_group.parameters:
+            layout = self._flat_layouts.get(param, None)
+            if layout is None:
+                return None
+            if layout not in layouts:
+                layouts.append(layout)
+        if len(layouts) == 0:
+            return None
+        return [layout.grad_buffer for layout in layouts]
+
+    def _multi_tensor_update(
+        self, op_type_name, dispatch, params, state_keys, **kwargs
+    ):
+        """Updates local parameters in one multi-tensor op launch per (device, dtype) group.
+
+        Args:
+            op_type_name (str): name of the multi-tensor update op, e.g. "multi_tensor_adam_update".
+            dispatch (callable): the `flow._C.dispatch_*_update` function matching the op attrs.
+            params (list): parameters with gradients to update.
+            state_keys (list): pairs of (op input name, key in `self._state[param]`).
+
+        Returns:
+            list: global parameters which are left to the per-parameter update path.
+        """
+        remaining = []
+        groups = collections.OrderedDict()
+        for param in params:
+            if param.is_global:
+                remaining.append(param)
+            else:
+                groups.setdefault((param.device, param.dtype), []).append(param)
+
+        for group in groups.values():
+            key = (op_type_name, len(group))
+            if key not in self._multi_tensor_ops:
+                builder = (
+                    flow.stateful_op(op_type_name)
+                    .Input("model", len(group))
+                    .Input("model_diff", len(group))
+                )
+                for (input_name, _) in state_keys:
+                    builder = builder.Input(input_name, len(group))
+                self._multi_tensor_ops[key] = builder.Build()
+
+            inputs = list(group) + [param.grad for param in group]
+            for (_, state_key) in state_keys:
+                inputs += [self._state[param][state_key] for param in group]
+            dispatch(self._multi_tensor_ops[key], tuple(inputs), **kwargs)
+        return remaining
+
     def _parse_input_parameters(self, parameters):
         """
         Supports such parameters:
@@ -193,12 +193,16 @@ class RMSprop(Optimizer):
                         continue
 
                     if "square_avg" not in self._state[param]:
-                        self._state[param]["square_avg"] = flow.zeros_like(param)
+                        self._state[param]["square_avg"] = self._zeros_like(
+                            param, "square_avg"
+                        )
                     ms_tensor = self._state[param]["square_avg"]
 
                     if param_group["centered"]:
                         if "grad_avg" not in self._state[param]:
-                            self._state[param]["grad_avg"] = flow.zeros_like(param)
+                            self._state[param]["grad_avg"] = self._zeros_like(
+                                param, "grad_avg"
+                            )
                         mg_tensor = self._state[param]["grad_avg"]
                         flow._C.dispatch_rmsprop_update(
                             self._centered_rmsprop,
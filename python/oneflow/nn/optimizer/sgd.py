@@ -48,6 +48,9 @@ class SGD(Optimizer):
         lr (float, optional): learning rate (default: 1e-3)
         momentum (float, optional): Momentum factor (default: 0.0)
         weight_decay (float, optional): weight decay (L2 penalty) (default: 0.0)
+        foreach (bool, optional): whether to update all local parameters of the same device
+            and dtype in one multi-tensor kernel launch instead of one launch per parameter.
+            (default: False)
 
     For example: 
 
@@ -101,6 +104,7 @@ class SGD(Optimizer):
         lr: float = 0.001,
         momentum: float = 0.0,
         weight_decay: float = 0.0,
+        foreach: bool = False,
     ):
         assert lr >= 0.0, f"Invalid learning rate: {lr}"
         assert momentum >= 0.0, f"Invalid momentum: {momentum}"
@@ -109,6 +113,7 @@ class SGD(Optimizer):
         options["lr"] = lr
         options["momentum"] = momentum
         options["weight_decay"] = weight_decay
+        options["foreach"] = foreach
         super().__init__(params, options)
 
         for param_group in self.param_groups:
@@ -141,16 +146,44 @@ class SGD(Optimizer):
             for param_group in self.param_groups:
                 lr = param_group["lr"]
                 l2 = param_group["weight_decay"]
+                params = []
                 for param in param_group.parameters:
                     if param.grad is None:
                         continue
+                    if param_group["momentum"] != 0.0:
+                        if "momentum_buf" not in self._state[param]:
+                            self._state[param]["momentum_buf"] = self._zeros_like(
+                                param, "momentum_buf"
+                            )
+                    params.append(param)
+
+                if param_group["foreach"]:
+                    if param_group["momentum"] == 0.0:
+                        params = self._multi_tensor_update(
+                            "multi_tensor_sgd_update",
+                            flow._C.dispatch_sgd_update,
+                            params,
+                            [],
+                            learning_rate=lr,
+                            l2=l2,
+                        )
+                    else:
+                        params = self._multi_tensor_update(
+                            "multi_tensor_momentum_update",
+                            flow._C.dispatch_momentum_update,
+                            params,
+                            [("momentum", "momentum_buf")],
+                            learning_rate=lr,
+                            l2=l2,
+                            beta=param_group["momentum"],
+                        )
+
+                for param in params:
                     if param_group["momentum"] == 0.0:
                         flow._C.dispatch_sgd_update(
                             self._sgd, (param, param.grad), learning_rate=lr, l2=l2
                         )
                     else:
-                        if "momentum_buf" not in self._state[param]:
-                            self._state[param]["momentum_buf"] = flow.zeros_like(param)
                         momentum_buf = self._state[param]["momentum_buf"]
                         beta = param_group["momentum"]
                         flow._C.dispatch_momentum_update(
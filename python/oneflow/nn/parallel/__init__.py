@@ -14,5 +14,6 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 from .ddp import DistributedDataParallel
+from . import comm_hooks
 
 __all__ = ["DistributedDataParallel"]
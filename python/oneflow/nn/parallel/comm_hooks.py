@@ -0,0 +1,307 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from typing import List, Optional
+
+import oneflow as flow
+
+
+class GradBucket:
+    r"""The gradients allreduced together by DistributedDataParallel, as passed
+    to a communication hook.
+
+    ``buffer()`` is the flat tensor the gradients of ``parameters()`` are views
+    of, the gradient of the i-th parameter starts at ``offsets()[i]``. The
+    gradients are already divided by the world size, so a hook that sums the
+    buffers of all ranks into ``buffer()`` in place averages them.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        buffer: flow.Tensor,
+        parameters: List[flow.Tensor],
+        offsets: List[int],
+        is_last: bool,
+    ):
+        self._index = index
+        self._buffer = buffer
+        self._parameters = parameters
+        self._offsets = offsets
+        self._is_last = is_last
+
+    def index(self) -> int:
+        return self._index
+
+    def buffer(self) -> flow.Tensor:
+        return self._buffer
+
+    def parameters(self) -> List[flow.Tensor]:
+        return self._parameters
+
+    def offsets(self) -> List[int]:
+        return self._offsets
+
+    def is_last(self) -> bool:
+        r"""Whether this is the last bucket allreduced in a backward."""
+        return self._is_last
+
+    def gradients(self) -> List[flow.Tensor]:
+        return [
+            flow._C.slice_view_1d_contiguous(
+                self._buffer, offset, offset + param.numel()
+            ).view(param.shape)
+            for param, offset in zip(self._parameters, self._offsets)
+        ]
+
+
+class CommHookState:
+    r"""The state of a communication hook.
+
+    ``bytes_on_wire`` counts the bytes this rank passed to collectives, so that
+    hooks can be compared by how much data they communicate.
+    """
+
+    def __init__(self):
+        self.bytes_on_wire = 0
+
+    def record(self, tensor: flow.Tensor):
+        self.bytes_on_wire += tensor.numel() * tensor.element_size()
+
+    def reset_bytes_on_wire(self):
+        self.bytes_on_wire = 0
+
+
+def _all_reduce(state: CommHookState, tensor: flow.Tensor):
+    state.record(tensor)
+    flow._C.local_all_reduce(tensor, inplace=True)
+
+
+def _all_gather(state: CommHookState, tensor: flow.Tensor) -> flow.Tensor:
+    # Returns the 1-D ``tensor`` of every rank concatenated in rank order.
+    state.record(tensor)
+    placement = flow.env.all_device_placement(tensor.device.type)
+    return (
+        tensor.to_global(placement=placement, sbp=flow.sbp.split(0))
+        .to_global(placement=placement, sbp=flow.sbp.broadcast)
+        .to_local()
+    )
+
+
+def allreduce_hook(state: CommHookState, bucket: GradBucket):
+    r"""Allreduces the bucket uncompressed. This is the default hook."""
+    _all_reduce(state, bucket.buffer())
+
+
+def _compress_hook(dtype):
+    def hook(state: CommHookState, bucket: GradBucket):
+        buffer = bucket.buffer()
+        if buffer.dtype == dtype:
+            _all_reduce(state, buffer)
+            return
+        compressed = buffer.to(dtype)
+        _all_reduce(state, compressed)
+        buffer.copy_(compressed.to(buffer.dtype))
+
+    return hook
+
+
+fp16_compress_hook = _compress_hook(flow.float16)
+fp16_compress_hook.__name__ = "fp16_compress_hook"
+fp16_compress_hook.__doc__ = r"""Casts the bucket to float16, allreduces it and
+casts the result back, halving the bytes communicated for float32 gradients."""
+
+bf16_compress_hook = _compress_hook(flow.bfloat16)
+bf16_compress_hook.__name__ = "bf16_compress_hook"
+bf16_compress_hook.__doc__ = r"""Casts the bucket to bfloat16, allreduces it and
+casts the result back. bfloat16 keeps the range of float32 and so does not
+overflow on large gradients, at the cost of precision."""
+
+
+class TopKState(CommHookState):
+    r"""The state of :func:`topk_hook`.
+
+    Args:
+        ratio (float): the fraction of the elements of every bucket that is
+            communicated. (default: ``0.01``)
+    """
+
+    def __init__(self, ratio: float = 0.01):
+        super().__init__()
+        if not 0 < ratio <= 1:
+            raise ValueError("ratio should be in (0, 1]")
+        self.ratio = ratio
+        # bucket index -> the part of the gradient not communicated yet
+        self.residuals = {}
+
+
+def topk_hook(state: TopKState, bucket: GradBucket):
+    r"""Communicates only the ``state.ratio`` elements of the bucket with the
+    largest magnitude on every rank, the other elements are kept as a residual and
+    added to the gradient of the next step (error feedback).
+
+    The values and indices of all ranks are gathered and summed into the bucket,
+    so every rank sends ``k`` values and ``k`` indices instead of the whole bucket.
+    """
+    buffer = bucket.buffer()
+    residual = state.residuals.get(bucket.index())
+    if residual is None or residual.numel() != buffer.numel():
+        # The first step, or the buckets were rebuilt.
+        residual = flow.zeros_like(buffer)
+    compensated = buffer + residual
+    k = max(1, int(buffer.numel() * state.ratio))
+    _, indices = flow.topk(compensated.abs(), k)
+    values = flow.gather(compensated, 0, indices)
+    residual = flow.scatter(compensated, 0, indices, 0.0)
+    state.residuals[bucket.index()] = residual
+    all_values = _all_gather(state, values)
+    all_indices = _all_gather(state, indices)
+    buffer.copy_(flow.scatter_add(flow.zeros_like(buffer), 0, all_indices, all_values))
+
+
+class PowerSGDState(CommHookState):
+    r"""The state of :func:`powersgd_hook`.
+
+    Args:
+        matrix_approximation_rank (int): the rank of the approximation of every
+            gradient. (default: ``1``)
+        start_iter (int): the number of steps allreduced uncompressed before the
+            compression starts. (default: ``10``)
+        min_compression_rate (float): a gradient is only compressed when this
+            reduces the elements communicated by at least this factor.
+            (default: ``2``)
+        seed (int): the seed of the initial low-rank factors. (default: ``0``)
+    """
+
+    def __init__(
+        self,
+        matrix_approximation_rank: int = 1,
+        start_iter: int = 10,
+        min_compression_rate: float = 2,
+        seed: int = 0,
+    ):
+        super().__init__()
+        if matrix_approximation_rank < 1:
+            raise ValueError("matrix_approximation_rank should be at least 1")
+        self.matrix_approximation_rank = matrix_approximation_rank
+        self.start_iter = start_iter
+        self.min_compression_rate = min_compression_rate
+        self.seed = seed
+        self.iter = 0
+        # parameter -> the part of the gradient not communicated yet
+        self.errors = {}
+        # parameter -> the right factor of the last step, reused as the
+        # starting point of the next one
+        self.qs = {}
+
+    def maybe_increase_iter(self, bucket: GradBucket):
+        if bucket.is_last():
+            self.iter += 1
+
+    def rank_of(self, param: flow.Tensor) -> Optional[int]:
+        r"""Returns the rank the gradient of ``param`` is approximated with, or
+        None if it is communicated uncompressed."""
+        if param.dim() < 2:
+            return None
+        n = param.shape[0]
+        m = param.numel() // n
+        rank = min(self.matrix_approximation_rank, n, m)
+        if n * m < (n + m) * rank * self.min_compression_rate:
+            return None
+        return rank
+
+
+def _orthogonalize(p: flow.Tensor, eps: float = 1e-8) -> flow.Tensor:
+    # Gram-Schmidt on the columns of p, the rank is small so the loop is cheap.
+    columns = []
+    for i in range(p.shape[1]):
+        column = p[:, i]
+        for prev in columns:
+            column = column - (column * prev).sum() * prev
+        columns.append(column / (column.norm() + eps))
+    return flow.stack(columns, dim=1)
+
+
+def _initial_q(state: PowerSGDState, m: int, rank: int, like: flow.Tensor):
+    # Sampled on the cpu with a fixed seed so that all ranks start from the same Q.
+    generator = flow.Generator()
+    generator.manual_seed(state.seed)
+    q = flow.randn(m, rank, generator=generator)
+    return q.to(device=like.device, dtype=like.dtype)
+
+
+def powersgd_hook(state: PowerSGDState, bucket: GradBucket):
+    r"""Communicates a low-rank approximation ``P @ Q.T`` of every gradient
+    matrix instead of the matrix (PowerSGD, Vogels et al. 2019).
+
+    A gradient of shape ``(n, ...)`` is viewed as an ``n x m`` matrix. Its factors
+    P (``n x rank``) and Q (``m x rank``) are allreduced in one collective each,
+    the approximation error is kept and added to the gradient of the next step.
+    Vectors such as biases and matrices too small to compress are allreduced
+    uncompressed in one more collective. Before ``state.start_iter`` steps the
+    whole bucket is allreduced uncompressed.
+    """
+    if state.iter < state.start_iter:
+        _all_reduce(state, bucket.buffer())
+        state.maybe_increase_iter(bucket)
+        return
+
+    uncompressed = []
+    compressed = []
+    for param, grad in zip(bucket.parameters(), bucket.gradients()):
+        rank = state.rank_of(param)
+        if rank is None:
+            uncompressed.append(grad)
+            continue
+        matrix = grad.reshape(param.shape[0], -1)
+        error = state.errors.get(param)
+        if error is not None:
+            matrix = matrix + error
+        q = state.qs.get(param)
+        if q is None:
+            q = _initial_q(state, matrix.shape[1], rank, matrix)
+        compressed.append((param, grad, matrix, q))
+
+    if len(uncompressed) > 0:
+        flat = flow.cat([grad.reshape(-1) for grad in uncompressed])
+        _all_reduce(state, flat)
+        offset = 0
+        for grad in uncompressed:
+            grad.copy_(flat[offset : offset + grad.numel()].reshape(grad.shape))
+            offset += grad.numel()
+
+    if len(compressed) > 0:
+        ps = [flow.matmul(matrix, q) for _, _, matrix, q in compressed]
+        flat_p = flow.cat([p.reshape(-1) for p in ps])
+        _all_reduce(state, flat_p)
+        offset = 0
+        for i, p in enumerate(ps):
+            ps[i] = _orthogonalize(flat_p[offset : offset + p.numel()].reshape(p.shape))
+            offset += p.numel()
+        qs = []
+        for (param, _, matrix, _), p in zip(compressed, ps):
+            q = flow.matmul(matrix, p, transpose_a=True)
+            state.errors[param] = matrix - flow.matmul(p, q, transpose_b=True)
+            qs.append(q)
+        flat_q = flow.cat([q.reshape(-1) for q in qs])
+        _all_reduce(state, flat_q)
+        offset = 0
+        for (param, grad, _, _), p, q in zip(compressed, ps, qs):
+            q = flat_q[offset : offset + q.numel()].reshape(q.shape)
+            offset += q.numel()
+            state.qs[param] = q
+            grad.copy_(flow.matmul(p, q, transpose_b=True).reshape(grad.shape))
+
+    state.maybe_increase_iter(bucket)
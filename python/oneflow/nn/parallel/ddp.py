@@ -13,12 +13,157 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import types
 import warnings
 from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
 
 import oneflow as flow
 from oneflow.support.env_var_util import parse_boolean_form_env
 from oneflow.framework.tensor_tuple_util import convert_to_tensor_tuple
+from oneflow.nn.parallel.comm_hooks import CommHookState, GradBucket, allreduce_hook
+
+
+def numel_in_bucket(tensor: flow.Tensor):
+    def align(x: int, unit_size: int):
+        return (x + (unit_size - 1)) // unit_size * unit_size
+
+    # tensor memory should be align to 512 bytes for cuda operations
+    # TODO(jianhao): expose the `kCudaMemAllocAlignSize` from C++ to
+    # avoid this hardcoded "512"
+    return align(tensor.numel(), 512 // tensor.element_size())
+
+
+def split_same_dtype_params_into_buckets(params, bucket_size, bucket_cap_bytes):
+    if bucket_cap_bytes is None:
+        return [params[i : i + bucket_size] for i in range(0, len(params), bucket_size)]
+    buckets = []
+    bucket_bytes = 0
+    for param in params:
+        param_bytes = numel_in_bucket(param) * param.element_size()
+        if len(buckets) == 0 or bucket_bytes + param_bytes > bucket_cap_bytes:
+            buckets.append([])
+            bucket_bytes = 0
+        buckets[-1].append(param)
+        bucket_bytes += param_bytes
+    return buckets
+
+
+def split_into_buckets(params, bucket_size, bucket_cap_bytes):
+    r"""Splits the parameters of every dtype in ``params`` into buckets of at most
+    ``bucket_size`` parameters, or of at most ``bucket_cap_bytes`` bytes when it is
+    not None. A parameter larger than ``bucket_cap_bytes`` gets a bucket of its own.
+
+    The buckets are ordered by their first parameter in ``params``, every rank
+    allreduces them one after another in this order."""
+    dtype2params = OrderedDict()
+    for param in params:
+        dtype2params.setdefault(param.dtype, []).append(param)
+    buckets = []
+    for same_dtype_params in dtype2params.values():
+        buckets.extend(
+            split_same_dtype_params_into_buckets(
+                same_dtype_params, bucket_size, bucket_cap_bytes
+            )
+        )
+    param2index = {param: i for i, param in enumerate(params)}
+    buckets.sort(key=lambda bucket: param2index[bucket[0]])
+    return buckets
+
+
+def build_buckets(module, params):
+    r"""Lays out the gradients of ``params`` in bucket tensors, in the order the
+    buckets are allreduced."""
+    module._buckets = split_into_buckets(
+        params, module._ddp_bucket_size, module._ddp_bucket_cap_bytes
+    )
+    module._param_grad_offset_in_bucket = {}
+    module._bucket_index = {}
+    module._bucket_tensors = []
+    with flow.no_grad():
+        for bucket_index, bucket in enumerate(module._buckets):
+            offset_in_bucket = 0
+            for param in bucket:
+                assert param.is_leaf
+                module._param_grad_offset_in_bucket[param] = offset_in_bucket
+                module._bucket_index[param] = bucket_index
+                offset_in_bucket += numel_in_bucket(param)
+            module._bucket_tensors.append(
+                flow.zeros(
+                    offset_in_bucket, dtype=bucket[0].dtype, device=module._ddp_device
+                )
+            )
+
+
+def rebuild_buckets_from_grad_ready_order(module):
+    r"""Rebuilds the buckets so that they are filled in the order the gradients
+    became ready in the last backward. The order of rank 0 is used on every rank
+    since all ranks must allreduce the same buckets."""
+    params = list(module._ddp_state_for_reversed_params.keys())
+    param2index = {param: i for i, param in enumerate(params)}
+    order = flow.tensor(
+        [param2index[param] for param in module._grad_ready_order],
+        dtype=flow.int64,
+        device=module._ddp_device,
+    )
+    flow._C.broadcast(order, inplace=True)
+    grads = {param: param.grad for param in params}
+    build_buckets(module, [params[i] for i in order.numpy().tolist()])
+    with flow.no_grad():
+        for param, grad in grads.items():
+            if grad is None:
+                continue
+            start = module._param_grad_offset_in_bucket[param]
+            bucket_tensor = module._bucket_tensors[module._bucket_index[param]]
+            param.grad = flow._C.slice_view_1d_contiguous(
+                bucket_tensor, start, start + param.numel()
+            ).view(param.shape)
+            param._is_grad_acc_inplace = True
+            param.grad.copy_(grad)
+
+
+def broadcast_buffers_coalesced(buffers):
+    r"""Broadcasts ``buffers`` from rank 0 with one collective per dtype."""
+    dtype2buffers = OrderedDict()
+    for x in buffers:
+        dtype2buffers.setdefault(x.dtype, []).append(x)
+    for group in dtype2buffers.values():
+        if len(group) == 1:
+            flow._C.broadcast(group[0], inplace=True)
+            continue
+        flat_buffer = flow.cat([x.reshape(-1) for x in group])
+        flow._C.broadcast(flat_buffer, inplace=True)
+        offset = 0
+        for x in group:
+            x.copy_(
+                flow._C.slice_view_1d_contiguous(
+                    flat_buffer, offset, offset + x.numel()
+                ).view(x.shape)
+            )
+            offset += x.numel()
+
+
+@contextmanager
+def no_sync(module):
+    r"""Skips the gradient allreduce of the backward of every forward run in this
+    context, so that gradients are accumulated locally."""
+    require_sync = module._ddp_require_sync
+    module._ddp_require_sync = False
+    try:
+        yield
+    finally:
+        module._ddp_require_sync = require_sync
+
+
+def register_comm_hook(module, state, hook):
+    r"""Replaces the allreduce of every bucket with ``hook(state, bucket)``, see
+    :mod:`oneflow.nn.parallel.comm_hooks`. ``state`` defaults to a new
+    :class:`CommHookState`."""
+    if not callable(hook):
+        raise TypeError("hook should be callable")
+    module._ddp_comm_state = CommHookState() if state is None else state
+    module._ddp_comm_hook = hook
 
 
 def grad_setting_fn(module, param):
@@ -38,10 +183,17 @@ def grad_setting_fn(module, param):
 
 def allreduce_fn(module, param):
     ddp_state_for_reversed_params = module._ddp_state_for_reversed_params
-    buckets = module._buckets
-    bucket_tensors = module._bucket_tensors
 
     def allreduce(grad):
+        if not module._ddp_sync_in_backward:
+            return
+        buckets = module._buckets
+        bucket_tensors = module._bucket_tensors
+        if (
+            module._grad_ready_order is not None
+            and not ddp_state_for_reversed_params[param][0]
+        ):
+            module._grad_ready_order.append(param)
         ddp_state_for_reversed_params[param][0] = True
         for index, bucket in enumerate(buckets):
             deleted = all(ddp_state_for_reversed_params[x][1] for x in bucket)
@@ -58,7 +210,16 @@ def allreduce_fn(module, param):
                     ddp_state_for_reversed_params[x][1] = True
                 # NOTE(jianhao)(higher-order-grad):
                 # local allreduce doesn't have gradient function, higher-order grad may be unsupported
-                flow._C.local_all_reduce(bucket_tensors[index], inplace=True)
+                module._ddp_comm_hook(
+                    module._ddp_comm_state,
+                    GradBucket(
+                        index,
+                        bucket_tensors[index],
+                        bucket,
+                        [module._param_grad_offset_in_bucket[x] for x in bucket],
+                        index == len(buckets) - 1,
+                    ),
+                )
             else:
                 break
 
@@ -66,14 +227,67 @@ def allreduce_fn(module, param):
 
 
 def DistributedDataParallel(
-    module: "flow.nn.Module", *, broadcast_buffers: bool = True, bucket_size: int = 10
+    module: "flow.nn.Module",
+    *,
+    broadcast_buffers: bool = True,
+    bucket_size: int = 10,
+    bucket_cap_mb: Optional[float] = None,
+    rebuild_buckets: bool = False
 ):
-    assert all(x.dtype == flow.float32 for x in module.parameters())
+    r"""Wraps ``module`` in place for data parallel training and returns it.
+
+    Args:
+        module (flow.nn.Module): the module to wrap.
+        broadcast_buffers (bool): broadcast the buffers of rank 0 to the other
+            ranks before every forward. All buffers of a dtype are broadcast in one
+            collective. (default: ``True``)
+        bucket_size (int): the number of parameters whose gradients are allreduced
+            together. Ignored when ``bucket_cap_mb`` is set. (default: ``10``)
+        bucket_cap_mb (float, optional): the maximum size in MiB of the gradients
+            allreduced together, so that every allreduce moves a similar amount of
+            data. (default: ``None``)
+        rebuild_buckets (bool): after the first backward, regroup the gradients into
+            buckets in the order they became ready, instead of the reversed order of
+            ``module.parameters()``, so that every bucket is allreduced as early as
+            possible. (default: ``False``)
+
+    Parameters of different dtypes, e.g. float16 and float32, are put in different
+    buckets.
+
+    The returned module has a ``no_sync()`` context manager. Gradients of the
+    backward of a forward run inside it are accumulated locally without any
+    communication, the next backward outside of it allreduces the accumulated
+    gradients:
+
+    .. code-block:: python
+
+        with m.no_sync():
+            for x in micro_batches[:-1]:
+                m(x).sum().backward()
+        m(micro_batches[-1]).sum().backward()
+        optimizer.step()
+
+    It also has a ``register_comm_hook(state, hook)`` method to replace the
+    allreduce of every bucket, e.g. to compress the gradients on a slow network:
+
+    .. code-block:: python
+
+        from oneflow.nn.parallel import comm_hooks
+
+        state = comm_hooks.PowerSGDState(matrix_approximation_rank=2)
+        m.register_comm_hook(state, comm_hooks.powersgd_hook)
+        ...
+        print(state.bytes_on_wire)
+
+    """
     if parse_boolean_form_env("ONEFLOW_DISABLE_VIEW", False):
         warnings.warn(
             "because the environment variable 'ONEFLOW_DISABLE_VIEW' is set to true, so the view mechanism is disabled, and we will set bucket_size = 1"
         )
         bucket_size = 1
+        bucket_cap_mb = None
+    if bucket_cap_mb is not None and bucket_cap_mb <= 0:
+        raise ValueError("bucket_cap_mb should be positive")
     world_size = flow.env.get_world_size()
     with flow.no_grad():
         for x in module.parameters():
@@ -84,48 +298,26 @@ def DistributedDataParallel(
             x.requires_grad_(requires_grad)
 
     all_grad_size = sum([x.numel() for x in module.parameters()])
+    device = None
     if all_grad_size > 0:
         device = list(module.parameters())[0].device
         assert all(x.device == device for x in module.parameters())
     reversed_param_list = list(
         reversed(list([param for param in module.parameters() if param.requires_grad]))
     )
-    module._param_grad_offset_in_bucket = {}
-
-    def numel_in_bucket(tensor: flow.Tensor):
-        def align(x: int, unit_size: int):
-            return (x + (unit_size - 1)) // unit_size * unit_size
-
-        # tensor memory should be align to 512 bytes for cuda operations,
-        # 4 is the bytes of a float number
-        # TODO(jianhao): expose the `kCudaMemAllocAlignSize` from C++ to
-        # avoid this hardcoded "512"
-        return align(tensor.numel(), 512 // 4)
-
-    offset_in_bucket = 0
-    with flow.no_grad():
-        for i, param in enumerate(reversed_param_list):
-            assert param.is_leaf
-            if i % bucket_size == 0:
-                offset_in_bucket = 0
-            module._param_grad_offset_in_bucket[param] = offset_in_bucket
-            offset_in_bucket += numel_in_bucket(param)
-
-    module._bucket_index = {
-        x: i // bucket_size for i, x in enumerate(reversed_param_list)
-    }
-    module._buckets = [
-        reversed_param_list[i : i + bucket_size]
-        for i in range(0, len(reversed_param_list), bucket_size)
-    ]
-
-    bucket_elems = 0
-    module._bucket_tensors = []
-    for b in module._buckets:
-        bucket_elems = sum([numel_in_bucket(x) for x in b])
-        module._bucket_tensors.append(
-            flow.zeros(bucket_elems, dtype=flow.float32, device=device)
-        )
+    module._ddp_device = device
+    module._ddp_bucket_size = bucket_size
+    module._ddp_bucket_cap_bytes = (
+        None if bucket_cap_mb is None else int(bucket_cap_mb * 1024 * 1024)
+    )
+    build_buckets(module, reversed_param_list)
+    module._grad_ready_order = [] if rebuild_buckets else None
+    module._ddp_require_sync = True
+    module._ddp_sync_in_backward = True
+    module.no_sync = types.MethodType(no_sync, module)
+    module._ddp_comm_state = CommHookState()
+    module._ddp_comm_hook = allreduce_hook
+    module.register_comm_hook = types.MethodType(register_comm_hook, module)
 
     ddp_state_for_reversed_params = OrderedDict(
         reversed([(x, [False, False]) for x in module.parameters() if x.requires_grad])
@@ -140,7 +332,8 @@ def DistributedDataParallel(
     mul_factor = 1 / world_size
 
     def inplace_mul_and_return_none(x):
-        x.mul_(mul_factor)
+        if module._ddp_sync_in_backward:
+            x.mul_(mul_factor)
         return None
 
     for param in module.parameters():
@@ -150,6 +343,7 @@ def DistributedDataParallel(
             param._register_post_grad_accumulation_hook(allreduce_fn(module, param))
 
     def post_forward_hook(module, input, output):
+        module._ddp_sync_in_backward = module._ddp_require_sync
         ddp_state_for_reversed_params = module._ddp_state_for_reversed_params
         for state in ddp_state_for_reversed_params.values():
             state[0], state[1] = False, False
@@ -206,16 +400,19 @@ def DistributedDataParallel(
 
     module.register_forward_hook(post_forward_hook)
 
-    if broadcast_buffers:
-
-        def pre_forward_hook(module, input):
+    def pre_forward_hook(module, input):
+        if module._grad_ready_order is not None and len(
+            module._grad_ready_order
+        ) == len(module._ddp_state_for_reversed_params):
+            rebuild_buckets_from_grad_ready_order(module)
+            module._grad_ready_order = None
+        if broadcast_buffers:
             with flow.no_grad():
                 buffers = list(module.buffers())
                 if len(buffers) > 0:
                     flow._C.stream_touch(buffers)  # for reusing soft syncs
-                for x in buffers:
-                    flow._C.broadcast(x, inplace=True)
+                    broadcast_buffers_coalesced(buffers)
 
-        module.register_forward_pre_hook(pre_forward_hook)
+    module.register_forward_pre_hook(pre_forward_hook)
 
     return module
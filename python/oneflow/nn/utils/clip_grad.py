@@ -14,6 +14,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import collections
 import warnings
 from typing import Union, Iterable
 
@@ -95,76 +96,101 @@ def clip_grad_norm_(
         assert all(
             [p.is_global for p in parameters]
         ), "All parameters must be consistent tensor."
-        sbp_broadcast = [flow.sbp.broadcast for _ in parameters[0].sbp]
-        if norm_type == float("inf"):
-            norms = [
-                p.grad.detach().to_global(sbp=sbp_broadcast).abs().max()
-                for p in parameters
-            ]
-            total_norm = norms[0] if len(norms) == 1 else flow.max(flow.stack(norms))
-        elif norm_type == float("-inf"):
-            norms = [
-                p.grad.detach().to_global(sbp=sbp_broadcast).abs().min()
-                for p in parameters
-            ]
-            total_norm = norms[0] if len(norms) == 1 else flow.min(flow.stack(norms))
-        else:
-            total_norm = flow.linalg.vector_norm(
-                flow.stack(
-                    [
-                        flow.linalg.vector_norm(
-                            p.grad.detach().to_global(sbp=sbp_broadcast), norm_type
-                        )
-                        for p in parameters
-                    ]
-                ),
-                norm_type,
-            )
-        if error_if_nonfinite and (
-            np.isnan(total_norm.to_local().numpy()).all()
-            or np.isinf(total_norm.to_local().numpy()).all()
-        ):
-            raise RuntimeError(
-                f"The total norm of order {norm_type} for gradients from "
-                "`parameters` is non-finite, so it cannot be clipped. To disable "
-                "this error and scale the gradients by the non-finite norm anyway, "
-                "set `error_if_nonfinite=False`"
-            )
-        clip_coef = max_norm / (total_norm + 1e-6)
-        clip_coef_clamped = clip_coef.clamp(max=1.0)
-        for p in parameters:
-            p.grad.detach().mul_(clip_coef_clamped)
+    return _clip_grads_norm_(
+        [p.grad.detach() for p in parameters], max_norm, norm_type, error_if_nonfinite
+    )
+
+
+_multi_tensor_dtypes = (flow.float32, flow.float64)
+
+
+def _group_tensors(tensors, key):
+    groups = collections.OrderedDict()
+    for tensor in tensors:
+        groups.setdefault(key(tensor), []).append(tensor)
+    return list(groups.values())
+
+
+def _multi_tensor_reduce(tensors, norm_type):
+    """Reduces to max(|x|) for inf, min(|x|) for -inf and sum(|x|^p) otherwise."""
+    if tensors[0].dtype not in _multi_tensor_dtypes:
+        tensors = [tensor.to(flow.float32) for tensor in tensors]
+    if norm_type == float("inf"):
+        return flow._C.multi_reduce_max_abs(tensors)
+    elif norm_type == float("-inf"):
+        return flow._C.multi_reduce_min_abs(tensors)
+    elif norm_type == 0.0:
+        # the 0-norm of the per-tensor norms counts the tensors with a nonzero element
+        counts = flow.stack([flow.linalg.vector_norm(tensor, 0) for tensor in tensors])
+        return flow.sum(counts != 0).to(tensors[0].dtype)
     else:
-        device = parameters[0].grad.device
-        if norm_type == float("inf"):
-            norms = [p.grad.detach().abs().max().to(device) for p in parameters]
-            total_norm = norms[0] if len(norms) == 1 else flow.max(flow.stack(norms))
-        elif norm_type == float("-inf"):
-            norms = [p.grad.detach().abs().min().to(device) for p in parameters]
-            total_norm = norms[0] if len(norms) == 1 else flow.min(flow.stack(norms))
-        else:
-            total_norm = flow.linalg.vector_norm(
-                flow.stack(
-                    [
-                        flow.linalg.vector_norm(p.grad.detach(), norm_type).to(device)
-                        for p in parameters
-                    ]
-                ),
-                norm_type,
-            )
-        if error_if_nonfinite and (
-            np.isnan(total_norm.numpy()).all() or np.isinf(total_norm.numpy()).all()
-        ):
+        return flow._C.multi_reduce_sum_pow_abs(tensors, norm_type)
+
+
+def _like(total_norm, tensor):
+    if not tensor.is_global and total_norm.device != tensor.device:
+        total_norm = total_norm.to(tensor.device)
+    if total_norm.dtype != tensor.dtype:
+        total_norm = total_norm.to(tensor.dtype)
+    return total_norm
+
+
+def _clip_grads_norm_(
+    grads: Iterable[Tensor],
+    max_norm: float,
+    norm_type: float,
+    error_if_nonfinite: bool = False,
+) -> Tensor:
+    """Clips gradient tensors in place by their total norm and returns the norm.
+
+    Both the norm and the scaling run as one multi-tensor op per group of gradients
+    with the same device and dtype (dtype and sbp for global tensors), instead of a
+    few ops per gradient. Gradients are taken as they are, so this also works on
+    flattened gradient buffers.
+    """
+    if grads[0].is_global:
+        sbp_broadcast = [flow.sbp.broadcast for _ in grads[0].sbp]
+        partials = [
+            _multi_tensor_reduce(group, norm_type).to_global(sbp=sbp_broadcast)
+            for group in _group_tensors(grads, lambda grad: grad.dtype)
+        ]
+        scale_groups = _group_tensors(grads, lambda grad: (grad.dtype, tuple(grad.sbp)))
+    else:
+        scale_groups = _group_tensors(grads, lambda grad: (grad.device, grad.dtype))
+        partials = [_multi_tensor_reduce(group, norm_type) for group in scale_groups]
+    partials = [_like(partial, partials[0]) for partial in partials]
+    if len(partials) == 1:
+        total_norm = partials[0]
+    elif norm_type == float("inf"):
+        total_norm = flow.max(flow.stack(partials))
+    elif norm_type == float("-inf"):
+        total_norm = flow.min(flow.stack(partials))
+    else:
+        total_norm = flow.sum(flow.stack(partials))
+    if norm_type not in (float("inf"), float("-inf"), 0.0):
+        total_norm = total_norm.pow(1.0 / norm_type)
+
+    if error_if_nonfinite:
+        total_norm_np = (
+            total_norm.to_local() if total_norm.is_global else total_norm
+        ).numpy()
+        if np.isnan(total_norm_np).all() or np.isinf(total_norm_np).all():
             raise RuntimeError(
                 f"The total norm of order {norm_type} for gradients from "
                 "`parameters` is non-finite, so it cannot be clipped. To disable "
                 "this error and scale the gradients by the non-finite norm anyway, "
                 "set `error_if_nonfinite=False`"
             )
-        clip_coef = max_norm / (total_norm + 1e-6)
-        clip_coef_clamped = clip_coef.clamp(max=1.0)
-        for p in parameters:
-            p.grad.detach().mul_(clip_coef_clamped.to(p.grad.device))
+    for group in scale_groups:
+        if group[0].dtype in _multi_tensor_dtypes:
+            flow._C.multi_tensor_clip_by_norm_(
+                group, _like(total_norm, group[0]), max_norm
+            )
+        else:
+            clip_coef = max_norm / (total_norm + 1e-6)
+            clip_coef_clamped = clip_coef.clamp(max=1.0)
+            for grad in group:
+                grad.mul_(_like(clip_coef_clamped, grad))
     return total_norm
 
 
@@ -202,6 +202,14 @@ class MultiTableEmbedding(Module):
             persistent_table["capacity_hint"] = (
                 persistent_table["capacity_hint"] // parallel_num
             )
+        if persistent_table.__contains__("compaction_live_ratio"):
+            assert 0 <= persistent_table["compaction_live_ratio"] <= 1
+        if persistent_table.__contains__("compaction_io_rate_limit_mb"):
+            assert persistent_table["compaction_io_rate_limit_mb"] >= 0
+        if persistent_table.__contains__("snapshot_prebuilt_index"):
+            assert isinstance(persistent_table["snapshot_prebuilt_index"], bool)
+        if persistent_table.__contains__("delta_snapshot"):
+            assert isinstance(persistent_table["delta_snapshot"], bool)
 
         key_value_store_options["kv_store"] = kv_store
 
@@ -268,11 +276,12 @@ class MultiTableEmbedding(Module):
                     )
                 )
 
-    def save_snapshot(self, snapshot_name):
+    def save_snapshot(self, snapshot_name, delta=False):
         """save snapshot
 
         Args:
             snapshot_name (str): the snapshot_name, snapshot will be saved in the snapshots dir under your_configed_persistent_path
+            delta (bool, optional): if True, only save the rows updated since the last snapshot saved or loaded, which becomes the base of this snapshot. Loading a delta snapshot restores its whole chain of bases, so the base snapshots must be kept and can not be overwritten. Requires "delta_snapshot": True in the "persistent_table" of store_options. Load a delta snapshot and save it again with delta=False to merge the chain into a full snapshot. Defaults to False.
     
         For example:
 
@@ -284,7 +293,10 @@ class MultiTableEmbedding(Module):
             >>> # a snapshot named "my_snapshot1" have been saved in the "snapshots" dir under your_configed_persistent_path
             >>> # which can be reload by flow.one_embedding.load_snapshot
         """
-        self.handler.SaveSnapshot(snapshot_name)
+        if delta:
+            self.handler.SaveDeltaSnapshot(snapshot_name)
+        else:
+            self.handler.SaveSnapshot(snapshot_name)
 
     def load_snapshot(self, snapshot_name):
         """load snapshot
@@ -0,0 +1,139 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+
+
+class _RangeDataset(flow.utils.data.Dataset):
+    def __init__(self, n, fail_at=None):
+        self.n = n
+        self.fail_at = fail_at
+
+    def __getitem__(self, idx):
+        if idx == self.fail_at:
+            raise ValueError("bad sample {}".format(idx))
+        return np.full((3,), idx, dtype=np.float32), idx
+
+    def __len__(self):
+        return self.n
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestDevicePrefetch(flow.unittest.TestCase):
+    def _check_epoch(test_case, loader, n, batch_size, device):
+        num_batches = 0
+        for i, (x, y) in enumerate(loader):
+            test_case.assertEqual(x.device, flow.device(device))
+            expected = np.arange(i * batch_size, min((i + 1) * batch_size, n))
+            test_case.assertTrue(np.array_equal(y.numpy(), expected))
+            test_case.assertTrue(np.array_equal(x.numpy()[:, 0], expected))
+            num_batches += 1
+        test_case.assertEqual(num_batches, len(loader))
+
+    def test_prefetch_to_cpu(test_case):
+        loader = flow.utils.data.DataLoader(
+            _RangeDataset(37), batch_size=4, prefetch_device="cpu", prefetch_batches=3
+        )
+        test_case._check_epoch(loader, 37, 4, "cpu")
+        test_case._check_epoch(loader, 37, 4, "cpu")
+
+    def test_break_and_restart(test_case):
+        loader = flow.utils.data.DataLoader(
+            _RangeDataset(64),
+            batch_size=2,
+            num_workers=2,
+            persistent_workers=True,
+            prefetch_device="cpu",
+        )
+        for i, _ in enumerate(loader):
+            if i == 3:
+                break
+        test_case._check_epoch(loader, 64, 2, "cpu")
+
+    def test_exception_is_reraised(test_case):
+        loader = flow.utils.data.DataLoader(
+            _RangeDataset(16, fail_at=9), batch_size=4, prefetch_device="cpu"
+        )
+        with test_case.assertRaises(ValueError):
+            for _ in loader:
+                pass
+
+    def test_invalid_options(test_case):
+        with test_case.assertRaises(ValueError):
+            flow.utils.data.DataLoader(_RangeDataset(4), prefetch_batches=0)
+        with test_case.assertRaises(ValueError):
+            flow.utils.data.DataLoader(
+                _RangeDataset(4), prefetch_placement=flow.placement("cpu", [0])
+            )
+
+    @unittest.skipIf(os.getenv("ONEFLOW_TEST_CPU_ONLY"), "only test cpu cases")
+    def test_prefetch_to_cuda(test_case):
+        loader = flow.utils.data.DataLoader(
+            _RangeDataset(20), batch_size=4, prefetch_device="cuda"
+        )
+        test_case._check_epoch(loader, 20, 4, "cuda")
+
+    def test_prefetch_to_placement(test_case):
+        placement = flow.placement("cpu", [0])
+        loader = flow.utils.data.DataLoader(
+            _RangeDataset(8),
+            batch_size=4,
+            prefetch_placement=placement,
+            prefetch_sbp=flow.sbp.broadcast,
+        )
+        for x, y in loader:
+            test_case.assertTrue(x.is_global)
+            test_case.assertEqual(x.placement, placement)
+
+
+@flow.unittest.skip_unless_1n2d()
+class TestDevicePrefetchGlobal(flow.unittest.TestCase):
+    def test_prefetch_to_split_placement(test_case):
+        placement = flow.placement("cpu", [0, 1])
+        sbp = flow.sbp.split(0)
+        loader = flow.utils.data.DataLoader(
+            _RangeDataset(16),
+            batch_size=4,
+            prefetch_placement=placement,
+            prefetch_sbp=sbp,
+            prefetch_batches=2,
+        )
+        for _ in range(2):
+            num_batches = 0
+            for i, (x, y) in enumerate(loader):
+                test_case.assertTrue(x.is_global)
+                test_case.assertEqual(x.placement, placement)
+                test_case.assertEqual(x.sbp, (sbp,))
+                expected = np.arange(i * 4, (i + 1) * 4)
+                test_case.assertTrue(
+                    np.array_equal(x.to_local().numpy()[:, 0], expected)
+                )
+                # Every rank loads the same batch, so the global tensor holds it twice.
+                # numpy() of a global tensor runs collectives between the prefetches.
+                test_case.assertTrue(
+                    np.array_equal(y.numpy(), np.concatenate([expected, expected]))
+                )
+                num_batches += 1
+            test_case.assertEqual(num_batches, len(loader))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+from oneflow.multiprocessing import reductions
+from oneflow.multiprocessing.shared_memory_pool import (
+    AttachedSegmentCache,
+    SharedMemoryPool,
+    get_attached_segment_cache,
+    get_shared_memory_pool,
+)
+
+
+class IndexDataset(flow.utils.data.Dataset):
+    def __len__(self):
+        return 20
+
+    def __getitem__(self, index):
+        image = flow.full((3, 8, 8), float(index), dtype=flow.float32)
+        return image, index
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestSharedMemoryCollate(flow.unittest.TestCase):
+    def test_reduce_shared_tensor_sends_segment(test_case):
+        t = reductions.new_shared_tensor((4, 5), np.float32)
+        t.numpy()[:] = np.arange(20, dtype=np.float32).reshape(4, 5)
+        pool = get_shared_memory_pool()
+        segment = pool.find_payload(t.numpy().ctypes.data, t.numpy().nbytes)
+        test_case.assertIsNotNone(segment)
+        rebuild_fn, args = reductions.reduce_tensor(t)
+        test_case.assertIs(rebuild_fn, reductions.rebuild_shm_tensor)
+        test_case.assertEqual(args[0], segment.name)
+        # A tensor whose segment was already sent is copied into another segment.
+        _, args_again = reductions.reduce_tensor(t)
+        test_case.assertNotEqual(args_again[0], segment.name)
+        test_case.assertTrue(np.array_equal(rebuild_fn(*args).numpy(), t.numpy()))
+
+    def test_shared_memory_pool_reuses_segments(test_case):
+        pool = get_shared_memory_pool()
+        pool.clear()
+        data = np.random.rand(16, 32).astype(np.float32)
+        names = set()
+        stats_before = pool.stats()
+        for _ in range(5):
+            rebuild_fn, args = reductions.reduce_tensor(flow.tensor(data))
+            names.add(args[0])
+            received = rebuild_fn(*args)
+            test_case.assertTrue(np.array_equal(received.numpy(), data))
+            # Freeing the received tensor clears the lease so the segment is reused.
+            del received
+            flow._oneflow_internal.eager.Sync()
+        stats = pool.stats()
+        test_case.assertEqual(len(names), 1)
+        test_case.assertEqual(stats["misses"] - stats_before["misses"], 1)
+        test_case.assertEqual(stats["hits"] - stats_before["hits"], 4)
+        test_case.assertEqual(stats["leased_segments"], 0)
+
+    def test_received_segments_stay_mapped(test_case):
+        pool = get_shared_memory_pool()
+        pool.clear()
+        cache = get_attached_segment_cache()
+        cache.clear()
+        data = np.random.rand(16, 32).astype(np.float32)
+        stats_before = cache.stats()
+        for i in range(5):
+            rebuild_fn, args = reductions.reduce_tensor(flow.tensor(data + i))
+            received = rebuild_fn(*args)
+            test_case.assertTrue(np.array_equal(received.numpy(), data + i))
+            del received
+            flow._oneflow_internal.eager.Sync()
+        stats = cache.stats()
+        # The segment is mapped once and its mapping is reused by later tensors.
+        test_case.assertEqual(stats["misses"] - stats_before["misses"], 1)
+        test_case.assertEqual(stats["hits"] - stats_before["hits"], 4)
+        test_case.assertEqual(stats["cached_segments"], 1)
+        test_case.assertEqual(pool.stats()["leased_segments"], 0)
+        cache.clear()
+
+    def test_attached_segment_cache_eviction(test_case):
+        pool = SharedMemoryPool(max_cached_bytes=0)
+        cache = AttachedSegmentCache(max_cached_bytes=8192)
+        segments = [pool.acquire(4000) for _ in range(3)]
+        for segment in segments:
+            cache.detach(cache.attach(segment.name, segment.size))
+        stats = cache.stats()
+        test_case.assertEqual(stats["misses"], 3)
+        test_case.assertEqual(stats["evictions"], 1)
+        test_case.assertEqual(stats["cached_segments"], 2)
+        cache.detach(cache.attach(segments[2].name, segments[2].size))
+        test_case.assertEqual(cache.stats()["hits"], 1)
+        cache.clear()
+        for segment in segments:
+            pool.release(segment)
+
+    def test_shared_memory_pool_eviction(test_case):
+        pool = SharedMemoryPool(max_cached_bytes=8192)
+        segments = [pool.acquire(4000) for _ in range(3)]
+        for segment in segments:
+            pool.release(segment)
+        stats = pool.stats()
+        test_case.assertEqual(stats["evictions"], 1)
+        test_case.assertEqual(stats["cached_segments"], 2)
+        # The least recently freed segment was evicted.
+        test_case.assertIs(pool.acquire(4000), segments[2])
+        pool.clear()
+
+    def test_multi_worker_collate(test_case):
+        loader = flow.utils.data.DataLoader(
+            IndexDataset(), batch_size=4, shuffle=False, num_workers=2
+        )
+        for i, (images, indices) in enumerate(loader):
+            expected = np.arange(i * 4, i * 4 + 4, dtype=np.float32)
+            expected_images = np.broadcast_to(
+                expected.reshape(4, 1, 1, 1), (4, 3, 8, 8)
+            )
+            test_case.assertEqual(images.shape, (4, 3, 8, 8))
+            test_case.assertTrue(np.array_equal(images.numpy(), expected_images))
+            test_case.assertTrue(np.array_equal(indices.numpy(), expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import time
+import unittest
+from collections import OrderedDict
+
+from oneflow.test_utils.test_util import GenArgList
+
+import oneflow as flow
+
+
+def _bench_optimizer_step(optim_type, device, foreach, num_params, iters=50, repeats=3):
+    params = [
+        flow.nn.Parameter(flow.randn(64, 64, device=device)) for _ in range(num_params)
+    ]
+    for p in params:
+        p.grad = flow.randn(64, 64, device=device)
+    optim = optim_type(params, lr=1e-3, foreach=foreach)
+    # warm up, which also creates the optimizer state
+    optim.step()
+    flow._oneflow_internal.eager.Sync()
+
+    # The best of several repeats is the least affected by other load on the host.
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iters):
+            optim.step()
+        flow._oneflow_internal.eager.Sync()
+        best = min(best, (time.perf_counter() - start) / iters)
+    return best
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestOptimForeachSpeed(flow.unittest.TestCase):
+    def test_foreach_step_speed(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["optim_type"] = [flow.optim.SGD, flow.optim.Adam, flow.optim.AdamW]
+        arg_dict["device"] = (
+            ["cpu"] if os.getenv("ONEFLOW_TEST_CPU_ONLY") else ["cpu", "cuda"]
+        )
+        arg_dict["num_params"] = [2000]
+        for optim_type, device, num_params in GenArgList(arg_dict):
+            single_cost = _bench_optimizer_step(optim_type, device, False, num_params)
+            foreach_cost = _bench_optimizer_step(optim_type, device, True, num_params)
+            # Fusing the update of 2000 small parameters into a few launches
+            # should be clearly faster than one launch per parameter. The bound
+            # only catches a foreach path that is much slower, timings on shared
+            # hosts are too noisy for more, and correctness is checked elsewhere.
+            test_case.assertLess(
+                foreach_cost,
+                2 * single_cost,
+                f"{optim_type.__name__} on {device} with {num_params} params: "
+                f"per-parameter step {single_cost * 1000:.3f} ms, "
+                f"foreach step {foreach_cost * 1000:.3f} ms",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
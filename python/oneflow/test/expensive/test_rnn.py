@@ -231,6 +231,85 @@ def _test_gru(test_case, device):
     )
 
 
+def _test_fused_rnn_grad(test_case, device):
+    # On cpu the modules run fused_rnn_sequence, check its gradients w.r.t. every
+    # parameter and the initial states as well as the outputs.
+    input_size, hidden_size, num_layers, batch_size, seq_len = 7, 9, 2, 3, 5
+    for module_name, kwargs in [
+        ("RNN", {"nonlinearity": "tanh"}),
+        ("RNN", {"nonlinearity": "relu"}),
+        ("GRU", {}),
+        ("LSTM", {}),
+        ("LSTM", {"proj_size": 4}),
+    ]:
+        for bias, bidirectional in [(True, False), (False, True)]:
+            kwargs.update(
+                input_size=input_size,
+                hidden_size=hidden_size,
+                num_layers=num_layers,
+                bias=bias,
+                bidirectional=bidirectional,
+            )
+            torch_module = getattr(torch.nn, module_name)(**kwargs).double()
+            flow_module = getattr(flow.nn, module_name)(**kwargs).to(flow.float64)
+            flow_module = flow_module.to(device)
+            for w_torch, w_flow in zip(
+                torch_module.parameters(), flow_module.parameters()
+            ):
+                w = w_torch.detach().numpy()
+                w_flow.copy_(flow.tensor(w.T if w.ndim > 1 else w))
+
+            D = 2 if bidirectional else 1
+            out_size = kwargs.get("proj_size", 0) or hidden_size
+            x = np.random.randn(seq_len, batch_size, input_size)
+            h0 = np.random.randn(D * num_layers, batch_size, out_size)
+            c0 = np.random.randn(D * num_layers, batch_size, hidden_size)
+            dy = np.random.randn(seq_len, batch_size, D * out_size)
+            states_torch = [torch.tensor(h0, requires_grad=True)]
+            states_flow = [flow.tensor(h0, requires_grad=True, device=device)]
+            if module_name == "LSTM":
+                states_torch.append(torch.tensor(c0, requires_grad=True))
+                states_flow.append(flow.tensor(c0, requires_grad=True, device=device))
+            x_torch = torch.tensor(x, requires_grad=True)
+            x_flow = flow.tensor(x, requires_grad=True, device=device)
+            if module_name == "LSTM":
+                out_torch, (h_torch, c_torch) = torch_module(
+                    x_torch, tuple(states_torch)
+                )
+                out_flow, (h_flow, c_flow) = flow_module(x_flow, tuple(states_flow))
+                last_torch = h_torch.sum() + c_torch.sum()
+                last_flow = h_flow.sum() + c_flow.sum()
+            else:
+                out_torch, h_torch = torch_module(x_torch, states_torch[0])
+                out_flow, h_flow = flow_module(x_flow, states_flow[0])
+                last_torch = h_torch.sum()
+                last_flow = h_flow.sum()
+            test_case.assertTrue(
+                np.allclose(out_torch.detach().numpy(), out_flow.numpy(), atol=1e-8)
+            )
+            test_case.assertTrue(
+                np.allclose(h_torch.detach().numpy(), h_flow.numpy(), atol=1e-8)
+            )
+            ((out_torch * torch.tensor(dy)).sum() + last_torch).backward()
+            ((out_flow * flow.tensor(dy, device=device)).sum() + last_flow).backward()
+            test_case.assertTrue(
+                np.allclose(x_torch.grad.numpy(), x_flow.grad.numpy(), atol=1e-8)
+            )
+            for s_torch, s_flow in zip(states_torch, states_flow):
+                test_case.assertTrue(
+                    np.allclose(s_torch.grad.numpy(), s_flow.grad.numpy(), atol=1e-8)
+                )
+            for w_torch, w_flow in zip(
+                torch_module.parameters(), flow_module.parameters()
+            ):
+                g = w_torch.grad.numpy()
+                test_case.assertTrue(
+                    np.allclose(
+                        g.T if g.ndim > 1 else g, w_flow.grad.numpy(), atol=1e-8
+                    )
+                )
+
+
 @flow.unittest.skip_unless_1n1d()
 class TestRNNModule(flow.unittest.TestCase):
     def test_rnn(test_case):
@@ -240,6 +319,9 @@ class TestRNNModule(flow.unittest.TestCase):
         for arg in GenArgList(arg_dict):
             arg[0](test_case, *arg[1:])
 
+    def test_fused_rnn_grad(test_case):
+        _test_fused_rnn_grad(test_case, "cpu")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,139 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+
+
+def _make_linear_graph_cls(linear):
+    class LinearGraph(flow.nn.Graph):
+        def __init__(self):
+            super().__init__()
+            self.linear = linear
+
+        def build(self, x):
+            return self.linear(x)
+
+    return LinearGraph
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestDynamicShapeGraph(flow.unittest.TestCase):
+    def test_pad_to_bucket(test_case):
+        linear = flow.nn.Linear(4, 3)
+        g = flow.nn.graph.DynamicShapeGraph(
+            _make_linear_graph_cls(linear), bucket_boundaries={1: [4, 8]}
+        )
+        for length, bucket in [(3, 4), (4, 4), (6, 8), (1, 4)]:
+            x = flow.randn(2, length, 4)
+            out = g(x)
+            test_case.assertEqual(tuple(out.shape), (2, bucket, 3))
+            test_case.assertTrue(
+                np.allclose(
+                    out[:, :length].numpy(), linear(x).numpy(), rtol=1e-5, atol=1e-5
+                )
+            )
+            # The padded positions are zeros, which the linear maps to its bias.
+            padded = np.broadcast_to(linear.bias.numpy(), (2, bucket - length, 3))
+            test_case.assertTrue(
+                np.allclose(out[:, length:].numpy(), padded, rtol=1e-5, atol=1e-5)
+            )
+        test_case.assertEqual(
+            [key[0][0] for key in g.compiled_buckets], [(2, 4, 4), (2, 8, 4)]
+        )
+
+    def test_lru_and_shared_parameters(test_case):
+        linear = flow.nn.Linear(4, 3)
+        num_graphs = [0]
+        graph_cls = _make_linear_graph_cls(linear)
+
+        def make_graph():
+            num_graphs[0] += 1
+            return graph_cls()
+
+        g = flow.nn.graph.DynamicShapeGraph(
+            make_graph, bucket_boundaries={1: [4, 8, 12]}, max_plans=2
+        )
+        g(flow.randn(2, 3, 4))
+        g(flow.randn(2, 6, 4))
+        g(flow.randn(2, 2, 4))
+        g(flow.randn(2, 10, 4))
+        # The (2, 8, 4) bucket was the least recently used one.
+        test_case.assertEqual(num_graphs[0], 3)
+        test_case.assertEqual(
+            [key[0][0] for key in g.compiled_buckets], [(2, 4, 4), (2, 12, 4)]
+        )
+        # All plans use the parameters of the module.
+        flow.nn.init.constant_(linear.weight, 1.0)
+        flow.nn.init.constant_(linear.bias, 0.0)
+        for length in [3, 10]:
+            out = g(flow.ones(2, length, 4))
+            test_case.assertTrue(np.allclose(out[:, :length].numpy(), 4.0))
+        test_case.assertEqual(num_graphs[0], 3)
+
+    def test_device_and_placement_in_key(test_case):
+        linear = flow.nn.Linear(4, 3)
+        g = flow.nn.graph.DynamicShapeGraph(
+            _make_linear_graph_cls(linear), bucket_boundaries={1: [4]}
+        )
+        x = flow.randn(2, 3, 4)
+        out = g(x)
+        # The same padded shape as a global tensor needs a plan of its own.
+        placement = flow.placement("cpu", [0])
+        linear.to_global(placement=placement, sbp=flow.sbp.broadcast)
+        global_out = g(x.to_global(placement=placement, sbp=flow.sbp.broadcast))
+        test_case.assertTrue(global_out.is_global)
+        test_case.assertEqual(global_out.placement, placement)
+        test_case.assertTrue(np.allclose(global_out.numpy(), out.numpy(), 1e-5, 1e-5))
+        test_case.assertEqual(len(g.compiled_buckets), 2)
+        test_case.assertEqual(g.compiled_buckets[0][0][2], flow.device("cpu"))
+        test_case.assertEqual(g.compiled_buckets[1][0][2], placement)
+
+    def test_bucket_size(test_case):
+        g = flow.nn.graph.DynamicShapeGraph(lambda: None, bucket_boundaries={1: [8, 4]})
+        test_case.assertEqual(g.bucket_size(1, 1), 4)
+        test_case.assertEqual(g.bucket_size(1, 5), 8)
+        test_case.assertEqual(g.bucket_size(0, 5), 5)
+        with test_case.assertRaises(ValueError):
+            g.bucket_size(1, 9)
+        with test_case.assertRaises(ValueError):
+            flow.nn.graph.DynamicShapeGraph(lambda: None, bucket_boundaries={1: []})
+
+    def test_graph_with_optimizer(test_case):
+        linear = flow.nn.Linear(4, 3)
+        sgd = flow.optim.SGD(linear.parameters(), lr=0.1)
+
+        class TrainGraph(flow.nn.Graph):
+            def __init__(self):
+                super().__init__()
+                self.linear = linear
+                self.add_optimizer(sgd)
+
+            def build(self, x):
+                loss = self.linear(x).sum()
+                loss.backward()
+                return loss
+
+        g = flow.nn.graph.DynamicShapeGraph(TrainGraph, bucket_boundaries={0: [4]})
+        with test_case.assertRaises(NotImplementedError):
+            g(flow.randn(2, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,7 +22,12 @@ import numpy as np
 import oneflow as flow
 import oneflow.unittest
 from oneflow.framework.tensor import Tensor, TensorTuple
-from oneflow.nn.graph.util import IONodeType, IONode
+from oneflow.nn.graph.util import (
+    IONodeType,
+    IONode,
+    flatten_io_tensors,
+    map_io_tensors,
+)
 
 
 @unittest.skipIf(os.getenv("ONEFLOW_TEST_CPU_ONLY"), "only test cpu cases")
@@ -278,6 +283,67 @@ class TestGraphIOCheck(flow.unittest.TestCase):
         for i in range(15):
             call_and_check(i)
 
+    def test_flatten_and_map_io_tensors(test_case):
+        t0 = flow.ones(2, 2)
+        t1 = flow.ones(2, 2)
+        t2 = flow.ones(2, 2)
+        inp = ((None, 1, "s", t0, [t1, {"a": t2, "b": None}]), {"kw": t0})
+
+        io_node = IONode(None, 0, inp, "Graph_0")
+        expected = [
+            node._value
+            for (_, node) in io_node.named_nodes()
+            if node._type == IONodeType.TENSOR
+        ]
+        flattened = flatten_io_tensors(inp)
+        test_case.assertEqual([id(t) for t in flattened], [id(t) for t in expected])
+
+        mapped = map_io_tensors(inp, lambda t: t + 1)
+        test_case.assertEqual(mapped[0][:3], (None, 1, "s"))
+        test_case.assertTrue(isinstance(mapped[0][4], list))
+        test_case.assertTrue(
+            np.array_equal(mapped[0][4][1]["a"].numpy(), 2 * np.ones((2, 2)))
+        )
+        test_case.assertEqual(mapped[0][4][1]["b"], None)
+        test_case.assertTrue(
+            np.array_equal(mapped[1]["kw"].numpy(), 2 * np.ones((2, 2)))
+        )
+
+    def test_graph_zero_copy_outputs(test_case):
+        class ZeroCopyGraph(flow.nn.Graph):
+            def __init__(self, zero_copy):
+                super().__init__()
+                self.config.set_outputs_buffer_size(3)
+                self.config.enable_zero_copy_outputs(zero_copy)
+
+            def build(self, x):
+                return {"y": x + 1, "z": [x * 2, None]}
+
+        def run(zero_copy):
+            g = ZeroCopyGraph(zero_copy)
+            outs = []
+            for i in range(7):
+                out = g(flow.ones(4) * i)
+                test_case.assertTrue(np.array_equal(out["y"].numpy(), [i + 1] * 4))
+                test_case.assertTrue(np.array_equal(out["z"][0].numpy(), [2 * i] * 4))
+                test_case.assertEqual(out["z"][1], None)
+                test_case.assertNotIn("extra", out)
+                outs.append(out)
+                # Changing the returned containers must not change later outputs.
+                out["z"][1] = flow.zeros(4)
+                out["extra"] = None
+            return outs
+
+        copied = run(False)
+        test_case.assertEqual(len(set(id(out["y"]) for out in copied)), 7)
+        # The outputs are the tensors of the outputs buffer, which is reused every
+        # 3 calls.
+        zero_copied = run(True)
+        test_case.assertEqual(len(set(id(out["y"]) for out in zero_copied)), 3)
+        test_case.assertTrue(zero_copied[0]["y"] is zero_copied[3]["y"])
+        test_case.assertFalse(zero_copied[0] is zero_copied[3])
+        test_case.assertTrue(np.array_equal(zero_copied[0]["y"].numpy(), [7] * 4))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,144 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+
+# Compiles two graphs, the ids of the second one depend on the counters left by the
+# first one, and saves their outputs.
+_COMPILE_GRAPHS_SCRIPT = """
+import sys
+
+import numpy as np
+import oneflow as flow
+
+data_dir = sys.argv[1]
+linear = flow.nn.Linear(3, 8)
+linear.load_state_dict(
+    {
+        "weight": flow.tensor(np.load(data_dir + "/weight.npy")),
+        "bias": flow.tensor(np.load(data_dir + "/bias.npy")),
+    }
+)
+x = flow.tensor(np.load(data_dir + "/x.npy"))
+
+
+class LinearGraph(flow.nn.Graph):
+    def __init__(self):
+        super().__init__()
+        self.linear = linear
+
+    def build(self, x):
+        return self.linear(x)
+
+
+class ReluLinearGraph(flow.nn.Graph):
+    def __init__(self):
+        super().__init__()
+        self.linear = linear
+
+    def build(self, x):
+        return flow.relu(self.linear(x))
+
+
+np.save(sys.argv[2] + "_linear.npy", LinearGraph()(x).numpy())
+np.save(sys.argv[2] + "_relu_linear.npy", ReluLinearGraph()(x).numpy())
+"""
+
+
+def _cache_file_stats(cache_dir):
+    stats = {}
+    for name in os.listdir(cache_dir):
+        stat = os.stat(os.path.join(cache_dir, name))
+        stats[name] = (stat.st_ino, stat.st_mtime_ns)
+    return stats
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestGraphPlanCache(flow.unittest.TestCase):
+    def test_graph_plan_cache(test_case):
+        linear = flow.nn.Linear(3, 8)
+
+        class LinearGraph(flow.nn.Graph):
+            def __init__(self):
+                super().__init__()
+                self.linear = linear
+
+            def build(self, x):
+                return self.linear(x)
+
+        x = flow.randn(4, 3)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            os.environ["ONEFLOW_NN_GRAPH_PLAN_CACHE_DIR"] = cache_dir
+            try:
+                out = LinearGraph()(x)
+            finally:
+                del os.environ["ONEFLOW_NN_GRAPH_PLAN_CACHE_DIR"]
+            cache_files = os.listdir(cache_dir)
+            test_case.assertEqual(len(cache_files), 1)
+            test_case.assertTrue(cache_files[0].startswith("plan_"))
+        test_case.assertTrue(
+            np.allclose(out.numpy(), linear(x).numpy(), rtol=1e-5, atol=1e-5)
+        )
+
+    def test_graph_plan_cache_hit_in_another_process(test_case):
+        with tempfile.TemporaryDirectory() as data_dir:
+            for name, shape in [("weight", (8, 3)), ("bias", (8,)), ("x", (4, 3))]:
+                np.save(
+                    os.path.join(data_dir, f"{name}.npy"),
+                    np.random.randn(*shape).astype(np.float32),
+                )
+            cache_dir = os.path.join(data_dir, "plan_cache")
+            env = dict(os.environ, ONEFLOW_NN_GRAPH_PLAN_CACHE_DIR=cache_dir)
+
+            def compile_graphs(run_name):
+                subprocess.run(
+                    [
+                        sys.executable,
+                        "-c",
+                        _COMPILE_GRAPHS_SCRIPT,
+                        data_dir,
+                        os.path.join(data_dir, run_name),
+                    ],
+                    env=env,
+                    check=True,
+                )
+
+            compile_graphs("miss")
+            stats = _cache_file_stats(cache_dir)
+            test_case.assertEqual(len(stats), 2)
+            compile_graphs("hit")
+            # A miss would write the entry again. The second graph only hits if the
+            # id counters of the first one were restored, otherwise its key differs.
+            test_case.assertEqual(_cache_file_stats(cache_dir), stats)
+            for graph in ["linear", "relu_linear"]:
+                test_case.assertTrue(
+                    np.array_equal(
+                        np.load(os.path.join(data_dir, f"miss_{graph}.npy")),
+                        np.load(os.path.join(data_dir, f"hit_{graph}.npy")),
+                    )
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestCpuAllocator(flow.unittest.TestCase):
+    def test_cached_memory_is_reused(test_case):
+        flow.cpu.empty_cache()
+        x = flow.ones(1024, 1024)
+        flow._oneflow_internal.eager.Sync()
+        stats = flow.cpu.memory_stats()
+        test_case.assertGreaterEqual(stats["allocated_bytes"], 4 * 1024 * 1024)
+        test_case.assertGreaterEqual(
+            flow.cpu.max_memory_allocated(), stats["allocated_bytes"]
+        )
+        del x
+        flow._oneflow_internal.eager.Sync()
+        test_case.assertGreaterEqual(
+            flow.cpu.memory_stats()["cached_bytes"], 4 * 1024 * 1024
+        )
+        num_system_allocs = flow.cpu.memory_stats()["num_system_allocs"]
+        y = flow.ones(1024, 1024)
+        flow._oneflow_internal.eager.Sync()
+        test_case.assertEqual(
+            flow.cpu.memory_stats()["num_system_allocs"], num_system_allocs
+        )
+        test_case.assertTrue(np.array_equal(y.numpy(), np.ones((1024, 1024))))
+        del y
+        flow._oneflow_internal.eager.Sync()
+        flow.cpu.empty_cache()
+        test_case.assertEqual(flow.cpu.memory_stats()["cached_bytes"], 0)
+
+    def test_cache_limit(test_case):
+        limit = flow.cpu.get_cache_limit()
+        flow.cpu.set_cache_limit(0)
+        x = flow.ones(256, 256)
+        del x
+        flow._oneflow_internal.eager.Sync()
+        test_case.assertEqual(flow.cpu.memory_stats()["cached_bytes"], 0)
+        flow.cpu.set_cache_limit(limit)
+        test_case.assertEqual(flow.cpu.get_cache_limit(), limit)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import oneflow as flow
+import oneflow.unittest
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestHostProfiler(flow.unittest.TestCase):
+    def test_profile_eager_ops(test_case):
+        x = flow.randn(8, 16)
+        w = flow.randn(16, 4)
+        with flow.profiler.profile(record_shapes=True, profile_memory=True) as prof:
+            with flow.profiler.record_function("forward"):
+                y = flow.relu(flow.matmul(x, w))
+        test_case.assertEqual(tuple(y.shape), (8, 4))
+        events = prof.events()
+        categories = set(event["category"] for event in events)
+        test_case.assertTrue({"op", "instruction", "range"} <= categories)
+        matmul_events = [
+            event
+            for event in events
+            if event["category"] == "op" and event["name"] == "matmul"
+        ]
+        test_case.assertEqual(len(matmul_events), 1)
+        test_case.assertEqual(matmul_events[0]["input_shapes"], "[(8,16), (16,4)]")
+        for event in events:
+            test_case.assertLessEqual(event["start_ns"], event["end_ns"])
+        instructions = [e for e in events if e["category"] == "instruction"]
+        test_case.assertTrue(any(e["stream"] for e in instructions))
+
+        averages = prof.key_averages(group_by_input_shape=True)
+        test_case.assertTrue(any(avg.name == "relu" for avg in averages))
+        table = averages.table(sort_by="count", row_limit=5)
+        test_case.assertIn("Calls", table)
+        test_case.assertIn("Input shapes", table)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "trace.json")
+            prof.export_chrome_trace(path)
+            with open(path) as f:
+                trace = json.load(f)
+        test_case.assertEqual(len(trace["traceEvents"]), len(events))
+        test_case.assertTrue(all(e["ph"] == "X" for e in trace["traceEvents"]))
+
+    def test_nothing_recorded_outside_profile(test_case):
+        with flow.profiler.profile() as prof:
+            pass
+        flow.relu(flow.randn(4))
+        flow._oneflow_internal.eager.Sync()
+        test_case.assertEqual(
+            [event for event in prof.events() if event["category"] == "op"], []
+        )
+
+    def test_unmatched_range_pop_is_ignored(test_case):
+        flow.profiler.range_pop()
+        with flow.profiler.profile() as prof:
+            flow.profiler.range_push("outer")
+            flow.profiler.range_pop()
+            flow.profiler.range_pop()
+        test_case.assertEqual(
+            [event["name"] for event in prof.events() if event["category"] == "range"],
+            ["outer"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
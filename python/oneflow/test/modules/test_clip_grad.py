@@ -66,6 +66,44 @@ def _test_clip_grad_norm_impl(test_case, shape, device, max_norm, norm_type):
     )
 
 
+def _test_clip_grad_norm_multi_tensor_impl(
+    test_case, device, num_tensors, max_norm, norm_type
+):
+    np_grads = [
+        np.random.randn(*np.random.randint(1, 6, size=np.random.randint(1, 4)))
+        for _ in range(num_tensors)
+    ]
+    of_inputs = []
+    for np_grad in np_grads:
+        of_input = flow.zeros(
+            np_grad.shape, device=flow.device(device), requires_grad=True
+        )
+        weight = flow.tensor(np_grad, dtype=flow.float32, device=flow.device(device))
+        (of_input * weight).sum().backward()
+        of_inputs.append(of_input)
+    of_total_norm = flow.nn.utils.clip_grad_norm_(of_inputs, max_norm, norm_type)
+
+    norm_type = float(norm_type)
+    if norm_type == float("inf"):
+        np_total_norm = max(np.max(np.abs(grad)) for grad in np_grads)
+    elif norm_type == float("-inf"):
+        np_total_norm = min(np.min(np.abs(grad)) for grad in np_grads)
+    elif norm_type == 0:
+        np_total_norm = sum(np.any(grad != 0) for grad in np_grads)
+    else:
+        np_total_norm = np.linalg.norm(
+            np.concatenate([grad.flatten() for grad in np_grads]), norm_type
+        )
+    clip_coef = min(max_norm / (np_total_norm + 1e-6), 1.0)
+    test_case.assertTrue(
+        np.allclose(of_total_norm.numpy(), np_total_norm, 1e-4, 1e-4, equal_nan=True)
+    )
+    for of_input, np_grad in zip(of_inputs, np_grads):
+        test_case.assertTrue(
+            np.allclose(of_input.grad.numpy(), np_grad * clip_coef, 1e-4, 1e-4)
+        )
+
+
 def _clip_grad_value_np(input, clip_value):
     np_out = np.maximum(0, input)
     np_grad = np.array(np_out > 0, dtype=np.float32)
@@ -158,6 +196,16 @@ class TestClipGrad(flow.unittest.TestCase):
         for arg in GenArgList(arg_dict):
             _test_clip_grad_norm_impl(test_case, *arg)
 
+    def test_clip_grad_multi_tensor(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["device"] = ["cpu", "cuda"]
+        # more tensors than a single multi-tensor op takes
+        arg_dict["num_tensors"] = [1, 7, 300]
+        arg_dict["max_norm"] = [0.5, 1e4]
+        arg_dict["norm_type"] = ["inf", "-inf", 0.0, 1.0, 2.0, 3.5]
+        for arg in GenArgList(arg_dict):
+            _test_clip_grad_norm_multi_tensor_impl(test_case, *arg)
+
     def test_clip_value(test_case):
         arg_dict = OrderedDict()
         arg_dict["shape"] = [(2, 3), (2, 3, 4), (2, 4, 5, 6)]
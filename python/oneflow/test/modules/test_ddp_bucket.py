@@ -0,0 +1,197 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import time
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+from oneflow.nn.parallel import DistributedDataParallel as ddp
+from oneflow.nn.parallel.ddp import split_into_buckets
+import oneflow.unittest
+
+
+test_device = ["cpu"] if os.getenv("ONEFLOW_TEST_CPU_ONLY") else ["cpu", "cuda"]
+
+
+def _make_mlp(num_layers, hidden_size, dev_type):
+    flow.manual_seed(0)
+    layers = []
+    for _ in range(num_layers):
+        layers.append(flow.nn.Linear(hidden_size, hidden_size))
+        layers.append(flow.nn.ReLU())
+    return flow.nn.Sequential(*layers).to(dev_type)
+
+
+def _rank_input(shape, dev_type):
+    return flow.ones(*shape, device=dev_type) * (flow.env.get_rank() + 1)
+
+
+@flow.unittest.skip_unless_1n2d()
+class TestDDPBucket(flow.unittest.TestCase):
+    def test_split_into_buckets(test_case):
+        params = [flow.zeros(n) for n in [128, 128, 1024, 128, 4096]]
+        buckets = split_into_buckets(params, 10, 1024 * 4)
+        test_case.assertEqual([len(b) for b in buckets], [2, 1, 1, 1])
+        buckets = split_into_buckets(params, 2, None)
+        test_case.assertEqual([len(b) for b in buckets], [2, 2, 1])
+
+    def _test_bucket_cap_mb(test_case, dev_type):
+        x = _rank_input((4, 64), dev_type)
+        # The gradients of DDP are the mean of the gradients of both ranks.
+        expected = _make_mlp(6, 64, dev_type)
+        expected(flow.ones(4, 64, device=dev_type)).sum().backward()
+        expected(flow.ones(4, 64, device=dev_type) * 2).sum().backward()
+        m = ddp(_make_mlp(6, 64, dev_type), bucket_cap_mb=0.02)
+        test_case.assertGreater(len(m._buckets), 1)
+        for bucket in m._buckets:
+            if len(bucket) > 1:
+                test_case.assertLessEqual(
+                    sum(p.numel() for p in bucket) * 4, 0.02 * 1024 * 1024
+                )
+        m(x).sum().backward()
+        for p, q in zip(m.parameters(), expected.parameters()):
+            test_case.assertTrue(
+                np.allclose(p.grad.numpy(), q.grad.numpy() / 2, 1e-4, 1e-4)
+            )
+
+    def test_bucket_cap_mb(test_case):
+        for dev_type in test_device:
+            test_case._test_bucket_cap_mb(dev_type)
+
+    def _test_rebuild_buckets(test_case, dev_type):
+        class Model(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w1 = flow.nn.Parameter(flow.Tensor([1, 1]))
+                self.w2 = flow.nn.Parameter(flow.Tensor([2, 2]))
+                self.w3 = flow.nn.Parameter(flow.Tensor([3, 3]))
+
+            def forward(self, x):
+                # w1 is used last, so its gradient is ready first.
+                return x * self.w3 * self.w2 * self.w1
+
+        x = _rank_input((2,), dev_type)
+        m = ddp(Model().to(dev_type), bucket_size=1, rebuild_buckets=True)
+        test_case.assertIs(m._buckets[0][0], m.w3)
+        for step in range(2):
+            if step > 0:
+                for p in m.parameters():
+                    p.grad.zero_()
+            m(x).sum().backward()
+            # The mean input is 1.5, times the product of the other weights.
+            test_case.assertTrue(np.allclose(m.w1.grad.numpy(), [9, 9]))
+            test_case.assertTrue(np.allclose(m.w2.grad.numpy(), [4.5, 4.5]))
+            test_case.assertTrue(np.allclose(m.w3.grad.numpy(), [3, 3]))
+        test_case.assertIs(m._buckets[0][0], m.w1)
+        test_case.assertIsNone(m._grad_ready_order)
+
+    def test_rebuild_buckets(test_case):
+        for dev_type in test_device:
+            test_case._test_rebuild_buckets(dev_type)
+
+    def _test_broadcast_buffers_coalesced(test_case, dev_type):
+        class Model(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                rank = flow.env.get_rank()
+                self.w = flow.nn.Parameter(flow.Tensor([1]))
+                self.register_buffer("a", flow.ones(3) * rank)
+                self.register_buffer("b", flow.ones(2, 2) * (rank + 1))
+                self.register_buffer("c", flow.ones(4, dtype=flow.int64) * rank)
+
+            def forward(self, x):
+                return x * self.w
+
+        m = ddp(Model().to(dev_type))
+        m(flow.ones(1, device=dev_type))
+        test_case.assertTrue(np.array_equal(m.a.numpy(), np.zeros(3)))
+        test_case.assertTrue(np.array_equal(m.b.numpy(), np.ones((2, 2))))
+        test_case.assertTrue(np.array_equal(m.c.numpy(), np.zeros(4)))
+        test_case.assertEqual(m.c.dtype, flow.int64)
+
+    def test_broadcast_buffers_coalesced(test_case):
+        for dev_type in test_device:
+            test_case._test_broadcast_buffers_coalesced(dev_type)
+
+    def _test_mixed_dtype(test_case, dev_type, low_dtype):
+        class Model(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w1 = flow.nn.Parameter(flow.tensor([1.0, 2.0], dtype=low_dtype))
+                self.w2 = flow.nn.Parameter(flow.tensor([3.0, 4.0]))
+                self.w3 = flow.nn.Parameter(flow.tensor([5.0, 6.0], dtype=low_dtype))
+
+            def forward(self, x):
+                y = (x.to(low_dtype) * self.w1 * self.w3).to(flow.float32)
+                return y * self.w2
+
+        m = ddp(Model().to(dev_type), bucket_size=10)
+        test_case.assertEqual(len(m._buckets), 2)
+        for bucket, bucket_tensor in zip(m._buckets, m._bucket_tensors):
+            test_case.assertTrue(all(p.dtype == bucket_tensor.dtype for p in bucket))
+        m(_rank_input((2,), dev_type)).sum().backward()
+        test_case.assertEqual(m.w1.grad.dtype, low_dtype)
+        test_case.assertEqual(m.w2.grad.dtype, flow.float32)
+        # The mean input is 1.5, times the product of the other weights.
+        test_case.assertTrue(np.allclose(m.w1.grad.numpy(), [22.5, 36]))
+        test_case.assertTrue(np.allclose(m.w2.grad.numpy(), [7.5, 18]))
+        test_case.assertTrue(np.allclose(m.w3.grad.numpy(), [4.5, 12]))
+
+    def test_mixed_dtype(test_case):
+        for dev_type in test_device:
+            # float16 kernels are only guaranteed on cuda.
+            low_dtype = flow.float16 if dev_type == "cuda" else flow.float64
+            test_case._test_mixed_dtype(dev_type, low_dtype)
+
+    def _benchmark_overlap(test_case, dev_type, **ddp_kwargs):
+        m = ddp(_make_mlp(24, 512, dev_type), **ddp_kwargs)
+        x = _rank_input((64, 512), dev_type)
+        num_steps = 10
+        for step in range(num_steps + 1):
+            if step == 1:
+                # The first step builds the buckets and warms up.
+                flow._oneflow_internal.eager.Sync()
+                start = time.perf_counter()
+            for p in m.parameters():
+                p.grad = None
+            m(x).sum().backward()
+        flow._oneflow_internal.eager.Sync()
+        seconds = (time.perf_counter() - start) / num_steps
+        return seconds, [p.grad.numpy() for p in m.parameters()]
+
+    def test_overlap_benchmark(test_case):
+        for dev_type in test_device:
+            count_seconds, count_grads = test_case._benchmark_overlap(
+                dev_type, bucket_size=10
+            )
+            cap_seconds, cap_grads = test_case._benchmark_overlap(
+                dev_type, bucket_cap_mb=1, rebuild_buckets=True
+            )
+            if os.getenv("ONEFLOW_TEST_PRINT_BENCHMARK") and flow.env.get_rank() == 0:
+                print(
+                    "DDP step on {}: {:.3f} ms with bucket_size=10, {:.3f} ms with "
+                    "bucket_cap_mb=1 and rebuild_buckets".format(
+                        dev_type, count_seconds * 1000, cap_seconds * 1000
+                    )
+                )
+            for count_grad, cap_grad in zip(count_grads, cap_grads):
+                test_case.assertTrue(np.allclose(count_grad, cap_grad, 1e-4, 1e-4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+from oneflow.nn.parallel import DistributedDataParallel as ddp
+from oneflow.nn.parallel import comm_hooks
+import oneflow.unittest
+
+
+test_device = ["cpu"] if os.getenv("ONEFLOW_TEST_CPU_ONLY") else ["cpu", "cuda"]
+
+
+class Model(flow.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.w = flow.nn.Parameter(flow.ones(8, 8))
+        self.b = flow.nn.Parameter(flow.zeros(8))
+
+    def forward(self, x):
+        return flow.matmul(x, self.w) + self.b
+
+
+def _run(dev_type, state, hook, steps=1):
+    m = ddp(Model().to(dev_type), bucket_size=2)
+    if hook is not None:
+        m.register_comm_hook(state, hook)
+    rank = flow.env.get_rank()
+    for i in range(steps):
+        for p in m.parameters():
+            p.grad = None
+        x = flow.ones(4, 8, device=dev_type) * (rank + 1) * (i + 1)
+        m(x).sum().backward()
+    return m
+
+
+@flow.unittest.skip_unless_1n2d()
+class TestDDPCommHook(flow.unittest.TestCase):
+    def _test_fp16_compress(test_case, dev_type):
+        default_m = _run(dev_type, None, None)
+        state = comm_hooks.CommHookState()
+        m = _run(dev_type, state, comm_hooks.fp16_compress_hook)
+        test_case.assertTrue(
+            np.allclose(m.w.grad.numpy(), default_m.w.grad.numpy(), atol=1e-2)
+        )
+        test_case.assertTrue(np.allclose(m.b.grad.numpy(), [4] * 8))
+        default_state = default_m._ddp_comm_state
+        test_case.assertEqual(default_state.bytes_on_wire, 2 * state.bytes_on_wire)
+
+    def test_fp16_compress(test_case):
+        for dev_type in test_device:
+            test_case._test_fp16_compress(dev_type)
+
+    def _test_topk_error_feedback(test_case, dev_type):
+        state = comm_hooks.TopKState(ratio=0.25)
+        m = _run(dev_type, state, comm_hooks.topk_hook)
+        # b and w are at offsets 0 and 128 of a bucket of 256 elements, the 64
+        # elements with the largest magnitude are sent, the other 8 of the 72
+        # nonzero ones are kept.
+        residual = state.residuals[0]
+        test_case.assertEqual(int((residual.numpy() != 0).sum()), 8)
+        # Nothing is lost: what was communicated plus the residuals of all ranks is
+        # the mean gradient.
+        flow._C.local_all_reduce(residual, inplace=True)
+        mean = np.zeros(256)
+        mean[:8] = 4
+        mean[128:192] = 6
+        test_case.assertTrue(
+            np.allclose(m._bucket_tensors[0].numpy() + residual.numpy(), mean)
+        )
+        # 64 float32 values and 64 int64 indices instead of 256 float32 values.
+        test_case.assertEqual(state.bytes_on_wire, 64 * 4 + 64 * 8)
+
+    def test_topk_error_feedback(test_case):
+        for dev_type in test_device:
+            test_case._test_topk_error_feedback(dev_type)
+
+    def _test_powersgd(test_case, dev_type):
+        state = comm_hooks.PowerSGDState(matrix_approximation_rank=1, start_iter=1)
+        m = _run(dev_type, state, comm_hooks.powersgd_hook, steps=3)
+        test_case.assertEqual(state.iter, 3)
+        # The gradient of w is a rank-1 matrix, so it is recovered exactly.
+        test_case.assertTrue(np.allclose(m.w.grad.numpy(), np.full((8, 8), 18.0)))
+        test_case.assertTrue(np.allclose(m.b.grad.numpy(), [4] * 8))
+        test_case.assertTrue(
+            np.allclose(state.errors[m.w].numpy(), np.zeros((8, 8)), atol=1e-4)
+        )
+        default_m = _run(dev_type, None, None, steps=3)
+        test_case.assertLess(
+            state.bytes_on_wire, default_m._ddp_comm_state.bytes_on_wire
+        )
+
+    def test_powersgd(test_case):
+        for dev_type in test_device:
+            test_case._test_powersgd(dev_type)
+
+    def test_register_comm_hook_checks_hook(test_case):
+        m = ddp(Model())
+        with test_case.assertRaises(TypeError):
+            m.register_comm_hook(None, "allreduce")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+from oneflow.nn.parallel import DistributedDataParallel as ddp
+import oneflow.unittest
+
+
+test_device = ["cpu"] if os.getenv("ONEFLOW_TEST_CPU_ONLY") else ["cpu", "cuda"]
+
+
+@flow.unittest.skip_unless_1n2d()
+class TestDDPNoSync(flow.unittest.TestCase):
+    def _test_no_sync(test_case, dev_type):
+        class Model(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w1 = flow.nn.Parameter(flow.Tensor([1, 1]))
+                self.w2 = flow.nn.Parameter(flow.Tensor([2, 2]))
+
+            def forward(self, x):
+                return x * self.w1 * self.w2
+
+        m = ddp(Model().to(dev_type), bucket_size=1)
+        num_allreduces = [0]
+        local_all_reduce = flow._C.local_all_reduce
+
+        def counting_local_all_reduce(*args, **kwargs):
+            num_allreduces[0] += 1
+            return local_all_reduce(*args, **kwargs)
+
+        flow._C.local_all_reduce = counting_local_all_reduce
+        try:
+            rank = flow.env.get_rank()
+            # Micro-batch i feeds (rank + 1) * (i + 1).
+            with m.no_sync():
+                for i in range(2):
+                    x = flow.ones(2, device=dev_type) * (rank + 1) * (i + 1)
+                    m(x).sum().backward()
+            test_case.assertEqual(num_allreduces[0], 0)
+            # Local accumulation only: (rank + 1) * (1 + 2) * w2.
+            test_case.assertTrue(np.allclose(m.w1.grad.numpy(), [6 * (rank + 1)] * 2))
+            x = flow.ones(2, device=dev_type) * (rank + 1) * 3
+            m(x).sum().backward()
+        finally:
+            flow._C.local_all_reduce = local_all_reduce
+        test_case.assertEqual(num_allreduces[0], 2)
+        # Sum of the inputs of all micro-batches is 6 * (rank + 1), the mean over
+        # both ranks is 9.
+        test_case.assertTrue(np.allclose(m.w1.grad.numpy(), [18, 18]))
+        test_case.assertTrue(np.allclose(m.w2.grad.numpy(), [9, 9]))
+
+    def test_no_sync(test_case):
+        for dev_type in test_device:
+            test_case._test_no_sync(dev_type)
+
+    def test_no_sync_restores_sync(test_case):
+        m = ddp(flow.nn.Linear(4, 4))
+        with m.no_sync():
+            test_case.assertFalse(m._ddp_require_sync)
+        test_case.assertTrue(m._ddp_require_sync)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,6 +15,7 @@ limitations under the License.
 """
 
 import os
+import shutil
 import warnings
 import tempfile
 import unittest
@@ -27,6 +28,7 @@ import numpy as np
 import oneflow as flow
 import oneflow.nn as nn
 import oneflow.unittest
+from oneflow.framework import check_point_v2
 
 
 def np_relu(np_arr):
@@ -201,6 +203,96 @@ class TestModule(flow.unittest.TestCase):
         res2 = m()
         test_case.assertTrue(np.array_equal(res1.numpy(), res2.numpy()))
 
+    @flow.unittest.skip_unless_1n1d()
+    def test_save_and_load_with_mmap(test_case):
+        state_dict = {
+            "weight": flow.randn(64, 32),
+            "half": flow.randn(8, 8).to(flow.float16),
+            "scalar": flow.tensor(3.0),
+            "empty": flow.zeros(0, 4),
+        }
+        with tempfile.TemporaryDirectory() as save_dir:
+            flow.save(state_dict, save_dir)
+            loaded_state_dict = flow.load(save_dir, mmap=True)
+            for key, value in state_dict.items():
+                loaded = loaded_state_dict[key]
+                test_case.assertEqual(loaded.dtype, value.dtype)
+                test_case.assertEqual(loaded.shape, value.shape)
+                test_case.assertTrue(np.array_equal(loaded.numpy(), value.numpy()))
+            # Writes go to private pages and never reach the checkpoint files.
+            loaded_state_dict["weight"].zero_()
+            reloaded = flow.load(save_dir)["weight"]
+            test_case.assertTrue(
+                np.array_equal(reloaded.numpy(), state_dict["weight"].numpy())
+            )
+            del loaded_state_dict
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_save_over_mmap_loaded_checkpoint(test_case):
+        state_dict = {"weight": flow.randn(64, 32)}
+        expected = state_dict["weight"].numpy().copy()
+        with tempfile.TemporaryDirectory() as save_dir:
+            flow.save(state_dict, save_dir)
+            loaded = flow.load(save_dir, mmap=True)["weight"]
+            (var_dir,) = [d for d in os.listdir(save_dir) if d.startswith("tensor_")]
+            var_dir = os.path.join(save_dir, var_dir)
+            # Writing the variable again replaces its file instead of truncating the
+            # one still mapped by `loaded`.
+            check_point_v2._save_tensor_to_disk(flow.zeros(64, 32), var_dir)
+            test_case.assertTrue(np.array_equal(loaded.numpy(), expected))
+            test_case.assertTrue(
+                np.array_equal(
+                    check_point_v2.FileBackendVariableBlob(var_dir).numpy(),
+                    np.zeros((64, 32)),
+                )
+            )
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_parallel_and_async_save_load(test_case):
+        state_dict = {"w{}".format(i): flow.randn(16, 8) for i in range(20)}
+        expected = {k: v.numpy().copy() for k, v in state_dict.items()}
+        with tempfile.TemporaryDirectory() as save_dir:
+            future = flow.save(state_dict, save_dir, num_io_threads=4, async_save=True)
+            # The save works on a snapshot, later in-place updates are not saved.
+            for v in state_dict.values():
+                v.zero_()
+            test_case.assertIsNone(future.result())
+            loaded_state_dict = flow.load(save_dir, num_io_threads=4)
+            test_case.assertEqual(set(loaded_state_dict.keys()), set(expected.keys()))
+            for k, v in expected.items():
+                test_case.assertTrue(np.array_equal(loaded_state_dict[k].numpy(), v))
+            test_case.assertIsNone(flow.save(state_dict, save_dir, num_io_threads=4))
+            loaded_state_dict = flow.load(save_dir, num_io_threads=1)
+            for k in expected:
+                test_case.assertTrue(
+                    np.array_equal(
+                        loaded_state_dict[k].numpy(), state_dict[k].numpy()
+                    )
+                )
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_load_prefetches_referenced_tensors_only(test_case):
+        state_dict = {"weight": flow.randn(4, 4)}
+        with tempfile.TemporaryDirectory() as save_dir:
+            flow.save(state_dict, save_dir)
+            # A variable the pickled data does not reference, e.g. a leftover of
+            # an earlier save into the same directory.
+            check_point_v2._save_tensor_to_disk(
+                flow.randn(4, 4), os.path.join(save_dir, "tensor_unreferenced")
+            )
+            pickle_bytes = (
+                check_point_v2.Path(save_dir) / check_point_v2.PICKLE_FILENAME
+            ).read_bytes()
+            var_names = check_point_v2._referenced_var_names(
+                pickle_bytes, check_point_v2.Path(save_dir)
+            )
+            test_case.assertEqual(len(var_names), 1)
+            test_case.assertNotIn("tensor_unreferenced", var_names)
+            loaded = flow.load(save_dir)["weight"]
+            test_case.assertTrue(
+                np.array_equal(loaded.numpy(), state_dict["weight"].numpy())
+            )
+
     @flow.unittest.skip_unless_1n4d()
     def test_save_and_load_global_from_nested_dict(test_case):
         class CustomModule(flow.nn.Module):
@@ -255,6 +347,65 @@ class TestModule(flow.unittest.TestCase):
 
         test_case.assertTrue(np.array_equal(res1.numpy(), res2.numpy()))
 
+    @flow.unittest.skip_unless_1n4d()
+    def test_save_and_load_sharded(test_case):
+        placement = flow.placement("cuda", [[0, 1], [2, 3]])
+        # Neither 7 rows nor 5 columns split evenly over 2 ranks.
+        weight = flow.randn(7, 5).to_global(
+            placement=flow.placement("cuda", range(4)), sbp=flow.sbp.broadcast
+        )
+        state_dict = {
+            "s0s1": weight.to_global(
+                placement=placement, sbp=[flow.sbp.split(0), flow.sbp.split(1)]
+            ),
+            "s1s0": weight.to_global(
+                placement=placement, sbp=[flow.sbp.split(1), flow.sbp.split(0)]
+            ),
+            "bs0": weight.to_global(
+                placement=placement, sbp=[flow.sbp.broadcast, flow.sbp.split(0)]
+            ),
+            "partial": weight.to_global(
+                placement=placement, sbp=[flow.sbp.split(0), flow.sbp.broadcast]
+            ).to_global(sbp=[flow.sbp.split(0), flow.sbp.partial_sum]),
+            "step": flow.tensor(3),
+        }
+        expected = weight.numpy()
+        # All ranks run on one node, so they share the temporary directory.
+        save_dir = os.path.join(tempfile.gettempdir(), "test_save_and_load_sharded")
+        with test_case.assertRaises(ValueError):
+            flow.save(state_dict, save_dir, sharded=True, async_save=True)
+        flow.save(state_dict, save_dir, sharded=True)
+
+        shard_dirs = os.listdir(
+            os.path.join(save_dir, f"global_tensor_{state_dict['s0s1'].global_id()}")
+        )
+        test_case.assertEqual(len(shard_dirs), 4)
+        shard_dirs = os.listdir(
+            os.path.join(save_dir, f"global_tensor_{state_dict['bs0'].global_id()}")
+        )
+        test_case.assertEqual(sorted(shard_dirs), ["rank_0", "rank_1"])
+
+        loaded_state_dict = flow.load(save_dir)
+        for key in ["s0s1", "s1s0", "bs0", "partial"]:
+            loaded = loaded_state_dict[key]
+            test_case.assertEqual(loaded.placement, placement)
+            test_case.assertEqual(loaded.shape, weight.shape)
+            test_case.assertTrue(np.array_equal(loaded.numpy(), expected))
+        for key in ["s0s1", "s1s0", "bs0"]:
+            # Every rank holds the same uneven shard it had before saving.
+            loaded = loaded_state_dict[key]
+            test_case.assertEqual(loaded.sbp, state_dict[key].sbp)
+            test_case.assertTrue(
+                np.array_equal(
+                    loaded.to_local().numpy(), state_dict[key].to_local().numpy()
+                )
+            )
+        test_case.assertEqual(loaded_state_dict["step"].item(), 3)
+
+        flow.comm.barrier()
+        if flow.env.get_rank() == 0:
+            shutil.rmtree(save_dir)
+
     @flow.unittest.skip_unless_1n1d()
     @unittest.skipIf(os.getenv("ONEFLOW_TEST_CPU_ONLY"), "only test cpu cases")
     def test_module_cpu_cuda(test_case):
@@ -0,0 +1,121 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+from oneflow.test_utils.test_util import GenArgList
+
+import oneflow as flow
+from oneflow.nn.parameter import Parameter
+
+
+def compare_flatten_with_unflatten(
+    test_case,
+    device,
+    optim_type,
+    optim_kwargs,
+    x_shapes,
+    train_iters,
+    reload_step,
+    norm_type=2.0,
+):
+    init_values = [np.random.uniform(size=s).astype(np.float32) for s in x_shapes]
+    random_grad_seq = [
+        [np.random.uniform(size=s).astype(np.float32) for s in x_shapes]
+        for _ in range(train_iters)
+    ]
+
+    def train(flatten):
+        xs = [
+            Parameter(flow.Tensor(v, device=flow.device(device))) for v in init_values
+        ]
+        params = [
+            {
+                "params": xs,
+                "clip_grad_max_norm": 1.0,
+                "clip_grad_norm_type": norm_type,
+                **optim_kwargs,
+            }
+        ]
+        optim = optim_type(params)
+        if flatten:
+            optim.flatten_parameters()
+        for i, grads in enumerate(random_grad_seq):
+            loss = 0
+            for x, grad in zip(xs, grads):
+                grad_tensor = flow.tensor(grad, device=flow.device(device))
+                loss = loss + flow.sum(x * grad_tensor)
+            loss.backward()
+            optim.clip_grad()
+            optim.step()
+            optim.zero_grad()
+            if flatten:
+                for x in xs:
+                    test_case.assertTrue(np.all(x.grad.numpy() == 0))
+            if i == reload_step:
+                state_dict = optim.state_dict()
+                optim = optim_type(params)
+                if flatten:
+                    optim.flatten_parameters()
+                optim.load_state_dict(state_dict)
+        return [x.numpy() for x in xs]
+
+    for flatten_res, res in zip(train(True), train(False)):
+        test_case.assertTrue(np.allclose(flatten_res, res, 1e-5, 1e-5))
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestOptimFlattenParameters(flow.unittest.TestCase):
+    def test_optim_flatten_parameters(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["device"] = ["cpu", "cuda"]
+        arg_dict["optim"] = [
+            (flow.optim.SGD, {"lr": 0.1, "momentum": 0.9}),
+            (flow.optim.Adam, {"lr": 1e-3, "weight_decay": 0.1}),
+            (flow.optim.RMSprop, {"lr": 1e-3, "centered": True}),
+        ]
+        arg_dict["x_shapes"] = [[(10,), (3, 4), (1,), (130, 2)]]
+        arg_dict["train_iters"] = [6]
+        arg_dict["reload_step"] = [3]
+        for arg in GenArgList(arg_dict):
+            device, (optim_type, optim_kwargs), x_shapes, train_iters, reload_step = arg
+            compare_flatten_with_unflatten(
+                test_case,
+                device,
+                optim_type,
+                optim_kwargs,
+                x_shapes,
+                train_iters,
+                reload_step,
+            )
+
+    def test_optim_flatten_parameters_clip_grad_norm_types(test_case):
+        for norm_type in [0.0, 1.0, float("inf"), float("-inf")]:
+            compare_flatten_with_unflatten(
+                test_case,
+                "cpu",
+                flow.optim.SGD,
+                {"lr": 0.1, "momentum": 0.9},
+                [(10,), (3, 4), (1,), (130, 2)],
+                4,
+                2,
+                norm_type,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+from oneflow.test_utils.test_util import GenArgList
+
+import oneflow as flow
+from oneflow.nn.parameter import Parameter
+
+
+def compare_foreach_with_single_tensor(
+    test_case, device, optim_type, optim_kwargs, x_shapes, train_iters
+):
+    init_values = [np.random.uniform(size=s).astype(np.float32) for s in x_shapes]
+    random_grad_seq = [
+        [np.random.uniform(size=s).astype(np.float32) for s in x_shapes]
+        for _ in range(train_iters)
+    ]
+
+    def train(foreach):
+        xs = [
+            Parameter(flow.Tensor(v, device=flow.device(device))) for v in init_values
+        ]
+        optim = optim_type(xs, foreach=foreach, **optim_kwargs)
+        for grads in random_grad_seq:
+            loss = 0
+            for x, grad in zip(xs, grads):
+                grad_tensor = flow.tensor(grad, device=flow.device(device))
+                loss = loss + flow.sum(x * grad_tensor)
+            loss.backward()
+            optim.step()
+            optim.zero_grad()
+        return [x.numpy() for x in xs]
+
+    for foreach_res, single_res in zip(train(True), train(False)):
+        test_case.assertTrue(np.allclose(foreach_res, single_res, 1e-5, 1e-5))
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestOptimForeach(flow.unittest.TestCase):
+    def test_optim_foreach(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["device"] = ["cpu", "cuda"]
+        arg_dict["optim"] = [
+            (flow.optim.SGD, {"lr": 0.1, "weight_decay": 0.1}),
+            (flow.optim.SGD, {"lr": 0.1, "momentum": 0.9, "weight_decay": 0.1}),
+            (flow.optim.Adam, {"lr": 1e-3, "weight_decay": 0.1}),
+            (flow.optim.Adam, {"lr": 1e-3, "do_bias_correction": False}),
+            (flow.optim.AdamW, {"lr": 1e-3, "weight_decay": 0.1}),
+        ]
+        # more tensors than one multi-tensor launch can take
+        arg_dict["x_shapes"] = [[(10,), (3, 4), (1,)], [(i + 1, 2) for i in range(100)]]
+        arg_dict["train_iters"] = [5]
+        for arg in GenArgList(arg_dict):
+            device, (optim_type, optim_kwargs), x_shapes, train_iters = arg
+            compare_foreach_with_single_tensor(
+                test_case, device, optim_type, optim_kwargs, x_shapes, train_iters
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
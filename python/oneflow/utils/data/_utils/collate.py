@@ -23,6 +23,8 @@ import re
 import collections
 
 import oneflow as flow
+from oneflow.multiprocessing.reductions import new_shared_tensor
+from .worker import get_worker_info
 
 
 string_classes = (str, bytes)
@@ -71,13 +73,41 @@ default_convert_err_msg_format = (
 )
 
 
+def _stack_in_shared_memory(batch):
+    r"""In a DataLoader worker, stacks cpu tensors straight into a shared memory
+    segment so that the batch reaches the main process without another copy.
+    Returns None when the batch does not qualify."""
+    if get_worker_info() is None:
+        return None
+    elem = batch[0]
+    if elem.dtype == flow.tensor_buffer:
+        return None
+    for b in batch:
+        if (
+            not b.is_local
+            or b.device.type != "cpu"
+            or b.requires_grad
+            or b.dtype != elem.dtype
+            or b.shape != elem.shape
+        ):
+            return None
+    arrays = [b.numpy() for b in batch]
+    out = new_shared_tensor((len(arrays),) + arrays[0].shape, arrays[0].dtype)
+    out_data = out.numpy()
+    for i, arr in enumerate(arrays):
+        out_data[i] = arr
+    return out
+
+
 def default_collate(batch):
     r"""Puts each data field into a tensor with outer dimension batch size"""
 
     elem = batch[0]
     elem_type = type(elem)
     if isinstance(elem, (flow.Tensor, flow._oneflow_internal.Tensor)):
-        # TODO: tensor.storage()._new_shared(numel)
+        out = _stack_in_shared_memory(batch)
+        if out is not None:
+            return out
         return flow._C.stack(batch, dim=0)
     elif (
         elem_type.__module__ == "numpy"
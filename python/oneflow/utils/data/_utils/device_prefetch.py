@@ -0,0 +1,144 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+r"""Contains definitions of the methods used by the DataLoader to move batches to
+the device or placement they are consumed on in a background thread, so that the
+transfer of the next batches overlaps with the computation on the current one.
+"""
+import collections
+import queue
+import threading
+
+import oneflow as flow
+from . import MP_STATUS_CHECK_INTERVAL
+from .worker import ExceptionWrapper
+
+
+string_classes = (str, bytes)
+
+
+class _PrefetchStopIteration(object):
+    r"""Put into the queue by the prefetch thread when the source is exhausted."""
+
+
+def move_to(data, device=None, placement=None, sbp=None):
+    r"""Moves every tensor in ``data`` to ``device``, or to ``placement`` with ``sbp``
+    when ``placement`` is given. Other objects are returned unchanged."""
+    if isinstance(data, (flow.Tensor, flow._oneflow_internal.Tensor)):
+        if placement is not None:
+            return data.to_global(placement=placement, sbp=sbp)
+        return data.to(device)
+    elif isinstance(data, collections.abc.Mapping):
+        return {key: move_to(data[key], device, placement, sbp) for key in data}
+    elif isinstance(data, tuple) and hasattr(data, "_fields"):  # namedtuple
+        return type(data)(*(move_to(d, device, placement, sbp) for d in data))
+    elif isinstance(data, collections.abc.Sequence) and not isinstance(
+        data, string_classes
+    ):
+        return [move_to(d, device, placement, sbp) for d in data]
+    else:
+        return data
+
+
+def _device_prefetch_loop(data_iter, data_queue, move_fn, done_event):
+    while not done_event.is_set():
+        try:
+            data = move_fn(next(data_iter))
+        except StopIteration:
+            data = _PrefetchStopIteration()
+        except Exception:
+            data = ExceptionWrapper(where="in DataLoader device prefetch thread")
+        # The queue is bounded, so wake up periodically to see if the iterator
+        # was shut down while the consumer stopped taking batches.
+        while not done_event.is_set():
+            try:
+                data_queue.put(data, timeout=MP_STATUS_CHECK_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        if isinstance(data, (_PrefetchStopIteration, ExceptionWrapper)):
+            break
+        del data
+
+
+class _DevicePrefetchIter(object):
+    r"""Wraps a DataLoader iterator and keeps up to ``num_batches`` batches moved to
+    the target device or placement ahead of the consumer."""
+
+    def __init__(self, data_iter, num_batches, device=None, placement=None, sbp=None):
+        self._data_iter = data_iter
+        self._data_queue = queue.Queue(maxsize=num_batches)
+        self._done_event = threading.Event()
+        self._exhausted = False
+        self._placement = placement
+        self._sbp = sbp
+        # Making global tensors runs collectives, which need the consistent id and
+        # rank group scope of the main thread and must be issued in the same order on
+        # all ranks. The prefetch thread only does the host to device copy, the
+        # conversion to global tensors happens in __next__.
+        if placement is not None:
+            device = placement.type
+        self._thread = threading.Thread(
+            target=_device_prefetch_loop,
+            args=(
+                data_iter,
+                self._data_queue,
+                lambda data: move_to(data, device),
+                self._done_event,
+            ),
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._exhausted:
+            raise StopIteration
+        data = self._data_queue.get()
+        if isinstance(data, _PrefetchStopIteration):
+            self._exhausted = True
+            self._thread.join()
+            raise StopIteration
+        if isinstance(data, ExceptionWrapper):
+            self._exhausted = True
+            self._thread.join()
+            data.reraise()
+        if self._placement is not None:
+            return move_to(data, placement=self._placement, sbp=self._sbp)
+        return data
+
+    next = __next__
+
+    def __len__(self):
+        return len(self._data_iter)
+
+    def shutdown(self):
+        r"""Stops the prefetch thread. The wrapped iterator can be reset after this
+        returns."""
+        if self._thread.is_alive():
+            self._done_event.set()
+            # Drop prefetched batches so that a blocked put returns.
+            while self._thread.is_alive():
+                try:
+                    self._data_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._thread.join()
+        self._exhausted = True
+
+    def __del__(self):
+        self.shutdown()
@@ -168,6 +168,21 @@ class DataLoader(Generic[T_co]):
         persistent_workers (bool, optional): If ``True``, the data loader will not shutdown
             the worker processes after a dataset has been consumed once. This allows to
             maintain the workers `Dataset` instances alive. (default: ``False``)
+        prefetch_device (str or flow.device, optional, keyword-only arg): If not ``None``,
+            a background thread moves the tensors of the next batches to this device, so
+            that the host to device copy overlaps with the computation on the current
+            batch. (default: ``None``)
+        prefetch_placement (flow.placement, optional, keyword-only arg): Like
+            :attr:`prefetch_device`, but converts the tensors to global tensors with this
+            placement and :attr:`prefetch_sbp`. The background thread only copies them
+            to the device type of the placement, the conversion runs on the thread
+            taking the batch. (default: ``None``)
+        prefetch_sbp (flow.sbp.sbp or tuple of flow.sbp.sbp, optional, keyword-only arg):
+            The sbp of the global tensors made by :attr:`prefetch_placement`.
+            (default: ``None``)
+        prefetch_batches (int, optional, keyword-only arg): Number of batches moved to
+            :attr:`prefetch_device` or :attr:`prefetch_placement` ahead of the batch being
+            consumed. (default: ``2``)
 
 
     .. warning:: If the ``spawn`` start method is used, :attr:`worker_init_fn`
@@ -214,7 +229,11 @@ class DataLoader(Generic[T_co]):
         generator=flow.Generator("cpu"),
         *,
         prefetch_factor: int = 2,
-        persistent_workers: bool = False
+        persistent_workers: bool = False,
+        prefetch_device=None,
+        prefetch_placement=None,
+        prefetch_sbp=None,
+        prefetch_batches: int = 2
     ):
 
         if num_workers < 0:
@@ -238,11 +257,27 @@ class DataLoader(Generic[T_co]):
         if persistent_workers and num_workers == 0:
             raise ValueError("persistent_workers option needs num_workers > 0")
 
+        if prefetch_device is not None and prefetch_placement is not None:
+            raise ValueError(
+                "prefetch_device option is mutually exclusive with prefetch_placement"
+            )
+        if (prefetch_placement is None) != (prefetch_sbp is None):
+            raise ValueError(
+                "prefetch_placement and prefetch_sbp options must be set together"
+            )
+        if prefetch_batches <= 0:
+            raise ValueError("prefetch_batches option should be positive")
+
         self.dataset = dataset
         self.prefetch_factor = prefetch_factor
         self.timeout = timeout
         self.worker_init_fn = worker_init_fn
         self.multiprocessing_context = multiprocessing_context
+        self.prefetch_device = prefetch_device
+        self.prefetch_placement = prefetch_placement
+        self.prefetch_sbp = prefetch_sbp
+        self.prefetch_batches = prefetch_batches
+        self._prefetch_iterator = None
 
         # Arg-check dataset related before checking samplers because we want to
         # tell users that iterable-style datasets are incompatible with custom
@@ -382,6 +417,11 @@ class DataLoader(Generic[T_co]):
     # We quote '_BaseDataLoaderIter' since it isn't defined yet and the definition can't be moved up
     # since '_BaseDataLoaderIter' references 'DataLoader'.
     def __iter__(self) -> "_BaseDataLoaderIter":
+        # The prefetch thread of the previous epoch may still be pulling from a
+        # persistent iterator, stop it before the iterator is reset.
+        if self._prefetch_iterator is not None:
+            self._prefetch_iterator.shutdown()
+            self._prefetch_iterator = None
         # When using a single worker the returned iterator should be
         # created everytime to avoid reseting its state
         # However, in the case of a multiple workers iterator
@@ -392,9 +432,19 @@ class DataLoader(Generic[T_co]):
                 self._iterator = self._get_iterator()
             else:
                 self._iterator._reset(self)
-            return self._iterator
+            data_iter = self._iterator
         else:
-            return self._get_iterator()
+            data_iter = self._get_iterator()
+        if self.prefetch_device is None and self.prefetch_placement is None:
+            return data_iter
+        self._prefetch_iterator = _utils.device_prefetch._DevicePrefetchIter(
+            data_iter,
+            self.prefetch_batches,
+            device=self.prefetch_device,
+            placement=self.prefetch_placement,
+            sbp=self.prefetch_sbp,
+        )
+        return self._prefetch_iterator
 
     @property
     def _auto_collation(self):